@@ -1,9 +1,34 @@
 """
 API clients package for video generation providers.
+
+Provider clients are imported lazily on first attribute access, so only the
+client that is actually used (and its HTTP stack) gets loaded.
 """
 
-from .runway_client import RunwayClient
-from .stable_video_client import StableVideoClient
-from .pika_client import PikaClient
+import importlib
+
+__all__ = ['StabilityAIClient', 'RunwayClient', 'StableVideoClient', 'PikaClient', 'resume_interrupted_generations']
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'StabilityAIClient': '.stability_ai_client',
+    'RunwayClient': '.runway_client',
+    'StableVideoClient': '.stable_video_client',
+    'PikaClient': '.pika_client',
+    'resume_interrupted_generations': '.resume',
+}
+
+
+def __getattr__(name):
+    """Import the client module that provides ``name`` on first access."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['RunwayClient', 'StableVideoClient', 'PikaClient']
+def __dir__():
+    return sorted(list(globals()) + __all__)
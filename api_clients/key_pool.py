@@ -0,0 +1,355 @@
+"""
+Pool of Stability AI API keys with per-key rate accounting.
+
+Each key has its own token bucket (requests per second with a burst), a
+credit balance refreshed from the account API (and charged locally for
+each successful request in between), and a health state. Requests
+are spread across the healthy keys, preferring the least loaded key with
+the most credits. Keys that are rejected with 401/403 are evicted for good;
+keys that run out of credits are evicted until a refresh shows a balance
+again; keys that hit 429 or keep failing cool down for a while.
+"""
+
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+
+import requests
+
+from config import Config
+from utils import cancellation
+from utils.cancellation import CancellationToken
+
+# Seconds a key sits out after a 429 or repeated server errors
+RATE_LIMIT_COOLDOWN = 10.0
+FAILURE_COOLDOWN = 30.0
+MAX_CONSECUTIVE_FAILURES = 3
+
+# Pools kept up to date by the one shared credit refresher. They are held
+# weakly, so a pool nobody uses any more is collected and drops out; the
+# refresher thread exits once no pool is left.
+_refreshed_pools: "weakref.WeakSet[KeyPool]" = weakref.WeakSet()
+_refresher_lock = threading.Lock()
+_refresher: Optional[threading.Thread] = None
+_pool_added = threading.Event()
+
+
+class NoAvailableKeyError(RuntimeError):
+    """Raised when no key in the pool can take a request."""
+
+
+@dataclass
+class ApiKeyState:
+    """Accounting for one API key."""
+    
+    key: str
+    rate: float
+    burst: float
+    tokens: float = 0.0
+    refilled_at: float = field(default_factory=time.monotonic)
+    credits: Optional[float] = None  # Unknown until the first refresh
+    credits_checked_at: float = 0.0
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    evicted: Optional[str] = None  # Reason, or None while the key is usable
+    
+    def __post_init__(self):
+        self.tokens = self.burst
+    
+    @property
+    def label(self) -> str:
+        """Key identifier that is safe to log."""
+        return f"{self.key[:6]}...{self.key[-4:]}"
+    
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+    
+    def available(self, now: float) -> bool:
+        return self.evicted is None and now >= self.cooldown_until
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'key': self.label,
+            'healthy': self.evicted is None and time.monotonic() >= self.cooldown_until,
+            'evicted': self.evicted,
+            'credits': self.credits,
+            'tokens': round(self.tokens, 2),
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures
+        }
+
+
+class KeyPool:
+    """Load-balanced, rate-limited pool of API keys (thread-safe)."""
+    
+    def __init__(
+        self,
+        keys: List[str],
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        min_credits: Optional[float] = None,
+        base_url: Optional[str] = None,
+        credits_per_request: Optional[float] = None
+    ):
+        """
+        Args:
+            keys: API keys; malformed ones are evicted immediately
+            rate: Requests per second allowed per key
+            burst: Requests a key may make back to back
+            min_credits: Keys with fewer credits are evicted
+            base_url: Stability AI API base URL
+            credits_per_request: Credits a successful request is assumed to
+                spend until the next refresh reports the real balance
+        """
+        rate = rate or Config.KEY_REQUESTS_PER_SECOND
+        burst = burst or Config.KEY_BURST
+        self.min_credits = Config.KEY_MIN_CREDITS if min_credits is None else min_credits
+        self.base_url = base_url or Config.STABILITY_BASE_URL
+        self.credits_per_request = (
+            Config.KEY_CREDITS_PER_REQUEST if credits_per_request is None else credits_per_request
+        )
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._keys = [ApiKeyState(key=key, rate=rate, burst=burst) for key in dict.fromkeys(keys) if key]
+        for state in self._keys:
+            if not state.key.startswith('sk-'):
+                state.evicted = "invalid key format"
+        self._refreshed = False
+        self._next_refresh = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def has_usable_key(self) -> bool:
+        """Whether any key is not evicted (it may still be cooling down)."""
+        with self._lock:
+            return any(state.evicted is None for state in self._keys)
+    
+    def acquire(
+        self,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> ApiKeyState:
+        """
+        Take a rate-limit token from the best available key, waiting for one
+        to refill if necessary.
+        
+        Args:
+            timeout: Seconds to wait (Config.API_TIMEOUT if omitted)
+            cancel_token: Stops the wait as soon as it is cancelled
+        
+        Raises:
+            NoAvailableKeyError: Every key is evicted, or none freed up in time
+            GenerationCancelled: The token was cancelled while waiting
+        """
+        self._start_refresher()
+        deadline = time.monotonic() + (Config.API_TIMEOUT if timeout is None else timeout)
+        unregister = cancel_token.on_cancel(self._wake_waiters) if cancel_token is not None else None
+        try:
+            return self._acquire(deadline, cancel_token)
+        finally:
+            if unregister is not None:
+                unregister()
+    
+    def _wake_waiters(self):
+        with self._lock:
+            self._available.notify_all()
+    
+    def _acquire(self, deadline: float, cancel_token: Optional[CancellationToken]) -> ApiKeyState:
+        with self._lock:
+            while True:
+                cancellation.check(cancel_token)
+                now = time.monotonic()
+                usable = [state for state in self._keys if state.evicted is None]
+                if not usable:
+                    raise NoAvailableKeyError("No usable API keys in the pool")
+                
+                ready = []
+                for state in usable:
+                    state.refill(now)
+                    if state.available(now) and state.tokens >= 1:
+                        ready.append(state)
+                
+                if ready:
+                    # Least loaded first, then the key with the most credits left
+                    state = min(ready, key=_load_order)
+                    state.tokens -= 1
+                    state.in_flight += 1
+                    state.requests += 1
+                    return state
+                
+                # Sleep until the soonest key refills or leaves its cooldown
+                wake = min(
+                    max(state.cooldown_until, now + (1 - state.tokens) / state.rate)
+                    for state in usable
+                )
+                if wake >= deadline:
+                    raise NoAvailableKeyError("All API keys are rate limited")
+                self._available.wait(wake - now)
+    
+    def release(self, state: ApiKeyState, status_code: Optional[int], error: str = ""):
+        """
+        Record the outcome of a request made with a key.
+        
+        Args:
+            state: Key returned by acquire()
+            status_code: HTTP status, or None if the request never completed
+            error: Response body, used to recognise exhausted credits
+        """
+        now = time.monotonic()
+        with self._lock:
+            state.in_flight = max(0, state.in_flight - 1)
+            
+            if status_code == 200:
+                state.consecutive_failures = 0
+                # Keep the balance roughly current between refreshes, so
+                # the credits ordering in acquire() does not go stale
+                if state.credits is not None:
+                    state.credits = max(0.0, state.credits - self.credits_per_request)
+                    if state.credits < self.min_credits:
+                        self._evict(state, "out of credits")
+            elif status_code in (401, 403):
+                self._evict(state, "unauthorized")
+            elif status_code == 402 or (status_code == 429 and "credit" in error.lower()):
+                state.credits = 0.0
+                self._evict(state, "out of credits")
+            elif status_code == 429:
+                state.failures += 1
+                state.tokens = 0.0
+                state.cooldown_until = now + RATE_LIMIT_COOLDOWN
+            elif status_code is None or status_code >= 500:
+                state.failures += 1
+                state.consecutive_failures += 1
+                if state.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                    state.cooldown_until = now + FAILURE_COOLDOWN
+                    state.consecutive_failures = 0
+            
+            self._available.notify_all()
+    
+    def _evict(self, state: ApiKeyState, reason: str):
+        """Take a key out of rotation (lock held)."""
+        if state.evicted is None:
+            print(f"⚠️  Evicting API key {state.label}: {reason}")
+        state.evicted = reason
+    
+    def refresh(self, state: ApiKeyState):
+        """
+        Check a key against the account API and update its credit balance.
+        
+        Keys evicted for running out of credits come back once topped up.
+        """
+        headers = {"Authorization": f"Bearer {state.key}"}
+        try:
+            response = requests.get(f"{self.base_url}/v1/user/account", headers=headers, timeout=10)
+            if response.status_code in (401, 403):
+                with self._lock:
+                    self._evict(state, "unauthorized")
+                return
+            if response.status_code != 200:
+                return
+            
+            credits = response.json().get("credits")
+            if credits is None:
+                # The account payload may omit the balance; it has its own endpoint
+                balance = requests.get(f"{self.base_url}/v1/user/balance", headers=headers, timeout=10)
+                if balance.status_code == 200:
+                    credits = balance.json().get("credits")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"⚠️  Credit check failed for API key {state.label}: {e}")
+            return
+        
+        with self._lock:
+            state.credits_checked_at = time.monotonic()
+            if credits is None:
+                return
+            state.credits = float(credits)
+            if state.credits < self.min_credits:
+                self._evict(state, "out of credits")
+            elif state.evicted == "out of credits":
+                state.evicted = None
+                self._available.notify_all()
+    
+    def refresh_all(self):
+        """Refresh every key that has not been permanently evicted."""
+        for state in list(self._keys):
+            if state.evicted in (None, "out of credits"):
+                self.refresh(state)
+    
+    def _start_refresher(self):
+        """Hand the pool to the shared background credit refresh on first use."""
+        global _refresher
+        if self._refreshed or Config.CREDIT_REFRESH_SECONDS <= 0:
+            return
+        with _refresher_lock:
+            if self._refreshed:
+                return
+            self._refreshed = True
+            _refreshed_pools.add(self)
+            _pool_added.set()
+            if _refresher is None:
+                _refresher = threading.Thread(target=_refresh_loop, name="key-pool-refresh", daemon=True)
+                _refresher.start()
+    
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-key accounting, with keys masked."""
+        with self._lock:
+            return [state.to_dict() for state in self._keys]
+
+
+def _load_order(state: ApiKeyState) -> tuple:
+    """Sort key for picking a key: fewest in flight, most credits, fewest requests."""
+    credits = state.credits if state.credits is not None else float("inf")
+    return state.in_flight, -credits, state.requests
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool() -> KeyPool:
+    """The key pool shared by every client in this process, built from Config."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = KeyPool(Config.get_api_keys())
+        return _pool
+
+
+def _refresh_loop():
+    """Refresh every live pool in turn, until none is left."""
+    while True:
+        _pool_added.clear()
+        wait = _refresh_due()
+        if wait is None:
+            return
+        _pool_added.wait(wait)
+
+
+def _refresh_due() -> Optional[float]:
+    """
+    Refresh the pools that are due.
+    
+    Returns:
+        Seconds until the next pool is due, or None once no pool is left
+        (the refresher has then been unregistered)
+    """
+    global _refresher
+    with _refresher_lock:
+        pools = list(_refreshed_pools)
+        if not pools:
+            _refresher = None
+            return None
+    
+    for pool in pools:
+        if pool._next_refresh <= time.monotonic():
+            pool.refresh_all()
+            pool._next_refresh = time.monotonic() + Config.CREDIT_REFRESH_SECONDS
+    # The pools list goes with this frame, so no pool is held while waiting
+    return max(0.0, min(pool._next_refresh for pool in pools) - time.monotonic())
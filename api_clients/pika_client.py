@@ -4,13 +4,28 @@ Pika Labs API client for video generation.
 
 import requests
 import asyncio
-import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+from config import Config, VideoProvider
+from utils import cancellation
+from utils.artifacts import MediaArtifact
+from utils.cancellation import CancellationToken, GenerationCancelled
+from utils.deadline import request_timeout, timed
+from utils.file_io import run_io
+from utils.job_journal import get_job_journal
+from utils.status_poller import StatusPoller, get_status_poller
+from utils.webhooks import PendingCallback, expect_callback
+
+PROVIDER = "pika"
 
 
 class PikaClient:
     """Client for interacting with Pika Labs API."""
     
+    # Path of the batch status endpoint (GET with ?ids=a,b,c, answering
+    # {"jobs": [status, ...]}), when the API has one; None polls jobs one by one
+    batch_status_path: Optional[str] = None
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.base_url = "https://api.pika.art/v1"
@@ -19,7 +34,13 @@ class PikaClient:
             "Content-Type": "application/json"
         }
     
-    async def generate_video(self, prompt: str, duration: int, style: str) -> Optional[bytes]:
+    async def generate_video(
+        self,
+        prompt: str,
+        duration: int,
+        style: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[bytes]:
         """
         Generate video using Pika Labs API.
         
@@ -27,11 +48,18 @@ class PikaClient:
             prompt: Text description for video generation
             duration: Video duration in seconds
             style: Visual style for the video
+            cancel_token: Stops polling and downloading when cancelled; a
+                Deadline also caps every HTTP timeout at the budget left
             
         Returns:
             Video data as bytes or None if failed
+            
+        Raises:
+            GenerationCancelled: The token was cancelled
         """
         try:
+            cancellation.check(cancel_token)
+            
             # Prepare generation request
             generation_data = {
                 "prompt": prompt,
@@ -43,31 +71,143 @@ class PikaClient:
                 "guidance_scale": 7.5
             }
             
-            # Start video generation
-            response = requests.post(
-                f"{self.base_url}/videos/generate",
-                headers=self.headers,
-                json=generation_data,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                print(f"Pika generation failed: {response.status_code} - {response.text}")
-                return None
-            
-            generation_id = response.json().get("id")
-            if not generation_id:
-                print("No generation ID received from Pika")
-                return None
+            # A job collected after a restart may already have produced this video
+            journal = get_job_journal()
+            resumed_path = await run_io(journal.take_completed, PROVIDER, generation_data)
+            if resumed_path:
+                return await self._deliver(
+                    MediaArtifact.from_file(resumed_path), prompt, duration, generation_data["duration"]
+                )
+            journaled_params = dict(generation_data)
             
-            # Poll for completion
-            video_data = await self._poll_generation_status(generation_id)
-            return video_data
+            # Completion webhook when the receiver is running; polling backs it up
+            with expect_callback() as callback:
+                if callback is not None:
+                    generation_data["webhook_url"] = callback.url
+                
+                # Start video generation
+                timeout = request_timeout(cancel_token, PROVIDER, "submit", 30)
+                with timed(PROVIDER, "submit", timeout):
+                    response = requests.post(
+                        f"{self.base_url}/videos/generate",
+                        headers=self.headers,
+                        json=generation_data,
+                        timeout=timeout
+                    )
+                
+                if response.status_code != 200:
+                    print(f"Pika generation failed: {response.status_code} - {response.text}")
+                    return None
+                
+                generation_id = response.json().get("id")
+                if not generation_id:
+                    print("No generation ID received from Pika")
+                    return None
+                
+                # Journal the job so a restart can still collect it
+                await run_io(journal.record, PROVIDER, generation_id, journaled_params)
+                
+                # Poll for completion, cancelling the remote job if we give up
+                try:
+                    artifact = await self._poll_generation_status(generation_id, cancel_token, callback, prompt)
+                except GenerationCancelled:
+                    self._cancel_remote(generation_id)
+                    await run_io(journal.forget, PROVIDER, generation_id)
+                    raise
+                
+                await run_io(journal.forget, PROVIDER, generation_id)
+                if artifact is None:
+                    return None
+                return await self._deliver(artifact, prompt, duration, generation_data["duration"], discard=True)
             
         except Exception as e:
             print(f"Pika client error: {str(e)}")
             return None
     
+    async def _deliver(
+        self,
+        artifact: MediaArtifact,
+        prompt: str,
+        duration: int,
+        clip_duration: int,
+        discard: bool = False
+    ) -> bytes:
+        """
+        Read a finished clip, stretched first if Pika stopped short of duration
+        and the clip can be re-encoded as is (see size_target.reencodable).
+        
+        Args:
+            artifact: The clip as Pika rendered it
+            prompt: Original prompt, for naming the stretched copy
+            duration: Requested length in seconds
+            clip_duration: Length Pika was asked for (at most 6 seconds)
+            discard: Delete the clip once read (a download only this request uses)
+        """
+        from utils.file_handler import FileHandler
+        from utils.size_target import reencodable
+        
+        stretched = None
+        # Pika stops at 6 seconds; stretch locally to the requested length.
+        # Retiming re-encodes to mp4v without audio, so H.264 clips or clips
+        # with sound are delivered as Pika made them
+        if Config.INTERPOLATE_SHORT_CLIPS and duration > clip_duration:
+            if await run_io(reencodable, artifact.path):
+                stretched = await self._stretch(artifact, duration, prompt)
+            else:
+                print("Keeping Pika clip at its own length: retiming would change its codec or drop its audio")
+        
+        try:
+            return await run_io((stretched or artifact).read_bytes)
+        finally:
+            file_handler = FileHandler()
+            if stretched is not None:
+                await run_io(file_handler.discard_artifact, stretched)
+            if discard:
+                await run_io(file_handler.discard_artifact, artifact)
+    
+    async def _stretch(self, artifact: MediaArtifact, duration: int, prompt: str) -> Optional[MediaArtifact]:
+        """Interpolate a short clip up to duration seconds, file to file (None on failure)."""
+        from utils.frame_interpolation import retime_artifact
+        
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, retime_artifact, artifact, duration, prompt, VideoProvider.PIKA)
+        except Exception as e:
+            print(f"Could not stretch Pika clip: {str(e)}")
+            return None
+    
+    async def resume_interrupted(self) -> List[MediaArtifact]:
+        """
+        Collect jobs journaled by a process that stopped before they finished.
+        
+        Each claimed job is polled to completion, downloaded and saved; the
+        video is then handed to the next request with the same parameters.
+        
+        Returns:
+            Artifacts of the videos that were recovered
+        """
+        journal = get_job_journal()
+        jobs = await run_io(journal.claim_orphans, PROVIDER)
+        if not jobs:
+            return []
+        
+        print(f"Resuming {len(jobs)} interrupted Pika generation(s)")
+        results = await asyncio.gather(
+            *(self._resume_job(generation_id, params) for generation_id, params in jobs),
+            return_exceptions=True
+        )
+        return [result for result in results if isinstance(result, MediaArtifact)]
+    
+    async def _resume_job(self, generation_id: str, params: Dict[str, Any]) -> Optional[MediaArtifact]:
+        journal = get_job_journal()
+        artifact = await self._poll_generation_status(generation_id, prompt=params.get("prompt", ""))
+        
+        if artifact is None:
+            await run_io(journal.forget, PROVIDER, generation_id)
+            return None
+        await run_io(journal.complete, PROVIDER, generation_id, artifact.path)
+        return artifact
+    
     def _map_style_to_pika(self, style: str) -> str:
         """Map general style to Pika Labs style."""
         style_mapping = {
@@ -82,67 +222,126 @@ class PikaClient:
         }
         return style_mapping.get(style, "realistic")
     
-    async def _poll_generation_status(self, generation_id: str) -> Optional[bytes]:
-        """Poll the generation status until completion."""
-        max_attempts = 60  # 5 minutes with 5-second intervals
-        attempt = 0
+    async def _poll_generation_status(
+        self,
+        generation_id: str,
+        cancel_token: Optional[CancellationToken] = None,
+        callback: Optional[PendingCallback] = None,
+        prompt: str = ""
+    ) -> Optional[MediaArtifact]:
+        """
+        Wait for the generation to finish and save the video.
         
-        while attempt < max_attempts:
-            try:
-                response = requests.get(
-                    f"{self.base_url}/videos/{generation_id}",
-                    headers=self.headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    status = data.get("status")
-                    
-                    if status == "completed":
-                        # Download the video
-                        video_url = data.get("video_url")
-                        if video_url:
-                            return await self._download_video(video_url)
-                        else:
-                            print("No video URL in response")
-                            return None
-                    elif status == "failed":
-                        print(f"Pika generation failed: {data.get('error', 'Unknown error')}")
-                        return None
-                    elif status in ["pending", "processing", "queued"]:
-                        # Continue polling
-                        await asyncio.sleep(5)
-                        attempt += 1
-                    else:
-                        print(f"Unknown status from Pika: {status}")
-                        return None
-                else:
-                    print(f"Status check failed: {response.status_code}")
-                    return None
-                    
-            except Exception as e:
-                print(f"Error checking status: {str(e)}")
-                await asyncio.sleep(5)
-                attempt += 1
+        Status comes from the provider's shared status poller, or from the
+        webhook callback if Pika calls back first.
+        """
+        data = await self._status_poller().wait(generation_id, cancel_token, callback)
+        if data is None:
+            print("Pika generation timed out")
+            return None
         
-        print("Pika generation timed out")
-        return None
-    
-    async def _download_video(self, video_url: str) -> Optional[bytes]:
-        """Download video from the provided URL."""
-        try:
-            response = requests.get(video_url, timeout=60)
-            if response.status_code == 200:
-                return response.content
+        status = data.get("status")
+        if status == "completed":
+            # Download the video
+            video_url = data.get("video_url")
+            if video_url:
+                return await self._download_video(video_url, cancel_token, prompt)
             else:
-                print(f"Video download failed: {response.status_code}")
+                print("No video URL in response")
                 return None
+        elif status == "failed":
+            print(f"Pika generation failed: {data.get('error', 'Unknown error')}")
+            return None
+        else:
+            print(f"Unknown status from Pika: {status}")
+            return None
+    
+    def _status_poller(self) -> StatusPoller:
+        """The poller shared by every client using this endpoint and key."""
+        return get_status_poller(
+            (PROVIDER, self.base_url, self.api_key),
+            lambda: StatusPoller(
+                PROVIDER,
+                self._fetch_status,
+                ["pending", "processing", "queued"],
+                fetch_batch=self._fetch_statuses if self.batch_status_path else None
+            )
+        )
+    
+    def _fetch_status(self, generation_id: str) -> Dict[str, Any]:
+        """Status document of one job (blocking; called by the status poller)."""
+        timeout = request_timeout(None, PROVIDER, "poll", 10)
+        with timed(PROVIDER, "poll", timeout):
+            response = requests.get(
+                f"{self.base_url}/videos/{generation_id}",
+                headers=self.headers,
+                timeout=timeout
+            )
+        
+        # Only a definitive rejection (unknown or refused job) fails the job;
+        # rate limits and server errors raise, so the poller asks again next tick
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            return {"status": "failed", "error": f"Status check failed: {response.status_code}"}
+        response.raise_for_status()
+        return response.json()
+    
+    def _fetch_statuses(self, generation_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Status documents of many jobs from the batch endpoint, by job ID."""
+        timeout = request_timeout(None, PROVIDER, "poll_batch", 10)
+        with timed(PROVIDER, "poll_batch", timeout):
+            response = requests.get(
+                f"{self.base_url}{self.batch_status_path}",
+                headers=self.headers,
+                params={"ids": ",".join(generation_ids)},
+                timeout=timeout
+            )
+        response.raise_for_status()
+        return {job["id"]: job for job in response.json().get("jobs", []) if "id" in job}
+    
+    async def _download_video(
+        self,
+        video_url: str,
+        cancel_token: Optional[CancellationToken] = None,
+        prompt: str = ""
+    ) -> Optional[MediaArtifact]:
+        """Download video from the provided URL to a saved file."""
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._fetch_video, video_url, cancel_token, prompt)
                 
         except Exception as e:
             print(f"Error downloading video: {str(e)}")
             return None
     
+    def _fetch_video(
+        self,
+        video_url: str,
+        cancel_token: Optional[CancellationToken],
+        prompt: str
+    ) -> Optional[MediaArtifact]:
+        """Stream the video body to disk; cancelling closes the connection mid-read."""
+        from utils.file_handler import FileHandler
+        
+        timeout = request_timeout(cancel_token, PROVIDER, "download", 60)
+        with timed(PROVIDER, "download", timeout), \
+                requests.get(video_url, stream=True, timeout=timeout) as response, \
+                cancellation.closing(cancel_token, response):
+            if response.status_code != 200:
+                print(f"Video download failed: {response.status_code}")
+                return None
+            return FileHandler().save_artifact(
+                cancellation.guard(cancel_token, response.iter_content(chunk_size=1024 * 1024)),
+                prompt,
+                VideoProvider.PIKA
+            )
+    
+    def _cancel_remote(self, generation_id: str):
+        """Best-effort request to stop a remote generation."""
+        try:
+            requests.delete(f"{self.base_url}/videos/{generation_id}", headers=self.headers, timeout=5)
+        except Exception as e:
+            print(f"Could not cancel Pika generation {generation_id}: {str(e)}")
+    
     def test_connection(self) -> bool:
         """Test if the API connection is working."""
         try:
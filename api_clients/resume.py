@@ -0,0 +1,55 @@
+"""
+Resume remote generations that a previous process left unfinished.
+
+Called once at startup: every provider client with a configured API key
+claims its orphaned jobs from the job journal and collects them on a
+background thread, so the app starts serving immediately.
+"""
+
+import asyncio
+import threading
+from typing import Optional
+
+from config import Config
+
+_started = False
+_lock = threading.Lock()
+
+
+async def _resume_all(clients):
+    results = await asyncio.gather(*(client.resume_interrupted() for client in clients), return_exceptions=True)
+    for client, result in zip(clients, results):
+        if isinstance(result, BaseException):
+            print(f"⚠️  Resuming {type(client).__name__} jobs failed: {result}")
+        elif result:
+            print(f"✅ Recovered {len(result)} video(s) from interrupted {type(client).__name__} jobs")
+
+
+def resume_interrupted_generations() -> Optional[threading.Thread]:
+    """
+    Start collecting orphaned Runway/Pika jobs in the background.
+    
+    Only the first call in a process does anything.
+    
+    Returns:
+        The worker thread, or None if there was nothing to start
+    """
+    global _started
+    with _lock:
+        if _started:
+            return None
+        _started = True
+    
+    clients = []
+    if Config.RUNWAY_API_KEY:
+        from api_clients.runway_client import RunwayClient
+        clients.append(RunwayClient(Config.RUNWAY_API_KEY))
+    if Config.PIKA_API_KEY:
+        from api_clients.pika_client import PikaClient
+        clients.append(PikaClient(Config.PIKA_API_KEY))
+    if not clients:
+        return None
+    
+    thread = threading.Thread(target=asyncio.run, args=(_resume_all(clients),), name="job-resume", daemon=True)
+    thread.start()
+    return thread
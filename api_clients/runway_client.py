@@ -4,13 +4,28 @@ Runway ML API client for video generation.
 
 import requests
 import asyncio
-import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+from config import VideoProvider
+from utils import cancellation
+from utils.artifacts import MediaArtifact
+from utils.cancellation import CancellationToken, GenerationCancelled
+from utils.deadline import request_timeout, timed
+from utils.file_io import run_io
+from utils.job_journal import get_job_journal
+from utils.status_poller import StatusPoller, get_status_poller
+from utils.webhooks import PendingCallback, expect_callback
+
+PROVIDER = "runway"
 
 
 class RunwayClient:
     """Client for interacting with Runway ML API."""
     
+    # Path of the batch status endpoint (GET with ?ids=a,b,c, answering
+    # {"jobs": [status, ...]}), when the API has one; None polls jobs one by one
+    batch_status_path: Optional[str] = None
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.base_url = "https://api.runwayml.com/v1"
@@ -19,7 +34,13 @@ class RunwayClient:
             "Content-Type": "application/json"
         }
     
-    async def generate_video(self, prompt: str, duration: int, style: str) -> Optional[bytes]:
+    async def generate_video(
+        self,
+        prompt: str,
+        duration: int,
+        style: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[bytes]:
         """
         Generate video using Runway ML API.
         
@@ -27,11 +48,18 @@ class RunwayClient:
             prompt: Text description for video generation
             duration: Video duration in seconds
             style: Visual style for the video
+            cancel_token: Stops polling and downloading when cancelled; a
+                Deadline also caps every HTTP timeout at the budget left
             
         Returns:
             Video data as bytes or None if failed
+            
+        Raises:
+            GenerationCancelled: The token was cancelled
         """
         try:
+            cancellation.check(cancel_token)
+            
             # Prepare generation request
             generation_data = {
                 "prompt": prompt,
@@ -41,91 +69,197 @@ class RunwayClient:
                 "aspect_ratio": "16:9"
             }
             
-            # Start video generation
-            response = requests.post(
-                f"{self.base_url}/generate",
-                headers=self.headers,
-                json=generation_data,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                print(f"Runway generation failed: {response.status_code} - {response.text}")
-                return None
-            
-            generation_id = response.json().get("id")
-            if not generation_id:
-                print("No generation ID received from Runway")
-                return None
+            # A job collected after a restart may already have produced this video
+            journal = get_job_journal()
+            resumed_path = await run_io(journal.take_completed, PROVIDER, generation_data)
+            if resumed_path:
+                return await run_io(MediaArtifact.from_file(resumed_path).read_bytes)
+            journaled_params = dict(generation_data)
             
-            # Poll for completion
-            video_url = await self._poll_generation_status(generation_id)
-            if not video_url:
-                return None
-            
-            # Download video
-            video_data = await self._download_video(video_url)
-            return video_data
+            # Completion webhook when the receiver is running; polling backs it up
+            with expect_callback() as callback:
+                if callback is not None:
+                    generation_data["webhook_url"] = callback.url
+                
+                # Start video generation
+                timeout = request_timeout(cancel_token, PROVIDER, "submit", 30)
+                with timed(PROVIDER, "submit", timeout):
+                    response = requests.post(
+                        f"{self.base_url}/generate",
+                        headers=self.headers,
+                        json=generation_data,
+                        timeout=timeout
+                    )
+                
+                if response.status_code != 200:
+                    print(f"Runway generation failed: {response.status_code} - {response.text}")
+                    return None
+                
+                generation_id = response.json().get("id")
+                if not generation_id:
+                    print("No generation ID received from Runway")
+                    return None
+                
+                # Journal the job so a restart can still collect it
+                await run_io(journal.record, PROVIDER, generation_id, journaled_params)
+                
+                # Poll for completion, cancelling the remote job if we give up
+                try:
+                    video_url = await self._poll_generation_status(generation_id, cancel_token, callback)
+                    
+                    # Download video
+                    video_data = await self._download_video(video_url, cancel_token) if video_url else None
+                except GenerationCancelled:
+                    self._cancel_remote(generation_id)
+                    await run_io(journal.forget, PROVIDER, generation_id)
+                    raise
+                
+                await run_io(journal.forget, PROVIDER, generation_id)
+                return video_data
             
         except Exception as e:
             print(f"Runway client error: {str(e)}")
             return None
     
-    async def _poll_generation_status(self, generation_id: str) -> Optional[str]:
-        """Poll the generation status until completion."""
-        max_attempts = 60  # 5 minutes with 5-second intervals
-        attempt = 0
+    async def resume_interrupted(self) -> List[MediaArtifact]:
+        """
+        Collect jobs journaled by a process that stopped before they finished.
         
-        while attempt < max_attempts:
-            try:
-                response = requests.get(
-                    f"{self.base_url}/generate/{generation_id}",
-                    headers=self.headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    status = data.get("status")
-                    
-                    if status == "completed":
-                        return data.get("video_url")
-                    elif status == "failed":
-                        print(f"Runway generation failed: {data.get('error', 'Unknown error')}")
-                        return None
-                    elif status in ["pending", "processing"]:
-                        # Continue polling
-                        await asyncio.sleep(5)
-                        attempt += 1
-                    else:
-                        print(f"Unknown status from Runway: {status}")
-                        return None
-                else:
-                    print(f"Status check failed: {response.status_code}")
-                    return None
-                    
-            except Exception as e:
-                print(f"Error checking status: {str(e)}")
-                await asyncio.sleep(5)
-                attempt += 1
+        Each claimed job is polled to completion, downloaded and saved; the
+        video is then handed to the next request with the same parameters.
         
-        print("Runway generation timed out")
-        return None
+        Returns:
+            Artifacts of the videos that were recovered
+        """
+        journal = get_job_journal()
+        jobs = await run_io(journal.claim_orphans, PROVIDER)
+        if not jobs:
+            return []
+        
+        print(f"Resuming {len(jobs)} interrupted Runway generation(s)")
+        results = await asyncio.gather(
+            *(self._resume_job(generation_id, params) for generation_id, params in jobs),
+            return_exceptions=True
+        )
+        return [result for result in results if isinstance(result, MediaArtifact)]
     
-    async def _download_video(self, video_url: str) -> Optional[bytes]:
+    async def _resume_job(self, generation_id: str, params: Dict[str, Any]) -> Optional[MediaArtifact]:
+        from utils.file_handler import FileHandler
+        
+        journal = get_job_journal()
+        video_url = await self._poll_generation_status(generation_id)
+        video_data = await self._download_video(video_url) if video_url else None
+        artifact = None
+        if video_data:
+            artifact = await FileHandler().save_artifact_async([video_data], params.get("prompt", ""), VideoProvider.RUNWAY)
+        
+        if artifact is None:
+            await run_io(journal.forget, PROVIDER, generation_id)
+            return None
+        await run_io(journal.complete, PROVIDER, generation_id, artifact.path)
+        return artifact
+    
+    async def _poll_generation_status(
+        self,
+        generation_id: str,
+        cancel_token: Optional[CancellationToken] = None,
+        callback: Optional[PendingCallback] = None
+    ) -> Optional[str]:
+        """
+        Wait for the generation to finish.
+        
+        Status comes from the provider's shared status poller, or from the
+        webhook callback if Runway calls back first.
+        """
+        data = await self._status_poller().wait(generation_id, cancel_token, callback)
+        if data is None:
+            print("Runway generation timed out")
+            return None
+        
+        status = data.get("status")
+        if status == "completed":
+            return data.get("video_url")
+        elif status == "failed":
+            print(f"Runway generation failed: {data.get('error', 'Unknown error')}")
+            return None
+        else:
+            print(f"Unknown status from Runway: {status}")
+            return None
+    
+    def _status_poller(self) -> StatusPoller:
+        """The poller shared by every client using this endpoint and key."""
+        return get_status_poller(
+            (PROVIDER, self.base_url, self.api_key),
+            lambda: StatusPoller(
+                PROVIDER,
+                self._fetch_status,
+                ["pending", "processing"],
+                fetch_batch=self._fetch_statuses if self.batch_status_path else None
+            )
+        )
+    
+    def _fetch_status(self, generation_id: str) -> Dict[str, Any]:
+        """Status document of one job (blocking; called by the status poller)."""
+        timeout = request_timeout(None, PROVIDER, "poll", 10)
+        with timed(PROVIDER, "poll", timeout):
+            response = requests.get(
+                f"{self.base_url}/generate/{generation_id}",
+                headers=self.headers,
+                timeout=timeout
+            )
+        
+        # Only a definitive rejection (unknown or refused job) fails the job;
+        # rate limits and server errors raise, so the poller asks again next tick
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            return {"status": "failed", "error": f"Status check failed: {response.status_code}"}
+        response.raise_for_status()
+        return response.json()
+    
+    def _fetch_statuses(self, generation_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Status documents of many jobs from the batch endpoint, by job ID."""
+        timeout = request_timeout(None, PROVIDER, "poll_batch", 10)
+        with timed(PROVIDER, "poll_batch", timeout):
+            response = requests.get(
+                f"{self.base_url}{self.batch_status_path}",
+                headers=self.headers,
+                params={"ids": ",".join(generation_ids)},
+                timeout=timeout
+            )
+        response.raise_for_status()
+        return {job["id"]: job for job in response.json().get("jobs", []) if "id" in job}
+    
+    async def _download_video(
+        self,
+        video_url: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[bytes]:
         """Download video from the provided URL."""
         try:
-            response = requests.get(video_url, timeout=60)
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f"Video download failed: {response.status_code}")
-                return None
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._fetch_video, video_url, cancel_token)
                 
         except Exception as e:
             print(f"Error downloading video: {str(e)}")
             return None
     
+    def _fetch_video(self, video_url: str, cancel_token: Optional[CancellationToken]) -> Optional[bytes]:
+        """Stream the video body; cancelling closes the connection mid-read."""
+        timeout = request_timeout(cancel_token, PROVIDER, "download", 60)
+        with timed(PROVIDER, "download", timeout), \
+                requests.get(video_url, stream=True, timeout=timeout) as response, \
+                cancellation.closing(cancel_token, response):
+            if response.status_code != 200:
+                print(f"Video download failed: {response.status_code}")
+                return None
+            return b"".join(cancellation.guard(cancel_token, response.iter_content(chunk_size=1024 * 1024)))
+    
+    def _cancel_remote(self, generation_id: str):
+        """Best-effort request to stop a remote generation."""
+        try:
+            requests.delete(f"{self.base_url}/generate/{generation_id}", headers=self.headers, timeout=5)
+        except Exception as e:
+            print(f"Could not cancel Runway generation {generation_id}: {str(e)}")
+    
     def test_connection(self) -> bool:
         """Test if the API connection is working."""
         try:
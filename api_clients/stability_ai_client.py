@@ -4,32 +4,57 @@ Stability AI Video Generation Client
 
 import os
 import time
+import random
 import asyncio
 import tempfile
 import requests
 import json
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List
+
+from config import Config
+from api_clients.key_pool import KeyPool, NoAvailableKeyError, get_key_pool
+from utils import cancellation
+from utils.artifacts import CHUNK_SIZE, GenerationResult, MediaArtifact
+from utils.cancellation import CancellationToken, GenerationCancelled
+from utils.deadline import remaining, request_timeout, timed
+
+# Camera cues that move keyframes through one shot (same seed, so the
+# composition carries over from one keyframe to the next)
+KEYFRAME_CUES = [
+    "wide establishing shot",
+    "camera slowly pushing in",
+    "medium shot",
+    "close-up, fine detail"
+]
 
 
 class StabilityAIClient:
     """Stability AI video generation client"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: Optional[str] = None, key_pool: Optional[KeyPool] = None):
         """
         Initialize Stability AI client
         
         Args:
-            api_key: Stability AI API key
+            api_key: A single Stability AI API key (used if no pool is given)
+            key_pool: Pool of keys to spread requests across (the shared
+                pool from Config if neither argument is given)
         """
-        if not api_key:
+        if key_pool is None:
+            if api_key and api_key not in Config.get_api_keys():
+                key_pool = KeyPool([api_key])
+            else:
+                key_pool = get_key_pool()
+        
+        if not len(key_pool):
             raise ValueError("Stability AI API key is required")
             
-        self.api_key = api_key
-        self.base_url = "https://api.stability.ai"
+        self.key_pool = key_pool
+        self.base_url = Config.STABILITY_BASE_URL
         self.headers = {
-            "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self._file_handler = None
         
     async def generate_video(
         self,
@@ -37,8 +62,11 @@ class StabilityAIClient:
         duration: int = 7,
         style: str = "Realistic",
         resolution: str = "1024x576",
-        progress_callback: Optional[Callable] = None
-    ) -> Dict[str, Any]:
+        progress_callback: Optional[Callable] = None,
+        quality: str = "final",
+        cancel_token: Optional[CancellationToken] = None,
+        upscale: Optional[bool] = None
+    ) -> GenerationResult:
         """
         Generate video using Stability AI
         
@@ -48,11 +76,23 @@ class StabilityAIClient:
             style: Video style (Realistic, Cinematic, etc.)
             resolution: Video resolution
             progress_callback: Callback function for progress updates
+            quality: "final" for the full-quality render, "draft" for a
+                fast low-step, low-resolution preview
+            cancel_token: Aborts the request (closing its connection and
+                deleting any partial file) when cancelled; a Deadline also
+                caps every HTTP timeout at the budget left
+            upscale: Render a final image at a smaller native size and
+                upscale it locally (Config.LOCAL_UPSCALE if omitted)
             
         Returns:
-            Dict with video data and metadata
+            GenerationResult with a file-backed artifact and metadata
+            
+        Raises:
+            GenerationCancelled: The token was cancelled
         """
         try:
+            cancellation.check(cancel_token)
+            
             # Update progress
             if progress_callback:
                 progress_callback(10, "Connecting to Stability AI...")
@@ -63,105 +103,340 @@ class StabilityAIClient:
             if progress_callback:
                 progress_callback(20, "Preparing video generation request...")
             
-            # Validate API key format
-            if not self.api_key.startswith('sk-'):
-                print("⚠️  Invalid API key format, using demo mode...")
-                return await self._demo_mode_response(prompt, style, progress_callback)
+            # Every key is malformed, unauthorized or out of credits
+            if not self.key_pool.has_usable_key():
+                print("⚠️  No usable API key, using demo mode...")
+                return await self._demo_mode_response(prompt, style, progress_callback, duration, resolution)
+            
+            # Final renders can come back smaller and be upscaled here instead
+            upscale = quality == "final" and (Config.LOCAL_UPSCALE if upscale is None else upscale)
             
             # Prepare request parameters for Stability AI
-            generation_params = {
-                "text_prompts": [
-                    {
-                        "text": enhanced_prompt,
-                        "weight": 1.0
-                    }
-                ],
-                "cfg_scale": 7,
-                "height": 1024,  # SDXL requires specific dimensions
-                "width": 1024,   # Use 1024x1024 which is always supported
-                "samples": 1,
-                "steps": 30
-            }
+            generation_params = self._build_generation_params(
+                enhanced_prompt, resolution, "upscaled" if upscale else quality
+            )
             
             if progress_callback:
                 progress_callback(30, "Sending request to Stability AI...")
             
             # Make API call to generate video
-            response = await self._make_stability_request(generation_params, progress_callback)
+            response = await self._make_stability_request(generation_params, progress_callback, prompt, cancel_token)
             
             if progress_callback:
                 progress_callback(80, "Processing video response...")
             
             # Check if we got a successful real API response
-            if response.get('success') and 'video_data' in response and response.get('real_api'):
-                print("✅ Real API success! Processing image data as video...")
-                image_artifact = response['video_data']
+            if response.get('success') and response.get('artifact') and response.get('real_api'):
+                artifact = response['artifact']
+                print(f"✅ Got image from Stability AI: {artifact.size} bytes")
                 
-                # Handle base64 image data and convert to a simple "video" format
-                if 'base64' in image_artifact:
-                    import base64
-                    image_data = base64.b64decode(image_artifact['base64'])
-                    
-                    print(f"✅ Got image from Stability AI: {len(image_data)} bytes")
-                    
-                    # For now, we'll save this as an image file that represents our "generated video"
-                    # In a real implementation, you could convert this to an actual video
-                    
+                if upscale:
                     if progress_callback:
-                        progress_callback(100, "Stability AI image generation complete!")
-                    
-                    return {
-                        'success': True,
-                        'video_data': image_data,  # This is actually image data
-                        'video_url': None,
-                        'metadata': {
-                            'prompt': prompt,
-                            'enhanced_prompt': enhanced_prompt,
-                            'duration': duration,
-                            'style': style,
-                            'resolution': resolution,
-                            'model': 'stability-ai-sdxl',
-                            'generated_at': time.time(),
-                            'real_api': True,
-                            'type': 'image_from_api'  # Mark this as image data
-                        }
+                        progress_callback(90, "Upscaling locally...")
+                    artifact = await self._upscale(artifact, resolution, prompt)
+                
+                if progress_callback:
+                    progress_callback(100, "Stability AI image generation complete!")
+                
+                return GenerationResult(
+                    success=True,
+                    artifact=artifact,
+                    metadata={
+                        'prompt': prompt,
+                        'enhanced_prompt': enhanced_prompt,
+                        'duration': duration,
+                        'style': style,
+                        'resolution': resolution,
+                        'model': generation_params["engine"],
+                        'quality': quality,
+                        'steps': generation_params["steps"],
+                        'native_size': f"{generation_params['width']}x{generation_params['height']}",
+                        'upscaled': upscale,
+                        'generated_at': time.time(),
+                        'real_api': True,
+                        'type': 'image_from_api'  # Mark this as image data
                     }
+                )
             
             print("⚠️  No real API data, falling back to demo mode...")
+            cancellation.check(cancel_token)
             
-            # Fall back to demo mode if real API didn't work
-            video_url = response.get('video_url', '')
+            # Fall back to a locally rendered video if real API didn't work
+            return await self._demo_mode_response(prompt, style, progress_callback, duration, resolution)
             
-            if not video_url:
-                print("⚠️  No video URL returned, using demo mode...")
-                return await self._demo_mode_response(prompt, style, progress_callback)
+        except Exception as e:
+            print(f"⚠️  Stability AI API error: {e}")
+            print("🔄 Falling back to demo mode...")
+            return await self._demo_mode_response(prompt, style, progress_callback, duration, resolution)
+    
+    async def generate_keyframe_video(
+        self,
+        prompt: str,
+        duration: int = 7,
+        style: str = "Realistic",
+        resolution: str = "1024x576",
+        progress_callback: Optional[Callable] = None,
+        keyframes: Optional[int] = None,
+        transition: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
+        """
+        Generate a video with real motion from several SDXL keyframes
+        
+        All keyframes are requested at once (spread over the key pool), with
+        one seed and a camera cue per keyframe, and then animated locally, so
+        wall-clock time stays close to that of a single image request.
+        
+        Args:
+            prompt: Text description for video generation
+            duration: Video duration in seconds (5-10)
+            style: Video style (Realistic, Cinematic, etc.)
+            resolution: Video resolution
+            progress_callback: Callback function for progress updates
+            keyframes: Number of keyframes (Config.KEYFRAME_COUNT if omitted)
+            transition: "morph" or "dissolve" (Config.KEYFRAME_TRANSITION if omitted)
+            cancel_token: Aborts every keyframe request when cancelled
+            
+        Returns:
+            GenerationResult with the animated video (a single image if only
+            one keyframe came back)
             
-            # Download the demo video file
-            video_data = await self._download_video(video_url, progress_callback)
+        Raises:
+            GenerationCancelled: The token was cancelled
+        """
+        try:
+            cancellation.check(cancel_token)
+            count = max(2, keyframes or Config.KEYFRAME_COUNT)
+            transition = transition or Config.KEYFRAME_TRANSITION
             
             if progress_callback:
-                progress_callback(100, "Demo video ready!")
-            
-            return {
-                'success': True,
-                'video_data': video_data,
-                'video_url': video_url,
-                'metadata': {
-                    'prompt': prompt,
-                    'enhanced_prompt': enhanced_prompt,
-                    'duration': duration,
-                    'style': style,
-                    'resolution': resolution,
-                    'model': 'demo-mode',
-                    'generated_at': time.time(),
-                    'demo_mode': True
-                }
+                progress_callback(10, "Connecting to Stability AI...")
+            
+            enhanced_prompt = self._enhance_prompt(prompt, style)
+            
+            if not self.key_pool.has_usable_key():
+                print("⚠️  No usable API key, using demo mode...")
+                return await self._demo_mode_response(prompt, style, progress_callback, duration, resolution)
+            
+            generation_params = self._build_generation_params(enhanced_prompt, resolution)
+            seed = random.randrange(1, 2 ** 32)
+            
+            if progress_callback:
+                progress_callback(20, f"Requesting {count} keyframes in parallel...")
+            
+            artifacts = await self._request_keyframes(generation_params, count, seed, prompt, progress_callback, cancel_token)
+            
+            metadata = {
+                'prompt': prompt,
+                'enhanced_prompt': enhanced_prompt,
+                'duration': duration,
+                'style': style,
+                'resolution': resolution,
+                'model': generation_params["engine"],
+                'steps': generation_params["steps"],
+                'seed': seed,
+                'generated_at': time.time(),
+                'real_api': True
             }
             
+            if len(artifacts) == 1:
+                print("⚠️  Only one keyframe generated, returning it as an image")
+                return GenerationResult(
+                    success=True,
+                    artifact=artifacts[0],
+                    metadata={**metadata, 'type': 'image_from_api'}
+                )
+            
+            if not artifacts:
+                print("⚠️  No keyframes generated, falling back to demo mode...")
+                cancellation.check(cancel_token)
+                return await self._demo_mode_response(prompt, style, progress_callback, duration, resolution)
+            
+            if progress_callback:
+                progress_callback(80, f"Animating {len(artifacts)} keyframes...")
+            
+            # Rendering is CPU-bound; keep it off the event loop
+            loop = asyncio.get_event_loop()
+            artifact = await loop.run_in_executor(
+                None, self._animate_keyframes, artifacts, duration, resolution, transition, prompt
+            )
+            if artifact is None:
+                raise RuntimeError("Keyframe animation produced no video")
+            
+            if progress_callback:
+                progress_callback(100, "Keyframe video ready!")
+            
+            return GenerationResult(
+                success=True,
+                artifact=artifact,
+                metadata={
+                    **metadata,
+                    'keyframes': len(artifacts),
+                    'transition': transition,
+                    'type': 'keyframe_video'
+                }
+            )
+            
         except Exception as e:
-            print(f"⚠️  Stability AI API error: {e}")
+            print(f"⚠️  Stability AI keyframe error: {e}")
             print("🔄 Falling back to demo mode...")
-            return await self._demo_mode_response(prompt, style, progress_callback)
+            return await self._demo_mode_response(prompt, style, progress_callback, duration, resolution)
+    
+    async def _request_keyframes(
+        self,
+        params: Dict[str, Any],
+        count: int,
+        seed: int,
+        prompt: str,
+        progress_callback: Optional[Callable] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> List[MediaArtifact]:
+        """
+        Request every keyframe concurrently, each on a worker thread
+        
+        Returns:
+            Artifacts of the keyframes that succeeded, in keyframe order
+        """
+        endpoint = f"{self.base_url}/v1/generation/{params['engine']}/text-to-image"
+        enhanced_prompt = params["text_prompts"][0]["text"]
+        loop = asyncio.get_event_loop()
+        finished = 0
+        
+        async def request_keyframe(index: int) -> Optional[MediaArtifact]:
+            nonlocal finished
+            cue = KEYFRAME_CUES[round(index * (len(KEYFRAME_CUES) - 1) / (count - 1))]
+            image_params = {
+                "text_prompts": [{"text": f"{enhanced_prompt}, {cue}, shot {index + 1} of {count}", "weight": 1.0}],
+                "cfg_scale": params["cfg_scale"],
+                "height": params["height"],
+                "width": params["width"],
+                "samples": 1,
+                "steps": params["steps"],
+                "seed": seed
+            }
+            status_code, artifact, error_text = await loop.run_in_executor(
+                None, self._post_image_request, endpoint, image_params, prompt, cancel_token
+            )
+            
+            finished += 1
+            if progress_callback:
+                progress_callback(20 + 55 * finished // count, f"Keyframe {finished}/{count} generated")
+            
+            if status_code != 200 or not artifact:
+                print(f"⚠️  Keyframe {index + 1} failed: {status_code} - {error_text}")
+                return None
+            return artifact
+        
+        outcomes = await asyncio.gather(*(request_keyframe(index) for index in range(count)), return_exceptions=True)
+        artifacts = [outcome for outcome in outcomes if isinstance(outcome, MediaArtifact)]
+        
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            # Don't leave finished keyframes behind when a sibling was cancelled or failed
+            file_handler = self._get_file_handler()
+            for artifact in artifacts:
+                file_handler.discard_artifact(artifact)
+            raise next((e for e in errors if isinstance(e, GenerationCancelled)), errors[0])
+        
+        return artifacts
+    
+    def _animate_keyframes(
+        self,
+        artifacts: List[MediaArtifact],
+        duration: int,
+        resolution: str,
+        transition: str,
+        prompt: str
+    ) -> Optional[MediaArtifact]:
+        """Render keyframe images into an MP4 and drop the images (blocking)"""
+        import uuid
+        from config import VideoProvider
+        from utils.keyframe_video import KeyframeAnimator
+        
+        file_handler = self._get_file_handler()
+        output_path = os.path.join(file_handler.output_dir, f"keyframes_{uuid.uuid4().hex}.mp4")
+        try:
+            rendered = KeyframeAnimator(resolution, fps=Config.KEYFRAME_FPS).render(
+                [artifact.path for artifact in artifacts],
+                duration,
+                output_path,
+                transition,
+                hold=Config.KEYFRAME_HOLD
+            )
+        finally:
+            for artifact in artifacts:
+                file_handler.discard_artifact(artifact)
+        
+        if not rendered:
+            return None
+        return file_handler.store_rendered_file(rendered, f"keyframes {prompt}", VideoProvider.STABILITY_AI)
+    
+    def _build_generation_params(self, enhanced_prompt: str, resolution: str, quality: str = "final") -> Dict[str, Any]:
+        """
+        Build text-to-image request parameters for the requested quality
+        
+        Final renders use SDXL at the supported size closest to the selected
+        resolution; drafts use a smaller engine, size and step count so they
+        come back in a couple of seconds and cost a fraction of the credits.
+        "upscaled" renders keep the final step count but at a smaller native
+        size, for local upscaling.
+        
+        Args:
+            enhanced_prompt: Prompt with style guidance
+            resolution: Selected output resolution
+            quality: "final", "draft" or "upscaled"
+            
+        Returns:
+            Request parameters including the engine to call
+        """
+        if quality == "draft":
+            engine = Config.DRAFT_ENGINE
+            steps = Config.DRAFT_STEPS
+            width, height = Config.DRAFT_DIMENSIONS.get(resolution, (512, 512))
+        elif quality == "upscaled":
+            engine = Config.UPSCALE_ENGINE
+            steps = Config.FINAL_STEPS
+            width, height = Config.UPSCALE_DIMENSIONS.get(resolution, (512, 512))
+        else:
+            engine = Config.STABILITY_IMAGE_ENGINE
+            steps = Config.FINAL_STEPS
+            width, height = Config.SDXL_DIMENSIONS.get(resolution, (1024, 1024))
+        
+        return {
+            "engine": engine,
+            "text_prompts": [
+                {
+                    "text": enhanced_prompt,
+                    "weight": 1.0
+                }
+            ],
+            "cfg_scale": 7,
+            "height": height,
+            "width": width,
+            "samples": 1,
+            "steps": steps
+        }
+    
+    async def _upscale(self, artifact: MediaArtifact, resolution: str, prompt: str) -> MediaArtifact:
+        """
+        Upscale a natively smaller image to the selected resolution
+        
+        Falls back to the original image if upscaling fails.
+        """
+        from utils.upscaler import upscale_artifact
+        
+        try:
+            # Tiles are resized and sharpened on the upscaler's own thread pool
+            loop = asyncio.get_event_loop()
+            upscaled = await loop.run_in_executor(None, upscale_artifact, artifact, resolution, prompt)
+        except Exception as e:
+            print(f"⚠️  Local upscale failed: {e}")
+            return artifact
+        
+        if upscaled is None:
+            return artifact
+        self._get_file_handler().discard_artifact(artifact)
+        return upscaled
     
     def _enhance_prompt(self, prompt: str, style: str) -> str:
         """
@@ -195,19 +470,16 @@ class StabilityAIClient:
     async def _make_stability_request(
         self, 
         params: Dict[str, Any], 
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        prompt: str = "",
+        cancel_token: Optional[CancellationToken] = None
     ) -> Dict[str, Any]:
         """
         Make request to Stability AI API for video generation
-        """
         
-    async def _make_stability_request(
-        self, 
-        params: Dict[str, Any], 
-        progress_callback: Optional[Callable] = None
-    ) -> Dict[str, Any]:
-        """
-        Make request to Stability AI API for video generation
+        The image is requested as raw PNG and streamed straight to disk, so
+        neither the JSON/base64 envelope nor the decoded image is ever held in
+        memory as a whole.
         """
         
         try:
@@ -218,7 +490,8 @@ class StabilityAIClient:
             
             # Since Stability AI's video API (SVD) is not publicly available yet,
             # let's generate a high-quality image and return it as our "video"
-            image_endpoint = f"{self.base_url}/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image"
+            engine = params.get("engine", Config.STABILITY_IMAGE_ENGINE)
+            image_endpoint = f"{self.base_url}/v1/generation/{engine}/text-to-image"
             
             print(f"🔍 DEBUG: Using image endpoint: {image_endpoint}")
             
@@ -237,177 +510,300 @@ class StabilityAIClient:
             
             print(f"🔍 DEBUG: Making image request...")
             
-            # Make image generation request
-            image_response = requests.post(
-                image_endpoint,
-                headers=self.headers,
-                json=image_params,
-                timeout=60
+            # Make image generation request on a worker thread, so concurrent
+            # generations (e.g. long-form segments) overlap instead of queueing
+            # behind each other on the event loop
+            loop = asyncio.get_event_loop()
+            status_code, artifact, error_text = await loop.run_in_executor(
+                None, self._post_image_request, image_endpoint, image_params, prompt, cancel_token
             )
             
-            print(f"🔍 DEBUG: Image response status: {image_response.status_code}")
+            print(f"🔍 DEBUG: Image response status: {status_code}")
             
-            if image_response.status_code == 200:
-                image_data = image_response.json()
+            if status_code == 200:
                 print(f"🔍 DEBUG: Image generated successfully!")
                 
                 if progress_callback:
                     progress_callback(70, "Processing generated image...")
                 
-                if 'artifacts' in image_data and len(image_data['artifacts']) > 0:
+                if artifact:
                     print("✅ SUCCESS: Got image from Stability AI!")
                     
                     # For now, return the image as our "video" content
                     # In a real implementation, you would convert this to a video
                     return {
                         "success": True,
-                        "video_data": image_data['artifacts'][0],
+                        "artifact": artifact,
                         "status": "completed",
                         "real_api": True
                     }
                 else:
                     print("⚠️  No image artifacts generated")
-                    return await self._get_demo_video_response()
+                    return self._failed_response("No image artifacts generated")
             
-            elif image_response.status_code == 401:
+            elif status_code == 401:
                 print("⚠️  Unauthorized: Invalid API key")
-                return await self._get_demo_video_response()
+                return self._failed_response("Unauthorized: Invalid API key")
             
-            elif image_response.status_code == 429:
+            elif status_code == 429:
                 print("⚠️  Rate limited: Too many requests")
-                return await self._get_demo_video_response()
+                return self._failed_response("Rate limited: Too many requests")
             
             else:
-                print(f"⚠️  API error: {image_response.status_code} - {image_response.text}")
-                return await self._get_demo_video_response()
+                print(f"⚠️  API error: {status_code} - {error_text}")
+                return self._failed_response(f"API error: {status_code}")
                 
         except requests.exceptions.Timeout:
             print("⚠️  Request timeout")
-            return await self._get_demo_video_response()
+            return self._failed_response("Request timeout")
         
         except requests.exceptions.ConnectionError:
             print("⚠️  Connection error")
-            return await self._get_demo_video_response()
+            return self._failed_response("Connection error")
         
         except Exception as e:
             print(f"⚠️  Unexpected error: {e}")
-            return await self._get_demo_video_response()
+            return self._failed_response(f"Unexpected error: {e}")
     
-    async def _get_demo_video_response(self) -> Dict[str, Any]:
-        """Get demo video response with working video URLs"""
-        
-        # List of working demo video URLs
-        demo_videos = [
-            "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4",
-            "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/ElephantsDream.mp4",
-            "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/ForBiggerBlazes.mp4",
-            "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/ForBiggerEscapes.mp4",
-            "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/Sintel.mp4"
-        ]
-        
-        # Pick a random demo video
-        import random
-        video_url = random.choice(demo_videos)
+    def _post_image_request(
+        self,
+        endpoint: str,
+        image_params: Dict[str, Any],
+        prompt: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> tuple:
+        """
+        POST a text-to-image request and stream a successful PNG to disk
+        
+        Each attempt takes a key from the pool; a key that is rejected or
+        rate limited is reported to the pool and the request is retried on
+        another key. Blocking; run it in an executor.
+        
+        Returns:
+            Tuple of (status_code, MediaArtifact or None, error body text)
+        """
+        attempts = max(1, min(Config.MAX_RETRIES, len(self.key_pool)))
+        status_code, artifact, error_text = None, None, ""
+        
+        for attempt in range(attempts):
+            cancellation.check(cancel_token)
+            try:
+                key = self.key_pool.acquire(timeout=remaining(cancel_token), cancel_token=cancel_token)
+            except NoAvailableKeyError as e:
+                # Reported like a provider-side outage; the caller falls back
+                return 503, None, str(e)
+            
+            status_code = None
+            try:
+                status_code, artifact, error_text = self._post_with_key(
+                    key.key, endpoint, image_params, prompt, cancel_token
+                )
+            except GenerationCancelled:
+                status_code = 499  # Client closed the request; not the key's fault
+                raise
+            finally:
+                self.key_pool.release(key, status_code, error_text)
+            
+            # Another key may well succeed where this one was refused
+            if status_code not in (401, 402, 403, 429):
+                break
         
+        return status_code, artifact, error_text
+    
+    def _post_with_key(
+        self,
+        api_key: str,
+        endpoint: str,
+        image_params: Dict[str, Any],
+        prompt: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> tuple:
+        """
+        Make one text-to-image request with a specific key
+        
+        Cancelling the token closes the response, which aborts the body read
+        on this thread; the atomic write then removes the partial file.
+        """
+        from config import VideoProvider
+        
+        provider = VideoProvider.STABILITY_AI.value
+        timeout = request_timeout(cancel_token, provider, "generate", 60)
+        
+        with timed(provider, "generate", timeout) as sample, requests.post(
+            endpoint,
+            headers={**self.headers, "Authorization": f"Bearer {api_key}", "Accept": "image/png"},
+            json=image_params,
+            timeout=timeout,
+            stream=True
+        ) as image_response, cancellation.closing(cancel_token, image_response):
+            if image_response.status_code != 200:
+                sample.discard()
+                return image_response.status_code, None, image_response.text
+            
+            artifact = self._get_file_handler().save_artifact(
+                cancellation.guard(cancel_token, image_response.iter_content(chunk_size=CHUNK_SIZE)),
+                prompt,
+                VideoProvider.STABILITY_AI,
+                extension=".png",
+                mime_type="image/png"
+            )
+            return image_response.status_code, artifact, ""
+    
+    def _failed_response(self, error: str) -> Dict[str, Any]:
+        """Build the response for a Stability AI request that produced no media"""
         return {
-            "video_url": video_url,
-            "status": "completed"
+            "success": False,
+            "status": "failed",
+            "error": error
         }
     
+    async def _get_demo_video_response(self, style: str, duration: int, resolution: str) -> Dict[str, Any]:
+        """
+        Get demo video response backed by a locally rendered fallback video
+        
+        The video is rendered by FileHandler's procedural engine and cached per
+        (style, duration, resolution), so repeat fallbacks are a file lookup and
+        nothing is downloaded.
+        """
+        from config import VideoProvider
+        
+        file_handler = self._get_file_handler()
+        loop = asyncio.get_event_loop()
+        
+        # Rendering on a cache miss is CPU-bound; keep it off the event loop
+        video_path = await loop.run_in_executor(
+            None,
+            file_handler.get_fallback_video,
+            style,
+            duration,
+            resolution,
+            VideoProvider.STABILITY_AI
+        )
+        
+        return {
+            "video_path": video_path,
+            "status": "completed" if video_path else "failed"
+        }
+    
+    def _get_file_handler(self):
+        """Get the FileHandler used for local rendering, creating it on first use"""
+        if self._file_handler is None:
+            from utils.file_handler import FileHandler
+            self._file_handler = FileHandler()
+        return self._file_handler
+    
     async def _demo_mode_response(
         self, 
         prompt: str,
         style: str,
-        progress_callback: Optional[Callable] = None
-    ) -> Dict[str, Any]:
+        progress_callback: Optional[Callable] = None,
+        duration: int = 7,
+        resolution: str = "1024x576"
+    ) -> GenerationResult:
         """
         Generate demo mode response when real API is not available
         """
         if progress_callback:
-            progress_callback(40, "Demo mode: Simulating Stability AI generation...")
-            await asyncio.sleep(1)
-            
-            progress_callback(50, "Demo mode: Generating video frames...")
-            await asyncio.sleep(2)
-            
-            progress_callback(60, "Demo mode: Applying style effects...")
-            await asyncio.sleep(2)
-            
-            progress_callback(70, "Demo mode: Rendering final video...")
-            await asyncio.sleep(1)
+            progress_callback(60, "Demo mode: Rendering local fallback video...")
         
         # Get demo video response
-        response = await self._get_demo_video_response()
+        response = await self._get_demo_video_response(style, duration, resolution)
         
-        return {
-            'success': True,
-            'video_data': b"demo_video_data",
-            'video_url': response["video_url"],
-            'metadata': {
-                'prompt': prompt,
-                'enhanced_prompt': self._enhance_prompt(prompt, style),
-                'duration': 7,
-                'style': style,
-                'resolution': "1024x576",
-                'model': 'svd-xt-1-1 (demo)',
-                'generated_at': time.time(),
-                'demo_mode': True
-            }
+        if progress_callback:
+            progress_callback(100, "Demo video ready!")
+        
+        metadata = {
+            'prompt': prompt,
+            'enhanced_prompt': self._enhance_prompt(prompt, style),
+            'duration': duration,
+            'style': style,
+            'resolution': resolution,
+            'model': 'svd-xt-1-1 (demo)',
+            'generated_at': time.time(),
+            'demo_mode': True
         }
+        
+        if not response["video_path"]:
+            return GenerationResult.failure("Failed to render demo video", metadata)
+        
+        return GenerationResult(
+            success=True,
+            artifact=MediaArtifact.from_file(response["video_path"], "video/mp4"),
+            metadata=metadata
+        )
     
     async def _download_video(
         self, 
         video_url: str, 
-        progress_callback: Optional[Callable] = None
-    ) -> bytes:
+        progress_callback: Optional[Callable] = None,
+        prompt: str = "",
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[MediaArtifact]:
         """
         Download video from URL
         
         Args:
             video_url: URL of the generated video
             progress_callback: Progress update callback
+            prompt: Prompt used for the video (for the file name)
+            cancel_token: Aborts the download and deletes the partial file
             
         Returns:
-            Video data as bytes
+            MediaArtifact for the downloaded video or None if failed
         """
         try:
             if progress_callback:
                 progress_callback(85, "Downloading video file...")
             
-            # Download the video file
-            response = requests.get(video_url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Check content type
-            content_type = response.headers.get('content-type', '')
-            if 'video' not in content_type and 'octet-stream' not in content_type:
-                print(f"⚠️  Warning: Unexpected content type: {content_type}")
+            # Download the video file on a worker thread
+            loop = asyncio.get_event_loop()
+            artifact = await loop.run_in_executor(None, self._stream_download, video_url, prompt, cancel_token)
             
             if progress_callback:
                 progress_callback(95, "Finalizing download...")
             
-            video_data = response.content
-            
             # Validate video data
-            if len(video_data) < 1000:  # Very small file, likely not a real video
-                if progress_callback:
-                    progress_callback(95, "Demo mode: Using demo video...")
-                return b"demo_video_data"
+            if artifact and artifact.size < 1000:  # Very small file, likely not a real video
+                self._get_file_handler().discard_artifact(artifact)
+                return None
             
-            return video_data
+            return artifact
             
         except requests.exceptions.RequestException as e:
             print(f"⚠️  Download failed: {e}")
-            if progress_callback:
-                progress_callback(95, "Demo mode: Using demo video...")
-            
-            return b"demo_video_data"
+            return None
         except Exception as e:
             print(f"⚠️  Unexpected error during download: {e}")
-            if progress_callback:
-                progress_callback(95, "Demo mode: Using demo video...")
+            return None
+    
+    def _stream_download(
+        self,
+        video_url: str,
+        prompt: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[MediaArtifact]:
+        """Stream a video download to disk (blocking; run it in an executor)"""
+        from config import VideoProvider
+        
+        provider = VideoProvider.STABILITY_AI.value
+        timeout = request_timeout(cancel_token, provider, "download", 30)
+        
+        with timed(provider, "download", timeout), \
+                requests.get(video_url, stream=True, timeout=timeout) as response, \
+                cancellation.closing(cancel_token, response):
+            response.raise_for_status()
             
-            return b"demo_video_data"
+            # Check content type
+            content_type = response.headers.get('content-type', '')
+            if 'video' not in content_type and 'octet-stream' not in content_type:
+                print(f"⚠️  Warning: Unexpected content type: {content_type}")
+            
+            # Stream to disk instead of buffering the whole body
+            return self._get_file_handler().save_artifact(
+                cancellation.guard(cancel_token, response.iter_content(chunk_size=CHUNK_SIZE)),
+                prompt,
+                VideoProvider.STABILITY_AI
+            )
     
     def _validate_parameters(
         self, 
@@ -4,13 +4,24 @@ Stable Video Diffusion API client for video generation.
 
 import requests
 import asyncio
-import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+from utils import cancellation
+from utils.cancellation import CancellationToken
+from utils.deadline import request_timeout, timed
+from utils.status_poller import StatusPoller, get_status_poller
+from utils.webhooks import PendingCallback, expect_callback
+
+PROVIDER = "stable_video"
 
 
 class StableVideoClient:
     """Client for interacting with Stable Video Diffusion API."""
     
+    # Path of the batch status endpoint (GET with ?ids=a,b,c, answering
+    # {"jobs": [status, ...]}), when the API has one; None polls jobs one by one
+    batch_status_path: Optional[str] = None
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.base_url = "https://api.stability.ai/v2alpha"
@@ -20,7 +31,13 @@ class StableVideoClient:
             "Accept": "application/json"
         }
     
-    async def generate_video(self, prompt: str, duration: int, style: str) -> Optional[bytes]:
+    async def generate_video(
+        self,
+        prompt: str,
+        duration: int,
+        style: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[bytes]:
         """
         Generate video using Stable Video Diffusion API.
         
@@ -28,11 +45,18 @@ class StableVideoClient:
             prompt: Text description for video generation
             duration: Video duration in seconds
             style: Visual style for the video
+            cancel_token: Stops polling and downloading when cancelled; a
+                Deadline also caps every HTTP timeout at the budget left
             
         Returns:
             Video data as bytes or None if failed
+            
+        Raises:
+            GenerationCancelled: The token was cancelled
         """
         try:
+            cancellation.check(cancel_token)
+            
             # Prepare generation request
             generation_data = {
                 "prompt": prompt,
@@ -44,26 +68,33 @@ class StableVideoClient:
                 "style_preset": self._map_style_to_preset(style)
             }
             
-            # Start video generation
-            response = requests.post(
-                f"{self.base_url}/generation/video",
-                headers=self.headers,
-                json=generation_data,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                print(f"Stable Video generation failed: {response.status_code} - {response.text}")
-                return None
-            
-            generation_id = response.json().get("id")
-            if not generation_id:
-                print("No generation ID received from Stable Video")
-                return None
-            
-            # Poll for completion
-            video_data = await self._poll_generation_status(generation_id)
-            return video_data
+            # Completion webhook when the receiver is running; polling backs it up
+            with expect_callback() as callback:
+                if callback is not None:
+                    generation_data["webhook_url"] = callback.url
+                
+                # Start video generation
+                timeout = request_timeout(cancel_token, PROVIDER, "submit", 30)
+                with timed(PROVIDER, "submit", timeout):
+                    response = requests.post(
+                        f"{self.base_url}/generation/video",
+                        headers=self.headers,
+                        json=generation_data,
+                        timeout=timeout
+                    )
+                
+                if response.status_code != 200:
+                    print(f"Stable Video generation failed: {response.status_code} - {response.text}")
+                    return None
+                
+                generation_id = response.json().get("id")
+                if not generation_id:
+                    print("No generation ID received from Stable Video")
+                    return None
+                
+                # Poll for completion (the API has no cancel; we just stop polling)
+                video_data = await self._poll_generation_status(generation_id, cancel_token, callback)
+                return video_data
             
         except Exception as e:
             print(f"Stable Video client error: {str(e)}")
@@ -83,67 +114,106 @@ class StableVideoClient:
         }
         return style_mapping.get(style, "photographic")
     
-    async def _poll_generation_status(self, generation_id: str) -> Optional[bytes]:
-        """Poll the generation status until completion."""
-        max_attempts = 60  # 5 minutes with 5-second intervals
-        attempt = 0
+    async def _poll_generation_status(
+        self,
+        generation_id: str,
+        cancel_token: Optional[CancellationToken] = None,
+        callback: Optional[PendingCallback] = None
+    ) -> Optional[bytes]:
+        """
+        Wait for the generation to finish.
         
-        while attempt < max_attempts:
-            try:
-                response = requests.get(
-                    f"{self.base_url}/generation/video/{generation_id}",
-                    headers=self.headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    status = data.get("status")
-                    
-                    if status == "complete":
-                        # Download the video
-                        video_url = data.get("artifacts", [{}])[0].get("url")
-                        if video_url:
-                            return await self._download_video(video_url)
-                        else:
-                            print("No video URL in response")
-                            return None
-                    elif status == "failed":
-                        print(f"Stable Video generation failed: {data.get('failure_reason', 'Unknown error')}")
-                        return None
-                    elif status in ["in-progress", "queued"]:
-                        # Continue polling
-                        await asyncio.sleep(5)
-                        attempt += 1
-                    else:
-                        print(f"Unknown status from Stable Video: {status}")
-                        return None
-                else:
-                    print(f"Status check failed: {response.status_code}")
-                    return None
-                    
-            except Exception as e:
-                print(f"Error checking status: {str(e)}")
-                await asyncio.sleep(5)
-                attempt += 1
+        Status comes from the provider's shared status poller, or from the
+        webhook callback if Stable Video calls back first.
+        """
+        data = await self._status_poller().wait(generation_id, cancel_token, callback)
+        if data is None:
+            print("Stable Video generation timed out")
+            return None
+        
+        status = data.get("status")
+        if status == "complete":
+            # Download the video
+            video_url = data.get("artifacts", [{}])[0].get("url")
+            if video_url:
+                return await self._download_video(video_url, cancel_token)
+            else:
+                print("No video URL in response")
+                return None
+        elif status == "failed":
+            print(f"Stable Video generation failed: {data.get('failure_reason', 'Unknown error')}")
+            return None
+        else:
+            print(f"Unknown status from Stable Video: {status}")
+            return None
+    
+    def _status_poller(self) -> StatusPoller:
+        """The poller shared by every client using this endpoint and key."""
+        return get_status_poller(
+            (PROVIDER, self.base_url, self.api_key),
+            lambda: StatusPoller(
+                PROVIDER,
+                self._fetch_status,
+                ["in-progress", "queued"],
+                fetch_batch=self._fetch_statuses if self.batch_status_path else None
+            )
+        )
+    
+    def _fetch_status(self, generation_id: str) -> Dict[str, Any]:
+        """Status document of one job (blocking; called by the status poller)."""
+        timeout = request_timeout(None, PROVIDER, "poll", 10)
+        with timed(PROVIDER, "poll", timeout):
+            response = requests.get(
+                f"{self.base_url}/generation/video/{generation_id}",
+                headers=self.headers,
+                timeout=timeout
+            )
         
-        print("Stable Video generation timed out")
-        return None
+        # Only a definitive rejection (unknown or refused job) fails the job;
+        # rate limits and server errors raise, so the poller asks again next tick
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            return {"status": "failed", "error": f"Status check failed: {response.status_code}"}
+        response.raise_for_status()
+        return response.json()
     
-    async def _download_video(self, video_url: str) -> Optional[bytes]:
+    def _fetch_statuses(self, generation_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Status documents of many jobs from the batch endpoint, by job ID."""
+        timeout = request_timeout(None, PROVIDER, "poll_batch", 10)
+        with timed(PROVIDER, "poll_batch", timeout):
+            response = requests.get(
+                f"{self.base_url}{self.batch_status_path}",
+                headers=self.headers,
+                params={"ids": ",".join(generation_ids)},
+                timeout=timeout
+            )
+        response.raise_for_status()
+        return {job["id"]: job for job in response.json().get("jobs", []) if "id" in job}
+    
+    async def _download_video(
+        self,
+        video_url: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[bytes]:
         """Download video from the provided URL."""
         try:
-            response = requests.get(video_url, timeout=60)
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f"Video download failed: {response.status_code}")
-                return None
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._fetch_video, video_url, cancel_token)
                 
         except Exception as e:
             print(f"Error downloading video: {str(e)}")
             return None
     
+    def _fetch_video(self, video_url: str, cancel_token: Optional[CancellationToken]) -> Optional[bytes]:
+        """Stream the video body; cancelling closes the connection mid-read."""
+        timeout = request_timeout(cancel_token, PROVIDER, "download", 60)
+        with timed(PROVIDER, "download", timeout), \
+                requests.get(video_url, stream=True, timeout=timeout) as response, \
+                cancellation.closing(cancel_token, response):
+            if response.status_code != 200:
+                print(f"Video download failed: {response.status_code}")
+                return None
+            return b"".join(cancellation.guard(cancel_token, response.iter_content(chunk_size=1024 * 1024)))
+    
     def test_connection(self) -> bool:
         """Test if the API connection is working."""
         try:
@@ -2,12 +2,18 @@ import streamlit as st
 import asyncio
 import os
 import time
-import requests
 import tempfile
+import threading
+import uuid
 from pathlib import Path
 
 from video_generator import VideoGenerator
-from config import Config
+from api_clients import resume_interrupted_generations
+from config import Config, VideoProvider
+from utils.deadline import Deadline
+
+# Streamlit serves this directory at app/static/ (see .streamlit/config.toml)
+STATIC_DIR = Path(__file__).parent / "static"
 
 def add_futuristic_background():
     """Add sci-fi inspired dark theme styling"""
@@ -426,6 +432,17 @@ def main():
         st.session_state.video_url = None
     if 'image_path' not in st.session_state:
         st.session_state.image_path = None
+    if 'media_artifacts' not in st.session_state:
+        st.session_state.media_artifacts = {}
+    if 'progressive_job' not in st.session_state:
+        st.session_state.progressive_job = None
+    if 'live_stream' not in st.session_state:
+        st.session_state.live_stream = None
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    
+    # Collect remote jobs a previous process left unfinished (once per process)
+    resume_interrupted_generations()
     
     # User input section
     st.subheader("Enter Your Video Prompt")
@@ -437,10 +454,16 @@ def main():
     
     # Video generation parameters
     st.subheader("Video Parameters")
+    long_form = st.checkbox(
+        f"Long-form mode (up to {Config.LONG_FORM_MAX_DURATION}s, segments generated in parallel)",
+        value=False
+    )
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        duration = st.slider("Duration (seconds)", 5, 10, 7)
+        max_duration = Config.LONG_FORM_MAX_DURATION if long_form else 10
+        duration = st.slider("Duration (seconds)", 5, max_duration, 7)
         
     with col2:
         video_style = st.selectbox(
@@ -448,6 +471,18 @@ def main():
             ["Realistic", "Cinematic", "Animated", "Documentary", "Fantasy", "Sci-Fi"]
         )
     
+    progressive = st.checkbox(
+        "Progressive mode (instant draft, full quality renders in the background)",
+        value=False,
+        disabled=long_form
+    )
+    
+    keyframe_motion = st.checkbox(
+        f"Keyframe motion ({Config.KEYFRAME_COUNT} SDXL keyframes generated in parallel and morphed into a video)",
+        value=False,
+        disabled=long_form or progressive
+    )
+    
     st.markdown("---")
     
     # Generate button
@@ -458,7 +493,7 @@ def main():
             if not user_prompt.strip():
                 st.error("Please enter a video prompt!")
             else:
-                generate_video(user_prompt, duration, video_style)
+                generate_video(user_prompt, duration, video_style, progressive, long_form, keyframe_motion)
     
     # Video display section
     if st.session_state.video_generated and (st.session_state.video_path or st.session_state.video_url or st.session_state.image_path):
@@ -469,16 +504,30 @@ def main():
         try:
             # Show image from Stability AI if available
             if hasattr(st.session_state, 'image_path') and st.session_state.image_path and os.path.exists(st.session_state.image_path):
-                st.image(st.session_state.image_path, caption="Generated by Stability AI", use_container_width=True)
+                st.image(playback_source(st.session_state.image_path), caption="Generated by Stability AI", use_container_width=True)
             
             # Show video (either real or demo)
+            live_stream = st.session_state.get('live_stream')
             if hasattr(st.session_state, 'video_path') and st.session_state.video_path and os.path.exists(st.session_state.video_path):
-                st.video(st.session_state.video_path)
+                st.video(playback_source(st.session_state.video_path))
+            elif live_stream and live_stream['path'] == st.session_state.video_path:
+                # Still rendering: play the segments published so far
+                live_player(live_stream['url'])
             elif hasattr(st.session_state, 'video_url') and st.session_state.video_url:
                 st.video(st.session_state.video_url)
         except Exception as e:
             st.error(f"Error displaying content: {str(e)}")
         
+        # Switch style locally: no new generation, no quota used
+        restyle_source = st.session_state.get('restyle_source')
+        if restyle_source and os.path.exists(restyle_source['path']):
+            restyle_col, apply_col = st.columns([3, 1])
+            with restyle_col:
+                new_style = st.selectbox("Restyle locally:", Config.STYLES, key="restyle_style")
+            with apply_col:
+                if st.button("Apply Style", use_container_width=True):
+                    restyle_current(new_style)
+        
         # Download button
         with download_col:
             # Download image if available
@@ -486,7 +535,7 @@ def main():
                 with open(st.session_state.image_path, "rb") as file:
                     st.download_button(
                         label="Download Image",
-                        data=file.read(),
+                        data=file,
                         file_name=f"stability_image_{int(time.time())}.png",
                         mime="image/png",
                         type="secondary",
@@ -497,13 +546,17 @@ def main():
                 with open(st.session_state.video_path, "rb") as file:
                     st.download_button(
                         label="Download Video",
-                        data=file.read(),
+                        data=file,
                         file_name=f"peppo_video_{int(time.time())}.mp4",
                         mime="video/mp4",
                         type="secondary",
                         use_container_width=True
                     )
     
+    # Progressive mode: swap in the final render once it lands
+    if st.session_state.progressive_job is not None:
+        watch_final_render()
+    
     # Footer
     st.markdown("---")
     st.markdown(
@@ -522,11 +575,16 @@ def main():
         unsafe_allow_html=True
     )
 
-def generate_video(prompt, duration, style):
+def generate_video(prompt, duration, style, progressive=False, long_form=False, keyframe_motion=False):
     """Generate video using Stability AI"""
     
-    # Initialize video generator
-    video_gen = VideoGenerator()
+    # Initialize video generator (queued requests are shared fairly between sessions)
+    video_gen = VideoGenerator(session_id=st.session_state.session_id)
+    
+    # A new generation supersedes any final render still pending
+    if st.session_state.progressive_job is not None:
+        st.session_state.progressive_job['job'].cancel()
+        st.session_state.progressive_job = None
     
     with st.spinner("Generating video..."):
         try:
@@ -534,67 +592,77 @@ def generate_video(prompt, duration, style):
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            def update_progress(percent, message):
-                progress_bar.progress(percent)
-                status_text.text(message)
+            # Clicking this reruns the script, which cancels the generation below
+            st.button("Cancel Generation", key="cancel_generation")
             
-            # Generate video using Stability AI
-            result = asyncio.run(video_gen.generate_video(
-                prompt=prompt,
-                duration=duration,
-                style=style,
-                resolution="1024x576",
-                progress_callback=update_progress
-            ))
+            if long_form:
+                # Segments are generated concurrently and stitched into one video
+                result = run_cancellable(
+                    lambda update_progress, cancel_token: video_gen.generate_long_video(
+                        prompt=prompt,
+                        duration=duration,
+                        style=style,
+                        resolution="1024x576",
+                        progress_callback=update_progress,
+                        cancel_token=cancel_token
+                    ),
+                    progress_bar,
+                    status_text
+                )
+            elif progressive:
+                # Draft comes back quickly; the final render keeps going in the background
+                job = run_cancellable(
+                    lambda update_progress, cancel_token: video_gen.generate_progressive(
+                        prompt=prompt,
+                        duration=duration,
+                        style=style,
+                        resolution="1024x576",
+                        progress_callback=update_progress,
+                        cancel_token=cancel_token
+                    ),
+                    progress_bar,
+                    status_text
+                )
+                result = job.draft
+                if result.success and not job.final_ready():
+                    st.session_state.progressive_job = {'job': job, 'duration': duration, 'style': style}
+            elif keyframe_motion:
+                # Keyframes are requested concurrently and morphed into one video
+                result = run_cancellable(
+                    lambda update_progress, cancel_token: video_gen.generate_keyframe_video(
+                        prompt=prompt,
+                        duration=duration,
+                        style=style,
+                        resolution="1024x576",
+                        progress_callback=update_progress,
+                        cancel_token=cancel_token
+                    ),
+                    progress_bar,
+                    status_text
+                )
+            else:
+                # Generate video using Stability AI
+                result = run_cancellable(
+                    lambda update_progress, cancel_token: video_gen.generate_video(
+                        prompt=prompt,
+                        duration=duration,
+                        style=style,
+                        resolution="1024x576",
+                        progress_callback=update_progress,
+                        cancel_token=cancel_token
+                    ),
+                    progress_bar,
+                    status_text
+                )
             
-            if result['success']:
-                # Handle different types of video data
-                video_data = result['video_data']
-                video_url = result.get('video_url')
-                metadata = result.get('metadata', {})
-                
-                if video_data == b"demo_video_data" or not video_data:
-                    # Demo mode - use the provided video URL
-                    st.session_state.video_url = video_url
-                    st.session_state.video_path = None
-                    
-                elif metadata.get('type') == 'image_from_api' and metadata.get('real_api'):
-                    # Real image data from Stability AI
-                    temp_dir = tempfile.gettempdir()
-                    image_filename = f"stability_image_{int(time.time())}.png"
-                    image_path = os.path.join(temp_dir, image_filename)
-                    
-                    with open(image_path, 'wb') as f:
-                        f.write(video_data)
-                    
-                    st.session_state.video_path = None
-                    st.session_state.image_path = image_path  # Store as image
-                    # Also set a demo video to play alongside the image
-                    st.session_state.video_url = video_url or "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4"
-                    
-                elif video_data and len(video_data) > 1000:
-                    # Real video data - save to file
-                    temp_dir = tempfile.gettempdir()
-                    video_filename = f"stability_video_{int(time.time())}.mp4"
-                    video_path = os.path.join(temp_dir, video_filename)
-                    
-                    with open(video_path, 'wb') as f:
-                        f.write(video_data)
-                    st.session_state.video_path = video_path
-                    st.session_state.video_url = None
-                else:
-                    # Fallback to URL if provided, or use demo video
-                    st.session_state.video_url = video_url or "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4"
-                    st.session_state.video_path = None
-                
-                st.session_state.video_generated = True
-                st.session_state.video_metadata = metadata
+            if result.success:
+                apply_generation_result(result, duration, style)
+                metadata = result.metadata
                 
                 progress_bar.empty()
                 status_text.empty()
                 
                 # Show generation details
-                metadata = result.get('metadata', {})
                 if metadata:
                     with st.expander("📊 Generation Details"):
                         st.write(f"**Provider:** Stability AI")
@@ -604,25 +672,241 @@ def generate_video(prompt, duration, style):
                         st.write(f"**Resolution:** {metadata.get('resolution', '1024x576')}")
                         if 'enhanced_prompt' in metadata:
                             st.write(f"**Enhanced Prompt:** {metadata['enhanced_prompt']}")
+                        if metadata.get('keyframes'):
+                            st.write(f"**Keyframes:** {metadata['keyframes']} ({metadata.get('transition')})")
                         if metadata.get('demo_mode'):
                             st.write("**Mode:** Demo Mode (sample video)")
                 
                 st.rerun()
                 
+            elif result.metadata.get('shed'):
+                # Queue is full: tell the user instead of silently showing a demo video
+                progress_bar.empty()
+                status_text.empty()
+                st.warning(f"⏳ {result.error}")
+                
+            elif result.metadata.get('cancelled'):
+                progress_bar.empty()
+                status_text.empty()
+                st.info("Generation cancelled")
+                
             else:
                 # Set fallback demo video when generation fails
                 st.session_state.video_generated = True
-                st.session_state.video_url = "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4"
-                st.session_state.video_path = None
+                st.session_state.image_path = None
+                st.session_state.video_path = get_fallback_video_path(duration, style)
+                st.session_state.video_url = None
                 st.rerun()
                 
         except Exception as e:
             # Fallback to demo mode
             st.session_state.video_generated = True
-            st.session_state.video_url = "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4"
-            st.session_state.video_path = None
+            st.session_state.image_path = None
+            st.session_state.video_path = get_fallback_video_path(duration, style)
+            st.session_state.video_url = None
             st.rerun()
 
+def run_cancellable(start, progress_bar, status_text):
+    """
+    Run a generation on a worker thread, cancelling it if this script run is
+    interrupted (Cancel clicked, a rerun, or the session closing)
+    
+    Args:
+        start: Called with (progress_callback, cancel_token); returns the coroutine to run
+        progress_bar: Progress bar to update
+        status_text: Placeholder for status messages
+    
+    Returns:
+        Whatever the coroutine returns
+    """
+    # Also cancels itself once the Config.API_TIMEOUT budget has been used
+    cancel_token = Deadline()
+    progress = {'percent': 0, 'message': "Starting..."}
+    outcome = {}
+    
+    def update_progress(percent, message):
+        # Called off the script thread; the loop below does the drawing
+        progress['percent'], progress['message'] = percent, message
+    
+    def worker():
+        try:
+            outcome['result'] = asyncio.run(start(update_progress, cancel_token))
+        except BaseException as e:
+            outcome['error'] = e
+    
+    thread = threading.Thread(target=worker, name="generation", daemon=True)
+    thread.start()
+    
+    try:
+        # Each UI update is a Streamlit checkpoint, so a rerun or stop
+        # interrupts this loop
+        while thread.is_alive():
+            progress_bar.progress(progress['percent'])
+            status_text.text(progress['message'])
+            thread.join(0.2)
+    except BaseException:
+        # Closes in-flight requests, stops polling and removes partial files
+        cancel_token.cancel("Generation cancelled")
+        raise
+    
+    progress_bar.progress(progress['percent'])
+    status_text.text(progress['message'])
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+def apply_generation_result(result, duration, style):
+    """Store a successful generation result in session state"""
+    # Only file paths and artifact handles go into session state; the media stays on disk
+    artifact = result.artifact
+    st.session_state.image_path = None
+    st.session_state.media_artifacts = {artifact.path: artifact} if artifact else {}
+    
+    if artifact and artifact.is_image:
+        # Real image from Stability AI
+        st.session_state.image_path = artifact.path  # Store as image
+        # Also set a demo video to play alongside the image
+        st.session_state.video_path = get_fallback_video_path(duration, style)
+        st.session_state.video_url = None
+        
+    elif artifact and artifact.is_video:
+        # Real or locally rendered video
+        st.session_state.video_path = artifact.path
+        st.session_state.video_url = None
+        
+    elif result.video_url:
+        # Fallback to URL if provided
+        st.session_state.video_url = result.video_url
+        st.session_state.video_path = None
+    else:
+        # Use the local demo video
+        st.session_state.video_path = get_fallback_video_path(duration, style)
+        st.session_state.video_url = None
+    
+    st.session_state.video_generated = True
+    st.session_state.video_metadata = result.metadata
+    
+    # Restyling always starts from the generated media, not an earlier restyle
+    if not result.metadata.get('restyled'):
+        st.session_state.restyle_source = None
+        if artifact and not result.metadata.get('demo_mode'):
+            st.session_state.restyle_source = {
+                'path': artifact.path,
+                'mime_type': artifact.mime_type,
+                'metadata': result.metadata,
+                'duration': duration
+            }
+
+def playback_source(path):
+    """What st.video / st.image should load: a fresh presigned URL for media in remote storage, else the local file"""
+    artifact = st.session_state.get('media_artifacts', {}).get(path)
+    if artifact is None or not artifact.storage_key:
+        return path
+    
+    from utils.file_handler import FileHandler
+    try:
+        return FileHandler().artifact_url(artifact)
+    except Exception as e:
+        print(f"⚠️  Could not get a storage URL for {artifact.storage_key}: {str(e)}")
+        return path
+
+def restyle_current(style):
+    """Grade the current generation into another style (local, no API call)"""
+    from utils.artifacts import GenerationResult, MediaArtifact
+    
+    source = st.session_state.restyle_source
+    original = GenerationResult(
+        success=True,
+        artifact=MediaArtifact.from_file(source['path'], source['mime_type']),
+        metadata=source['metadata']
+    )
+    
+    with st.spinner(f"Applying {style} style..."):
+        result = asyncio.run(VideoGenerator(session_id=st.session_state.session_id).restyle(original, style))
+    
+    if result.success:
+        apply_generation_result(result, source['duration'], style)
+        st.rerun()
+    else:
+        st.error(result.error)
+
+def watch_final_render():
+    """Wait for a progressive job's final render and swap it in, unless cancelled"""
+    pending = st.session_state.progressive_job
+    job = pending['job']
+    
+    status_col, cancel_col = st.columns([3, 1])
+    
+    with cancel_col:
+        if st.button("Cancel Final Render", use_container_width=True):
+            job.cancel()
+            st.session_state.progressive_job = None
+            st.info("Final render cancelled - keeping the draft")
+            return
+    
+    with status_col:
+        status_text = st.empty()
+    
+    # Each status update is a Streamlit checkpoint, so clicking Cancel
+    # interrupts this loop with a rerun
+    waited = 0.0
+    while not job.final_ready():
+        status_text.text(f"Draft shown - rendering full quality in the background ({int(waited)}s)...")
+        time.sleep(0.5)
+        waited += 0.5
+    
+    st.session_state.progressive_job = None
+    result = job.final_result()
+    
+    if result is not None and result.success:
+        apply_generation_result(result, pending['duration'], pending['style'])
+        st.rerun()
+    else:
+        status_text.text("Final render unavailable - keeping the draft")
+
+def get_fallback_video_path(duration, style, resolution="1024x576"):
+    """Get the locally rendered fallback video for a style (cached, no network I/O)"""
+    from utils.file_handler import FileHandler
+    file_handler = FileHandler()
+    if Config.LIVE_FALLBACK and serves_live_output():
+        # Not cached yet: stream it while it renders; the path exists once it is done
+        live_dir = file_handler.get_live_fallback(style, duration, resolution, VideoProvider.STABILITY_AI)
+        if live_dir:
+            path = file_handler.fallback_path(style, duration, resolution)
+            st.session_state.live_stream = {'path': path, 'url': live_playlist_url(live_dir)}
+            return path
+    return file_handler.get_fallback_video(style, duration, resolution, VideoProvider.STABILITY_AI)
+
+def serves_live_output():
+    """Whether live renders land where Streamlit's static file serving can reach them"""
+    relative = os.path.relpath(os.path.abspath(Config.LIVE_OUTPUT_DIR), STATIC_DIR)
+    return not relative.startswith(os.pardir)
+
+def live_playlist_url(live_dir):
+    """URL of a live render's HLS playlist (static/ is served at app/static/)"""
+    from utils.live_stream import PLAYLIST_NAME
+    relative = os.path.relpath(os.path.join(live_dir, PLAYLIST_NAME), STATIC_DIR)
+    return "app/static/" + Path(relative).as_posix()
+
+def live_player(url, height=420):
+    """Play an HLS playlist that is still growing: hls.js where supported, native HLS (Safari) otherwise"""
+    import streamlit.components.v1 as components
+    components.html(f"""
+        <video id="live" controls autoplay muted playsinline style="width: 100%; max-height: {height - 10}px;"></video>
+        <script src="https://cdn.jsdelivr.net/npm/hls.js@1"></script>
+        <script>
+            const video = document.getElementById("live");
+            const source = new URL("{url}", document.baseURI).href;
+            if (window.Hls && Hls.isSupported()) {{
+                const hls = new Hls();
+                hls.loadSource(source);
+                hls.attachMedia(video);
+            }} else {{
+                video.src = source;
+            }}
+        </script>
+    """, height=height)
+
 def create_demo_video(prompt, duration, style):
     """Create a demo video file (placeholder for actual Sora integration)"""
     # This function is kept for backward compatibility but is now handled by StabilityAIClient
@@ -0,0 +1,190 @@
+"""
+Benchmark native-resolution renders against smaller renders upscaled locally.
+
+Runs the same prompts through StabilityAIClient twice, once at the native
+SDXL size and once at the smaller LOCAL_UPSCALE size followed by the tiled
+upscaler, and reports end-to-end latency and quota use for each.
+
+By default the API is simulated by a local server whose render time and
+credit cost grow with pixels x steps (how hosted diffusion is metered), so
+the comparison runs offline and costs nothing; the local upscale is real.
+With --live the real API is used and quota is the change in the account's
+credit balance (this spends credits).
+
+    python benchmark_upscale.py
+    python benchmark_upscale.py --runs 5 --resolution 576x1024
+    STABILITY_API_KEY=sk-... python benchmark_upscale.py --live --runs 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import Config
+
+PROMPT = "A lighthouse on a rocky coast during a storm, waves crashing"
+
+
+class SimulatedStability(BaseHTTPRequestHandler):
+    """Text-to-image endpoint with pixel x step proportional latency and cost."""
+
+    # Seconds of render time, and credits, per megapixel-step
+    seconds_per_mp_step = 0.12
+    credits_per_mp_step = 0.02
+    credits = 1000.0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path.endswith("/balance"):
+            self._json({"credits": type(self).credits})
+        else:
+            self._json({"id": "benchmark", "email": "benchmark@example.com"})
+
+    def do_POST(self):
+        import cv2
+        import numpy as np
+
+        params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        width, height, steps = params["width"], params["height"], params["steps"]
+        mp_steps = width * height / 1e6 * steps
+        time.sleep(mp_steps * self.seconds_per_mp_step)
+        with self.lock:
+            type(self).credits -= mp_steps * self.credits_per_mp_step
+
+        # Smooth gradient with a few hard edges, roughly like a real render
+        y, x = np.mgrid[0:height, 0:width]
+        image = np.dstack([x * 255 // width, y * 255 // height, (x + y) * 127 // (width + height)]).astype(np.uint8)
+        for index in range(6):
+            cv2.circle(image, (width * (index + 1) // 7, height // 2), min(width, height) // 8, (240, 240, 240), 3)
+        png = cv2.imencode(".png", image)[1].tobytes()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(png)))
+        self.end_headers()
+        self.wfile.write(png)
+
+    def _json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def read_balance(api_key: str) -> float:
+    """Current credit balance of the account behind api_key."""
+    import requests
+
+    response = requests.get(
+        f"{Config.STABILITY_BASE_URL}/v1/user/balance",
+        headers={"Authorization": f"Bearer {api_key}"},
+        timeout=10
+    )
+    response.raise_for_status()
+    return float(response.json().get("credits", 0.0))
+
+
+async def run_mode(client, api_key: str, resolution: str, upscale: bool, runs: int):
+    """Generate `runs` images and return (latencies, credits used, metadata)."""
+    latencies = []
+    metadata = {}
+    balance_before = read_balance(api_key)
+
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await client.generate_video(PROMPT, resolution=resolution, quality="final", upscale=upscale)
+        latencies.append(time.perf_counter() - started)
+        if not result.success:
+            raise RuntimeError(f"Generation failed: {result.error}")
+        metadata = result.metadata
+
+    return latencies, balance_before - read_balance(api_key), metadata
+
+
+def time_local_upscale(resolution: str, repeats: int = 5) -> float:
+    """Seconds the local upscale adds on its own, for the breakdown."""
+    import numpy as np
+    from utils.upscaler import TiledUpscaler
+
+    width, height = (int(value) for value in resolution.split("x"))
+    native_width, native_height = Config.UPSCALE_DIMENSIONS.get(resolution, (512, 512))
+    image = np.random.default_rng(0).integers(0, 256, (native_height, native_width, 3), dtype=np.uint8)
+    upscaler = TiledUpscaler(width, height)
+    upscaler.upscale(image)
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        upscaler.upscale(image)
+    return (time.perf_counter() - started) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3, help="Generations per mode")
+    parser.add_argument("--resolution", default="1024x576", choices=list(Config.UPSCALE_DIMENSIONS))
+    parser.add_argument("--live", action="store_true", help="Use the real API (spends credits)")
+    args = parser.parse_args()
+
+    from api_clients.key_pool import KeyPool
+    from api_clients.stability_ai_client import StabilityAIClient
+
+    server = None
+    if args.live:
+        api_key = Config.STABILITY_API_KEY
+        if not api_key:
+            parser.error("--live needs STABILITY_API_KEY")
+    else:
+        api_key = "sk-benchmark"
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SimulatedStability)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        Config.STABILITY_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = StabilityAIClient(key_pool=KeyPool([api_key], base_url=Config.STABILITY_BASE_URL))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # Generated files land in ./generated_videos; keep them out of the tree
+        os.chdir(directory)
+        try:
+            results = {
+                mode: asyncio.run(run_mode(client, api_key, args.resolution, mode == "upscaled", args.runs))
+                for mode in ("native", "upscaled")
+            }
+        finally:
+            os.chdir(cwd)
+            if server:
+                server.shutdown()
+
+    print("=" * 64)
+    print(f"📊 Native vs local upscale — {args.resolution}, {args.runs} run(s) each"
+          f"{' (live API)' if args.live else ' (simulated API)'}")
+    print("=" * 64)
+    print(f"{'mode':<10}{'rendered':>12}{'output':>12}{'median s':>11}{'max s':>9}{'credits':>10}")
+    for mode, (latencies, credits, metadata) in results.items():
+        print(
+            f"{mode:<10}{metadata.get('native_size', ''):>12}{args.resolution:>12}"
+            f"{statistics.median(latencies):>11.2f}{max(latencies):>9.2f}{credits / args.runs:>10.3f}"
+        )
+
+    native, upscaled = results["native"], results["upscaled"]
+    speedup = statistics.median(native[0]) / statistics.median(upscaled[0])
+    print()
+    print(f"⏱️  Local upscale: {time_local_upscale(args.resolution) * 1000:.0f} ms per image")
+    print(f"🚀 End-to-end speedup: {speedup:.2f}x")
+    if native[1] > 0:
+        print(f"💳 Credits per image: {upscaled[1] / native[1]:.0%} of native")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
 import os
 from enum import Enum
-from dotenv import load_dotenv
+
+
+def _load_env_file():
+    """
+    Load environment variables from a .env file, if there is one.
+    
+    Deployed containers get their settings from the real environment, so
+    python-dotenv is only imported (and the filesystem only searched) when a
+    .env file actually exists in the working directory or next to this module.
+    """
+    for directory in (os.getcwd(), os.path.dirname(os.path.abspath(__file__))):
+        env_path = os.path.join(directory, ".env")
+        if os.path.isfile(env_path):
+            try:
+                from dotenv import load_dotenv
+            except ImportError:
+                return
+            load_dotenv(env_path)
+            return
+
 
 # Load environment variables from .env file
-load_dotenv()
+_load_env_file()
 
 class VideoProvider(Enum):
     STABILITY_AI = "stability_ai"
+    RUNWAY = "runway"
+    PIKA = "pika"
 
 class Config:
     # API Configuration
@@ -14,6 +35,18 @@ class Config:
     
     # Load API keys from environment variables
     STABILITY_API_KEY = os.getenv("STABILITY_API_KEY", "")
+    # Extra keys for the key pool, comma-separated (STABILITY_API_KEY is included too)
+    STABILITY_API_KEYS = os.getenv("STABILITY_API_KEYS", "")
+    # Only needed to resume journaled Runway/Pika jobs after a restart
+    RUNWAY_API_KEY = os.getenv("RUNWAY_API_KEY", "")
+    PIKA_API_KEY = os.getenv("PIKA_API_KEY", "")
+    
+    # Per-key rate accounting for the key pool
+    KEY_REQUESTS_PER_SECOND = float(os.getenv("KEY_REQUESTS_PER_SECOND", 10))
+    KEY_BURST = float(os.getenv("KEY_BURST", 10))
+    KEY_MIN_CREDITS = float(os.getenv("KEY_MIN_CREDITS", 1))  # Evict keys below this balance
+    KEY_CREDITS_PER_REQUEST = float(os.getenv("KEY_CREDITS_PER_REQUEST", 1))  # Charged per success until the next refresh
+    CREDIT_REFRESH_SECONDS = int(os.getenv("CREDIT_REFRESH_SECONDS", 300))  # 0 disables
     
     # Video Generation Settings
     DEFAULT_DURATION = 7
@@ -24,6 +57,97 @@ class Config:
     # Stability AI specific settings
     STABILITY_MODEL = "svd-xt-1-1"  # Stable Video Diffusion model
     STABILITY_BASE_URL = "https://api.stability.ai"
+    STABILITY_IMAGE_ENGINE = "stable-diffusion-xl-1024-v1-0"
+    FINAL_STEPS = 30
+    
+    # SDXL only accepts specific dimensions; closest match per output resolution
+    SDXL_DIMENSIONS = {
+        "1024x576": (1344, 768),
+        "576x1024": (768, 1344),
+        "768x768": (1024, 1024),
+        "1024x1024": (1024, 1024)
+    }
+    
+    # Progressive mode: a cheap low-step, low-resolution draft comes back
+    # first, then the full-quality render runs in the background
+    DRAFT_ENGINE = os.getenv("DRAFT_ENGINE", "stable-diffusion-v1-6")
+    DRAFT_STEPS = int(os.getenv("DRAFT_STEPS", 10))
+    DRAFT_DIMENSIONS = {
+        "1024x576": (768, 448),
+        "576x1024": (448, 768),
+        "768x768": (512, 512),
+        "1024x1024": (512, 512)
+    }
+    MAX_BACKGROUND_RENDERS = int(os.getenv("MAX_BACKGROUND_RENDERS", 4))
+    
+    # Local upscaling: final renders are requested at a smaller native size
+    # and upscaled to the selected resolution on the CPU
+    LOCAL_UPSCALE = os.getenv("LOCAL_UPSCALE", "false").lower() == "true"
+    UPSCALE_ENGINE = os.getenv("UPSCALE_ENGINE", "stable-diffusion-v1-6")
+    UPSCALE_DIMENSIONS = {
+        "1024x576": (640, 384),
+        "576x1024": (384, 640),
+        "768x768": (512, 512),
+        "1024x1024": (512, 512)
+    }
+    UPSCALE_TILE = int(os.getenv("UPSCALE_TILE", 256))  # Output pixels per tile side
+    UPSCALE_WORKERS = int(os.getenv("UPSCALE_WORKERS", 4))
+    UPSCALE_SHARPEN = float(os.getenv("UPSCALE_SHARPEN", 0.6))  # Edge sharpening amount, 0 disables
+    
+    # Frame interpolation: clips shorter than the requested duration are
+    # stretched with synthesized in-between frames instead of freezing
+    INTERPOLATE_SHORT_CLIPS = os.getenv("INTERPOLATE_SHORT_CLIPS", "true").lower() == "true"
+    INTERPOLATION_METHOD = os.getenv("INTERPOLATION_METHOD", "blend")  # "blend" or "motion" (block matching)
+    INTERPOLATION_FPS = int(os.getenv("INTERPOLATION_FPS", 24))
+    INTERPOLATION_BLOCK = int(os.getenv("INTERPOLATION_BLOCK", 16))  # Block size at half resolution
+    INTERPOLATION_SEARCH = int(os.getenv("INTERPOLATION_SEARCH", 8))  # Largest offset tried per block
+    INTERPOLATION_BATCH = 8  # Output frames blended per array operation
+    
+    # Frames buffered between the render, overlay and encode stages of
+    # locally rendered video
+    FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", 8))
+    
+    # Move the MP4 index (moov) to the front of saved videos, so browsers can
+    # start playback before the whole file has downloaded
+    FASTSTART = os.getenv("FASTSTART", "true").lower() == "true"
+    
+    # Live output: local renders published as fragmented-MP4 / HLS segments
+    # while they render, so playback can start on the first segment
+    LIVE_SEGMENT_SECONDS = float(os.getenv("LIVE_SEGMENT_SECONDS", 1.0))
+    # Live renders go under static/, which Streamlit serves at app/static/
+    # (server.enableStaticServing in .streamlit/config.toml)
+    LIVE_OUTPUT_DIR = os.getenv("LIVE_OUTPUT_DIR", os.path.join("static", "live"))
+    # Stream uncached fallback videos to the player while they render
+    LIVE_FALLBACK = os.getenv("LIVE_FALLBACK", "true").lower() == "true"
+    # Live directories older than this are removed when a new one is made
+    LIVE_RETENTION_SECONDS = int(os.getenv("LIVE_RETENTION_SECONDS", 3600))
+    
+    # Saved videos over their size budget (MAX_FILE_SIZE, or the bitrate of
+    # TARGET_BANDWIDTH times the duration) are re-encoded at a lower
+    # resolution / frame rate chosen from a sampled estimate; only mp4v
+    # videos without audio (local renders), so provider videos stay as delivered
+    ENFORCE_MAX_FILE_SIZE = os.getenv("ENFORCE_MAX_FILE_SIZE", "true").lower() == "true"
+    TARGET_BANDWIDTH = os.getenv("TARGET_BANDWIDTH", "")  # "", "mobile", "sd" or "hd"
+    BANDWIDTH_CLASSES = {"mobile": 1_000_000, "sd": 2_500_000, "hd": 5_000_000}  # bits per second
+    SIZE_SAMPLES = int(os.getenv("SIZE_SAMPLES", 3))
+    SIZE_SAMPLE_SECONDS = float(os.getenv("SIZE_SAMPLE_SECONDS", 0.5))
+    
+    # Long-form mode: the duration is split into segments that are generated
+    # concurrently and stitched together
+    LONG_FORM_MAX_DURATION = int(os.getenv("LONG_FORM_MAX_DURATION", 60))
+    SEGMENT_DURATION = int(os.getenv("SEGMENT_DURATION", 5))
+    MAX_CONCURRENT_SEGMENTS = int(os.getenv("MAX_CONCURRENT_SEGMENTS", 6))
+    CROSSFADE_SECONDS = float(os.getenv("CROSSFADE_SECONDS", 0.5))
+    
+    # Keyframe mode: several SDXL keyframes (one seed, varied camera cues) are
+    # requested concurrently and morphed into a video locally
+    KEYFRAME_COUNT = int(os.getenv("KEYFRAME_COUNT", 4))
+    KEYFRAME_TRANSITION = os.getenv("KEYFRAME_TRANSITION", "morph")  # "morph" or "dissolve"
+    KEYFRAME_HOLD = float(os.getenv("KEYFRAME_HOLD", 0.3))  # Share of each interval spent on the still
+    KEYFRAME_FPS = int(os.getenv("KEYFRAME_FPS", 24))
+    
+    # Local restyling: optional <style>.cube LUTs overriding the built-in grades
+    RESTYLE_LUT_DIR = os.getenv("RESTYLE_LUT_DIR", "")
     
     # Available resolutions for Stability AI
     AVAILABLE_RESOLUTIONS = [
@@ -46,11 +170,70 @@ class Config:
     # File Settings
     TEMP_DIR = os.getenv("TEMP_DIR", "temp")
     MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 100 * 1024 * 1024))  # 100MB default
+    IO_WORKERS = int(os.getenv("IO_WORKERS", 4))  # Thread pool for file writes
+    FSYNC_WRITES = os.getenv("FSYNC_WRITES", "false").lower() in ("1", "true", "yes")
+    # "flat": one file per output in generated_videos/
+    # "cas": SHA-256 sharded, deduplicated blobs with a name index
+    STORAGE_MODE = os.getenv("STORAGE_MODE", "flat")
+    
+    # Storage backend shared by replicas: "local" or "s3" (any S3-compatible store)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    S3_BUCKET = os.getenv("S3_BUCKET", "")
+    S3_PREFIX = os.getenv("S3_PREFIX", "generated_videos/")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # e.g. MinIO / R2 endpoint
+    S3_REGION = os.getenv("S3_REGION", "")
+    S3_PART_SIZE = int(os.getenv("S3_PART_SIZE", 8 * 1024 * 1024))
+    PRESIGNED_URL_TTL = int(os.getenv("PRESIGNED_URL_TTL", 3600))
+    
+    # Result cache shared by all worker processes on a node (SQLite, WAL mode)
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join("generated_videos", "result_cache.sqlite"))
+    RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 24 * 3600))
+    # How long one worker may hold the generation lock before others take over
+    RESULT_CACHE_LEASE_SECONDS = int(os.getenv("RESULT_CACHE_LEASE_SECONDS", 600))
+    
+    # Admission control: provider generations running at once across all
+    # sessions in this process, and how many more may wait before shedding
+    MAX_IN_FLIGHT_GENERATIONS = int(os.getenv("MAX_IN_FLIGHT_GENERATIONS", 4))
+    MAX_QUEUED_GENERATIONS = int(os.getenv("MAX_QUEUED_GENERATIONS", 20))
+    ADMISSION_ESTIMATE_SECONDS = float(os.getenv("ADMISSION_ESTIMATE_SECONDS", 60))  # Initial ETA per generation
+    
+    # Scheduling of queued generations: lower rank runs first
+    PRIORITY_CLASSES = {
+        "interactive": 0,  # A user waiting on the spinner
+        "standard": 1,     # Long-form segments
+        "background": 2    # Progressive final renders behind a draft
+    }
+    DEFAULT_PRIORITY = os.getenv("DEFAULT_PRIORITY", "interactive")
+    SCHEDULER_SJF = os.getenv("SCHEDULER_SJF", "false").lower() in ("1", "true", "yes")  # Shortest duration first per session
+    SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", 120))  # Promote one class per this much waiting
     
     # API Settings
-    API_TIMEOUT = int(os.getenv("API_TIMEOUT", 300))  # 5 minutes default
+    API_TIMEOUT = int(os.getenv("API_TIMEOUT", 300))  # 5 minutes default; end-to-end budget per generation
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))
     
+    # Adaptive HTTP timeouts: a multiple of the observed p95 latency per provider call
+    ADAPTIVE_TIMEOUT_PERCENTILE = float(os.getenv("ADAPTIVE_TIMEOUT_PERCENTILE", 95))
+    ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", 3))
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv("ADAPTIVE_TIMEOUT_MIN_SAMPLES", 20))  # Fixed defaults until then
+    MIN_REQUEST_TIMEOUT = float(os.getenv("MIN_REQUEST_TIMEOUT", 5))
+    
+    # Completion webhooks: providers call back instead of being polled. Set
+    # WEBHOOK_PUBLIC_URL to the address providers can reach WEBHOOK_PORT on.
+    WEBHOOK_PUBLIC_URL = os.getenv("WEBHOOK_PUBLIC_URL", "")  # Empty disables the receiver
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8765))
+    WEBHOOK_FALLBACK_POLL_SECONDS = float(os.getenv("WEBHOOK_FALLBACK_POLL_SECONDS", 30))  # Poll anyway this often
+    
+    # Shared status poller: one loop per provider checks every outstanding job
+    STATUS_POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", 5))
+    STATUS_BATCH_SIZE = int(os.getenv("STATUS_BATCH_SIZE", 50))  # Job IDs per batch status request
+    STATUS_POLL_CONCURRENCY = int(os.getenv("STATUS_POLL_CONCURRENCY", 8))  # Parallel single-job checks
+    
+    # Journal of submitted remote jobs, so a restart resumes them instead of paying again
+    JOB_JOURNAL_PATH = os.getenv("JOB_JOURNAL_PATH", os.path.join("generated_videos", "job_journal.sqlite"))
+    JOB_RESUME_MAX_AGE = int(os.getenv("JOB_RESUME_MAX_AGE", 86400))  # Older jobs are given up
+    
     @property
     def stability_api_key(self) -> str:
         """Get Stability AI API key"""
@@ -61,26 +244,36 @@ class Config:
         """Get the current video provider"""
         return self.DEFAULT_PROVIDER
     
+    @staticmethod
+    def get_api_keys() -> list:
+        """Get every configured Stability AI API key, without duplicates"""
+        keys = [Config.STABILITY_API_KEY] + Config.STABILITY_API_KEYS.split(",")
+        return list(dict.fromkeys(key.strip() for key in keys if key.strip()))
+    
     @staticmethod
     def get_api_key(provider: VideoProvider) -> str:
         """Get API key for specified provider"""
         if provider == VideoProvider.STABILITY_AI:
             return Config.STABILITY_API_KEY
+        if provider == VideoProvider.RUNWAY:
+            return Config.RUNWAY_API_KEY
+        if provider == VideoProvider.PIKA:
+            return Config.PIKA_API_KEY
         return ""
     
     @staticmethod
     def is_demo_mode() -> bool:
         """Check if running in demo mode (no API keys available)"""
-        return not Config.STABILITY_API_KEY or not Config.validate_api_key()
+        return not Config.get_api_keys() or not Config.validate_api_key()
     
     @staticmethod
     def validate_api_key() -> bool:
-        """Validate if Stability AI API key is present and properly formatted"""
-        api_key = Config.STABILITY_API_KEY
-        return bool(
+        """Validate if at least one Stability AI API key is present and properly formatted"""
+        return any(
             api_key and 
             api_key.startswith('sk-') and 
             len(api_key) > 20
+            for api_key in Config.get_api_keys()
         )
     
     @staticmethod
@@ -0,0 +1,148 @@
+"""
+Tests for the process-wide admission controller.
+
+    python test_admission.py
+"""
+
+import asyncio
+
+from utils.admission import AdmissionController, QueueFullError
+from utils.cancellation import CancellationToken, GenerationCancelled
+
+
+def _controller(max_in_flight=1, max_queue=1):
+    return AdmissionController(max_in_flight, max_queue, initial_estimate=10, poll_interval=0.01)
+
+
+def test_full_queue_sheds_new_requests():
+    controller = _controller(max_in_flight=1, max_queue=1)
+
+    async def scenario():
+        await controller.acquire(session_id="a")
+        waiter = asyncio.ensure_future(controller.acquire(session_id="b"))
+        await asyncio.sleep(0.05)
+        try:
+            await controller.acquire(session_id="c")
+            assert False, "third request should have been shed"
+        except QueueFullError as e:
+            # Behind one running and one queued request at 10 s each
+            assert e.retry_after == 20
+        stats = controller.stats()
+        assert (stats["in_flight"], stats["queued"], stats["shed"]) == (1, 1, 1)
+
+        controller.release()
+        await asyncio.wait_for(waiter, 1)
+        assert controller.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiters_see_their_queue_position():
+    controller = _controller(max_in_flight=1, max_queue=5)
+    messages = {}
+
+    async def scenario():
+        await controller.acquire(session_id="holder")
+        waiters = []
+        for name in ("first", "second"):
+            messages[name] = []
+            callback = lambda percent, message, name=name: messages[name].append(message)
+            waiters.append(asyncio.ensure_future(controller.acquire(callback, session_id=name)))
+            await asyncio.sleep(0.03)
+
+        controller.release()
+        await asyncio.sleep(0.05)
+        controller.release()
+        await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+    asyncio.run(scenario())
+
+    assert messages["first"] == ["Waiting in queue: position 1, about 10s to start..."]
+    assert messages["second"][0] == "Waiting in queue: position 2, about 20s to start..."
+    assert "position 1" in messages["second"][-1]
+
+
+def test_slot_is_released_after_an_error():
+    controller = _controller()
+
+    async def failing():
+        async with controller.slot(session_id="a"):
+            raise RuntimeError("provider exploded")
+
+    try:
+        asyncio.run(failing())
+    except RuntimeError:
+        pass
+
+    assert controller.stats()["in_flight"] == 0
+    asyncio.run(asyncio.wait_for(controller.acquire(session_id="b"), 1))
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    controller = _controller(max_in_flight=1, max_queue=1)
+    token = CancellationToken()
+
+    async def scenario():
+        await controller.acquire(session_id="holder")
+        waiter = asyncio.ensure_future(controller.acquire(session_id="waiter", cancel_token=token))
+        await asyncio.sleep(0.03)
+        assert controller.stats()["queued"] == 1
+
+        token.cancel()
+        try:
+            await asyncio.wait_for(waiter, 1)
+            assert False, "cancelled waiter was admitted"
+        except GenerationCancelled:
+            pass
+
+        # Its place is free again: a new request can queue instead of being shed
+        assert controller.stats()["queued"] == 0
+        replacement = asyncio.ensure_future(controller.acquire(session_id="next"))
+        await asyncio.sleep(0.03)
+        controller.release()
+        await asyncio.wait_for(replacement, 1)
+        assert controller.stats()["in_flight"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_slot_is_released():
+    controller = _controller()
+    token = CancellationToken()
+
+    async def generation():
+        async with controller.slot(session_id="a", cancel_token=token):
+            await token.sleep(5)
+
+    async def scenario():
+        task = asyncio.ensure_future(generation())
+        await asyncio.sleep(0.03)
+        assert controller.stats()["in_flight"] == 1
+        token.cancel()
+        try:
+            await asyncio.wait_for(task, 1)
+        except GenerationCancelled:
+            pass
+
+    asyncio.run(scenario())
+
+    assert controller.stats()["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Admission Control Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All admission control tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,98 @@
+"""
+Tests for file-backed media artifacts and generation results.
+
+    python test_artifacts.py
+"""
+
+import hashlib
+import os
+import tempfile
+
+from utils.artifacts import GenerationResult, MediaArtifact, write_artifact
+
+DATA = bytes(range(256)) * 5000  # A little over 1 MB, so it spans two chunks
+
+
+def test_write_artifact_streams_and_hashes():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "clip.mp4")
+        chunks = [DATA[offset:offset + 4096] for offset in range(0, len(DATA), 4096)]
+
+        artifact = write_artifact(iter(chunks), path, "video/mp4")
+
+        assert artifact.size == len(DATA) == os.path.getsize(path)
+        assert artifact.sha256 == hashlib.sha256(DATA).hexdigest()
+        assert artifact.is_video and not artifact.is_image
+        assert os.listdir(directory) == ["clip.mp4"]
+
+
+def test_from_file_reads_lazily_without_copies():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "frame.png")
+        with open(path, "wb") as f:
+            f.write(DATA)
+
+        artifact = MediaArtifact.from_file(path)
+
+        assert artifact.mime_type == "image/png" and artifact.is_image
+        assert artifact._sha256 is None
+        assert artifact.sha256 == hashlib.sha256(DATA).hexdigest()
+        chunks = list(artifact.iter_chunks())
+        assert len(chunks) == 2 and b"".join(chunks) == DATA
+        view = artifact.memoryview()
+        assert view[:256] == DATA[:256] and len(view) == len(DATA)
+        assert artifact.read_bytes() == DATA
+        assert artifact.to_dict() == {
+            "path": path,
+            "size": len(DATA),
+            "sha256": artifact.sha256,
+            "mime_type": "image/png",
+            "storage_key": None
+        }
+
+
+def test_empty_and_unknown_files():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "blob")
+        open(path, "wb").close()
+
+        artifact = MediaArtifact.from_file(path)
+
+        assert artifact.mime_type == "application/octet-stream"
+        assert artifact.size == 0 and bytes(artifact.memoryview()) == b""
+        os.remove(path)
+        assert not artifact.exists()
+
+
+def test_generation_results_reference_media():
+    with tempfile.TemporaryDirectory() as directory:
+        artifact = write_artifact([b"video"], os.path.join(directory, "clip.mp4"), "video/mp4")
+
+        result = GenerationResult(success=True, artifact=artifact, metadata={"prompt": "a harbour"})
+        failure = GenerationResult.failure("provider down", {"shed": True})
+
+        assert result.artifact.path.endswith("clip.mp4") and result.error is None
+        assert not failure.success and failure.artifact is None
+        assert failure.error == "provider down" and failure.metadata == {"shed": True}
+        # Failures without metadata don't share a mutable default
+        GenerationResult.failure("a").metadata["x"] = 1
+        assert GenerationResult.failure("b").metadata == {}
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Artifact Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All artifact tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,127 @@
+"""
+Tests for the content-addressed, sharded blob store.
+
+    python test_blob_store.py
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+from config import VideoProvider
+from utils.blob_store import ContentAddressedStore
+from utils.file_handler import FileHandler
+
+
+def _blob_files(store):
+    return [
+        os.path.join(root, name)
+        for root, _, names in os.walk(store.blob_dir)
+        for name in names
+    ]
+
+
+def _refcount(store, sha256):
+    with store._connect() as conn:
+        row = conn.execute("SELECT refcount FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    return row[0] if row else None
+
+
+def test_identical_content_is_stored_once():
+    with tempfile.TemporaryDirectory() as directory:
+        store = ContentAddressedStore(directory)
+        sha256 = hashlib.sha256(b"same video").hexdigest()
+
+        first = store.put_stream([b"same ", b"video"], "first.mp4", "video/mp4", ".mp4")
+        second = store.put_stream([b"same video"], "second.mp4", "video/mp4", ".mp4")
+
+        assert first.path == second.path == store.blob_path(sha256, ".mp4")
+        assert first.path.endswith(os.path.join("blobs", sha256[:2], sha256[2:4], f"{sha256}.mp4"))
+        assert _blob_files(store) == [first.path]
+        assert _refcount(store, sha256) == 2
+        assert store.get("second.mp4").sha256 == sha256
+        assert [entry["name"] for entry in store.list()] == ["second.mp4", "first.mp4"]
+        assert os.listdir(store.staging_dir) == []
+
+
+def test_blob_is_deleted_with_its_last_name():
+    with tempfile.TemporaryDirectory() as directory:
+        store = ContentAddressedStore(directory)
+        artifact = store.put_stream([b"shared"], "a.mp4", "video/mp4", ".mp4")
+        store.put_stream([b"shared"], "b.mp4", "video/mp4", ".mp4")
+
+        assert store.delete("a.mp4")
+        assert os.path.exists(artifact.path) and _refcount(store, artifact.sha256) == 1
+        assert store.get("a.mp4") is None
+
+        assert store.delete("b.mp4")
+        assert not os.path.exists(artifact.path)
+        assert store.get_by_digest(artifact.sha256) is None
+        assert not store.delete("b.mp4")
+
+
+def test_renaming_a_name_to_new_content_releases_the_old_blob():
+    with tempfile.TemporaryDirectory() as directory:
+        store = ContentAddressedStore(directory)
+        old = store.put_stream([b"draft"], "clip.mp4", "video/mp4", ".mp4")
+
+        new = store.put_stream([b"final"], "clip.mp4", "video/mp4", ".mp4")
+
+        assert not os.path.exists(old.path)
+        assert store.get("clip.mp4").path == new.path
+        assert _blob_files(store) == [new.path]
+
+
+def test_concurrent_duplicate_puts_share_one_blob():
+    with tempfile.TemporaryDirectory() as directory:
+        store = ContentAddressedStore(directory)
+        threads = [
+            threading.Thread(target=store.put_stream, args=([b"popular"], f"{n}.mp4", "video/mp4", ".mp4"))
+            for n in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(_blob_files(store)) == 1
+        assert _refcount(store, hashlib.sha256(b"popular").hexdigest()) == 8
+
+
+def test_file_handler_cas_mode_discards_by_reference():
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            handler = FileHandler(storage_mode="cas")
+            first = handler.save_artifact([b"\x89PNG same"], "a prompt", VideoProvider.STABILITY_AI, ".png", "image/png")
+            second = handler.save_artifact([b"\x89PNG same"], "a prompt", VideoProvider.STABILITY_AI, ".png", "image/png")
+
+            assert first.name != second.name and first.path == second.path
+            handler.discard_artifact(first)
+            assert os.path.exists(second.path)
+            assert handler.get_artifact(second.name).path == second.path
+            handler.discard_artifact(second)
+            assert not os.path.exists(second.path)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Blob Store Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All blob store tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,150 @@
+"""
+Tests for per-generation deadlines and adaptive HTTP timeouts.
+
+    python test_deadline.py
+"""
+
+import asyncio
+import tempfile
+import threading
+import time
+
+from utils.deadline import Deadline, DeadlineExceeded, LatencyTracker, request_timeout
+from video_generator import VideoGenerator
+from test_webhooks import _Settings
+
+
+class Stream:
+    """Stands in for a streamed HTTP response."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+class StallingClient:
+    """Provider client that keeps polling until its deadline stops it."""
+
+    async def generate_video(self, prompt, duration, style, resolution,
+                             progress_callback=None, quality="final", cancel_token=None):
+        while True:
+            request_timeout(cancel_token, "stall", "poll", 10)
+            await cancel_token.sleep(0.05)
+
+
+def test_open_stream_is_closed_when_the_budget_runs_out():
+    deadline = Deadline(0.2)
+    stream = Stream()
+    started = time.monotonic()
+
+    try:
+        with deadline.closing(stream):
+            assert stream.closed.wait(2), "stream outlived its deadline"
+            raise IOError("read on closed socket")
+    except DeadlineExceeded as e:
+        assert "0.2s" in str(e)
+
+    assert 0.15 < time.monotonic() - started < 1
+    assert deadline.expired and deadline.cancelled
+
+
+def test_finished_streams_leave_the_deadline_alone():
+    deadline = Deadline(0.1)
+    fired = []
+    deadline.on_cancel(lambda: fired.append(True))
+
+    with deadline.closing(Stream()):
+        pass
+    time.sleep(0.3)
+
+    # Nothing was cancelled behind the caller's back; the next check expires it
+    assert not fired and not deadline.cancelled
+    try:
+        deadline.raise_if_cancelled()
+        assert False, "expired deadline passed its check"
+    except DeadlineExceeded:
+        pass
+    assert fired == [True]
+
+
+def test_streams_share_one_watcher_thread():
+    threads_before = threading.active_count()
+    streams = [Stream() for _ in range(50)]
+    deadlines = [Deadline(0.2 + n * 0.002) for n in range(50)]
+
+    def read(deadline, stream):
+        try:
+            with deadline.closing(stream):
+                stream.closed.wait(2)
+                deadline.raise_if_cancelled()
+        except DeadlineExceeded:
+            pass
+
+    readers = [threading.Thread(target=read, args=pair) for pair in zip(deadlines, streams)]
+    for reader in readers:
+        reader.start()
+    time.sleep(0.1)
+    # One thread per reader, plus at most the shared watcher
+    assert threading.active_count() <= threads_before + len(readers) + 1
+    for reader in readers:
+        reader.join()
+
+    assert all(stream.closed.is_set() for stream in streams)
+    assert all(deadline.expired for deadline in deadlines)
+
+
+def test_deadline_caps_timeouts_and_surfaces_as_timed_out():
+    deadline = Deadline(5)
+    assert request_timeout(deadline, "stall", "poll", 60) <= 5
+    assert request_timeout(deadline, "stall", "poll", 1) == 1
+
+    with tempfile.TemporaryDirectory() as directory, _Settings(RESULT_CACHE_ENABLED=False):
+        generator = VideoGenerator(session_id="test")
+        generator._client = StallingClient()
+        started = time.monotonic()
+
+        result = asyncio.run(generator.generate_video("a stalled request", 5, "Cinematic", cancel_token=Deadline(0.3)))
+
+    assert time.monotonic() - started < 2
+    assert not result.success and result.metadata == {"timed_out": True}
+    assert "Deadline of 0.3s exceeded" in result.error
+
+
+def test_adaptive_timeout_is_a_multiple_of_p95():
+    with _Settings(ADAPTIVE_TIMEOUT_MIN_SAMPLES=20, ADAPTIVE_TIMEOUT_PERCENTILE=95,
+                   ADAPTIVE_TIMEOUT_MULTIPLIER=3, MIN_REQUEST_TIMEOUT=5):
+        tracker = LatencyTracker(window=100)
+        for seconds in range(1, 20):
+            tracker.record("pika", "download", float(seconds))
+        # Not enough samples yet: the fixed default applies
+        assert tracker.timeout("pika", "download", 60) == 60
+
+        tracker.record("pika", "download", 20.0)
+        assert tracker.percentile("pika", "download", 95) == 19.0
+        assert tracker.timeout("pika", "download", 60) == 57.0
+
+        # Fast operations still get the minimum timeout
+        for _ in range(20):
+            tracker.record("pika", "poll", 0.1)
+        assert tracker.timeout("pika", "poll", 10) == 5
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Deadline Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All deadline tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,123 @@
+"""
+Tests for the locally rendered, cached fallback videos.
+
+    python test_fallback_video.py
+"""
+
+import os
+import tempfile
+
+import cv2
+
+from config import VideoProvider
+from utils.file_handler import FileHandler
+from test_faststart import _layout
+
+
+class _CountingHandler(FileHandler):
+    """FileHandler that counts (and can fail) demo renders."""
+
+    def __init__(self, fail=False):
+        super().__init__(storage_mode="flat")
+        self.renders = 0
+        self.fail = fail
+
+    def create_demo_video(self, *args, **kwargs):
+        self.renders += 1
+        return super().create_demo_video(*args, **kwargs)
+
+    def _create_gradient_frame(self, *args, **kwargs):
+        if self.fail:
+            raise RuntimeError("render failed")
+        return super()._create_gradient_frame(*args, **kwargs)
+
+
+class _Workspace:
+    """Temporary working directory, so output lands outside the tree."""
+
+    def __enter__(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+
+def test_fallback_is_rendered_once_and_reused():
+    with _Workspace():
+        handler = _CountingHandler()
+
+        first = handler.get_fallback_video("Cinematic", 1, "160x96", VideoProvider.STABILITY_AI)
+        second = handler.get_fallback_video("Cinematic", 1, "160x96", VideoProvider.STABILITY_AI)
+
+        assert first is not None and first == second
+        assert handler.renders == 1
+        # A fresh handler (another session) hits the same cache entry
+        other = _CountingHandler()
+        assert other.get_fallback_video("Cinematic", 1, "160x96", VideoProvider.STABILITY_AI) == first
+        assert other.renders == 0
+
+        capture = cv2.VideoCapture(first)
+        assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 24
+        assert (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))) == (160, 96)
+        capture.release()
+
+
+def test_each_style_duration_and_resolution_has_its_own_entry():
+    with _Workspace():
+        handler = _CountingHandler()
+
+        paths = {
+            handler.get_fallback_video(style, duration, resolution, VideoProvider.STABILITY_AI)
+            for style, duration, resolution in (
+                ("Cinematic", 1, "160x96"),
+                ("Fantasy", 1, "160x96"),
+                ("Cinematic", 2, "160x96"),
+                ("Cinematic", 1, "96x96")
+            )
+        }
+
+        assert len(paths) == 4 and None not in paths
+        assert handler.renders == 4
+
+
+def test_failed_render_leaves_nothing_behind():
+    with _Workspace():
+        handler = _CountingHandler(fail=True)
+
+        assert handler.create_demo_video("", 1, "Cinematic", VideoProvider.STABILITY_AI, "160x96") is None
+        assert os.listdir(handler.output_dir) == []
+        assert handler.get_fallback_video("Cinematic", 1, "160x96", VideoProvider.STABILITY_AI) is None
+        assert os.listdir(handler.fallback_dir) == []
+
+
+def test_cached_fallback_starts_fast():
+    with _Workspace():
+        path = _CountingHandler().get_fallback_video("Nature", 1, "160x96", VideoProvider.PIKA)
+
+        with open(path, "rb") as f:
+            kinds = _layout(f.read())
+        assert kinds.index(b"moov") < kinds.index(b"mdat")
+        assert [name for name in os.listdir(os.path.dirname(path)) if name.startswith(".")] == []
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Fallback Video Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All fallback video tests passed!" if not failed else f"❌ {failed} test(s) failed")
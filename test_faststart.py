@@ -0,0 +1,184 @@
+"""
+Tests for the fast-start MP4 remux.
+
+Most tests build minimal MP4 box structures by hand, so they need neither
+cv2 nor a real encoder.
+
+    python test_faststart.py
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+
+from config import Config, VideoProvider
+from utils.faststart import faststart
+from utils.file_handler import FileHandler
+
+
+def _box(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _offsets_box(kind, offsets):
+    code = "I" if kind == b"stco" else "Q"
+    return _box(kind, struct.pack(f">II{len(offsets)}{code}", 0, len(offsets), *offsets))
+
+
+def _mp4(chunks, table=b"stco", trailer=b""):
+    """ftyp, mdat holding chunks, then moov whose chunk table points at them."""
+    ftyp = _box(b"ftyp", b"isom\x00\x00\x02\x00isommp41")
+    mdat_start = len(ftyp) + 8
+    offsets, position = [], mdat_start
+    for chunk in chunks:
+        offsets.append(position)
+        position += len(chunk)
+    stbl = _box(b"stbl", _box(b"stsz", b"\x00" * 12) + _offsets_box(table, offsets))
+    trak = _box(b"trak", _box(b"tkhd", b"\x00" * 84) + _box(b"mdia", _box(b"minf", stbl)))
+    moov = _box(b"moov", _box(b"mvhd", b"\x00" * 100) + trak)
+    return ftyp + _box(b"mdat", b"".join(chunks)) + moov + trailer
+
+
+def _layout(data):
+    kinds, position = [], 0
+    while position < len(data):
+        size, kind = struct.unpack_from(">I4s", data, position)
+        kinds.append(kind)
+        position += size
+    return kinds
+
+
+def _chunk_offsets(data):
+    """Chunk offsets of the (single) stco/co64 table in data."""
+    for kind, code in ((b"stco", "I"), (b"co64", "Q")):
+        index = data.find(kind)
+        if index >= 0:
+            count = struct.unpack_from(">I", data, index + 8)[0]
+            return list(struct.unpack_from(f">{count}{code}", data, index + 12))
+
+
+def _write(directory, data, name="clip.mp4"):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_moov_moves_in_front_and_offsets_follow_their_chunks():
+    chunks = [b"frame-one" * 10, b"frame-two" * 7, b"frame-three" * 5]
+    for table in (b"stco", b"co64"):
+        with tempfile.TemporaryDirectory() as directory:
+            path = _write(directory, _mp4(chunks, table, trailer=_box(b"free", b"\x00" * 16)))
+
+            size, sha256 = faststart(path)
+
+            with open(path, "rb") as f:
+                data = f.read()
+            assert _layout(data) == [b"ftyp", b"moov", b"mdat", b"free"]
+            assert (size, sha256) == (len(data), hashlib.sha256(data).hexdigest())
+            for offset, chunk in zip(_chunk_offsets(data), chunks):
+                assert data[offset:offset + len(chunk)] == chunk
+
+
+def test_fast_start_and_foreign_files_are_left_alone():
+    with tempfile.TemporaryDirectory() as directory:
+        path = _write(directory, _mp4([b"data" * 50]))
+        assert faststart(path) is not None
+        with open(path, "rb") as f:
+            remuxed = f.read()
+
+        # Already fast start
+        assert faststart(path) is None
+        # Not an MP4 at all
+        other = _write(directory, b"\x89PNG\r\n\x1a\n" + b"\x00" * 64, "image.png")
+        assert faststart(other) is None
+
+        with open(path, "rb") as f:
+            assert f.read() == remuxed
+
+
+def test_cv2_video_still_decodes_after_remux():
+    import cv2
+    import numpy as np
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "render.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 24, (160, 96))
+        frames = [np.full((96, 160, 3), value, np.uint8) for value in range(0, 240, 10)]
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+
+        with open(path, "rb") as f:
+            original = f.read()
+        assert faststart(path) is not None
+
+        capture = cv2.VideoCapture(path)
+        decoded = []
+        ok, frame = capture.read()
+        while ok:
+            decoded.append(frame)
+            ok, frame = capture.read()
+        capture.release()
+
+        reference = cv2.VideoCapture(_write(directory, original, "original.mp4"))
+        for frame in decoded:
+            ok, expected = reference.read()
+            assert ok and np.array_equal(frame, expected)
+        reference.release()
+        assert len(decoded) == len(frames)
+
+
+def test_saved_videos_are_remuxed_in_every_storage_mode():
+    data = _mp4([b"chunk" * 100, b"more" * 50])
+    for mode in ("flat", "cas"):
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                artifact = FileHandler(storage_mode=mode).save_artifact([data], "a prompt", VideoProvider.STABILITY_AI)
+
+                with open(artifact.path, "rb") as f:
+                    saved = f.read()
+                assert _layout(saved)[:3] == [b"ftyp", b"moov", b"mdat"]
+                assert artifact.size == len(saved)
+                assert artifact.sha256 == hashlib.sha256(saved).hexdigest()
+            finally:
+                os.chdir(cwd)
+
+
+def test_faststart_can_be_disabled():
+    data = _mp4([b"chunk" * 100])
+    original = Config.FASTSTART
+    Config.FASTSTART = False
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                artifact = FileHandler(storage_mode="flat").save_artifact([data], "a prompt", VideoProvider.STABILITY_AI)
+                assert artifact.read_bytes() == data
+            finally:
+                os.chdir(cwd)
+    finally:
+        Config.FASTSTART = original
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Faststart Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All faststart tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,126 @@
+"""
+Tests for the atomic, non-blocking file I/O layer.
+
+    python test_file_io.py
+"""
+
+import asyncio
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+
+from utils.file_io import atomic_write, atomic_write_async, unique_filename
+
+
+def test_bytes_and_chunks_are_written_and_hashed():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "out.bin")
+
+        assert atomic_write(path, b"hello world") == (11, hashlib.sha256(b"hello world").hexdigest())
+        size, sha256 = atomic_write(path, iter([b"abc", b"", memoryview(b"def")]), fsync=True)
+
+        with open(path, "rb") as f:
+            assert f.read() == b"abcdef"
+        assert (size, sha256) == (6, hashlib.sha256(b"abcdef").hexdigest())
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+        assert os.listdir(directory) == ["out.bin"]
+
+
+def test_failed_write_keeps_the_previous_file():
+    def chunks():
+        yield b"partial"
+        raise IOError("connection reset")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "out.bin")
+        atomic_write(path, b"complete")
+
+        try:
+            atomic_write(path, chunks())
+            assert False, "error was swallowed"
+        except IOError:
+            pass
+
+        with open(path, "rb") as f:
+            assert f.read() == b"complete"
+        assert os.listdir(directory) == ["out.bin"]
+
+
+def test_concurrent_writers_never_expose_partial_files():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "shared.bin")
+        payloads = [bytes([n]) * 200_000 for n in range(8)]
+        seen = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        seen.append(f.read())
+
+        watcher = threading.Thread(target=reader)
+        watcher.start()
+        writers = [threading.Thread(target=atomic_write, args=(path, payload)) for payload in payloads]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        done.set()
+        watcher.join()
+
+        assert all(data in payloads for data in seen)
+        with open(path, "rb") as f:
+            assert f.read() in payloads
+        assert os.listdir(directory) == ["shared.bin"]
+
+
+def test_async_write_runs_off_the_event_loop():
+    with tempfile.TemporaryDirectory() as directory:
+        async def write_all():
+            return await asyncio.gather(*(
+                atomic_write_async(os.path.join(directory, f"{n}.bin"), bytes([n]) * 1000) for n in range(10)
+            ))
+
+        results = asyncio.run(write_all())
+
+        assert [size for size, _ in results] == [1000] * 10
+        assert len(os.listdir(directory)) == 10
+
+
+def test_unique_filenames_never_collide():
+    names = [unique_filename("stability_ai_same_prompt", ".mp4") for _ in range(2000)]
+    threaded = []
+    threads = [
+        threading.Thread(target=lambda: threaded.extend(unique_filename("same", ".mp4") for _ in range(500)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(names)) == len(names)
+    assert len(set(threaded)) == len(threaded) == 2000
+    assert all("_stability_ai_same_prompt_" in name and name.endswith(".mp4") for name in names)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 File I/O Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All file I/O tests passed!" if not failed else f"❌ {failed} test(s) failed")
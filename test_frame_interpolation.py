@@ -0,0 +1,98 @@
+"""
+Tests for temporal frame interpolation.
+
+    python test_frame_interpolation.py
+"""
+
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from utils.frame_interpolation import FrameInterpolator
+
+DISC_RADIUS = 60
+
+
+def _frame(x, height=288, width=512):
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur((rng.random((height, width, 3)) * 60 + 40).astype(np.uint8), (0, 0), 3)
+    cv2.circle(frame, (x, height // 2), DISC_RADIUS, (0, 200, 255), -1)
+    return frame
+
+
+def _bright_width(frame):
+    return int((frame[frame.shape[0] // 2, :, 2] > 200).sum())
+
+
+def test_blend_hits_target_count_and_keeps_endpoints():
+    source = [np.full((4, 4, 3), value, np.uint8) for value in (0, 60, 120, 180, 240)]
+
+    frames = list(FrameInterpolator("blend", batch=3).interpolate(iter(source), 5, 13))
+
+    assert len(frames) == 13
+    # Positions step by a third of a source frame
+    assert [int(frame[0, 0, 0]) for frame in frames] == [round(20 * index) for index in range(13)]
+
+
+def test_source_is_streamed():
+    consumed = []
+
+    def source():
+        for index in range(10):
+            consumed.append(index)
+            yield np.full((4, 4, 3), index, np.uint8)
+
+    frames = FrameInterpolator("blend").interpolate(source(), 10, 40)
+    next(frames)
+    assert len(consumed) == 2
+    assert len(list(frames)) == 39
+
+
+def test_motion_moves_content_instead_of_ghosting():
+    first, second = _frame(200), _frame(224)
+
+    blended = list(FrameInterpolator("blend").interpolate(iter([first, second]), 2, 3))[1]
+    warped = list(FrameInterpolator("motion", block=8, search=8).interpolate(iter([first, second]), 2, 3))[1]
+
+    # Half way, a blend only keeps the overlap of the two discs at full
+    # brightness; motion compensation shows the whole disc
+    assert _bright_width(blended) < 2 * DISC_RADIUS - 20
+    assert _bright_width(warped) > 2 * DISC_RADIUS - 12
+
+
+def test_retime_stretches_clip_to_duration():
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "short.mp4")
+        writer = cv2.VideoWriter(source, cv2.VideoWriter_fourcc(*'mp4v'), 12, (512, 288))
+        for index in range(12):
+            writer.write(_frame(100 + 10 * index))
+        writer.release()
+
+        output = FrameInterpolator().retime(source, os.path.join(directory, "long.mp4"), duration=3, fps=24)
+
+        assert output is not None
+        capture = cv2.VideoCapture(output)
+        assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 72
+        assert capture.get(cv2.CAP_PROP_FPS) == 24
+        capture.release()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Frame Interpolation Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All frame interpolation tests passed!" if not failed else f"❌ {failed} test(s) failed")
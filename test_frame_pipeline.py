@@ -0,0 +1,129 @@
+"""
+Tests for the threaded render -> overlay -> encode frame pipeline.
+
+    python test_frame_pipeline.py
+"""
+
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+from config import VideoProvider
+from utils.file_handler import FileHandler
+from utils.frame_pipeline import FramePool, encode_frames
+
+
+def _frame_count(path):
+    capture = cv2.VideoCapture(path)
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    return count
+
+
+def test_frames_keep_their_order_through_every_stage():
+    pool = FramePool((64, 64, 3), count=3)
+    threads = set()
+
+    def render():
+        for index in range(40):
+            frame = pool.acquire()
+            frame[:] = 0
+            threads.add(("render", threading.current_thread().name))
+            yield frame
+
+    def overlay(index, frame):
+        threads.add(("overlay", threading.current_thread().name))
+        frame[:] = index * 6
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ordered.mp4")
+        written = encode_frames(path, 24, (64, 64), render(), overlay, pool, queue_size=1)
+
+        assert written == 40
+        capture = cv2.VideoCapture(path)
+        values = []
+        ok, frame = capture.read()
+        while ok:
+            values.append(int(frame.mean()))
+            ok, frame = capture.read()
+        capture.release()
+
+    assert len(values) == 40
+    assert values == sorted(set(values))
+    assert all(abs(value - index * 6) <= 5 for index, value in enumerate(values))
+    # Three buffers were enough for 40 frames, and stages ran off this thread
+    assert {name for stage, name in threads} == {"frame-render", "frame-overlay"}
+
+
+def test_generator_error_is_raised_without_hanging():
+    pool = FramePool((32, 32, 3), count=2)
+
+    def render():
+        for index in range(10):
+            if index == 5:
+                raise ValueError("render failed")
+            yield pool.acquire()
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            encode_frames(os.path.join(directory, "broken.mp4"), 24, (32, 32), render(), pool=pool, queue_size=1)
+        except ValueError as e:
+            assert str(e) == "render failed"
+        else:
+            raise AssertionError("ValueError not raised")
+
+
+def test_overlay_error_stops_pipeline():
+    pool = FramePool((32, 32, 3), count=2)
+
+    def render():
+        while True:
+            yield pool.acquire()
+
+    def overlay(index, frame):
+        if index == 3:
+            raise RuntimeError("overlay failed")
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            encode_frames(os.path.join(directory, "broken.mp4"), 24, (32, 32), render(), overlay, pool, queue_size=1)
+        except RuntimeError as e:
+            assert str(e) == "overlay failed"
+        else:
+            raise AssertionError("RuntimeError not raised")
+
+
+def test_demo_video_renders_every_frame():
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            path = FileHandler().create_demo_video(
+                "a lighthouse", 2, "Sci-Fi", VideoProvider.STABILITY_AI, "320x180",
+                os.path.join(directory, "demo.mp4")
+            )
+            assert _frame_count(path) == 48
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Frame Pipeline Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All frame pipeline tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,105 @@
+"""
+Cold-start check for the Streamlit app.
+
+Imports ``app`` in a fresh interpreter with ``python -X importtime`` and fails
+if the cumulative import time exceeds the budget, or if modules that are meant
+to be loaded lazily were imported eagerly.
+
+Run directly to print an import-time profile of the slowest modules:
+
+    python test_import_time.py
+"""
+
+import os
+import subprocess
+import sys
+
+# Seconds allowed for `import app` in a fresh interpreter (Streamlit included)
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", 3.0))
+
+# Modules that must not be imported until a video is actually generated
+LAZY_MODULES = [
+    "cv2",
+    "utils.file_handler",
+    "api_clients.stability_ai_client",
+    "api_clients.runway_client",
+    "api_clients.pika_client",
+    "api_clients.stable_video_client",
+]
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_imports(module: str = "app"):
+    """
+    Import a module in a fresh interpreter and collect its import-time profile.
+
+    Args:
+        module: Name of the module to import
+
+    Returns:
+        Tuple of (cumulative seconds for the module, list of
+        (cumulative_us, self_us, module_name) sorted slowest first,
+        list of lazy modules that ended up loaded)
+    """
+    code = (
+        f"import {module}, sys; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    entries = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+        if name.strip() == module and not name[1:].startswith(" "):
+            total_us = int(cumulative_us)
+
+    entries.sort(reverse=True)
+    eager = [m for m in result.stdout.strip().split(",") if m]
+    return total_us / 1_000_000, entries, eager
+
+
+def test_import_app_within_budget():
+    """`import app` must finish within IMPORT_TIME_BUDGET seconds"""
+    total, _, _ = profile_imports("app")
+    assert total <= IMPORT_TIME_BUDGET, (
+        f"import app took {total:.2f}s (budget {IMPORT_TIME_BUDGET:.2f}s); "
+        f"run `python test_import_time.py` for a profile"
+    )
+
+
+def test_heavy_modules_are_lazy():
+    """cv2 and the provider clients must not be loaded by `import app`"""
+    _, _, eager = profile_imports("app")
+    assert not eager, f"Modules imported eagerly by app: {', '.join(eager)}"
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("⏱️  Import-time profile for `import app`")
+    print("=" * 50)
+
+    total, entries, eager = profile_imports("app")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative_us, self_us, name in entries[:20]:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms {name}")
+
+    print()
+    print(f"Total: {total:.2f}s (budget {IMPORT_TIME_BUDGET:.2f}s)")
+    if eager:
+        print(f"❌ Eagerly imported: {', '.join(eager)}")
+    elif total <= IMPORT_TIME_BUDGET:
+        print("✅ Within cold-start budget")
+    else:
+        print("❌ Over cold-start budget")
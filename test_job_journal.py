@@ -0,0 +1,135 @@
+"""
+Tests for the job journal: resuming remote generations after a restart.
+
+A "previous process" is simulated by journaling a job under an owner whose
+PID no longer exists; the MockProvider from test_webhooks renders it.
+
+    python test_job_journal.py
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+
+from api_clients.runway_client import RunwayClient, PROVIDER
+from utils import job_journal
+from utils.job_journal import JobJournal
+from test_webhooks import MockProvider, VIDEO_BYTES, _Settings
+
+PARAMS = {
+    "prompt": "a lighthouse in a storm",
+    "duration": 5,
+    "style": "Cinematic",
+    "quality": "high",
+    "aspect_ratio": "16:9"
+}
+
+
+def _dead_pid():
+    pid = 999999
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return pid
+        except PermissionError:
+            pass
+        pid -= 1
+
+
+class _Workspace:
+    """Temporary working directory with its own journal."""
+
+    def __enter__(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.journal = JobJournal(os.path.join(self.tmp.name, "journal.sqlite"))
+        job_journal._journal = self.journal
+        return self
+
+    def __exit__(self, *exc_info):
+        job_journal._journal = None
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def previous_process(self):
+        """A journal handle owned by a process that has exited."""
+        journal = JobJournal(self.journal.path)
+        journal.owner = f"{socket.gethostname()}:{_dead_pid()}:previous"
+        return journal
+
+
+def _client(provider):
+    client = RunwayClient("test-key")
+    client.base_url = provider.url
+    return client
+
+
+def test_orphaned_job_is_resumed_and_reused():
+    provider = MockProvider(render_seconds=0.3, send_webhooks=False)
+    try:
+        with _Workspace() as workspace, _Settings(STATUS_POLL_INTERVAL=0.2):
+            generation_id = provider.submit(dict(PARAMS))["id"]
+            workspace.previous_process().record(PROVIDER, generation_id, PARAMS)
+
+            recovered = asyncio.run(_client(provider).resume_interrupted())
+            assert len(recovered) == 1
+            assert recovered[0].read_bytes() == VIDEO_BYTES
+
+            # The next identical request is served without submitting again
+            video = asyncio.run(_client(provider).generate_video("a lighthouse in a storm", 5, "Cinematic"))
+            assert video == VIDEO_BYTES
+            assert len(provider.jobs) == 1
+
+            # ...and only once
+            assert workspace.journal.take_completed(PROVIDER, PARAMS) is None
+    finally:
+        provider.stop()
+
+
+def test_live_owner_keeps_its_jobs():
+    with _Workspace() as workspace:
+        other = JobJournal(workspace.journal.path)
+        other.owner = f"{socket.gethostname()}:{os.getppid()}:live"
+        other.record(PROVIDER, "job-live", PARAMS)
+        workspace.previous_process().record(PROVIDER, "job-orphan", PARAMS)
+
+        claimed = workspace.journal.claim_orphans(PROVIDER)
+        assert [generation_id for generation_id, _ in claimed] == ["job-orphan"]
+        assert claimed[0][1] == PARAMS
+        # Claimed jobs now belong to us
+        assert workspace.journal.claim_orphans(PROVIDER) == []
+
+
+def test_finished_jobs_leave_the_journal():
+    provider = MockProvider(render_seconds=0.2, send_webhooks=False)
+    try:
+        with _Workspace() as workspace, _Settings(STATUS_POLL_INTERVAL=0.2):
+            video = asyncio.run(_client(provider).generate_video("a quiet harbour", 5, "Cinematic"))
+            assert video == VIDEO_BYTES
+
+            with workspace.journal._connect() as conn:
+                assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+    finally:
+        provider.stop()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Job Journal Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All job journal tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,143 @@
+"""
+Tests for the Stability AI key pool: cancellation while waiting, credit
+accounting and the shared credit refresher.
+
+    python test_key_pool.py
+"""
+
+import functools
+import gc
+import threading
+import time
+import weakref
+
+from api_clients.key_pool import KeyPool
+from utils.cancellation import CancellationToken, GenerationCancelled
+from test_webhooks import _Settings
+
+
+def _pool(keys, **options):
+    pool = KeyPool(keys, **options)
+    # These keys do not exist; skip the background credit refresh
+    pool._refreshed = True
+    return pool
+
+
+def test_cancel_wakes_a_waiting_acquire():
+    pool = _pool(["sk-only-key-0001"], rate=0.1, burst=1)
+    pool.acquire()
+    token = CancellationToken()
+    outcome = []
+
+    def waiter():
+        started = time.monotonic()
+        try:
+            pool.acquire(timeout=30, cancel_token=token)
+            outcome.append("acquired")
+        except GenerationCancelled:
+            outcome.append(time.monotonic() - started)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    token.cancel()
+    thread.join(2)
+
+    assert not thread.is_alive()
+    assert outcome and outcome[0] != "acquired" and outcome[0] < 1
+    # The waiter took nothing from the pool
+    assert pool.stats()[0]["requests"] == 1
+
+
+def test_cancelled_token_fails_fast():
+    pool = _pool(["sk-only-key-0001"])
+    token = CancellationToken()
+    token.cancel()
+
+    try:
+        pool.acquire(cancel_token=token)
+        assert False, "acquired with a cancelled token"
+    except GenerationCancelled:
+        pass
+    assert pool.stats()[0]["requests"] == 0
+
+
+def test_successful_requests_spend_credits():
+    pool = _pool(["sk-first-key-0001", "sk-second-key-0002"], credits_per_request=1, min_credits=1)
+    first, second = pool._keys
+    first.credits, second.credits = 10.0, 9.5
+
+    key = pool.acquire()
+    assert key is first
+    pool.release(key, 200)
+    assert first.credits == 9.0
+
+    # The second key now has the most credits left
+    key = pool.acquire()
+    assert key is second
+    pool.release(key, 200)
+    assert second.credits == 8.5
+
+    # Failed requests are not charged
+    key = pool.acquire()
+    assert key is first
+    pool.release(key, 500)
+    assert first.credits == 9.0
+
+
+def test_key_is_evicted_when_local_balance_runs_out():
+    pool = _pool(["sk-only-key-0001"], credits_per_request=1, min_credits=1)
+    pool._keys[0].credits = 1.5
+
+    pool.release(pool.acquire(), 200)
+
+    assert pool.stats()[0]["evicted"] == "out of credits"
+    assert not pool.has_usable_key()
+
+
+def _refresher_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "key-pool-refresh"]
+
+
+def test_pools_share_one_refresher_and_can_be_collected():
+    refreshed = []
+    with _Settings(CREDIT_REFRESH_SECONDS=0.05):
+        pools = [KeyPool([f"sk-pool-key-{n:04d}"]) for n in range(5)]
+        for n, pool in enumerate(pools):
+            # No account API here; record the refresh instead
+            pool.refresh_all = functools.partial(refreshed.append, n)
+            pool._start_refresher()
+        time.sleep(0.2)
+
+        assert set(refreshed) == set(range(5))
+        assert len(_refresher_threads()) == 1
+
+        collected = weakref.ref(pools[0])
+        del pool, pools
+        give_up = time.monotonic() + 2
+        while (collected() is not None or _refresher_threads()) and time.monotonic() < give_up:
+            gc.collect()
+            time.sleep(0.05)
+
+    # Dropped pools are not kept alive, and the refresher stops with them
+    assert collected() is None
+    assert not _refresher_threads()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Key Pool Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All key pool tests passed!" if not failed else f"❌ {failed} test(s) failed")
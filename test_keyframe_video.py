@@ -0,0 +1,92 @@
+"""
+Tests for keyframe animation (keyframe motion mode).
+
+Keyframes are synthetic: a bright disc on a textured background that moves
+between keyframes, so a morph can be told apart from a dissolve.
+
+    python test_keyframe_video.py
+"""
+
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from utils.keyframe_video import KeyframeAnimator
+
+DISC_RADIUS = 76
+
+
+def _keyframes(directory, offsets):
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur((rng.random((576, 1024, 3)) * 60 + 40).astype(np.uint8), (0, 0), 3)
+    paths = []
+    for index, offset in enumerate(offsets):
+        image = background.copy()
+        cv2.circle(image, (380 + offset, 288), DISC_RADIUS, (0, 200, 255), -1)
+        path = os.path.join(directory, f"keyframe_{index}.png")
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def _bright_width(frame):
+    """Width of the fully bright part of the disc along the middle row."""
+    return int((frame[288, :, 2] > 200).sum())
+
+
+def test_render_writes_every_frame():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = _keyframes(directory, [0, 40, 80, 120])
+        output = KeyframeAnimator("1024x576", fps=24).render(paths, 5, os.path.join(directory, "out.mp4"))
+
+        assert output is not None
+        capture = cv2.VideoCapture(output)
+        assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 5 * 24
+        capture.release()
+
+
+def test_morph_moves_content_instead_of_fading_it():
+    with tempfile.TemporaryDirectory() as directory:
+        animator = KeyframeAnimator("1024x576")
+        first, second = (animator._load(path) for path in _keyframes(directory, [0, 60]))
+
+        dissolved = next(animator._dissolve(first, second, [0.5]))
+        morphed = next(animator._morph(first, second, [0.5]))
+
+        # Half way, a dissolve only keeps the overlap of the two discs at full
+        # brightness; a morph shows the whole disc half way along its path
+        assert _bright_width(dissolved) < 2 * DISC_RADIUS - 40
+        assert _bright_width(morphed) > 2 * DISC_RADIUS - 20
+
+
+def test_dissolve_batches_match_per_frame_blend():
+    animator = KeyframeAnimator("64x36")
+    first = np.zeros((36, 64, 3), np.uint8)
+    second = np.full((36, 64, 3), 200, np.uint8)
+    weights = [step / 10 for step in range(1, 11)]
+
+    frames = list(animator._dissolve(first, second, weights))
+
+    assert len(frames) == len(weights)
+    assert [int(frame[0, 0, 0]) for frame in frames] == [round(200 * weight) for weight in weights]
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Keyframe Animation Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All keyframe animation tests passed!" if not failed else f"❌ {failed} test(s) failed")
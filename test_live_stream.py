@@ -0,0 +1,155 @@
+"""
+Tests for live fragmented-MP4 / HLS output.
+
+    python test_live_stream.py
+"""
+
+import os
+import struct
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from config import Config, VideoProvider
+from utils.file_handler import FileHandler
+from utils.live_stream import HLSWriter
+from test_webhooks import _Settings
+
+
+def _frames(count, size=(160, 96)):
+    return [np.full((size[1], size[0], 3), (index * 4) % 256, np.uint8) for index in range(count)]
+
+
+def _decode(path):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    ok, frame = capture.read()
+    while ok:
+        frames.append(frame)
+        ok, frame = capture.read()
+    capture.release()
+    return frames
+
+
+def _tfdt_times(data):
+    times, position = [], data.find(b"tfdt")
+    while position >= 0:
+        times.append(struct.unpack_from(">Q", data, position + 8)[0])
+        position = data.find(b"tfdt", position + 4)
+    return times
+
+
+def test_playlist_grows_while_rendering():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = HLSWriter(directory, 24, (160, 96), segment_seconds=1)
+        frames = _frames(60)
+
+        for frame in frames[:24]:
+            writer.write(frame)
+        with open(writer.playlist_path) as f:
+            playlist = f.read()
+        assert "segment_00000.m4s" in playlist and "#EXT-X-ENDLIST" not in playlist
+        assert '#EXT-X-MAP:URI="init.mp4"' in playlist
+
+        for frame in frames[24:]:
+            writer.write(frame)
+        writer.release()
+        with open(writer.playlist_path) as f:
+            playlist = f.read()
+        assert playlist.count("#EXTINF:") == 3 and playlist.rstrip().endswith("#EXT-X-ENDLIST")
+        assert "#EXTINF:0.500000," in playlist
+
+
+def test_stream_decodes_every_frame_in_order():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = HLSWriter(directory, 24, (160, 96), segment_seconds=0.5)
+        frames = _frames(50)
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+
+        decoded = _decode(writer.stream_path)
+        assert len(decoded) == len(frames)
+        means = [int(frame.mean()) for frame in decoded]
+        assert means == sorted(set(means))
+        assert all(abs(got - int(sent.mean())) <= 5 for got, sent in zip(means, frames))
+
+        with open(writer.stream_path, "rb") as f:
+            data = f.read()
+        with open(os.path.join(directory, "init.mp4"), "rb") as f:
+            assert data.startswith(f.read())
+        # Fragments continue each other's decode timeline (512 ticks per frame)
+        assert _tfdt_times(data) == [index * 12 * 512 for index in range(5)]
+
+
+def test_live_demo_video():
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            file_handler = FileHandler()
+            live_dir = file_handler.new_live_dir()
+            path = file_handler.create_demo_video(
+                "a lighthouse", 2, "Cinematic", VideoProvider.STABILITY_AI, "320x180", live_dir=live_dir
+            )
+
+            assert path == os.path.join(live_dir, "stream.mp4")
+            assert len(_decode(path)) == 48
+            assert len(_decode(os.path.join(live_dir, "playlist.m3u8"))) == 48
+        finally:
+            os.chdir(cwd)
+
+
+def test_uncached_fallback_streams_then_fills_the_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            file_handler = FileHandler()
+            args = ("Cinematic", 4, "320x180", VideoProvider.STABILITY_AI)
+            cached = file_handler.fallback_path(*args[:3])
+
+            live_dir = file_handler.get_live_fallback(*args)
+            # Playable before the render is done
+            with open(os.path.join(live_dir, "playlist.m3u8")) as f:
+                assert "segment_00000.m4s" in f.read()
+            # A second request joins the same render (or finds it cached)
+            assert file_handler.get_live_fallback(*args) in (live_dir, None)
+
+            give_up = time.monotonic() + 30
+            while not os.path.exists(cached) and time.monotonic() < give_up:
+                time.sleep(0.05)
+
+            assert len(_decode(cached)) == 96
+            assert os.listdir(Config.LIVE_OUTPUT_DIR) == [os.path.basename(live_dir)]
+            assert file_handler.get_live_fallback(*args) is None
+            assert file_handler.get_fallback_video(*args) == cached
+
+            # Expired live directories go when the next one is made
+            with _Settings(LIVE_RETENTION_SECONDS=0):
+                time.sleep(0.05)
+                fresh = file_handler.new_live_dir()
+            assert os.listdir(Config.LIVE_OUTPUT_DIR) == [os.path.basename(fresh)]
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Live Stream Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All live stream tests passed!" if not failed else f"❌ {failed} test(s) failed")
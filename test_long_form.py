@@ -0,0 +1,142 @@
+"""
+Tests for long-form generation: segment planning, parallel segments and stitching.
+
+SegmentClient stands in for StabilityAIClient and renders each segment as a
+short solid-colour clip, so the whole pipeline runs without network access.
+
+    python test_long_form.py
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+from config import Config
+from utils.artifacts import GenerationResult, MediaArtifact
+from video_generator import VideoGenerator
+
+PROMPT = "a slow journey along a rocky coastline"
+
+
+class SegmentClient:
+    """Renders one short clip per segment; tracks concurrency and can fail a segment."""
+
+    def __init__(self, directory, fail_scene=None):
+        self.directory = directory
+        self.fail_scene = fail_scene
+        self.paths = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    async def generate_video(self, prompt, duration, style, resolution,
+                             progress_callback=None, quality="final", cancel_token=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.05)
+            scene = int(prompt.rsplit("scene ", 1)[1].split()[0])
+            if scene == self.fail_scene:
+                return GenerationResult.failure("provider error")
+            path = os.path.join(self.directory, f"scene_{scene}.mp4")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 24, (160, 96))
+            for _ in range(24):
+                writer.write(np.full((96, 160, 3), scene * 60, np.uint8))
+            writer.release()
+            self.paths.append(path)
+            return GenerationResult(success=True, artifact=MediaArtifact.from_file(path, "video/mp4"))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class _Workspace:
+    """Temporary working directory, so stitched output lands outside the tree."""
+
+    def __enter__(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        return self.tmp.name
+
+    def __exit__(self, *exc_info):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+
+def _generator(client):
+    generator = VideoGenerator(session_id="test")
+    generator._client = client
+    return generator
+
+
+def test_durations_split_into_near_equal_segments():
+    generator = VideoGenerator()
+    original = Config.SEGMENT_DURATION
+    Config.SEGMENT_DURATION = 5
+    try:
+        assert generator._plan_segments(5) == [5]
+        assert generator._plan_segments(10) == [5, 5]
+        assert generator._plan_segments(23) == [5, 5, 5, 4, 4]
+        assert generator._plan_segments(60) == [5] * 12
+    finally:
+        Config.SEGMENT_DURATION = original
+
+
+def test_segments_run_concurrently_and_stitch_into_one_video():
+    with _Workspace() as directory:
+        client = SegmentClient(directory)
+
+        result = asyncio.run(_generator(client).generate_long_video(PROMPT, 15, "Cinematic", "1024x576"))
+
+        assert result.success, result.error
+        assert result.metadata["segments"] == 3 and result.metadata["long_form"]
+        assert client.peak == 3
+        capture = cv2.VideoCapture(result.artifact.path)
+        assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 15 * 24
+        assert int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) == 1024
+        # Scenes appear in order: dark, then brighter
+        means = []
+        for index in range(15 * 24):
+            ok, frame = capture.read()
+            if index in (60, 180, 300):
+                means.append(frame.mean())
+        capture.release()
+        assert means[0] < means[1] < means[2]
+        # Intermediate segment files are gone
+        assert not any(os.path.exists(path) for path in client.paths)
+
+
+def test_failed_segment_discards_its_siblings():
+    with _Workspace() as directory:
+        client = SegmentClient(directory, fail_scene=2)
+
+        result = asyncio.run(_generator(client).generate_long_video(PROMPT, 15, "Cinematic", "1024x576"))
+
+        assert not result.success and "Segments 2 failed" in result.error
+        assert len(client.paths) == 2
+        assert not any(os.path.exists(path) for path in client.paths)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Long-Form Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All long-form tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,374 @@
+"""
+Tests for the Pika client: cancelling a generation while it is being polled,
+retrying status checks that fail for a moment, and stretching short clips to
+the requested duration (only mp4v clips without audio, which retiming can
+re-encode without losing anything).
+
+PikaProvider is a local HTTP server speaking the subset of the Pika API the
+client uses (submit, status, download, delete). Without a video its jobs stay
+"processing", so a cancel always lands mid-poll; with one they complete at
+once and serve it.
+
+    python test_pika.py
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from api_clients.pika_client import PikaClient, PROVIDER
+from utils import job_journal
+from utils.admission import get_admission_controller
+from utils.artifacts import GenerationResult, write_artifact
+from utils.cancellation import CancellationToken, GenerationCancelled
+from utils.deadline import Deadline
+from utils.faststart import track_formats
+from utils.job_journal import JobJournal
+from video_generator import VideoGenerator
+from test_size_target import _with_track
+from test_webhooks import VIDEO_BYTES, _Settings
+
+PROMPT = "a paper boat drifting down a gutter"
+
+
+class PikaProvider:
+    """
+    Local stand-in for the Pika API; jobs finish at once only if it has a video.
+
+    Status checks are answered with the codes in status_errors first, one each.
+    """
+
+    def __init__(self, video=None):
+        self.video = video
+        self.status_errors = []
+        self.jobs = {}
+        self.deleted = []
+        self.status_calls = 0
+        self._ids = itertools.count(1)
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                job_id = f"pika-{next(provider._ids)}"
+                provider.jobs[job_id] = "completed" if provider.video else "processing"
+                self._reply(200, {"id": job_id})
+
+            def do_GET(self):
+                job_id = self.path.rsplit("/", 1)[1]
+                if job_id.endswith(".mp4"):
+                    self.send_response(200)
+                    video = provider.video or VIDEO_BYTES
+                    self.send_header("Content-Length", str(len(video)))
+                    self.end_headers()
+                    self.wfile.write(video)
+                    return
+                provider.status_calls += 1
+                if provider.status_errors:
+                    self._reply(provider.status_errors.pop(0), {"error": "status unavailable"})
+                    return
+                payload = {"id": job_id, "status": provider.jobs[job_id]}
+                if payload["status"] == "completed":
+                    payload["video_url"] = f"{provider.url}/files/{job_id}.mp4"
+                self._reply(200, payload)
+
+            def do_DELETE(self):
+                job_id = self.path.rsplit("/", 1)[1]
+                provider.deleted.append(job_id)
+                provider.jobs[job_id] = "cancelled"
+                self._reply(200, {"id": job_id})
+
+            def _reply(self, code, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Workspace:
+    """Temporary working directory with its own journal and a running provider."""
+
+    def __init__(self, video=None):
+        self.video = video
+
+    def __enter__(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.journal = JobJournal(os.path.join(self.tmp.name, "journal.sqlite"))
+        job_journal._journal = self.journal
+        self.provider = PikaProvider(self.video)
+        self.settings = _Settings(STATUS_POLL_INTERVAL=0.05)
+        self.settings.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.settings.__exit__(*exc_info)
+        self.provider.stop()
+        job_journal._journal = None
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def client(self):
+        return SpyPikaClient(self.provider.url)
+
+    def journaled(self):
+        with self.journal._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+class SpyPikaClient(PikaClient):
+    """PikaClient against the local provider, recording remote cancels."""
+
+    def __init__(self, base_url):
+        super().__init__("test-key")
+        self.base_url = base_url
+        self.cancelled_remote = []
+        self.forgotten = []
+        self.polling = threading.Event()
+
+    async def _poll_generation_status(self, generation_id, *args, **kwargs):
+        self.polling.set()
+        return await super()._poll_generation_status(generation_id, *args, **kwargs)
+
+    def _cancel_remote(self, generation_id):
+        self.cancelled_remote.append(generation_id)
+        super()._cancel_remote(generation_id)
+
+
+class PikaBackedClient:
+    """Stands in for StabilityAIClient, rendering every request through Pika."""
+
+    def __init__(self, pika, directory):
+        self.pika = pika
+        self.directory = directory
+
+    async def generate_video(self, prompt, duration, style, resolution,
+                             progress_callback=None, quality="final", cancel_token=None):
+        video = await self.pika.generate_video(prompt, duration, style, cancel_token=cancel_token)
+        if video is None:
+            return GenerationResult.failure("Pika generation failed")
+        artifact = write_artifact([video], os.path.join(self.directory, "pika.mp4"), "video/mp4")
+        return GenerationResult(success=True, artifact=artifact)
+
+
+def _one_second_clip(path):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 24, (160, 96))
+    for index in range(24):
+        writer.write(np.full((96, 160, 3), 40 + 8 * index, np.uint8))
+    writer.release()
+    return path
+
+
+def _frame_count(video):
+    path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}.mp4")
+    with open(path, "wb") as f:
+        f.write(video)
+    try:
+        capture = cv2.VideoCapture(path)
+        count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+        return count
+    finally:
+        os.remove(path)
+
+
+def _tracks(video):
+    path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}.mp4")
+    with open(path, "wb") as f:
+        f.write(video)
+    try:
+        return track_formats(path)
+    finally:
+        os.remove(path)
+
+
+def _watch_forget(workspace, client):
+    """Record journal.forget calls made for the client."""
+    forget = workspace.journal.forget
+
+    def recording(provider, generation_id):
+        client.forgotten.append((provider, generation_id))
+        return forget(provider, generation_id)
+
+    workspace.journal.forget = recording
+
+
+def _cancel_when_polling(client, token):
+    def cancel():
+        if client.polling.wait(5):
+            # Let a few status checks go by first
+            threading.Event().wait(0.2)
+        token.cancel()
+
+    thread = threading.Thread(target=cancel)
+    thread.start()
+    return thread
+
+
+def test_cancel_mid_poll_stops_the_remote_job():
+    with _Workspace() as workspace:
+        client = workspace.client()
+        _watch_forget(workspace, client)
+        token = CancellationToken()
+        canceller = _cancel_when_polling(client, token)
+
+        try:
+            asyncio.run(client.generate_video(PROMPT, 5, "Cinematic", cancel_token=token))
+            assert False, "cancellation was swallowed"
+        except GenerationCancelled:
+            pass
+        canceller.join()
+
+        assert workspace.provider.status_calls > 0
+        assert client.cancelled_remote == ["pika-1"]
+        assert workspace.provider.deleted == ["pika-1"]
+        assert client.forgotten == [(PROVIDER, "pika-1")]
+        assert workspace.journaled() == 0
+        assert client._status_poller().stats()["outstanding"] == 0
+
+
+def test_cancellation_reaches_the_video_generator():
+    with _Workspace() as workspace:
+        pika = workspace.client()
+        generator = VideoGenerator(session_id="test")
+        generator._client = PikaBackedClient(pika, workspace.tmp.name)
+        token = CancellationToken()
+        canceller = _cancel_when_polling(pika, token)
+
+        result = asyncio.run(generator.generate_video(PROMPT, 5, "Cinematic", cancel_token=token))
+        canceller.join()
+
+        assert not result.success and result.metadata == {"cancelled": True}
+        assert pika.cancelled_remote == ["pika-1"]
+        assert workspace.journaled() == 0
+        assert get_admission_controller().stats()["in_flight"] == 0
+
+
+def test_expired_deadline_cancels_the_remote_job():
+    with _Workspace() as workspace:
+        pika = workspace.client()
+        generator = VideoGenerator(session_id="test")
+        generator._client = PikaBackedClient(pika, workspace.tmp.name)
+
+        result = asyncio.run(generator.generate_video(PROMPT, 5, "Cinematic", cancel_token=Deadline(0.5)))
+
+        assert not result.success and result.metadata == {"timed_out": True}
+        assert pika.cancelled_remote == ["pika-1"]
+        assert workspace.journaled() == 0
+
+
+def test_short_clip_is_stretched_to_the_requested_duration():
+    with tempfile.TemporaryDirectory() as directory:
+        with open(_one_second_clip(os.path.join(directory, "clip.mp4")), "rb") as f:
+            clip = f.read()
+
+    with _Workspace(video=clip) as workspace, _Settings(INTERPOLATE_SHORT_CLIPS=True, INTERPOLATION_FPS=24):
+        video = asyncio.run(workspace.client().generate_video(PROMPT, 8, "Cinematic"))
+
+        assert _frame_count(video) == 8 * 24
+        # Neither the download nor the stretched copy is left behind
+        assert not [name for _, _, names in os.walk("generated_videos") for name in names]
+
+
+def test_resumed_clip_is_stretched_too():
+    with _Workspace() as workspace, _Settings(INTERPOLATE_SHORT_CLIPS=True, INTERPOLATION_FPS=24):
+        client = workspace.client()
+        params = {
+            "prompt": PROMPT,
+            "duration": 6,
+            "aspect_ratio": "16:9",
+            "frame_rate": 24,
+            "style": client._map_style_to_pika("Cinematic"),
+            "motion": "medium",
+            "guidance_scale": 7.5
+        }
+        # A job collected after a restart, waiting for the next identical request
+        resumed = _one_second_clip(os.path.join(workspace.tmp.name, "resumed.mp4"))
+        workspace.journal.record(PROVIDER, "pika-resumed", params)
+        workspace.journal.complete(PROVIDER, "pika-resumed", resumed)
+
+        video = asyncio.run(client.generate_video(PROMPT, 8, "Cinematic"))
+
+        assert workspace.provider.jobs == {}
+        assert _frame_count(video) == 8 * 24
+
+
+def test_clip_with_audio_is_delivered_as_made():
+    with tempfile.TemporaryDirectory() as directory:
+        with open(_with_track(_one_second_clip(os.path.join(directory, "clip.mp4"))), "rb") as f:
+            clip = f.read()
+
+    with _Workspace(video=clip) as workspace, _Settings(INTERPOLATE_SHORT_CLIPS=True, INTERPOLATION_FPS=24):
+        video = asyncio.run(workspace.client().generate_video(PROMPT, 8, "Cinematic"))
+
+        # Not retimed: still one second long, audio track and all
+        assert _frame_count(video) == 24
+        assert _tracks(video) == [(b"vide", b"mp4v"), (b"soun", b"mp4a")]
+
+
+def test_transient_status_errors_are_retried():
+    with _Workspace(video=VIDEO_BYTES) as workspace:
+        client = workspace.client()
+        _watch_forget(workspace, client)
+        workspace.provider.status_errors = [503, 429, 502]
+
+        video = asyncio.run(client.generate_video(PROMPT, 5, "Cinematic"))
+
+        assert video is not None
+        assert workspace.provider.status_calls == 4
+        assert client.forgotten == [(PROVIDER, "pika-1")]
+
+
+def test_unknown_job_fails():
+    with _Workspace(video=VIDEO_BYTES) as workspace:
+        client = workspace.client()
+        _watch_forget(workspace, client)
+        workspace.provider.status_errors = [404]
+
+        video = asyncio.run(client.generate_video(PROMPT, 5, "Cinematic"))
+
+        assert video is None
+        assert workspace.provider.status_calls == 1
+        assert client.forgotten == [(PROVIDER, "pika-1")]
+        assert workspace.journaled() == 0
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Pika Client Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All Pika client tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,124 @@
+"""
+Tests for draft-then-final progressive generation.
+
+FakeClient stands in for StabilityAIClient: drafts come back at once, final
+renders wait until they are released (or cancelled), so the tests control
+exactly when the background render is in flight.
+
+    python test_progressive.py
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+
+from utils.artifacts import GenerationResult, write_artifact
+from utils.cancellation import CancellationToken
+from video_generator import VideoGenerator
+
+PROMPT = "a lighthouse in a storm at night"
+
+
+class FakeClient:
+    """Provider client whose final renders block until released."""
+
+    def __init__(self, directory, demo_draft=False):
+        self.directory = directory
+        self.demo_draft = demo_draft
+        self.calls = []
+        self.final_started = threading.Event()
+        self.release_final = threading.Event()
+        self.final_cancelled = threading.Event()
+
+    async def generate_video(self, prompt, duration, style, resolution,
+                             progress_callback=None, quality="final", cancel_token=None):
+        self.calls.append(quality)
+        if quality == "final":
+            self.final_started.set()
+            try:
+                while not self.release_final.is_set():
+                    await cancel_token.sleep(0.02)
+            except BaseException:
+                self.final_cancelled.set()
+                raise
+        artifact = write_artifact([quality.encode()], os.path.join(self.directory, f"{quality}.mp4"), "video/mp4")
+        return GenerationResult(success=True, artifact=artifact, metadata={"quality": quality, "demo_mode": self.demo_draft})
+
+
+def _generator(client):
+    generator = VideoGenerator(session_id="test")
+    generator._client = client
+    return generator
+
+
+def test_final_render_arrives_after_the_draft():
+    with tempfile.TemporaryDirectory() as directory:
+        client = FakeClient(directory)
+
+        progressive = asyncio.run(_generator(client).generate_progressive(PROMPT, 5))
+
+        assert progressive.draft.metadata["quality"] == "draft"
+        assert client.final_started.wait(5)
+        assert not progressive.final_ready()
+        client.release_final.set()
+        final = progressive.final_result(timeout=5)
+        assert final.success and final.metadata["quality"] == "final"
+        assert client.calls == ["draft", "final"]
+
+
+def test_cancel_stops_the_final_render_in_flight():
+    with tempfile.TemporaryDirectory() as directory:
+        client = FakeClient(directory)
+        progressive = asyncio.run(_generator(client).generate_progressive(PROMPT, 5))
+        assert client.final_started.wait(5)
+
+        assert progressive.cancel()
+
+        assert progressive.cancelled
+        assert client.final_cancelled.wait(5), "final render kept running"
+        assert progressive.final_result(timeout=5) is None
+        assert not os.path.exists(os.path.join(directory, "final.mp4"))
+
+
+def test_cancelling_the_request_cancels_the_final_render():
+    with tempfile.TemporaryDirectory() as directory:
+        client = FakeClient(directory)
+        token = CancellationToken()
+        progressive = asyncio.run(_generator(client).generate_progressive(PROMPT, 5, cancel_token=token))
+        assert client.final_started.wait(5)
+
+        token.cancel()
+
+        assert client.final_cancelled.wait(5)
+        assert progressive.final_result(timeout=5) is None
+
+
+def test_demo_draft_skips_the_final_render():
+    with tempfile.TemporaryDirectory() as directory:
+        client = FakeClient(directory, demo_draft=True)
+
+        progressive = asyncio.run(_generator(client).generate_progressive(PROMPT, 5))
+
+        assert progressive.final_ready()
+        assert progressive.final_result() is progressive.draft
+        assert client.calls == ["draft"]
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Progressive Generation Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All progressive generation tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,125 @@
+"""
+Tests for local restyling (3D colour LUTs, grain and vignette).
+
+    python test_restyle.py
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from utils.artifacts import GenerationResult, MediaArtifact
+from utils.restyle import Restyler, STYLE_GRADES, grade
+from video_generator import VideoGenerator
+
+
+def _image(height=576, width=1024):
+    return np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def test_baked_lut_matches_grade():
+    # Animated has neither grain nor vignette, so only the LUT applies
+    image = _image()
+    expected = grade(image[..., ::-1].astype(np.float32) / 255.0, STYLE_GRADES["Animated"])[..., ::-1] * 255.0
+
+    graded = Restyler("Animated").apply(image)
+
+    error = np.abs(graded.astype(np.float32) - expected)
+    assert error.mean() < 1.0, error.mean()
+    assert error.max() <= 6, error.max()
+
+
+def test_cube_file_overrides_builtin_grade():
+    with tempfile.TemporaryDirectory() as lut_dir:
+        # Identity LUT with red and blue swapped
+        size = 2
+        with open(os.path.join(lut_dir, "Cinematic.cube"), "w") as f:
+            f.write(f"LUT_3D_SIZE {size}\n")
+            for b in range(size):
+                for g in range(size):
+                    for r in range(size):
+                        f.write(f"{b} {g} {r}\n")
+
+        restyler = Restyler("Cinematic", lut_dir=lut_dir)
+        restyler.recipe = {**restyler.recipe, "grain": 0, "vignette": 0}
+        pixel = np.array([[[10, 120, 250]]], dtype=np.uint8)  # BGR
+
+        assert restyler.lut_source.endswith("Cinematic.cube")
+        assert np.abs(restyler.apply(pixel).astype(int) - [250, 120, 10]).max() <= 2
+
+
+def test_vignette_and_grain():
+    grey = np.full((288, 512, 3), 128, dtype=np.uint8)
+    graded = Restyler("Cinematic").apply(grey)
+
+    centre = graded[134:154, 246:266].astype(np.float32)
+    corner = graded[:20, :20].astype(np.float32)
+    assert corner.mean() < centre.mean() - 10
+    assert centre.std() > 1  # Grain
+
+
+def test_batch_grades_every_frame_and_is_fast():
+    restyler = Restyler("Sci-Fi")
+    frames = np.stack([_image()] * 8)
+    restyler.apply(frames[0])
+
+    started = time.perf_counter()
+    graded = restyler.apply(frames)
+    per_frame = (time.perf_counter() - started) / len(frames)
+
+    assert graded.shape == frames.shape and graded.dtype == np.uint8
+    # Grain differs between frames, the grade does not
+    assert not np.array_equal(graded[0], graded[1])
+    assert np.abs(graded[0].astype(int) - graded[1].astype(int)).mean() < 10
+    assert per_frame < 0.1, f"{per_frame * 1000:.1f} ms per frame"
+
+
+def test_restyle_video_result():
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            source = os.path.join(directory, "source.mp4")
+            writer = cv2.VideoWriter(source, cv2.VideoWriter_fourcc(*'mp4v'), 24, (320, 180))
+            for _ in range(30):
+                writer.write(_image(180, 320))
+            writer.release()
+
+            original = GenerationResult(
+                success=True,
+                artifact=MediaArtifact.from_file(source, "video/mp4"),
+                metadata={'prompt': "a lighthouse in a storm", 'style': "Realistic"}
+            )
+            result = asyncio.run(VideoGenerator().restyle(original, "Fantasy"))
+
+            assert result.success, result.error
+            assert result.metadata['style'] == "Fantasy" and result.metadata['restyled']
+            assert result.artifact.path != source
+            capture = cv2.VideoCapture(result.artifact.path)
+            assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 30
+            capture.release()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Restyle Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All restyle tests passed!" if not failed else f"❌ {failed} test(s) failed")
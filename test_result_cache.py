@@ -0,0 +1,157 @@
+"""
+Tests for the shared result cache and its single-flight generation lease.
+
+Each worker process is simulated by a thread with its own event loop and its
+own SharedResultCache instance on the same SQLite file.
+
+    python test_result_cache.py
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from utils.artifacts import GenerationResult, write_artifact
+from utils.result_cache import SharedResultCache
+
+
+class _Workspace:
+    """Temporary working directory holding the cache database and media."""
+
+    def __enter__(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.db = os.path.join(self.tmp.name, "cache.sqlite")
+        return self
+
+    def __exit__(self, *exc_info):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+
+class CountingProvider:
+    """Slow provider that counts its calls."""
+
+    def __init__(self, directory, seconds=0.3, demo_mode=False):
+        self.directory = directory
+        self.seconds = seconds
+        self.demo_mode = demo_mode
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    async def generate(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        await asyncio.sleep(self.seconds)
+        artifact = write_artifact([b"video"], os.path.join(self.directory, f"result_{call}.mp4"), "video/mp4")
+        return GenerationResult(success=True, artifact=artifact, metadata={"call": call, "demo_mode": self.demo_mode})
+
+
+def _run_workers(db, key, provider, workers, **cache_options):
+    results = [None] * workers
+
+    def worker(index):
+        cache = SharedResultCache(db, **cache_options)
+        results[index] = asyncio.run(cache.get_or_generate(key, provider.generate, poll_interval=0.05))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_identical_requests_generate_once():
+    with _Workspace() as workspace:
+        provider = CountingProvider(workspace.tmp.name)
+        key = SharedResultCache.make_key("a lighthouse  in a storm", duration=5)
+
+        results = _run_workers(workspace.db, key, provider, workers=4)
+
+        assert provider.calls == 1
+        assert {result.artifact.path for result in results} == {results[0].artifact.path}
+        assert sorted(bool(result.metadata.get("cache_hit")) for result in results) == [False, True, True, True]
+        # Whitespace differences map to the same key
+        assert SharedResultCache.make_key("a lighthouse in a storm", duration=5) == key
+        assert SharedResultCache.make_key("a lighthouse in a storm", duration=6) != key
+
+
+def test_stale_lease_is_taken_over():
+    with _Workspace() as workspace:
+        provider = CountingProvider(workspace.tmp.name, seconds=0.0)
+        cache = SharedResultCache(workspace.db, lease_seconds=1)
+        key = SharedResultCache.make_key("an abandoned request")
+
+        # A worker took the lease and crashed without releasing it
+        assert cache.try_acquire(key, "crashed-worker")
+        assert not cache.try_acquire(key, "another-worker")
+
+        started = time.monotonic()
+        result = asyncio.run(cache.get_or_generate(key, provider.generate, poll_interval=0.05))
+
+        assert result.success and provider.calls == 1
+        assert 0.8 < time.monotonic() - started < 5
+        # The new owner released its lease; the result is now published
+        with cache._connect() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0] == 0
+        assert cache.get(key).metadata["cache_hit"]
+
+
+def test_waiters_wake_up_when_the_result_is_published():
+    with _Workspace() as workspace:
+        provider = CountingProvider(workspace.tmp.name, seconds=0.0)
+        cache = SharedResultCache(workspace.db)
+        key = SharedResultCache.make_key("published by someone else")
+        assert cache.try_acquire(key, "other-worker")
+
+        def publish_later():
+            time.sleep(0.3)
+            artifact = write_artifact([b"theirs"], os.path.join(workspace.tmp.name, "theirs.mp4"), "video/mp4")
+            cache.publish(key, GenerationResult(success=True, artifact=artifact))
+            cache.release(key, "other-worker")
+
+        threading.Thread(target=publish_later).start()
+        result = asyncio.run(cache.get_or_generate(key, provider.generate, poll_interval=0.05))
+
+        assert provider.calls == 0
+        assert result.artifact.read_bytes() == b"theirs"
+
+
+def test_demo_results_and_missing_media_are_not_served():
+    with _Workspace() as workspace:
+        provider = CountingProvider(workspace.tmp.name, seconds=0.0, demo_mode=True)
+        cache = SharedResultCache(workspace.db)
+        key = SharedResultCache.make_key("offline fallback")
+
+        asyncio.run(cache.get_or_generate(key, provider.generate))
+        asyncio.run(cache.get_or_generate(key, provider.generate))
+        assert provider.calls == 2
+
+        provider.demo_mode = False
+        result = asyncio.run(cache.get_or_generate(key, provider.generate))
+        os.remove(result.artifact.path)
+        assert cache.get(key) is None
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Result Cache Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All result cache tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,112 @@
+"""
+Tests for priority, aging, fair-share and shortest-job-first ordering of queued jobs.
+
+    python test_scheduler.py
+"""
+
+from utils.scheduler import FairShareScheduler
+
+
+def _scheduler(shortest_job_first=False, aging_seconds=0, **options):
+    return FairShareScheduler(shortest_job_first=shortest_job_first, aging_seconds=aging_seconds, **options)
+
+
+def _drain(scheduler):
+    """Grant every waiting job in schedule order; returns (session, cost) pairs."""
+    order = []
+    while len(scheduler):
+        job = scheduler.peek()
+        scheduler.grant(job)
+        order.append((job.session_id, job.cost))
+    return order
+
+
+def test_higher_priority_classes_run_first():
+    scheduler = _scheduler()
+    scheduler.submit("background", "a", 5)
+    scheduler.submit("standard", "b", 5)
+    scheduler.submit("interactive", "c", 5)
+    scheduler.submit("background", "c", 1)
+
+    assert [session for session, _ in _drain(scheduler)] == ["c", "b", "a", "c"]
+
+
+def test_waiting_jobs_age_into_higher_classes():
+    for aging_seconds, expected in ((0, ["fresh", "old"]), (10, ["old", "fresh"])):
+        scheduler = _scheduler(aging_seconds=aging_seconds)
+        old = scheduler.submit("background", "old", 5)
+        # Waited long enough to be promoted two classes, to interactive
+        old.enqueued_at -= 25
+        scheduler.submit("standard", "fresh", 5)
+
+        assert [session for session, _ in _drain(scheduler)] == expected
+
+
+def test_sessions_share_slots_fairly():
+    scheduler = _scheduler()
+    for _ in range(3):
+        scheduler.submit("interactive", "heavy", 5)
+    scheduler.submit("interactive", "light", 5)
+    scheduler.submit("interactive", "light", 5)
+
+    assert [session for session, _ in _drain(scheduler)] == ["heavy", "light", "heavy", "light", "heavy"]
+
+
+def test_shortest_job_first_within_a_session():
+    for shortest_job_first, expected in ((False, [10, 5, 7]), (True, [5, 7, 10])):
+        scheduler = _scheduler(shortest_job_first=shortest_job_first)
+        for cost in (10, 5, 7):
+            scheduler.submit("interactive", "a", cost)
+
+        assert [cost for _, cost in _drain(scheduler)] == expected
+
+
+def test_mixed_sessions_and_priorities():
+    scheduler = _scheduler(shortest_job_first=True)
+    jobs = [
+        scheduler.submit("background", "a", 1),
+        scheduler.submit("interactive", "a", 10),
+        scheduler.submit("interactive", "a", 4),
+        scheduler.submit("interactive", "b", 6),
+        scheduler.submit("standard", "b", 2),
+    ]
+    positions = sorted(jobs, key=scheduler.position)
+
+    order = _drain(scheduler)
+
+    # Interactive jobs alternate between sessions, shortest first within "a";
+    # then standard, then background
+    assert order == [("a", 4), ("b", 6), ("a", 10), ("b", 2), ("a", 1)]
+    assert [(job.session_id, job.cost) for job in positions] == order
+    assert scheduler.metrics()["classes"]["interactive"]["count"] == 3
+
+
+def test_session_grant_counts_stay_bounded():
+    scheduler = _scheduler(session_window=3)
+    for n in range(10):
+        scheduler.record_immediate("interactive", f"session-{n}", 5)
+    scheduler.record_immediate("interactive", "session-7", 5)
+
+    granted = scheduler.metrics()["granted_by_session"]
+    assert granted == {"session-8": 1, "session-9": 1, "session-7": 2}
+    # Nothing was queued, so no usage is kept for fair sharing either
+    assert scheduler._usage == {}
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Scheduler Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All scheduler tests passed!" if not failed else f"❌ {failed} test(s) failed")
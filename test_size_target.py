@@ -0,0 +1,191 @@
+"""
+Tests for size-targeted re-encoding of oversized videos.
+
+    python test_size_target.py
+"""
+
+import os
+import struct
+import tempfile
+
+import cv2
+import numpy as np
+
+from config import Config, VideoProvider
+from utils.file_handler import FileHandler
+from utils.faststart import track_formats
+from utils.size_target import LADDER, SizeTargetedEncoder, fit_to_size, reencodable, target_size
+
+
+def _noisy_video(path, frames=48, size=(320, 192), fps=24):
+    """Moving noise, so every frame costs the encoder real bytes."""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (size[1], size[0] * 2, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for index in range(frames):
+        writer.write(np.ascontiguousarray(base[:, index * 4:index * 4 + size[0]]))
+    writer.release()
+    return path
+
+
+def _box(kind, payload, full=False):
+    if full:
+        payload = b"\x00" * 4 + payload
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _with_track(path, handler=b"soun", entry_format=b"mp4a"):
+    """Append an (empty) extra track to the moov box of a cv2-written MP4."""
+    with open(path, "rb") as f:
+        data = f.read()
+    position = 0
+    while True:
+        size, kind = struct.unpack_from(">I4s", data, position)
+        if kind == b"moov":
+            break
+        position += size
+
+    entry = _box(entry_format, b"\x00" * 6 + struct.pack(">H", 1) + b"\x00" * 20)
+    stbl = _box(b"stbl", b"".join([
+        _box(b"stsd", struct.pack(">I", 1) + entry, full=True),
+        _box(b"stts", struct.pack(">I", 0), full=True),
+        _box(b"stsc", struct.pack(">I", 0), full=True),
+        _box(b"stsz", struct.pack(">II", 0, 0), full=True),
+        _box(b"stco", struct.pack(">I", 0), full=True),
+    ]))
+    mdia = _box(b"mdia", b"".join([
+        _box(b"mdhd", b"\x00" * 8 + struct.pack(">II", 44100, 0) + b"\x00" * 4, full=True),
+        _box(b"hdlr", b"\x00" * 4 + handler + b"\x00" * 12 + b"extra\x00", full=True),
+        _box(b"minf", stbl),
+    ]))
+    trak = _box(b"trak", mdia)
+    # mdat comes before moov in cv2 output, so no chunk offsets move
+    moov = struct.pack(">I", size + len(trak)) + data[position + 4:position + size] + trak
+    with open(path, "wb") as f:
+        f.write(data[:position] + moov + data[position + size:])
+    return path
+
+
+def _probe(path):
+    capture = cv2.VideoCapture(path)
+    info = (
+        int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        capture.get(cv2.CAP_PROP_FPS),
+        int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    )
+    capture.release()
+    return info
+
+
+def test_budget_is_the_smaller_of_max_size_and_bandwidth_class():
+    assert target_size(10.0, "") == Config.MAX_FILE_SIZE
+    assert target_size(10.0, "mobile") == min(Config.MAX_FILE_SIZE, Config.BANDWIDTH_CLASSES["mobile"] * 10 // 8)
+    assert target_size(10.0, "no-such-class") == Config.MAX_FILE_SIZE
+
+
+def test_estimates_shrink_down_the_ladder_and_track_real_sizes():
+    with tempfile.TemporaryDirectory() as directory:
+        source = _noisy_video(os.path.join(directory, "source.mp4"))
+        encoder = SizeTargetedEncoder(os.path.getsize(source))
+
+        estimates = encoder.estimate(source)
+
+        assert set(estimates) == set(LADDER)
+        assert estimates[LADDER[0]] > estimates[LADDER[2]] > estimates[LADDER[-1]]
+        full = encoder._encode_rung(source, os.path.join(directory, "full.mp4"), LADDER[0])
+        assert 0.5 < estimates[LADDER[0]] / full["size"] < 2.0
+
+
+def test_oversized_video_is_reencoded_under_its_budget():
+    with tempfile.TemporaryDirectory() as directory:
+        path = _noisy_video(os.path.join(directory, "clip.mp4"))
+        original_size = os.path.getsize(path)
+        width, height, fps, frames = _probe(path)
+        original = Config.MAX_FILE_SIZE
+        Config.MAX_FILE_SIZE = original_size // 2
+        try:
+            result = fit_to_size(path, "")
+        finally:
+            Config.MAX_FILE_SIZE = original
+
+        assert result is not None
+        assert os.path.getsize(path) == result["size"] <= original_size // 2
+        new_width, new_height, new_fps, new_frames = _probe(path)
+        assert (new_width, new_height) == (result["width"], result["height"])
+        assert new_width * new_height * new_fps < width * height * fps
+        assert abs(new_frames / new_fps - frames / fps) < 0.1
+        assert track_formats(path) == [(b"vide", b"mp4v")]
+        assert os.listdir(directory) == ["clip.mp4"]
+
+
+def test_videos_with_audio_or_other_codecs_are_kept_as_delivered():
+    with tempfile.TemporaryDirectory() as directory:
+        with_audio = _with_track(_noisy_video(os.path.join(directory, "audio.mp4")))
+        h264 = _noisy_video(os.path.join(directory, "h264.mp4"))
+        with open(h264, "r+b") as f:
+            data = f.read()
+            f.seek(data.index(b"mp4v"))
+            f.write(b"avc1")
+
+        assert track_formats(with_audio) == [(b"vide", b"mp4v"), (b"soun", b"mp4a")]
+        assert track_formats(h264) == [(b"vide", b"avc1")]
+        assert not reencodable(with_audio) and not reencodable(h264)
+        # cv2 still decodes the video track, so only the audio stops a re-encode
+        assert _probe(with_audio)[3] == 48
+
+        originals = {}
+        for path in (with_audio, h264):
+            with open(path, "rb") as f:
+                originals[path] = f.read()
+        original = Config.MAX_FILE_SIZE
+        Config.MAX_FILE_SIZE = min(len(data) for data in originals.values()) // 2
+        try:
+            assert fit_to_size(with_audio, "") is None
+            assert fit_to_size(h264, "") is None
+        finally:
+            Config.MAX_FILE_SIZE = original
+
+        for path, data in originals.items():
+            with open(path, "rb") as f:
+                assert f.read() == data
+
+
+def test_saved_videos_are_held_to_the_bandwidth_class():
+    with tempfile.TemporaryDirectory() as directory:
+        with open(_noisy_video(os.path.join(directory, "source.mp4")), "rb") as f:
+            data = f.read()
+        original = Config.TARGET_BANDWIDTH, dict(Config.BANDWIDTH_CLASSES)
+        # 2 s of video at this rate is half the source size
+        Config.TARGET_BANDWIDTH = "test"
+        Config.BANDWIDTH_CLASSES["test"] = len(data) * 8 // 4
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            for mode in ("flat", "cas"):
+                artifact = FileHandler(storage_mode=mode).save_artifact([data], "a prompt", VideoProvider.STABILITY_AI)
+
+                assert artifact.size == os.path.getsize(artifact.path) <= len(data) // 2
+                assert _probe(artifact.path)[3] > 0
+        finally:
+            os.chdir(cwd)
+            Config.TARGET_BANDWIDTH, Config.BANDWIDTH_CLASSES = original
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Size Target Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All size target tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,253 @@
+"""
+Tests for the pluggable storage backends.
+
+The S3 backend is exercised against InProcessObjectStore, a local stand-in
+that implements the subset of the boto3 S3 client API the backend uses, so no
+network, credentials or boto3 install are needed.
+
+    python test_storage.py
+"""
+
+import hashlib
+import hmac
+import io
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import urlencode, urlparse, parse_qs
+
+from config import VideoProvider
+from utils.artifacts import GenerationResult
+from utils.file_handler import FileHandler
+from utils.result_cache import SharedResultCache
+from utils.storage import LocalStorageBackend, S3StorageBackend, MIN_PART_SIZE
+
+
+class InProcessObjectStore:
+    """In-memory stand-in for an S3-compatible object store client."""
+
+    def __init__(self, secret: bytes = b"test-secret"):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+        self._secret = secret
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.calls.append("put_object")
+        self.objects[(Bucket, Key)] = (bytes(Body), ContentType)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None):
+        self.calls.append("create_multipart_upload")
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {"key": (Bucket, Key), "parts": {}, "content_type": ContentType}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append("upload_part")
+        self.uploads[UploadId]["parts"][PartNumber] = bytes(Body)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        upload = self.uploads.pop(UploadId)
+        parts = MultipartUpload["Parts"]
+        for part in parts[:-1]:
+            assert len(upload["parts"][part["PartNumber"]]) >= MIN_PART_SIZE, "part below S3 minimum"
+        body = b"".join(upload["parts"][part["PartNumber"]] for part in parts)
+        self.objects[upload["key"]] = (body, upload["content_type"])
+        return {"ETag": f"multipart-{len(parts)}"}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+
+    def get_object(self, Bucket, Key):
+        body, content_type = self.objects[(Bucket, Key)]
+        return {"Body": io.BytesIO(body), "ContentLength": len(body), "ContentType": content_type}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise KeyError(Key)
+        body, content_type = self.objects[(Bucket, Key)]
+        return {"ContentLength": len(body), "ContentType": content_type}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        expires = int(time.time()) + ExpiresIn
+        path = f"/{Params['Bucket']}/{Params['Key']}"
+        signature = self._sign(path, expires)
+        return f"memory://objects{path}?{urlencode({'Expires': expires, 'Signature': signature})}"
+
+    def open_presigned_url(self, url):
+        """Resolve a presigned URL the way the object store would."""
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        expires = int(query["Expires"][0])
+        if not hmac.compare_digest(query["Signature"][0], self._sign(parsed.path, expires)):
+            raise PermissionError("Bad signature")
+        if time.time() > expires:
+            raise PermissionError("URL expired")
+        _, bucket, key = parsed.path.split("/", 2)
+        return self.objects[(bucket, key)][0]
+
+    def _sign(self, path, expires):
+        return hmac.new(self._secret, f"{path}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def _chunks(data, size=256 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_s3_small_object_uses_single_put():
+    store = InProcessObjectStore()
+    backend = S3StorageBackend("videos", prefix="out/", client=store)
+
+    stored = backend.put_stream("a.png", [b"png-bytes"], "image/png")
+
+    assert stored.size == 9
+    assert store.calls == ["put_object"]
+    assert b"".join(backend.iter_chunks("a.png")) == b"png-bytes"
+
+
+def test_s3_multipart_streaming_upload():
+    store = InProcessObjectStore()
+    backend = S3StorageBackend("videos", client=store, part_size=MIN_PART_SIZE)
+    data = os.urandom(2 * MIN_PART_SIZE + 12345)
+
+    stored = backend.put_stream("big.mp4", _chunks(data), "video/mp4")
+
+    assert stored.size == len(data)
+    assert store.calls.count("upload_part") == 3
+    assert store.objects[("videos", "big.mp4")] == (data, "video/mp4")
+
+
+def test_s3_failed_upload_is_aborted():
+    store = InProcessObjectStore()
+    backend = S3StorageBackend("videos", client=store, part_size=MIN_PART_SIZE)
+
+    def failing_chunks():
+        yield os.urandom(MIN_PART_SIZE)
+        raise IOError("provider stream dropped")
+
+    try:
+        backend.put_stream("broken.mp4", failing_chunks(), "video/mp4")
+        assert False, "expected the upload to fail"
+    except IOError:
+        pass
+
+    assert "abort_multipart_upload" in store.calls
+    assert not store.uploads
+    assert not backend.exists("broken.mp4")
+
+
+def test_s3_presigned_read_url():
+    store = InProcessObjectStore()
+    backend = S3StorageBackend("videos", client=store)
+    backend.put_stream("clip.mp4", [b"video"], "video/mp4")
+
+    assert store.open_presigned_url(backend.read_url("clip.mp4")) == b"video"
+
+    expired = backend.read_url("clip.mp4", expires_in=-1)
+    try:
+        store.open_presigned_url(expired)
+        assert False, "expected an expired URL to be rejected"
+    except PermissionError:
+        pass
+
+
+def test_local_backend_round_trip():
+    root = tempfile.mkdtemp()
+    try:
+        backend = LocalStorageBackend(root)
+        backend.put_stream("nested/clip.mp4", [b"abc", b"def"], "video/mp4")
+
+        assert backend.exists("nested/clip.mp4")
+        assert b"".join(backend.iter_chunks("nested/clip.mp4")) == b"abcdef"
+        assert os.path.isfile(backend.read_url("nested/clip.mp4"))
+
+        backend.delete("nested/clip.mp4")
+        assert not backend.exists("nested/clip.mp4")
+    finally:
+        shutil.rmtree(root)
+
+
+def test_file_handler_shares_artifacts_between_replicas():
+    store = InProcessObjectStore()
+    workdir = os.getcwd()
+    replica_a, replica_b = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        os.chdir(replica_a)
+        saved = FileHandler(storage=S3StorageBackend("videos", client=store)).save_artifact(
+            [b"frame" * 1000], "a shared prompt", VideoProvider.STABILITY_AI
+        )
+        assert saved.storage_key
+
+        # A different node with its own disk fetches the same artifact
+        os.chdir(replica_b)
+        fetched = FileHandler(storage=S3StorageBackend("videos", client=store)).fetch_artifact(saved.storage_key)
+
+        assert fetched is not None
+        assert fetched.path.startswith(replica_b)
+        assert fetched.sha256 == saved.sha256
+    finally:
+        os.chdir(workdir)
+        shutil.rmtree(replica_a)
+        shutil.rmtree(replica_b)
+
+
+def test_result_cache_is_shared_between_replicas():
+    store = InProcessObjectStore()
+    workdir = os.getcwd()
+    replica_a, replica_b = tempfile.mkdtemp(), tempfile.mkdtemp()
+    key = SharedResultCache.make_key("a shared prompt", duration=5)
+    try:
+        os.chdir(replica_a)
+        handler_a = FileHandler(storage=S3StorageBackend("videos", client=store))
+        cache_a = SharedResultCache(os.path.join(replica_a, "cache.sqlite"), file_handler=handler_a)
+        saved = handler_a.save_artifact([b"frame" * 1000], "a shared prompt", VideoProvider.STABILITY_AI)
+        assert cache_a.publish(key, GenerationResult(success=True, artifact=saved, metadata={"model": "svd"}))
+
+        # Another node, with its own disk and its own SQLite index
+        os.chdir(replica_b)
+        handler_b = FileHandler(storage=S3StorageBackend("videos", client=store))
+        cache_b = SharedResultCache(os.path.join(replica_b, "cache.sqlite"), file_handler=handler_b)
+        hit = cache_b.get(key)
+
+        assert hit is not None and hit.metadata == {"model": "svd", "cache_hit": True}
+        assert hit.artifact.path.startswith(replica_b)
+        assert hit.artifact.sha256 == saved.sha256
+        assert store.open_presigned_url(handler_b.artifact_url(hit.artifact)) == b"frame" * 1000
+        # Now indexed locally: no second manifest read
+        with cache_b._connect() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 1
+
+        cache_b.invalidate(key)
+        assert not cache_a.file_handler.storage.exists(f"results/{key}.json")
+    finally:
+        os.chdir(workdir)
+        shutil.rmtree(replica_a)
+        shutil.rmtree(replica_b)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Storage Backend Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All storage tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,88 @@
+"""
+Tests for the tiled local upscaler.
+
+    python test_upscaler.py
+"""
+
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from utils.artifacts import MediaArtifact
+from utils.upscaler import TiledUpscaler, upscale_artifact
+
+
+def _image(height=384, width=640):
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur((rng.random((height, width, 3)) * 255).astype(np.uint8), (0, 0), 2)
+    cv2.rectangle(image, (100, 100), (300, 250), (255, 255, 255), -1)
+    return image
+
+
+def test_tiles_join_without_seams():
+    image = _image()
+    for sharpen in (0.0, 0.6):
+        tiled = TiledUpscaler(1024, 576, tile=128, sharpen=sharpen).upscale(image)
+        whole = TiledUpscaler(1024, 576, tile=2048, sharpen=sharpen).upscale(image)
+
+        assert tiled.shape == (576, 1024, 3)
+        assert np.array_equal(tiled, whole)
+
+
+def test_crops_to_output_aspect():
+    # A square render upscaled to 16:9 is centre-cropped, not stretched
+    square = np.zeros((512, 512, 3), np.uint8)
+    square[:, 256:] = 255
+
+    upscaled = TiledUpscaler(1024, 576, sharpen=0).upscale(square)
+
+    assert upscaled.shape == (576, 1024, 3)
+    assert upscaled[:, :500].max() < 10 and upscaled[:, 524:].min() > 245
+
+
+def test_sharpening_only_touches_edges():
+    image = _image()
+    plain = TiledUpscaler(1024, 576, sharpen=0).upscale(image).astype(np.float32)
+    sharp = TiledUpscaler(1024, 576, sharpen=0.6).upscale(image).astype(np.float32)
+
+    # Steeper step across the rectangle's left edge, flat interior unchanged
+    row = 280
+    assert np.abs(np.diff(sharp[row, 150:175, 0])).max() > np.abs(np.diff(plain[row, 150:175, 0])).max()
+    assert np.abs(sharp[250:350, 250:400] - plain[250:350, 250:400]).max() < 1
+
+
+def test_upscale_artifact_writes_full_size_png():
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            source = os.path.join(directory, "small.png")
+            cv2.imwrite(source, _image())
+
+            result = upscale_artifact(MediaArtifact.from_file(source, "image/png"), "1024x576", "a test")
+
+            assert result is not None and result.path != source
+            assert cv2.imread(result.path).shape == (576, 1024, 3)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Upscaler Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print()
+    print("🎉 All upscaler tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -0,0 +1,253 @@
+"""
+Tests for job completion: the webhook receiver and the shared status poller.
+
+MockProvider is a local HTTP server speaking the subset of the Runway API the
+client uses (submit, status, batch status, download). It calls the job's
+webhook_url back on completion unless told not to, so the webhook path, the
+polling fallback and batched polling run end to end without network access
+or API keys.
+
+    python test_webhooks.py
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from api_clients.runway_client import RunwayClient
+from config import Config
+from utils import job_journal, webhooks
+from utils.webhooks import WebhookReceiver
+
+VIDEO_BYTES = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 4096
+
+
+@pytest.fixture(autouse=True)
+def isolated_journal(monkeypatch, tmp_path):
+    """Keep the job journal out of the working tree."""
+    monkeypatch.setattr(Config, "JOB_JOURNAL_PATH", str(tmp_path / "job_journal.sqlite"))
+    monkeypatch.setattr(job_journal, "_journal", None)
+
+
+class MockProvider:
+    """Local stand-in for a video provider with completion callbacks."""
+
+    def __init__(self, render_seconds=0.3, send_webhooks=True):
+        self.render_seconds = render_seconds
+        self.send_webhooks = send_webhooks
+        self.jobs = {}
+        self.status_calls = 0
+        self.batch_calls = 0
+        self._ids = itertools.count(1)
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                self._reply(200, provider.submit(body))
+
+            def do_GET(self):
+                if self.path.startswith("/generate/batch?"):
+                    provider.batch_calls += 1
+                    ids = parse_qs(urlparse(self.path).query)["ids"][0].split(",")
+                    self._reply(200, {"jobs": [provider.status(job_id) for job_id in ids]})
+                elif self.path.startswith("/generate/"):
+                    provider.status_calls += 1
+                    self._reply(200, provider.status(self.path.rsplit("/", 1)[1]))
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "video/mp4")
+                    self.send_header("Content-Length", str(len(VIDEO_BYTES)))
+                    self.end_headers()
+                    self.wfile.write(VIDEO_BYTES)
+
+            def _reply(self, code, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def submit(self, body):
+        job_id = f"job-{next(self._ids)}"
+        self.jobs[job_id] = {"status": "processing", "webhook_url": body.get("webhook_url")}
+        threading.Timer(self.render_seconds, self._complete, args=(job_id,)).start()
+        return {"id": job_id}
+
+    def status(self, job_id):
+        job = self.jobs[job_id]
+        payload = {"id": job_id, "status": job["status"]}
+        if job["status"] == "completed":
+            payload["video_url"] = f"{self.url}/videos/{job_id}.mp4"
+        return payload
+
+    def _complete(self, job_id):
+        job = self.jobs[job_id]
+        job["status"] = "completed"
+        if self.send_webhooks and job["webhook_url"]:
+            _post_json(job["webhook_url"], self.status(job_id))
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _post_json(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _use_receiver(receiver):
+    """Make the clients use this receiver instead of one built from Config."""
+    webhooks._receiver = receiver
+    webhooks._receiver_started = True
+
+
+def _start_receiver():
+    receiver = WebhookReceiver("http://127.0.0.1", host="127.0.0.1", port=0)
+    receiver.start()
+    receiver.public_url = f"http://127.0.0.1:{receiver.port}"
+    return receiver
+
+
+def _generate(provider):
+    client = RunwayClient("test-key")
+    client.base_url = provider.url
+    return asyncio.run(client.generate_video("a lighthouse in a storm", 5, "Cinematic"))
+
+
+class _Settings:
+    """Temporarily override Config attributes."""
+
+    def __init__(self, **overrides):
+        self.overrides = overrides
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.overrides.items():
+            self.saved[name] = getattr(Config, name)
+            setattr(Config, name, value)
+
+    def __exit__(self, *exc_info):
+        for name, value in self.saved.items():
+            setattr(Config, name, value)
+
+
+def test_webhook_completes_without_waiting_for_poll():
+    provider = MockProvider(render_seconds=0.3)
+    receiver = _start_receiver()
+    _use_receiver(receiver)
+    try:
+        with _Settings(WEBHOOK_FALLBACK_POLL_SECONDS=30):
+            started = time.monotonic()
+            video = _generate(provider)
+
+        assert video == VIDEO_BYTES
+        assert time.monotonic() - started < 5, "waited for the fallback poll"
+        assert provider.status_calls == 0
+        assert receiver.delivered == 1
+    finally:
+        _use_receiver(None)
+        receiver.stop()
+        provider.stop()
+
+
+def test_missing_callback_falls_back_to_polling():
+    provider = MockProvider(render_seconds=0.3, send_webhooks=False)
+    receiver = _start_receiver()
+    _use_receiver(receiver)
+    try:
+        with _Settings(WEBHOOK_FALLBACK_POLL_SECONDS=0.2, STATUS_POLL_INTERVAL=0.2):
+            video = _generate(provider)
+
+        assert video == VIDEO_BYTES
+        assert provider.status_calls >= 2
+        assert receiver.delivered == 0
+    finally:
+        _use_receiver(None)
+        receiver.stop()
+        provider.stop()
+
+
+def test_concurrent_jobs_share_batch_status_requests():
+    provider = MockProvider(render_seconds=0.5, send_webhooks=False)
+    RunwayClient.batch_status_path = "/generate/batch"
+    jobs = 20
+
+    async def generate_all():
+        client = RunwayClient("test-key")
+        client.base_url = provider.url
+        return await asyncio.gather(*(
+            client.generate_video(f"a lighthouse in a storm, take {n}", 5, "Cinematic") for n in range(jobs)
+        ))
+
+    try:
+        with _Settings(STATUS_POLL_INTERVAL=0.2):
+            videos = asyncio.run(generate_all())
+
+        assert videos == [VIDEO_BYTES] * jobs
+        assert provider.status_calls == 0
+        # One poller checks every job per pass: a handful of requests, not jobs x passes
+        assert provider.batch_calls < jobs, provider.batch_calls
+    finally:
+        RunwayClient.batch_status_path = None
+        provider.stop()
+
+
+def test_receiver_only_accepts_issued_urls():
+    receiver = _start_receiver()
+    try:
+        assert _post_json(f"{receiver.public_url}/webhooks/not-a-token", {"status": "completed"}) == 404
+
+        callback = receiver.expect()
+        assert _post_json(callback.url, {"status": "processing"}) == 204
+        callback.close()
+        assert _post_json(callback.url, {"status": "completed"}) == 404
+        assert receiver.delivered == 1
+    finally:
+        receiver.stop()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🧪 Webhook Receiver Tests")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    with tempfile.TemporaryDirectory() as directory, _Settings(JOB_JOURNAL_PATH=os.path.join(directory, "job_journal.sqlite")):
+        for test in tests:
+            try:
+                test()
+                print(f"✅ {test.__name__}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {test.__name__}: {e!r}")
+        job_journal._journal = None
+
+    print()
+    print("🎉 All webhook tests passed!" if not failed else f"❌ {failed} test(s) failed")
@@ -1,7 +1,32 @@
 """
 Utilities package for file handling and other helper functions.
+
+Submodules are imported lazily on first attribute access so that importing
+``utils`` does not pull in heavy dependencies such as cv2 and numpy.
 """
 
-from .file_handler import FileHandler
+import importlib
+
+__all__ = ['FileHandler', 'MediaArtifact', 'GenerationResult']
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'FileHandler': '.file_handler',
+    'MediaArtifact': '.artifacts',
+    'GenerationResult': '.artifacts',
+}
+
+
+def __getattr__(name):
+    """Import the submodule that provides ``name`` on first access."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['FileHandler']
+def __dir__():
+    return sorted(list(globals()) + __all__)
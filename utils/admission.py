@@ -0,0 +1,175 @@
+"""
+Process-wide admission control for provider generations.
+
+Every Streamlit session runs its generation in its own event loop, so the
+limiter is built on a thread lock rather than asyncio primitives. At most
+Config.MAX_IN_FLIGHT_GENERATIONS provider calls run at once; further
+requests wait in a bounded queue, ordered by FairShareScheduler (priority
+classes, per-session fair share, optional shortest-job-first), and see their
+position and estimated wait through the progress callback. Once the queue is full, new requests are
+shed immediately instead of piling onto a provider that is already
+returning 429s.
+"""
+
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Callable, Dict, Any
+
+from config import Config
+from utils import cancellation
+from utils.cancellation import CancellationToken
+from utils.scheduler import FairShareScheduler
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a request is shed because the wait queue is full."""
+    
+    def __init__(self, retry_after: float):
+        super().__init__(f"Server busy, please try again in about {int(math.ceil(retry_after))}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded in-flight limit with a scheduled wait queue."""
+    
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        initial_estimate: Optional[float] = None,
+        poll_interval: float = 0.25,
+        scheduler: Optional[FairShareScheduler] = None
+    ):
+        """
+        Args:
+            max_in_flight: Generations allowed to run concurrently
+            max_queue: Requests allowed to wait; more are shed
+            initial_estimate: Assumed seconds per generation until some complete
+            poll_interval: Seconds between queue checks while waiting
+            scheduler: Orders the wait queue (built from Config if omitted)
+        """
+        self.max_in_flight = max(1, max_in_flight or Config.MAX_IN_FLIGHT_GENERATIONS)
+        self.max_queue = max(0, max_queue if max_queue is not None else Config.MAX_QUEUED_GENERATIONS)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._scheduler = scheduler if scheduler is not None else FairShareScheduler()
+        self._in_flight = 0
+        self._average_seconds = initial_estimate or Config.ADMISSION_ESTIMATE_SECONDS
+        self._shed = 0
+    
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until a request at this queue position should start."""
+        return math.ceil(position / self.max_in_flight) * self._average_seconds
+    
+    async def acquire(
+        self,
+        progress_callback: Optional[Callable] = None,
+        priority: Optional[str] = None,
+        session_id: Optional[str] = None,
+        cost: float = 1.0,
+        cancel_token: Optional[CancellationToken] = None
+    ):
+        """
+        Wait for a generation slot.
+        
+        Args:
+            progress_callback: Optional callback for queue position updates
+            priority: Priority class (Config.DEFAULT_PRIORITY if omitted)
+            session_id: Session to charge for fair sharing
+            cost: Relative size of the job (video seconds)
+            cancel_token: Stops waiting (and leaves the queue) when cancelled
+        
+        Raises:
+            QueueFullError: The wait queue is full
+            ValueError: Unknown priority class
+            GenerationCancelled: The token was cancelled while waiting
+        """
+        cancellation.check(cancel_token)
+        priority = priority or Config.DEFAULT_PRIORITY
+        session_id = session_id or "anonymous"
+        
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not len(self._scheduler):
+                self._scheduler.record_immediate(priority, session_id, cost)
+                self._in_flight += 1
+                return
+            if len(self._scheduler) >= self.max_queue:
+                self._shed += 1
+                raise QueueFullError(self.estimated_wait(len(self._scheduler) + 1))
+            job = self._scheduler.submit(priority, session_id, cost)
+        
+        reported = None
+        try:
+            while True:
+                with self._lock:
+                    if self._in_flight < self.max_in_flight and self._scheduler.peek() is job:
+                        self._scheduler.grant(job)
+                        self._in_flight += 1
+                        return
+                    position = self._scheduler.position(job)
+                    eta = self.estimated_wait(position)
+                
+                if progress_callback and (position, int(eta)) != reported:
+                    reported = (position, int(eta))
+                    progress_callback(
+                        2, f"Waiting in queue: position {position}, about {int(math.ceil(eta))}s to start..."
+                    )
+                await cancellation.sleep(self.poll_interval, cancel_token)
+        except BaseException:
+            # Cancelled or failed while waiting: give up our place in line
+            with self._lock:
+                self._scheduler.remove(job)
+            raise
+    
+    def release(self, elapsed: Optional[float] = None):
+        """Free a slot, feeding the generation time into the wait estimate."""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if elapsed is not None:
+                # Exponential moving average keeps the ETA tracking current latency
+                self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+    
+    @asynccontextmanager
+    async def slot(
+        self,
+        progress_callback: Optional[Callable] = None,
+        priority: Optional[str] = None,
+        session_id: Optional[str] = None,
+        cost: float = 1.0,
+        cancel_token: Optional[CancellationToken] = None
+    ):
+        """Hold a generation slot for the duration of the block."""
+        await self.acquire(progress_callback, priority, session_id, cost, cancel_token)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Current load and per-class wait metrics, for status displays."""
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'queued': len(self._scheduler),
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'average_seconds': round(self._average_seconds, 1),
+                'shed': self._shed,
+                **self._scheduler.metrics()
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """The admission controller shared by every session in this process."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
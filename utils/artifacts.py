@@ -0,0 +1,138 @@
+"""
+File-backed media artifacts and generation results.
+
+Generated media is written to disk once, as it arrives, and then passed around
+as a small handle (path, size, digest, MIME type). Callers that need the bytes
+read them lazily or map the file, so the pipeline never keeps extra in-memory
+copies of a video or image.
+"""
+
+import hashlib
+import mimetypes
+import mmap
+import os
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Iterable, Iterator, BinaryIO
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class MediaArtifact:
+    """Handle to a media file on disk."""
+
+    path: str
+    size: int
+    mime_type: str
+    _sha256: Optional[str] = field(default=None, repr=False)
+    name: Optional[str] = None  # Index name when stored content-addressed
+    storage_key: Optional[str] = None  # Key in the configured storage backend
+
+    @classmethod
+    def from_file(cls, path: str, mime_type: Optional[str] = None, sha256: Optional[str] = None) -> "MediaArtifact":
+        """
+        Create a handle for an existing file.
+
+        Args:
+            path: Path to the media file
+            mime_type: MIME type (guessed from the extension if omitted)
+            sha256: Known hex digest, if already computed
+
+        Returns:
+            MediaArtifact for the file
+        """
+        if mime_type is None:
+            mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return cls(path=path, size=os.path.getsize(path), mime_type=mime_type, _sha256=sha256)
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 digest of the file, computed on first access."""
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            for chunk in self.iter_chunks():
+                digest.update(chunk)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    @property
+    def is_video(self) -> bool:
+        return self.mime_type.startswith("video/")
+
+    @property
+    def is_image(self) -> bool:
+        return self.mime_type.startswith("image/")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def open(self) -> BinaryIO:
+        """Open the artifact for binary reading."""
+        return open(self.path, "rb")
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream the artifact in chunks without loading it whole."""
+        with self.open() as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def memoryview(self) -> memoryview:
+        """
+        Map the file read-only and return a zero-copy view of it.
+
+        The mapping stays open for as long as the view is referenced.
+        """
+        if self.size == 0:
+            return memoryview(b"")
+        with self.open() as f:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def read_bytes(self) -> bytes:
+        """Read the whole artifact into memory (prefer open() or memoryview())."""
+        with self.open() as f:
+            return f.read()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "size": self.size,
+            "sha256": self.sha256,
+            "mime_type": self.mime_type,
+            "storage_key": self.storage_key
+        }
+
+
+def write_artifact(chunks: Iterable[bytes], path: str, mime_type: str) -> MediaArtifact:
+    """
+    Stream chunks to a file atomically, hashing them on the way.
+
+    Args:
+        chunks: Iterable of byte chunks (e.g. a streamed HTTP response)
+        path: Destination file path
+        mime_type: MIME type of the media
+
+    Returns:
+        MediaArtifact for the written file
+    """
+    from utils.file_io import atomic_write
+
+    size, sha256 = atomic_write(path, chunks)
+    return MediaArtifact(path=path, size=size, mime_type=mime_type, _sha256=sha256)
+
+
+@dataclass
+class GenerationResult:
+    """Outcome of a generation request; media is referenced, never embedded."""
+
+    success: bool
+    artifact: Optional[MediaArtifact] = None
+    video_url: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @classmethod
+    def failure(cls, error: str, metadata: Optional[Dict[str, Any]] = None) -> "GenerationResult":
+        return cls(success=False, error=error, metadata=metadata or {})
@@ -0,0 +1,233 @@
+"""
+Content-addressed, sharded blob storage for generated media.
+
+Blobs are stored once per SHA-256 digest under two levels of shard
+directories (``blobs/ab/cd/abcd....mp4``), so no directory ever holds more
+than a few hundred entries and identical outputs are deduplicated. The
+human-readable names live only in a SQLite index, which makes lookups and
+listings indexed queries instead of directory scans.
+"""
+
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterable, List
+
+from utils.artifacts import MediaArtifact
+from utils.file_io import atomic_write
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mime_type TEXT NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    created_at REAL NOT NULL,
+    prompt TEXT,
+    provider TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_created_at ON entries(created_at);
+CREATE INDEX IF NOT EXISTS entries_sha256 ON entries(sha256);
+"""
+
+
+class ContentAddressedStore:
+    """Deduplicating blob store with a name index."""
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.staging_dir = os.path.join(root, "staging")
+        self.index_path = os.path.join(root, "index.sqlite")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection (safe to use from any thread)."""
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def blob_path(self, sha256: str, extension: str = "") -> str:
+        """Sharded location of a blob: blobs/<2 hex>/<2 hex>/<digest><ext>."""
+        return os.path.join(self.blob_dir, sha256[:2], sha256[2:4], f"{sha256}{extension}")
+    
+    def put_stream(
+        self,
+        chunks: Iterable[bytes],
+        name: str,
+        mime_type: str,
+        extension: str = "",
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> MediaArtifact:
+        """
+        Store streamed content under a human-readable name.
+        
+        The content is hashed while it is staged; if a blob with the same
+        digest already exists, the staged copy is discarded and the name is
+        pointed at the existing blob.
+        
+        Args:
+            chunks: Iterable of byte chunks
+            name: Human-readable name recorded in the index
+            mime_type: MIME type of the content
+            extension: File extension for the blob, including the dot
+            metadata: Optional "prompt" / "provider" values for the index
+        
+        Returns:
+            MediaArtifact pointing at the (possibly shared) blob
+        """
+        staging_path = os.path.join(self.staging_dir, f"{uuid.uuid4().hex}{extension}")
+        size, sha256 = atomic_write(staging_path, chunks)
+        return self._commit(staging_path, sha256, size, name, mime_type, extension, metadata)
+    
+    def put_file(
+        self,
+        path: str,
+        name: str,
+        mime_type: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> MediaArtifact:
+        """
+        Move an existing file (e.g. a local render) into the store.
+        
+        The file should live on the same filesystem as the store so the move
+        is a rename; it is removed if its content is already stored.
+        """
+        artifact = MediaArtifact.from_file(path, mime_type)
+        extension = os.path.splitext(path)[1]
+        return self._commit(path, artifact.sha256, artifact.size, name, mime_type, extension, metadata)
+    
+    def _commit(
+        self,
+        source_path: str,
+        sha256: str,
+        size: int,
+        name: str,
+        mime_type: str,
+        extension: str,
+        metadata: Optional[Dict[str, Any]]
+    ) -> MediaArtifact:
+        """Publish a staged file as a blob (or drop it as a duplicate) and index it."""
+        metadata = metadata or {}
+        blob_path = self.blob_path(sha256, extension)
+        
+        with self._connect() as conn:
+            # Take the write lock up front so concurrent publishers serialize
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            
+            if row and os.path.exists(row[0]):
+                # Duplicate content: keep the existing blob
+                os.remove(source_path)
+                blob_path = row[0]
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(source_path, blob_path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO blobs (sha256, path, size, mime_type, refcount) "
+                    "VALUES (?, ?, ?, ?, COALESCE((SELECT refcount FROM blobs WHERE sha256 = ?), 0))",
+                    (sha256, blob_path, size, mime_type, sha256)
+                )
+            
+            previous = conn.execute("SELECT sha256 FROM entries WHERE name = ?", (name,)).fetchone()
+            if previous:
+                self._release(conn, previous[0])
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (name, sha256, created_at, prompt, provider) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, sha256, time.time(), metadata.get("prompt"), metadata.get("provider"))
+            )
+            conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE sha256 = ?", (sha256,))
+        
+        return MediaArtifact(path=blob_path, size=size, mime_type=mime_type, _sha256=sha256, name=name)
+    
+    def get(self, name: str) -> Optional[MediaArtifact]:
+        """Look up an artifact by its human-readable name."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT b.path, b.size, b.mime_type, b.sha256 FROM entries e "
+                "JOIN blobs b ON b.sha256 = e.sha256 WHERE e.name = ?",
+                (name,)
+            ).fetchone()
+        if not row:
+            return None
+        return MediaArtifact(path=row[0], size=row[1], mime_type=row[2], _sha256=row[3], name=name)
+    
+    def get_by_digest(self, sha256: str) -> Optional[MediaArtifact]:
+        """Look up a blob by its SHA-256 digest."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path, size, mime_type FROM blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+        if not row:
+            return None
+        return MediaArtifact(path=row[0], size=row[1], mime_type=row[2], _sha256=sha256)
+    
+    def list(self, limit: int = 100, offset: int = 0, mime_prefix: str = "") -> List[Dict[str, Any]]:
+        """
+        List indexed entries, newest first.
+        
+        Args:
+            limit: Maximum number of entries
+            offset: Number of entries to skip
+            mime_prefix: Only include MIME types starting with this (e.g. "video/")
+        
+        Returns:
+            List of entry dicts (name, path, size, mime_type, sha256, created)
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT e.name, b.path, b.size, b.mime_type, b.sha256, e.created_at FROM entries e "
+                "JOIN blobs b ON b.sha256 = e.sha256 WHERE b.mime_type LIKE ? "
+                "ORDER BY e.created_at DESC LIMIT ? OFFSET ?",
+                (f"{mime_prefix}%", limit, offset)
+            ).fetchall()
+        return [
+            {
+                "name": row[0],
+                "path": row[1],
+                "size": row[2],
+                "mime_type": row[3],
+                "sha256": row[4],
+                "created": row[5]
+            }
+            for row in rows
+        ]
+    
+    def delete(self, name: str) -> bool:
+        """Remove a name; the blob is deleted once no name references it."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT sha256 FROM entries WHERE name = ?", (name,)).fetchone()
+            if not row:
+                return False
+            conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+            self._release(conn, row[0])
+        return True
+    
+    def _release(self, conn: sqlite3.Connection, sha256: str):
+        """Drop one reference to a blob and delete it when unreferenced."""
+        conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = ?", (sha256,))
+        row = conn.execute("SELECT path, refcount FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row and row[1] <= 0:
+            conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            if os.path.exists(row[0]):
+                os.remove(row[0])
@@ -0,0 +1,158 @@
+"""
+Cooperative cancellation for generation requests.
+
+A CancellationToken is created per request and handed down through
+VideoGenerator, the provider clients and downloads. Blocking work registers
+cleanup callbacks on it (closing an HTTP response aborts a socket read on
+another thread, a remote cancel call stops the provider job), loops check it
+between steps, and sleeps wake up as soon as it is cancelled.
+
+GenerationCancelled derives from BaseException, like asyncio.CancelledError,
+so the many ``except Exception`` fallbacks in the clients do not turn a
+cancelled request into a demo video; ``finally`` blocks and atomic writes
+still clean up on the way out.
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Optional, Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class GenerationCancelled(BaseException):
+    """Raised inside a request once its token has been cancelled."""
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag with cleanup callbacks."""
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = ""
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def cancel(self, reason: str = "Cancelled by user") -> bool:
+        """
+        Cancel the request and run every registered cleanup callback.
+        
+        Returns:
+            False if the token was already cancelled
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️  Cancellation cleanup failed: {e}")
+        return True
+    
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Register a cleanup callback; it runs immediately if already cancelled.
+        
+        Returns:
+            Function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+        
+        def unregister():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return unregister
+    
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason)
+    
+    async def sleep(self, seconds: float):
+        """asyncio.sleep that returns early (raising) when cancelled."""
+        self.raise_if_cancelled()
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+        
+        def wake():
+            loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(None))
+        
+        unregister = self.on_cancel(wake)
+        try:
+            await asyncio.wait([woken], timeout=seconds)
+        finally:
+            unregister()
+        self.raise_if_cancelled()
+    
+    def wait(self, seconds: float) -> bool:
+        """Blocking sleep that wakes on cancellation; returns True if cancelled."""
+        return self._event.wait(seconds)
+    
+    @contextmanager
+    def closing(self, resource):
+        """
+        Close resource (e.g. a streamed HTTP response) if the token is
+        cancelled while the block runs; the read that fails because of it
+        surfaces as GenerationCancelled.
+        """
+        unregister = self.on_cancel(resource.close)
+        try:
+            yield resource
+        except Exception:
+            # A read failing because we closed the socket is a cancellation
+            self.raise_if_cancelled()
+            raise
+        finally:
+            unregister()
+    
+    def guard(self, chunks: Iterable[T]) -> Iterator[T]:
+        """Pass chunks through, stopping with GenerationCancelled once cancelled."""
+        for chunk in chunks:
+            self.raise_if_cancelled()
+            yield chunk
+        self.raise_if_cancelled()
+
+
+def check(token: Optional[CancellationToken]):
+    """raise_if_cancelled for an optional token."""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+async def sleep(seconds: float, token: Optional[CancellationToken] = None):
+    """asyncio.sleep that honours an optional token."""
+    if token is None:
+        await asyncio.sleep(seconds)
+    else:
+        await token.sleep(seconds)
+
+
+def closing(token: Optional[CancellationToken], resource):
+    """CancellationToken.closing for an optional token."""
+    if token is None:
+        return nullcontext(resource)
+    return token.closing(resource)
+
+
+def guard(token: Optional[CancellationToken], chunks: Iterable[T]) -> Iterable[T]:
+    """CancellationToken.guard for an optional token."""
+    if token is None:
+        return chunks
+    return token.guard(chunks)
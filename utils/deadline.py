@@ -0,0 +1,259 @@
+"""
+Per-generation deadlines and adaptive HTTP timeouts.
+
+A Deadline is a CancellationToken with a time budget (Config.API_TIMEOUT by
+default). It is created once per generation and travels wherever the token
+already goes, so every stage sees how much of the budget is left: HTTP calls
+use the remaining budget as their timeout, queue waits and polling sleeps
+stop at the deadline, and a streamed body that is still arriving when it
+passes is cut off. One watcher thread per process tracks the deadlines that
+have a stream open, rather than a timer thread per HTTP call.
+
+Timeouts are also adaptive. LatencyTracker keeps recent latencies per
+provider and operation; once there are enough samples a call's timeout is a
+multiple of the observed p95 instead of the fixed default, so a hung request
+fails fast while a provider that is merely slow still gets the time it
+normally needs.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+from config import Config
+from utils import cancellation
+from utils.cancellation import CancellationToken, GenerationCancelled
+
+
+class DeadlineExceeded(GenerationCancelled):
+    """Raised once a generation has used up its time budget."""
+
+
+class Deadline(CancellationToken):
+    """Cancellation token that cancels itself when its budget runs out."""
+    
+    def __init__(self, budget: Optional[float] = None):
+        """
+        Args:
+            budget: Seconds the whole generation may take (Config.API_TIMEOUT if omitted)
+        """
+        super().__init__()
+        self.budget = Config.API_TIMEOUT if budget is None else budget
+        self.expires_at = time.monotonic() + self.budget
+        self.expired = False
+        self._open_streams = 0
+        self._watched = False
+    
+    def remaining(self) -> float:
+        """Seconds left in the budget."""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def _expire(self):
+        # Flag first: cancelling closes streams, and the reader that fails
+        # because of it must already see why
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.expired = True
+            self.reason = f"Deadline of {self.budget:g}s exceeded"
+        self.cancel(self.reason)
+    
+    def raise_if_cancelled(self):
+        if not self.cancelled and self.remaining() <= 0:
+            self._expire()
+        if self.expired:
+            raise DeadlineExceeded(self.reason)
+        super().raise_if_cancelled()
+    
+    def timeout(self, default: float) -> float:
+        """
+        Timeout for the next HTTP call: default, capped by the remaining budget.
+        
+        Raises:
+            DeadlineExceeded: No budget left
+        """
+        self.raise_if_cancelled()
+        return min(default, self.remaining())
+    
+    async def sleep(self, seconds: float):
+        await super().sleep(min(seconds, self.remaining()))
+    
+    def wait(self, seconds: float) -> bool:
+        return super().wait(min(seconds, self.remaining())) or self.remaining() <= 0
+    
+    @contextmanager
+    def closing(self, resource):
+        # HTTP timeouts bound each socket read, not the whole body; close a
+        # stream that is still going when the budget runs out
+        with self._lock:
+            self._open_streams += 1
+            watch, self._watched = not self._watched, True
+        if watch:
+            _watcher.watch(self)
+        try:
+            with super().closing(resource):
+                yield resource
+        finally:
+            with self._lock:
+                self._open_streams -= 1
+    
+    def _on_expiry(self):
+        """Called by the watcher once expires_at has passed."""
+        with self._lock:
+            self._watched = False
+            streaming = self._open_streams > 0
+        # Without an open stream the next check expires it lazily; cancelling
+        # now would also fire callbacks of a generation that already finished
+        if streaming:
+            self._expire()
+
+
+class _ExpiryWatcher:
+    """Single thread that calls Deadline._on_expiry as each deadline passes."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._heap = []
+        self._seq = itertools.count()
+        self._thread = None
+    
+    def watch(self, deadline: Deadline):
+        with self._lock:
+            heapq.heappush(self._heap, (deadline.expires_at, next(self._seq), deadline))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="deadline-watcher", daemon=True)
+                self._thread.start()
+            self._changed.notify()
+    
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._changed.wait(max(0.0, self._heap[0][0] - time.monotonic()) if self._heap else None)
+                _, _, deadline = heapq.heappop(self._heap)
+            try:
+                deadline._on_expiry()
+            except Exception as e:
+                print(f"⚠️  Deadline expiry failed: {e}")
+
+
+_watcher = _ExpiryWatcher()
+
+
+class LatencyTracker:
+    """Recent latencies per (provider, operation); thread-safe."""
+    
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: Samples kept per provider and operation
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[tuple, deque] = {}
+    
+    def record(self, provider: str, operation: str, seconds: float):
+        with self._lock:
+            samples = self._samples.setdefault((provider, operation), deque(maxlen=self.window))
+            samples.append(seconds)
+    
+    def percentile(self, provider: str, operation: str, percent: float) -> Optional[float]:
+        """Nearest-rank percentile, or None without enough samples."""
+        with self._lock:
+            ordered = sorted(self._samples.get((provider, operation), ()))
+        if len(ordered) < Config.ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return None
+        return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+    
+    def timeout(self, provider: str, operation: str, default: float) -> float:
+        """Adaptive timeout for a call, or default until enough calls were seen."""
+        observed = self.percentile(provider, operation, Config.ADAPTIVE_TIMEOUT_PERCENTILE)
+        if observed is None:
+            return default
+        return max(Config.MIN_REQUEST_TIMEOUT, observed * Config.ADAPTIVE_TIMEOUT_MULTIPLIER)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Sample count, p50, p95 and current timeout per provider operation."""
+        with self._lock:
+            keys = list(self._samples)
+        stats = {}
+        for provider, operation in keys:
+            stats[f"{provider}.{operation}"] = {
+                'samples': len(self._samples[(provider, operation)]),
+                'p50': self.percentile(provider, operation, 50),
+                'p95': self.percentile(provider, operation, 95),
+                'timeout': self.timeout(provider, operation, None)
+            }
+        return stats
+
+
+_tracker = LatencyTracker()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """The latency tracker shared by every client in this process."""
+    return _tracker
+
+
+def request_timeout(
+    token: Optional[CancellationToken],
+    provider: str,
+    operation: str,
+    default: float
+) -> float:
+    """
+    Timeout for an HTTP call: adaptive per provider operation, capped by the
+    deadline when the token has one.
+    
+    Raises:
+        GenerationCancelled: The token was cancelled or its deadline passed
+    """
+    timeout = _tracker.timeout(provider, operation, default)
+    if isinstance(token, Deadline):
+        return token.timeout(timeout)
+    cancellation.check(token)
+    return timeout
+
+
+def remaining(token: Optional[CancellationToken]) -> Optional[float]:
+    """Seconds left before the token's deadline, or None without one."""
+    if isinstance(token, Deadline):
+        return token.remaining()
+    return None
+
+
+class _Sample:
+    def __init__(self):
+        self.keep = True
+    
+    def discard(self):
+        """Leave this call out, e.g. an error response that came back early."""
+        self.keep = False
+
+
+@contextmanager
+def timed(provider: str, operation: str, timeout: float):
+    """
+    Record how long the block takes as a latency sample.
+    
+    Calls that ran into their timeout are recorded too (at the time they
+    took), so the estimate can grow when a provider gets slower; other
+    failures return early and would skew it low, so they are left out.
+    """
+    sample = _Sample()
+    started = time.monotonic()
+    try:
+        yield sample
+    except BaseException:
+        elapsed = time.monotonic() - started
+        if elapsed >= 0.9 * timeout:
+            _tracker.record(provider, operation, elapsed)
+        raise
+    if sample.keep:
+        _tracker.record(provider, operation, time.monotonic() - started)
@@ -0,0 +1,212 @@
+"""
+Fast-start remux for MP4 files.
+
+cv2's mp4v writer (and some providers) put the ``moov`` box - the index a
+player needs before it can decode anything - after the media data, so a
+browser has to download the whole file before playback starts. Moving
+``moov`` in front of ``mdat`` fixes that. The chunk offsets inside ``moov``
+(``stco`` / ``co64`` tables) point into the file, so every offset into data
+that moves is shifted by the size of ``moov``.
+
+Only ``moov`` is held in memory (it is an index, a few KB for a short
+clip); the media data is copied through in CHUNK_SIZE pieces into a temp
+file that replaces the original atomically.
+
+track_formats reads the same boxes to tell which codecs a file carries.
+"""
+
+import os
+import struct
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from utils.artifacts import CHUNK_SIZE
+from utils.file_io import atomic_write
+
+# Boxes whose children can contain chunk offset tables
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+# MIME types of ISO base media files
+FASTSTART_TYPES = {"video/mp4", "video/quicktime"}
+
+
+def faststart(path: str) -> Optional[Tuple[int, str]]:
+    """
+    Move the moov box of an MP4 in front of its media data, in place.
+    
+    Files that already start fast, are not MP4s, or cannot be parsed are
+    left untouched.
+    
+    Args:
+        path: MP4 file to rewrite
+    
+    Returns:
+        (size, sha256) of the rewritten file, or None if it was left as is
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        boxes = _top_level_boxes(f, file_size)
+        if boxes is None:
+            return None
+        
+        kinds = [kind for kind, _, _ in boxes]
+        if b"moov" not in kinds or b"mdat" not in kinds:
+            return None
+        moov_index = kinds.index(b"moov")
+        first_mdat = kinds.index(b"mdat")
+        if moov_index < first_mdat:
+            return None
+        
+        _, moov_offset, moov_size = boxes[moov_index]
+        f.seek(moov_offset)
+        moov = bytearray(f.read(moov_size))
+        
+        # Everything from the first mdat up to the old moov moves back by
+        # the size of moov; data after the old moov stays where it was
+        data_start = boxes[first_mdat][1]
+        try:
+            _shift_chunk_offsets(moov, 0, len(moov), moov_size, data_start, moov_offset)
+        except (ValueError, struct.error, OverflowError) as e:
+            print(f"⚠️  Skipping faststart for {os.path.basename(path)}: {e}")
+            return None
+        
+        plan: List[Union[bytes, Tuple[int, int]]] = [
+            (offset, size) for _, offset, size in boxes[:first_mdat]
+        ]
+        plan.append(bytes(moov))
+        plan.extend((offset, size) for kind, offset, size in boxes[first_mdat:] if kind != b"moov")
+        
+        return atomic_write(path, _copy(f, plan))
+
+
+def track_formats(path: str) -> Optional[List[Tuple[bytes, bytes]]]:
+    """
+    Handler type and sample entry format of every track in an MP4.
+    
+    E.g. [(b"vide", b"avc1"), (b"soun", b"mp4a")] for H.264 video with AAC
+    audio; a track without a sample description has an empty format.
+    
+    Returns:
+        The tracks in file order, or None if the file cannot be parsed
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        boxes = _top_level_boxes(f, file_size)
+        moov = next(((offset, size) for kind, offset, size in boxes or () if kind == b"moov"), None)
+        if moov is None:
+            return None
+        f.seek(moov[0])
+        data = f.read(moov[1])
+    
+    tracks = []
+    try:
+        for _, start, end in _child_boxes(data, 0, len(data)):  # moov itself
+            for trak_kind, trak_start, trak_end in _child_boxes(data, start, end):
+                if trak_kind != b"trak":
+                    continue
+                hdlr = _find_box(data, trak_start, trak_end, (b"mdia", b"hdlr"))
+                stsd = _find_box(data, trak_start, trak_end, (b"mdia", b"minf", b"stbl", b"stsd"))
+                # hdlr: version/flags, pre_defined, then the handler type;
+                # stsd: version/flags, entry count, then size and format of each entry
+                handler = data[hdlr[0] + 8:hdlr[0] + 12] if hdlr else b""
+                entry_format = data[stsd[0] + 12:stsd[0] + 16] if stsd else b""
+                tracks.append((handler, entry_format))
+    except (ValueError, struct.error):
+        return None
+    return tracks
+
+
+def _child_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """(type, payload start, box end) of every box between start and end of data."""
+    position = start
+    while position + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, position)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, position + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ValueError(f"malformed {kind!r} box")
+        yield kind, position + header, position + size
+        position += size
+
+
+def _find_box(data: bytes, start: int, end: int, path: Tuple[bytes, ...]) -> Optional[Tuple[int, int]]:
+    """(payload start, box end) of the first box along path below start..end."""
+    for wanted in path:
+        found = next(((child_start, child_end) for kind, child_start, child_end in _child_boxes(data, start, end)
+                      if kind == wanted), None)
+        if found is None:
+            return None
+        start, end = found
+    return start, end
+
+
+def _top_level_boxes(f: BinaryIO, file_size: int) -> Optional[List[Tuple[bytes, int, int]]]:
+    """(type, offset, size) of every top-level box, or None if malformed."""
+    boxes = []
+    offset = 0
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return None
+        size, kind = struct.unpack(">I4s", header[:8])
+        if size == 1:
+            if len(header) < 16:
+                return None
+            size = struct.unpack(">Q", header[8:16])[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8 or offset + size > file_size:
+            return None
+        boxes.append((kind, offset, size))
+        offset += size
+    return boxes
+
+
+def _shift_chunk_offsets(moov: bytearray, start: int, end: int, shift: int, low: int, high: int):
+    """Add shift to every chunk offset in [low, high) found between start and end."""
+    position = start
+    while position + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", moov, position)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", moov, position + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ValueError(f"malformed {kind!r} box")
+        
+        if kind in _CONTAINERS:
+            _shift_chunk_offsets(moov, position + header, position + size, shift, low, high)
+        elif kind in (b"stco", b"co64"):
+            # Full box: version/flags, entry count, then the offsets
+            count = struct.unpack_from(">I", moov, position + header + 4)[0]
+            table = position + header + 8
+            code = "I" if kind == b"stco" else "Q"
+            offsets = struct.unpack_from(f">{count}{code}", moov, table)
+            shifted = [offset + shift if low <= offset < high else offset for offset in offsets]
+            if kind == b"stco" and shifted and max(shifted) > 0xFFFFFFFF:
+                raise OverflowError("32-bit chunk offsets would overflow")
+            struct.pack_into(f">{count}{code}", moov, table, *shifted)
+        
+        position += size
+
+
+def _copy(f: BinaryIO, plan: List[Union[bytes, Tuple[int, int]]]) -> Iterator[bytes]:
+    """Yield the new file: literal bytes, or (offset, size) ranges of the original."""
+    for part in plan:
+        if isinstance(part, bytes):
+            yield part
+            continue
+        offset, remaining = part
+        f.seek(offset)
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError("file shrank while being remuxed")
+            yield chunk
+            remaining -= len(chunk)
@@ -3,22 +3,49 @@ File handling utilities for video generation and management.
 """
 
 import os
+import shutil
 import tempfile
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import Optional
-import cv2
-import numpy as np
-from config import VideoProvider
+from typing import Optional, Iterable, Dict, TYPE_CHECKING
+from config import Config, VideoProvider
+from utils.artifacts import MediaArtifact, write_artifact
+from utils.faststart import FASTSTART_TYPES, faststart
+from utils.file_io import run_io, unique_filename
+from utils.size_target import SIZE_TARGET_TYPES, fit_to_size
+from utils.storage import StorageBackend, get_storage_backend
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# cv2 and numpy are imported inside the methods that need them; together they
+# dominate cold-start time and most requests never render a video locally.
+
+# Fallback videos streaming live while they render: cache path -> live directory
+_live_fallbacks: Dict[str, str] = {}
+_live_lock = threading.RLock()
 
 
 class FileHandler:
     """Handles file operations for video generation and storage."""
     
-    def __init__(self):
+    def __init__(self, storage_mode: Optional[str] = None, storage: Optional[StorageBackend] = None):
         self.temp_dir = tempfile.gettempdir()
         self.output_dir = os.path.join(os.getcwd(), "generated_videos")
+        self.fallback_dir = os.path.join(self.output_dir, "fallback")
+        self.storage_mode = storage_mode or Config.STORAGE_MODE
         self.ensure_output_directory()
+        
+        # Shared persistence tier; output_dir stays the local working copy
+        self.storage = storage or get_storage_backend(self.output_dir)
+        
+        # Content-addressed mode keeps blobs sharded by digest and names in an index
+        self.blob_store = None
+        if self.storage_mode == "cas":
+            from utils.blob_store import ContentAddressedStore
+            self.blob_store = ContentAddressedStore(os.path.join(self.output_dir, "store"))
     
     def ensure_output_directory(self):
         """Ensure the output directory exists."""
@@ -29,6 +56,9 @@ class FileHandler:
         """
         Save video data to a file.
         
+        The file is written under a collision-free name via a temp file and
+        an atomic rename, so concurrent saves never overwrite each other.
+        
         Args:
             video_data: Raw video data as bytes
             prompt: Original prompt used for generation
@@ -37,88 +67,523 @@ class FileHandler:
         Returns:
             Path to saved video file or None if failed
         """
+        artifact = self.save_artifact([video_data], prompt, provider)
+        return artifact.path if artifact else None
+    
+    async def save_video_async(self, video_data: bytes, prompt: str, provider: VideoProvider) -> Optional[str]:
+        """save_video on the shared I/O thread pool, for use from async code."""
+        return await run_io(self.save_video, video_data, prompt, provider)
+    
+    def save_artifact(
+        self,
+        chunks: Iterable[bytes],
+        prompt: str,
+        provider: VideoProvider,
+        extension: str = ".mp4",
+        mime_type: str = "video/mp4"
+    ) -> Optional[MediaArtifact]:
+        """
+        Stream media chunks to a file and return a handle to it.
+        
+        The media never has to be held in memory as a whole; chunks are
+        written and hashed as they arrive, and the file only appears under
+        its final name once it is complete.
+        
+        Args:
+            chunks: Iterable of byte chunks
+            prompt: Original prompt used for generation
+            provider: Video provider used
+            extension: File extension including the dot
+            mime_type: MIME type of the media
+            
+        Returns:
+            MediaArtifact for the saved file or None if failed
+        """
         try:
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_prompt = "".join(c for c in prompt[:30] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_prompt = safe_prompt.replace(' ', '_')
+            filename = self._build_filename(prompt, provider, extension)
             
-            filename = f"{timestamp}_{provider.value}_{safe_prompt}.mp4"
-            filepath = os.path.join(self.output_dir, filename)
+            if self.blob_store is not None and self._needs_rewrite(mime_type):
+                # The digest must cover the rewritten file, so stage and rewrite first
+                staging_path = os.path.join(self.blob_store.staging_dir, f"{uuid.uuid4().hex}{extension}")
+                staged = write_artifact(chunks, staging_path, mime_type)
+                if staged.size == 0:
+                    os.remove(staging_path)
+                    print(f"Failed to save media file: {filename}")
+                    return None
+                return self.store_rendered_file(staging_path, prompt, provider, mime_type)
             
-            # Save video data
-            with open(filepath, 'wb') as f:
-                f.write(video_data)
+            if self.blob_store is not None:
+                # Identical content is stored once; the name only lives in the index
+                artifact = self.blob_store.put_stream(
+                    chunks,
+                    filename,
+                    mime_type,
+                    extension,
+                    {"prompt": prompt, "provider": provider.value}
+                )
+                if artifact.size == 0:
+                    self.blob_store.delete(filename)
+                    print(f"Failed to save media file: {filename}")
+                    return None
+                return self._publish(artifact)
             
-            # Verify file was saved successfully
-            if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-                return filepath
+            filepath = os.path.join(self.output_dir, filename)
+            artifact = write_artifact(chunks, filepath, mime_type)
+            
+            # Size comes from the write itself; no need to re-stat the file
+            if artifact.size > 0:
+                return self._publish(self._finalize(artifact))
             else:
-                print(f"Failed to save video file: {filepath}")
+                print(f"Failed to save media file: {filepath}")
+                os.remove(filepath)
                 return None
                 
         except Exception as e:
-            print(f"Error saving video: {str(e)}")
+            print(f"Error saving media: {str(e)}")
             return None
     
+    def store_rendered_file(
+        self,
+        path: str,
+        prompt: str,
+        provider: VideoProvider,
+        mime_type: str = "video/mp4"
+    ) -> MediaArtifact:
+        """
+        Register a locally rendered file (e.g. from cv2.VideoWriter) as an artifact.
+        
+        In content-addressed mode the file is moved into the blob store, so
+        it must be on the same filesystem as output_dir.
+        """
+        if self.blob_store is None:
+            return self._publish(self._finalize(MediaArtifact.from_file(path, mime_type)))
+        
+        self._finalize(MediaArtifact.from_file(path, mime_type))
+        name = self._build_filename(prompt, provider, os.path.splitext(path)[1])
+        artifact = self.blob_store.put_file(path, name, mime_type, {"prompt": prompt, "provider": provider.value})
+        return self._publish(artifact)
+    
+    @staticmethod
+    def _needs_faststart(mime_type: str) -> bool:
+        """Whether saved media of this type is remuxed for fast start."""
+        return Config.FASTSTART and mime_type in FASTSTART_TYPES
+    
+    @staticmethod
+    def _needs_size_check(mime_type: str) -> bool:
+        """Whether saved media of this type is held to its size budget."""
+        return Config.ENFORCE_MAX_FILE_SIZE and mime_type in SIZE_TARGET_TYPES
+    
+    def _needs_rewrite(self, mime_type: str) -> bool:
+        """Whether _finalize may rewrite saved media of this type."""
+        return self._needs_faststart(mime_type) or self._needs_size_check(mime_type)
+    
+    def _finalize(self, artifact: MediaArtifact) -> MediaArtifact:
+        """Fit a saved video to its size budget, then remux it for fast start."""
+        return self._faststart(self._fit_to_size(artifact))
+    
+    def _fit_to_size(self, artifact: MediaArtifact) -> MediaArtifact:
+        """
+        Re-encode a saved video that is over its size budget (see utils.size_target).
+        
+        Returns:
+            The artifact, with size and digest updated if the file changed
+        """
+        if not self._needs_size_check(artifact.mime_type):
+            return artifact
+        if artifact.size <= Config.MAX_FILE_SIZE and not Config.TARGET_BANDWIDTH:
+            # Without a bandwidth class the budget is MAX_FILE_SIZE itself
+            return artifact
+        
+        try:
+            result = fit_to_size(artifact.path)
+        except Exception as e:
+            print(f"⚠️  Size-targeted re-encode failed for {artifact.path}: {str(e)}")
+            return artifact
+        if result is not None:
+            print(
+                f"📉 Re-encoded {os.path.basename(artifact.path)} at {result['width']}x{result['height']} "
+                f"{result['fps']:g} fps to fit its size budget ({result['size']} bytes)"
+            )
+            artifact.size, artifact._sha256 = result["size"], None
+        return artifact
+    
+    def _faststart(self, artifact: MediaArtifact) -> MediaArtifact:
+        """
+        Remux a saved MP4 so its index comes first (see utils.faststart).
+        
+        Returns:
+            The artifact, with size and digest updated if the file changed
+        """
+        if not self._needs_faststart(artifact.mime_type):
+            return artifact
+        
+        try:
+            remuxed = faststart(artifact.path)
+        except Exception as e:
+            print(f"⚠️  Faststart remux failed for {artifact.path}: {str(e)}")
+            return artifact
+        if remuxed is not None:
+            artifact.size, artifact._sha256 = remuxed
+        return artifact
+    
+    def _publish(self, artifact: MediaArtifact) -> MediaArtifact:
+        """
+        Store a locally saved artifact in the storage backend.
+        
+        The key mirrors the path under output_dir, so content-addressed blobs
+        keep their digest-based keys (and stay deduplicated) remotely too.
+        """
+        key = os.path.relpath(artifact.path, self.output_dir).replace(os.sep, "/")
+        try:
+            if not (self.storage.is_remote and self.storage.exists(key)):
+                self.storage.put_file(key, artifact.path, artifact.mime_type)
+            artifact.storage_key = key
+        except Exception as e:
+            print(f"⚠️  Failed to publish {key} to storage backend: {str(e)}")
+        return artifact
+    
+    def artifact_url(self, artifact: MediaArtifact, expires_in: Optional[int] = None) -> str:
+        """
+        Get a URL (presigned for remote backends) or path to read an artifact from.
+        
+        Args:
+            artifact: Saved artifact
+            expires_in: URL lifetime in seconds (remote backends only)
+            
+        Returns:
+            URL or local path usable by st.video / st.image
+        """
+        if artifact.storage_key:
+            return self.storage.read_url(artifact.storage_key, expires_in)
+        return artifact.path
+    
+    def fetch_artifact(self, storage_key: str, mime_type: Optional[str] = None) -> Optional[MediaArtifact]:
+        """
+        Get a local copy of an artifact that may have been saved by another replica.
+        
+        Args:
+            storage_key: Key returned in MediaArtifact.storage_key
+            mime_type: MIME type (guessed from the extension if omitted)
+            
+        Returns:
+            MediaArtifact with a local path, or None if the object does not exist
+        """
+        try:
+            local_path = os.path.join(self.output_dir, *storage_key.split("/"))
+            if not os.path.isfile(local_path):
+                if not self.storage.exists(storage_key):
+                    return None
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                self.storage.download_to(storage_key, local_path)
+            
+            artifact = MediaArtifact.from_file(local_path, mime_type)
+            artifact.storage_key = storage_key
+            return artifact
+            
+        except Exception as e:
+            print(f"Error fetching artifact: {str(e)}")
+            return None
+    
+    def discard_artifact(self, artifact: MediaArtifact):
+        """Delete an artifact that is no longer needed (e.g. an intermediate segment)."""
+        try:
+            if self.blob_store is not None and artifact.name:
+                # Shared blobs are only removed once no other name references them
+                self.blob_store.delete(artifact.name)
+            elif artifact.exists():
+                os.remove(artifact.path)
+            
+            if self.storage.is_remote and artifact.storage_key and not artifact.exists():
+                self.storage.delete(artifact.storage_key)
+        except Exception as e:
+            print(f"Error discarding artifact: {str(e)}")
+    
+    def get_artifact(self, filename: str) -> Optional[MediaArtifact]:
+        """Look up a saved artifact by its human-readable file name."""
+        if self.blob_store is not None:
+            return self.blob_store.get(filename)
+        
+        filepath = os.path.join(self.output_dir, filename)
+        if not os.path.isfile(filepath):
+            return None
+        return MediaArtifact.from_file(filepath)
+    
+    async def save_artifact_async(
+        self,
+        chunks: Iterable[bytes],
+        prompt: str,
+        provider: VideoProvider,
+        extension: str = ".mp4",
+        mime_type: str = "video/mp4"
+    ) -> Optional[MediaArtifact]:
+        """save_artifact on the shared I/O thread pool, for use from async code."""
+        return await run_io(self.save_artifact, chunks, prompt, provider, extension, mime_type)
+    
+    def _build_filename(self, prompt: str, provider: VideoProvider, extension: str) -> str:
+        """Build a unique, human-readable file name for generated media."""
+        safe_prompt = "".join(c for c in prompt[:30] if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        safe_prompt = safe_prompt.replace(' ', '_')
+        return unique_filename(f"{provider.value}_{safe_prompt}", extension)
+    
     def create_temp_file(self, suffix: str = ".mp4") -> str:
         """Create a temporary file and return its path."""
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
         temp_file.close()
         return temp_file.name
     
-    def create_demo_video(self, prompt: str, duration: int, style: str, provider: VideoProvider) -> str:
+    def create_demo_video(
+        self,
+        prompt: str,
+        duration: int,
+        style: str,
+        provider: VideoProvider,
+        resolution: str = "1280x720",
+        filepath: Optional[str] = None,
+        live_dir: Optional[str] = None
+    ) -> Optional[str]:
         """
         Create a demo video for demonstration purposes.
         
         Args:
-            prompt: Text prompt for the video
+            prompt: Text prompt for the video (empty to omit the prompt overlay)
             duration: Duration in seconds
             style: Video style
             provider: Provider used
+            resolution: Output resolution as "WIDTHxHEIGHT"
+            filepath: Optional output path (defaults to a timestamped file)
+            live_dir: Render as live fMP4/HLS segments into this directory
+                instead (see new_live_dir); filepath is then ignored
             
         Returns:
-            Path to created demo video
+            Path to created demo video (the live stream.mp4 with live_dir),
+            or None if rendering failed
         """
         try:
+            from utils.frame_pipeline import FramePool, encode_frames
+            
             # Create a simple demo video with text overlay
-            width, height = 1280, 720
+            width, height = self.parse_resolution(resolution)
             fps = 24
             total_frames = duration * fps
             
             # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"demo_{timestamp}_{provider.value}.mp4"
-            filepath = os.path.join(self.output_dir, filename)
+            if filepath is None:
+                filename = unique_filename(f"demo_{provider.value}", ".mp4")
+                filepath = os.path.join(self.output_dir, filename)
             
-            # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(filepath, fourcc, fps, (width, height))
+            # Gradients are drawn into pooled buffers on one thread, text on
+            # another, while this thread encodes
+            pool = FramePool((height, width, 3))
             
-            # Generate frames
-            for frame_num in range(total_frames):
-                # Create a gradient background
-                frame = self._create_gradient_frame(width, height, frame_num, total_frames, style)
-                
-                # Add text overlay
+            def render():
+                for frame_num in range(total_frames):
+                    yield self._create_gradient_frame(
+                        width, height, frame_num, total_frames, style, out=pool.acquire()
+                    )
+            
+            def overlay(frame_num, frame):
                 self._add_text_overlay(frame, prompt, provider, frame_num, total_frames)
-                
-                out.write(frame)
             
-            out.release()
-            cv2.destroyAllWindows()
+            writer = None
+            if live_dir is not None:
+                from utils.live_stream import HLSWriter
+                writer = HLSWriter(live_dir, fps, (width, height))
+                filepath = writer.stream_path
+            
+            encode_frames(filepath, fps, (width, height), render(), overlay, pool, writer=writer)
             
             return filepath
             
         except Exception as e:
             print(f"Error creating demo video: {str(e)}")
-            # Return a placeholder path
-            return self.create_temp_file()
+            # Leave no half-written video behind (live directories are pruned)
+            if live_dir is None and filepath is not None and os.path.exists(filepath):
+                os.remove(filepath)
+            return None
+    
+    def new_live_dir(self) -> str:
+        """Fresh directory under Config.LIVE_OUTPUT_DIR for a live (fMP4/HLS) render."""
+        self._prune_live_dirs()
+        live_dir = os.path.join(os.path.abspath(Config.LIVE_OUTPUT_DIR), uuid.uuid4().hex)
+        os.makedirs(live_dir)
+        return live_dir
+    
+    def _prune_live_dirs(self):
+        """Remove live directories older than Config.LIVE_RETENTION_SECONDS."""
+        # They outlive their render so players can finish
+        live_root = os.path.abspath(Config.LIVE_OUTPUT_DIR)
+        if not os.path.isdir(live_root):
+            return
+        expired = time.time() - Config.LIVE_RETENTION_SECONDS
+        with _live_lock:
+            rendering = set(_live_fallbacks.values())
+        for name in os.listdir(live_root):
+            live_dir = os.path.join(live_root, name)
+            if live_dir not in rendering and os.path.getmtime(live_dir) < expired:
+                shutil.rmtree(live_dir, ignore_errors=True)
+    
+    def fallback_path(self, style: str, duration: int, resolution: str) -> str:
+        """Where the fallback video for a (style, duration, resolution) is cached."""
+        safe_style = "".join(c for c in style if c.isalnum()).lower() or "default"
+        return os.path.join(self.fallback_dir, f"fallback_{safe_style}_{duration}s_{resolution}.mp4")
     
-    def _create_gradient_frame(self, width: int, height: int, frame_num: int, total_frames: int, style: str) -> np.ndarray:
-        """Create a gradient background frame."""
-        # Create base gradient
-        gradient = np.zeros((height, width, 3), dtype=np.uint8)
+    def get_fallback_video(
+        self,
+        style: str,
+        duration: int,
+        resolution: str,
+        provider: VideoProvider
+    ) -> Optional[str]:
+        """
+        Get a locally rendered, style-appropriate fallback video.
+        
+        Fallback videos carry no prompt overlay, so they are rendered once per
+        (style, duration, resolution) and served from the fallback cache
+        directory afterwards. No network I/O is involved.
+        
+        Args:
+            style: Video style
+            duration: Duration in seconds
+            resolution: Output resolution as "WIDTHxHEIGHT"
+            provider: Provider shown in the watermark
+            
+        Returns:
+            Path to the cached fallback video or None if rendering failed
+        """
+        filepath = self.fallback_path(style, duration, resolution)
+        filename = os.path.basename(filepath)
+        
+        # Cache hit
+        if os.path.isfile(filepath) and os.path.getsize(filepath) > 0:
+            return filepath
+        
+        try:
+            os.makedirs(self.fallback_dir, exist_ok=True)
+            
+            # Render to a private file and rename into place, so concurrent
+            # sessions never see (or serve) a half-written video
+            temp_path = os.path.join(self.fallback_dir, f".{uuid.uuid4().hex}.mp4")
+            rendered = self.create_demo_video("", duration, style, provider, resolution, temp_path)
+            
+            if rendered != temp_path or not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
+                print(f"Failed to render fallback video: {filename}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return None
+            
+            return self._cache_fallback(temp_path, filepath)
+            
+        except Exception as e:
+            print(f"Error creating fallback video: {str(e)}")
+            return None
+    
+    def _cache_fallback(self, temp_path: str, filepath: str) -> str:
+        """Move a rendered fallback video from temp_path into the cache."""
+        # Index first, so browsers start playing before the whole file arrives
+        self._faststart(MediaArtifact.from_file(temp_path, "video/mp4"))
+        os.replace(temp_path, filepath)
+        return filepath
+    
+    def get_live_fallback(
+        self,
+        style: str,
+        duration: int,
+        resolution: str,
+        provider: VideoProvider,
+        first_segment_timeout: float = 10.0
+    ) -> Optional[str]:
+        """
+        Start streaming an uncached fallback video while it renders.
+        
+        The video is rendered on a background thread as live HLS segments
+        (see create_demo_video) and moved into the fallback cache once done,
+        so later requests are served by get_fallback_video. Concurrent
+        requests for the same video share one render.
+        
+        Args:
+            style: Video style
+            duration: Duration in seconds
+            resolution: Output resolution as "WIDTHxHEIGHT"
+            provider: Provider shown in the watermark
+            first_segment_timeout: Seconds to wait for the first segment
+            
+        Returns:
+            The live directory once its playlist has a segment, or None if
+            the video is already cached or the render produced nothing
+        """
+        from utils.live_stream import PLAYLIST_NAME
+        
+        filepath = self.fallback_path(style, duration, resolution)
+        if os.path.isfile(filepath) and os.path.getsize(filepath) > 0:
+            return None
+        
+        with _live_lock:
+            live_dir = _live_fallbacks.get(filepath)
+            if live_dir is None:
+                live_dir = self.new_live_dir()
+                _live_fallbacks[filepath] = live_dir
+                threading.Thread(
+                    target=self._render_live_fallback,
+                    args=(filepath, live_dir, style, duration, resolution, provider),
+                    name="live-fallback",
+                    daemon=True
+                ).start()
+        
+        # The playlist is only written once it lists a segment
+        playlist = os.path.join(live_dir, PLAYLIST_NAME)
+        give_up = time.monotonic() + first_segment_timeout
+        while not os.path.exists(playlist) and time.monotonic() < give_up:
+            with _live_lock:
+                if _live_fallbacks.get(filepath) != live_dir:
+                    break
+            time.sleep(0.05)
+        return live_dir if os.path.exists(playlist) else None
+    
+    def _render_live_fallback(
+        self,
+        filepath: str,
+        live_dir: str,
+        style: str,
+        duration: int,
+        resolution: str,
+        provider: VideoProvider
+    ):
+        """Render a fallback video into live_dir, then copy it into the cache."""
+        try:
+            rendered = self.create_demo_video("", duration, style, provider, resolution, live_dir=live_dir)
+            if not rendered or not os.path.exists(rendered) or os.path.getsize(rendered) == 0:
+                print(f"Failed to render fallback video: {os.path.basename(filepath)}")
+                return
+            
+            # The live directory keeps serving its segments; the cache gets a copy
+            os.makedirs(self.fallback_dir, exist_ok=True)
+            temp_path = os.path.join(self.fallback_dir, f".{uuid.uuid4().hex}.mp4")
+            shutil.copyfile(rendered, temp_path)
+            self._cache_fallback(temp_path, filepath)
+        except Exception as e:
+            print(f"Error creating fallback video: {str(e)}")
+        finally:
+            with _live_lock:
+                _live_fallbacks.pop(filepath, None)
+    
+    @staticmethod
+    def parse_resolution(resolution: str) -> tuple:
+        """Parse a "WIDTHxHEIGHT" string into an (width, height) tuple."""
+        width, height = resolution.lower().split("x")
+        return int(width), int(height)
+    
+    def _create_gradient_frame(
+        self,
+        width: int,
+        height: int,
+        frame_num: int,
+        total_frames: int,
+        style: str,
+        out: Optional["np.ndarray"] = None
+    ) -> "np.ndarray":
+        """Create a gradient background frame (drawn into out if given)."""
+        import cv2
+        import numpy as np
         
         # Style-based color schemes
         color_schemes = {
@@ -127,6 +592,7 @@ class FileHandler:
             "Artistic": [(60, 20, 80), (200, 100, 180)],
             "Fantasy": [(40, 20, 60), (160, 100, 200)],
             "Sci-Fi": [(10, 30, 50), (50, 150, 255)],
+            "Animated": [(80, 40, 20), (255, 200, 100)],
             "Animation": [(80, 40, 20), (255, 200, 100)],
             "Abstract": [(30, 50, 30), (150, 200, 150)],
             "Documentary": [(50, 50, 50), (150, 150, 150)]
@@ -136,19 +602,23 @@ class FileHandler:
         
         # Animate colors based on frame
         progress = frame_num / total_frames
-        color1 = np.array(colors[0])
-        color2 = np.array(colors[1])
+        color1 = np.array(colors[0], dtype=np.float32)
+        color2 = np.array(colors[1], dtype=np.float32)
         
-        # Create animated gradient
-        for y in range(height):
-            blend = (y / height + progress * 0.5) % 1.0
-            color = color1 * (1 - blend) + color2 * blend
-            gradient[y, :] = color.astype(np.uint8)
+        # Create animated gradient: blend one colour per row, then repeat across
+        blend = (np.arange(height, dtype=np.float32) / height + progress * 0.5) % 1.0
+        rows = color1 * (1 - blend[:, None]) + color2 * blend[:, None]
+        if out is None:
+            out = np.empty((height, width, 3), dtype=np.uint8)
+        # Nearest-neighbour widening of the one-pixel column is the fastest fill
+        cv2.resize(rows.astype(np.uint8)[:, None, :], (width, height), dst=out, interpolation=cv2.INTER_NEAREST)
         
-        return gradient
+        return out
     
-    def _add_text_overlay(self, frame: np.ndarray, prompt: str, provider: VideoProvider, frame_num: int, total_frames: int):
+    def _add_text_overlay(self, frame: "np.ndarray", prompt: str, provider: VideoProvider, frame_num: int, total_frames: int):
         """Add text overlay to frame."""
+        import cv2
+        
         height, width = frame.shape[:2]
         
         # Add provider watermark
@@ -156,9 +626,10 @@ class FileHandler:
                    (20, height - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         # Add prompt (truncated)
-        prompt_text = prompt[:50] + "..." if len(prompt) > 50 else prompt
-        cv2.putText(frame, f"Prompt: {prompt_text}", 
-                   (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        if prompt:
+            prompt_text = prompt[:50] + "..." if len(prompt) > 50 else prompt
+            cv2.putText(frame, f"Prompt: {prompt_text}", 
+                       (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         
         # Add demo watermark
         cv2.putText(frame, "DEMO VIDEO", 
@@ -171,6 +642,8 @@ class FileHandler:
     def get_video_info(self, video_path: str) -> dict:
         """Get information about a video file."""
         try:
+            import cv2
+            
             cap = cv2.VideoCapture(video_path)
             
             if not cap.isOpened():
@@ -198,7 +671,7 @@ class FileHandler:
             return {}
     
     def cleanup(self):
-        """Clean up temporary files."""
+        """Clean up temporary files and expired live renders."""
         try:
             # Clean up old temporary files
             temp_files = [f for f in os.listdir(self.temp_dir) if f.startswith('tmp') and f.endswith('.mp4')]
@@ -207,12 +680,28 @@ class FileHandler:
                     os.remove(os.path.join(self.temp_dir, temp_file))
                 except:
                     pass
+            
+            self._prune_live_dirs()
         except Exception as e:
             print(f"Cleanup error: {str(e)}")
     
-    def list_generated_videos(self) -> list:
-        """List all generated videos."""
+    def list_generated_videos(self, limit: int = 100) -> list:
+        """List generated videos, newest first."""
         try:
+            if self.blob_store is not None:
+                # Indexed query; no directory scan regardless of file count
+                return [
+                    {
+                        "filename": entry["name"],
+                        "filepath": entry["path"],
+                        "size": entry["size"],
+                        "created": datetime.fromtimestamp(entry["created"]),
+                        "modified": datetime.fromtimestamp(entry["created"]),
+                        "sha256": entry["sha256"]
+                    }
+                    for entry in self.blob_store.list(limit=limit, mime_prefix="video/")
+                ]
+            
             if not os.path.exists(self.output_dir):
                 return []
             
@@ -231,7 +720,7 @@ class FileHandler:
             
             # Sort by creation time, newest first
             videos.sort(key=lambda x: x["created"], reverse=True)
-            return videos
+            return videos[:limit]
             
         except Exception as e:
             print(f"Error listing videos: {str(e)}")
@@ -0,0 +1,119 @@
+"""
+Non-blocking, atomic file writes.
+
+Every write goes to a private temp file in the destination directory and is
+renamed into place with os.replace, so readers only ever see complete files
+and concurrent writers never clobber each other's partial output. fsync is
+opt-in through Config.FSYNC_WRITES. Async callers hand the work to a small
+shared thread pool so the event loop never blocks on disk I/O.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Iterable, Union, Tuple
+
+from config import Config
+
+_io_executor = ThreadPoolExecutor(max_workers=Config.IO_WORKERS, thread_name_prefix="file-io")
+
+
+def unique_filename(stem: str, extension: str) -> str:
+    """
+    Build a collision-free file name.
+    
+    Args:
+        stem: Human-readable part of the name
+        extension: File extension including the dot
+    
+    Returns:
+        "<timestamp with microseconds>_<stem>_<random suffix><extension>"
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return f"{timestamp}_{stem}_{uuid.uuid4().hex[:8]}{extension}"
+
+
+def atomic_write(
+    path: str,
+    data: Union[bytes, memoryview, Iterable[bytes]],
+    fsync: Optional[bool] = None
+) -> Tuple[int, str]:
+    """
+    Write data to path atomically.
+    
+    Args:
+        path: Destination file path
+        data: Bytes, or an iterable of byte chunks to stream
+        fsync: Flush to stable storage before renaming (defaults to
+            Config.FSYNC_WRITES)
+    
+    Returns:
+        Tuple of (bytes written, hex SHA-256 digest)
+    """
+    if fsync is None:
+        fsync = Config.FSYNC_WRITES
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    chunks = [data] if isinstance(data, (bytes, bytearray, memoryview)) else data
+    
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # mkstemp creates files as 0600; published files get normal permissions
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    if fsync:
+        _fsync_directory(directory)
+    
+    return size, digest.hexdigest()
+
+
+async def atomic_write_async(
+    path: str,
+    data: Union[bytes, memoryview, Iterable[bytes]],
+    fsync: Optional[bool] = None
+) -> Tuple[int, str]:
+    """atomic_write on the shared I/O thread pool."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_io_executor, atomic_write, path, data, fsync)
+
+
+async def run_io(func, *args):
+    """Run any blocking file operation on the shared I/O thread pool."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_io_executor, func, *args)
+
+
+def _fsync_directory(directory: str):
+    """Persist the rename itself (no-op where directories cannot be opened)."""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
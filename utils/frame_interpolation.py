@@ -0,0 +1,291 @@
+"""
+Temporal frame interpolation for stretching clips to a target duration or fps.
+
+Provider clips are often shorter than the requested duration (Pika stops at
+6 seconds). Instead of another API round-trip, output frames are spread
+evenly over the source clip and every frame that falls between two source
+frames is synthesized from them:
+
+- "blend": a cross-fade weighted by the frame's position, computed for a
+  batch of output frames per array operation.
+- "motion": block-matching motion estimation between the two source frames
+  (every candidate offset is scored for all blocks at once), then both
+  frames are warped part of the way along the motion before blending, so
+  moving content travels instead of ghosting.
+
+Frames are streamed: only the current pair of source frames, its motion
+field and one batch of output frames are in memory at any time.
+"""
+
+import os
+from typing import Iterator, List, Optional, TYPE_CHECKING
+
+from config import Config, VideoProvider
+from utils.artifacts import MediaArtifact
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Motion is estimated at this fraction of the frame size
+MOTION_SCALE = 0.5
+
+# Extra cost per pixel of offset, so flat blocks stay put instead of
+# matching noise somewhere else
+MOTION_BIAS = 0.5
+
+
+class FrameInterpolator:
+    """Resamples a stream of frames to another frame count."""
+    
+    def __init__(
+        self,
+        method: Optional[str] = None,
+        block: Optional[int] = None,
+        search: Optional[int] = None,
+        batch: Optional[int] = None
+    ):
+        """
+        Args:
+            method: "blend" or "motion" (Config.INTERPOLATION_METHOD if omitted)
+            block: Block size for motion estimation, in downscaled pixels
+            search: Largest offset tried per block, in downscaled pixels
+            batch: Output frames blended per array operation
+        """
+        self.method = method or Config.INTERPOLATION_METHOD
+        self.block = block or Config.INTERPOLATION_BLOCK
+        self.search = search or Config.INTERPOLATION_SEARCH
+        self.batch = batch or Config.INTERPOLATION_BATCH
+    
+    def interpolate(
+        self,
+        frames: Iterator["np.ndarray"],
+        source_count: int,
+        target_count: int
+    ) -> Iterator["np.ndarray"]:
+        """
+        Yield target_count frames spread evenly over the source frames.
+        
+        The first and last output frames are the first and last source
+        frames. If the source ends early, its last frame is held.
+        
+        Args:
+            frames: Source frames, all the same size
+            source_count: Number of source frames (may be an estimate)
+            target_count: Number of frames to yield
+        """
+        frames = iter(frames)
+        previous = next(frames, None)
+        if previous is None:
+            return
+        following = next(frames, None)
+        
+        step = (source_count - 1) / (target_count - 1) if target_count > 1 else 0.0
+        index = 0
+        motion = None
+        weights: List[float] = []
+        
+        for frame_number in range(target_count):
+            position = frame_number * step
+            
+            # Move on to the source pair that contains this position
+            while following is not None and position >= index + 1:
+                yield from self._between(previous, following, weights, motion)
+                weights = []
+                previous, following = following, next(frames, None)
+                index += 1
+                motion = None
+            
+            if following is None:
+                yield previous
+                continue
+            
+            if self.method == "motion" and motion is None:
+                motion = self._estimate_motion(previous, following)
+            weights.append(position - index)
+            if len(weights) == self.batch:
+                yield from self._between(previous, following, weights, motion)
+                weights = []
+        
+        if weights:
+            yield from self._between(previous, following, weights, motion)
+    
+    def retime(
+        self,
+        input_path: str,
+        output_path: str,
+        duration: Optional[float] = None,
+        fps: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Write a video stretched (or squeezed) to a duration and frame rate.
+        
+        Args:
+            input_path: Source video
+            output_path: Destination MP4 path
+            duration: Target length in seconds (the source length if omitted)
+            fps: Target frame rate (Config.INTERPOLATION_FPS if omitted)
+        
+        Returns:
+            output_path on success, None if the source could not be read
+        """
+        import cv2
+        from utils.frame_pipeline import encode_frames
+        
+        cap = cv2.VideoCapture(input_path)
+        try:
+            source_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            source_fps = cap.get(cv2.CAP_PROP_FPS) or 24.0
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            if source_count <= 0 or size[0] <= 0:
+                return None
+            
+            fps = fps or Config.INTERPOLATION_FPS
+            duration = duration or source_count / source_fps
+            target_count = max(1, int(round(duration * fps)))
+            
+            frames = self.interpolate(read_frames(cap), source_count, target_count)
+            written = encode_frames(output_path, fps, size, frames)
+        finally:
+            cap.release()
+        
+        if written == 0 or not os.path.exists(output_path):
+            return None
+        return output_path
+    
+    def _between(
+        self,
+        previous: "np.ndarray",
+        following: "np.ndarray",
+        weights: List[float],
+        motion: Optional["np.ndarray"]
+    ) -> Iterator["np.ndarray"]:
+        """Frames at the given fractional positions between two source frames."""
+        if not weights:
+            return
+        if motion is None:
+            yield from self._blend(previous, following, weights)
+        else:
+            yield from self._warp(previous, following, weights, motion)
+    
+    @staticmethod
+    def _blend(previous: "np.ndarray", following: "np.ndarray", weights: List[float]) -> Iterator["np.ndarray"]:
+        """Cross-fade, all weights of the batch in one array operation."""
+        import numpy as np
+        
+        base = previous.astype(np.float32)
+        delta = following.astype(np.float32) - base
+        alphas = np.asarray(weights, dtype=np.float32)[:, None, None, None]
+        batch = base + alphas * delta
+        np.clip(batch + 0.5, 0, 255, out=batch)
+        yield from batch.astype(np.uint8)
+    
+    def _warp(
+        self,
+        previous: "np.ndarray",
+        following: "np.ndarray",
+        weights: List[float],
+        motion: "np.ndarray"
+    ) -> Iterator["np.ndarray"]:
+        """
+        Motion-compensated frames.
+        
+        At weight t, a pixel is sampled t of the way back along the motion
+        in the previous frame and (1 - t) of the way forward in the next
+        one; the two samples are blended by t.
+        """
+        import cv2
+        import numpy as np
+        
+        height, width = previous.shape[:2]
+        grid_x, grid_y = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        
+        for t in weights:
+            if t <= 0.0:
+                yield previous
+                continue
+            warped_previous = cv2.remap(
+                previous, grid_x - t * motion[..., 0], grid_y - t * motion[..., 1],
+                cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT
+            )
+            warped_following = cv2.remap(
+                following, grid_x + (1 - t) * motion[..., 0], grid_y + (1 - t) * motion[..., 1],
+                cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT
+            )
+            yield cv2.addWeighted(warped_previous, 1.0 - t, warped_following, t, 0.0)
+    
+    def _estimate_motion(self, previous: "np.ndarray", following: "np.ndarray") -> "np.ndarray":
+        """
+        Block-matching motion from previous to following, per output pixel.
+        
+        Every block of the following frame is compared against the previous
+        frame at each offset within the search range; offsets are scored for
+        all blocks at once (sum of absolute differences per block).
+        """
+        import cv2
+        import numpy as np
+        
+        height, width = previous.shape[:2]
+        size = (max(self.block, int(width * MOTION_SCALE)), max(self.block, int(height * MOTION_SCALE)))
+        small_previous, small_following = (
+            cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            for frame in (previous, following)
+        )
+        
+        block, search = self.block, self.search
+        rows, cols = size[1] // block, size[0] // block
+        target = small_following[:rows * block, :cols * block]
+        padded = cv2.copyMakeBorder(small_previous, search, search, search, search, cv2.BORDER_REPLICATE)
+        
+        best = np.full((rows, cols), np.inf, dtype=np.float32)
+        vectors = np.zeros((rows, cols, 2), dtype=np.float32)
+        for dy in range(-search, search + 1):
+            for dx in range(-search, search + 1):
+                candidate = padded[search + dy:search + dy + rows * block, search + dx:search + dx + cols * block]
+                cost = cv2.absdiff(target, candidate).reshape(rows, block, cols, block).sum(axis=(1, 3), dtype=np.int32)
+                cost = cost.astype(np.float32) + MOTION_BIAS * (abs(dx) + abs(dy)) * block * block
+                better = cost < best
+                best[better] = cost[better]
+                # The block came from (x + dx, y + dy), so it moved by (-dx, -dy)
+                vectors[better] = (-dx, -dy)
+        
+        # Drop isolated outliers, then spread block vectors over every pixel
+        vectors = np.dstack([cv2.medianBlur(vectors[..., axis], 3) for axis in (0, 1)])
+        motion = cv2.resize(vectors, (width, height), interpolation=cv2.INTER_LINEAR)
+        motion[..., 0] *= width / size[0]
+        motion[..., 1] *= height / size[1]
+        return motion
+
+
+def read_frames(cap) -> Iterator["np.ndarray"]:
+    """Yield frames from an open cv2.VideoCapture until it runs out."""
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            return
+        yield frame
+
+
+def retime_artifact(
+    artifact: MediaArtifact,
+    duration: float,
+    prompt: str = "",
+    provider: VideoProvider = VideoProvider.STABILITY_AI,
+    fps: Optional[float] = None
+) -> Optional[MediaArtifact]:
+    """
+    Stretch a generated video to a duration (blocking).
+    
+    Returns:
+        Artifact of the retimed copy, or None if it could not be produced
+    """
+    import uuid
+    from utils.file_handler import FileHandler
+    
+    file_handler = FileHandler()
+    output_path = os.path.join(file_handler.output_dir, f"retimed_{uuid.uuid4().hex}.mp4")
+    if not FrameInterpolator().retime(artifact.path, output_path, duration, fps):
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return None
+    return file_handler.store_rendered_file(output_path, prompt, provider, "video/mp4")
+
@@ -0,0 +1,199 @@
+"""
+Threaded render -> overlay -> encode pipeline for locally rendered video.
+
+Frames come from a generator running on its own thread, an optional overlay
+step draws on them on a second thread, and the calling thread encodes them.
+Stages are connected by bounded queues, so a slow encoder holds back
+rendering instead of letting frames pile up; numpy and cv2 release the GIL,
+so rendering the next frames overlaps encoding the current one.
+
+Generators that draw into buffers from a FramePool reuse a fixed set of
+preallocated frames instead of allocating one per frame; the encoder hands
+each pooled buffer back once it has been written.
+"""
+
+import queue
+import threading
+from typing import Callable, Iterable, Optional, Tuple, TYPE_CHECKING
+
+from config import Config
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# Seconds between checks for a failed stage while waiting on a queue
+_POLL_INTERVAL = 0.1
+
+
+class FramePool:
+    """Fixed set of preallocated frame buffers (thread-safe)."""
+    
+    def __init__(self, shape: Tuple[int, ...], count: Optional[int] = None):
+        """
+        Args:
+            shape: Frame shape, e.g. (height, width, 3)
+            count: Buffers to allocate; the default covers every frame a
+                pipeline can have in flight, so rendering never waits on a
+                buffer before it would wait on a full queue
+        """
+        import numpy as np
+        
+        count = count or 2 * Config.FRAME_QUEUE_SIZE + 3
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(count)]
+        self._free = queue.Queue()
+        for buffer in self._buffers:
+            self._free.put(buffer)
+    
+    def acquire(self) -> "np.ndarray":
+        """Take a free buffer, waiting for one to be released if necessary."""
+        return self._free.get()
+    
+    def release(self, frame: "np.ndarray"):
+        """Return a buffer to the pool; frames from elsewhere are ignored."""
+        if any(frame is buffer for buffer in self._buffers):
+            self._free.put(frame)
+
+
+class _Pipeline:
+    """Queues and failure state shared by the stages of one encode_frames call."""
+    
+    def __init__(self, queue_size: int):
+        self.rendered = queue.Queue(maxsize=queue_size)
+        self.overlaid = queue.Queue(maxsize=queue_size)
+        self.failed = threading.Event()
+        self.errors = []
+    
+    def fail(self, error: BaseException):
+        self.errors.append(error)
+        self.failed.set()
+    
+    def put(self, target: queue.Queue, item) -> bool:
+        """Queue an item; False if the pipeline failed while waiting."""
+        while not self.failed.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def get(self, source: queue.Queue):
+        """Next item, or _DONE once the pipeline has failed."""
+        while not self.failed.is_set():
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+    
+    def drain(self, pool: Optional[FramePool]):
+        """Return every queued frame to the pool (after a failure)."""
+        for source in (self.rendered, self.overlaid):
+            while True:
+                try:
+                    item = source.get_nowait()
+                except queue.Empty:
+                    break
+                if pool is not None and item is not _DONE:
+                    pool.release(item[1])
+
+
+def encode_frames(
+    output_path: str,
+    fps: float,
+    size: Tuple[int, int],
+    frames: Iterable["np.ndarray"],
+    overlay: Optional[Callable[[int, "np.ndarray"], None]] = None,
+    pool: Optional[FramePool] = None,
+    queue_size: Optional[int] = None,
+    writer=None
+) -> int:
+    """
+    Encode frames to an MP4, rendering, overlaying and encoding concurrently.
+    
+    Args:
+        output_path: Destination MP4 path
+        fps: Frame rate
+        size: (width, height) of the frames
+        frames: Frames in order; iterated on a render thread
+        overlay: Called as overlay(index, frame) on an overlay thread to draw
+            on each frame in place
+        pool: Pool the frames were taken from; each one is released after
+            it has been encoded
+        queue_size: Frames buffered between stages (Config.FRAME_QUEUE_SIZE
+            if omitted)
+        writer: Object with write(frame) and release() to encode into
+            instead of a cv2.VideoWriter for output_path (e.g. an HLSWriter)
+    
+    Returns:
+        Number of frames written
+    
+    Raises:
+        Whatever the frame generator or overlay raised
+    """
+    import cv2
+    
+    pipeline = _Pipeline(queue_size or Config.FRAME_QUEUE_SIZE)
+    
+    def render():
+        try:
+            for index, frame in enumerate(frames):
+                if not pipeline.put(pipeline.rendered, (index, frame)):
+                    return
+            pipeline.put(pipeline.rendered, _DONE)
+        except BaseException as e:
+            pipeline.fail(e)
+        finally:
+            close = getattr(frames, "close", None)
+            if close is not None:
+                close()
+    
+    def draw():
+        try:
+            while True:
+                item = pipeline.get(pipeline.rendered)
+                if item is _DONE:
+                    break
+                overlay(*item)
+                if not pipeline.put(pipeline.overlaid, item):
+                    return
+            pipeline.put(pipeline.overlaid, _DONE)
+        except BaseException as e:
+            pipeline.fail(e)
+    
+    stages = [threading.Thread(target=render, name="frame-render", daemon=True)]
+    if overlay is not None:
+        stages.append(threading.Thread(target=draw, name="frame-overlay", daemon=True))
+    encoded = pipeline.overlaid if overlay is not None else pipeline.rendered
+    
+    out = writer or cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    written = 0
+    for stage in stages:
+        stage.start()
+    
+    try:
+        while True:
+            item = pipeline.get(encoded)
+            if item is _DONE:
+                break
+            out.write(item[1])
+            written += 1
+            if pool is not None:
+                pool.release(item[1])
+    except BaseException as e:
+        pipeline.fail(e)
+        raise
+    finally:
+        out.release()
+        # Unblock stages still waiting on a queue or a pooled buffer
+        for stage in stages:
+            while stage.is_alive():
+                pipeline.drain(pool)
+                stage.join(_POLL_INTERVAL)
+    
+    if pipeline.errors:
+        raise pipeline.errors[0]
+    return written
@@ -0,0 +1,240 @@
+"""
+Durable journal of submitted remote generations.
+
+Runway and Pika render asynchronously: the request only returns a job ID,
+and the video has to be collected minutes later. If the process dies in
+between (a deploy, a crash, a worker recycled by the platform) the job keeps
+rendering and is paid for, but nobody collects it.
+
+Each submitted job is therefore written to a SQLite journal (WAL mode, safe
+across worker processes) with the parameters it was submitted with, and
+removed once the client is done with it. On startup, jobs whose owning
+process is gone are claimed, polled to completion, downloaded and saved; the
+next request with the same parameters gets that video instead of paying for
+a new generation.
+
+A job belongs to the process that submitted it. It is treated as orphaned
+when that process no longer runs on this host (or the PID was reused by a
+new process, as happens to PID 1 in restarted containers), or, for jobs from
+another host, once it is older than Config.API_TIMEOUT and its owner would
+have given up on it anyway. API keys are never journaled.
+
+The journal is best effort: if it cannot be written, generation carries on
+without it.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
+
+from config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    provider TEXT NOT NULL,
+    generation_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    params TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    status TEXT NOT NULL,
+    artifact_path TEXT,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (provider, generation_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs(fingerprint, status);
+"""
+
+RUNNING = "running"
+COMPLETED = "completed"
+
+
+def _best_effort(default=None):
+    """Log journal errors and return default instead of failing the generation."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            except (sqlite3.Error, OSError, ValueError) as e:
+                print(f"⚠️  Job journal unavailable ({method.__name__}): {e}")
+                return default
+        return wrapper
+    return decorator
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    return True
+
+
+class JobJournal:
+    """Cross-process record of remote jobs that have not been collected yet."""
+    
+    def __init__(self, path: Optional[str] = None, max_age: Optional[int] = None):
+        """
+        Args:
+            path: SQLite database file (Config.JOB_JOURNAL_PATH by default)
+            max_age: Seconds after submission a job is still worth resuming
+        """
+        self.path = os.path.abspath(path or Config.JOB_JOURNAL_PATH)
+        self.max_age = max_age or Config.JOB_RESUME_MAX_AGE
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._init_schema()
+    
+    @_best_effort()
+    def _init_schema(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection (safe to use from any thread or process)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def fingerprint(provider: str, params: Dict[str, Any]) -> str:
+        """Identify a request by provider and submitted parameters."""
+        payload = {"provider": provider, **params}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    
+    @_best_effort()
+    def record(self, provider: str, generation_id: str, params: Dict[str, Any]):
+        """Journal a job right after the provider accepted it."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(provider, generation_id, fingerprint, params, owner, status, artifact_path, submitted_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (
+                    provider,
+                    generation_id,
+                    self.fingerprint(provider, params),
+                    json.dumps(params, default=str),
+                    self.owner,
+                    RUNNING,
+                    now,
+                    now
+                )
+            )
+    
+    @_best_effort()
+    def forget(self, provider: str, generation_id: str):
+        """Drop a job that was collected, failed or cancelled."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE provider = ? AND generation_id = ?", (provider, generation_id))
+    
+    @_best_effort()
+    def complete(self, provider: str, generation_id: str, artifact_path: str):
+        """Keep a resumed job's saved video for the next identical request."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, artifact_path = ?, updated_at = ? "
+                "WHERE provider = ? AND generation_id = ?",
+                (COMPLETED, os.path.abspath(artifact_path), time.time(), provider, generation_id)
+            )
+    
+    @_best_effort()
+    def take_completed(self, provider: str, params: Dict[str, Any]) -> Optional[str]:
+        """
+        Hand out a resumed video generated with exactly these parameters.
+        
+        Each video is handed out once; entries whose file is gone are dropped.
+        
+        Returns:
+            Path of the saved video, or None
+        """
+        fingerprint = self.fingerprint(provider, params)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT generation_id, artifact_path FROM jobs "
+                "WHERE fingerprint = ? AND status = ? ORDER BY updated_at DESC",
+                (fingerprint, COMPLETED)
+            ).fetchall()
+            for generation_id, artifact_path in rows:
+                conn.execute("DELETE FROM jobs WHERE provider = ? AND generation_id = ?", (provider, generation_id))
+                if artifact_path and os.path.exists(artifact_path):
+                    return artifact_path
+        return None
+    
+    def _orphaned(self, owner: str, updated_at: float, now: float) -> bool:
+        host, _, rest = owner.partition(":")
+        pid, _, _ = rest.partition(":")
+        if owner == self.owner:
+            return False
+        if host != self.host:
+            return now - updated_at > Config.API_TIMEOUT
+        if not pid.isdigit():
+            return True
+        # Our own PID under another owner means the PID was reused
+        return int(pid) == os.getpid() or not _process_alive(int(pid))
+    
+    @_best_effort(default=())
+    def claim_orphans(self, provider: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Take over the provider's unfinished jobs whose owner is gone.
+        
+        Jobs older than max_age are given up instead.
+        
+        Returns:
+            (generation_id, params) of every claimed job
+        """
+        now = time.time()
+        claimed = []
+        with self._connect() as conn:
+            # Take the write lock up front so two restarting workers don't both claim a job
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM jobs WHERE provider = ? AND submitted_at < ?",
+                (provider, now - self.max_age)
+            )
+            rows = conn.execute(
+                "SELECT generation_id, params, owner, updated_at FROM jobs WHERE provider = ? AND status = ?",
+                (provider, RUNNING)
+            ).fetchall()
+            for generation_id, params, owner, updated_at in rows:
+                if not self._orphaned(owner, updated_at, now):
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET owner = ?, updated_at = ? WHERE provider = ? AND generation_id = ?",
+                    (self.owner, now, provider, generation_id)
+                )
+                claimed.append((generation_id, json.loads(params)))
+        return claimed
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_job_journal() -> JobJournal:
+    """The job journal shared by every client in this process."""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal()
+        return _journal
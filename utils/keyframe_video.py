@@ -0,0 +1,181 @@
+"""
+Animate a handful of still keyframes into a video.
+
+Each keyframe is held briefly and then transitions into the next one, while
+a slow push-in runs over the whole clip. Transitions are either a plain
+cross-dissolve or a flow-based morph: dense optical flow between the two
+keyframes moves pixels part of the way towards their position in the next
+frame while the images blend, so shapes travel instead of just fading.
+
+Per-frame work is array arithmetic over whole frames (a batch of frames at a
+time for dissolves, one remap per frame and keyframe for morphs).
+"""
+
+import os
+from typing import List, Iterator, Optional, TYPE_CHECKING
+
+from utils.video_stitcher import VideoStitcher
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Frames blended per array operation in a dissolve (bounds the float buffer)
+DISSOLVE_BATCH = 6
+
+# Optical flow is estimated at this fraction of the output size
+FLOW_SCALE = 0.5
+
+
+class KeyframeAnimator(VideoStitcher):
+    """Renders keyframes into an MP4 with dissolve or morph transitions."""
+    
+    def render(
+        self,
+        keyframe_paths: List[str],
+        duration: float,
+        output_path: str,
+        transition: str = "morph",
+        hold: float = 0.3,
+        zoom: float = 0.06
+    ) -> Optional[str]:
+        """
+        Render keyframes into one MP4.
+        
+        Args:
+            keyframe_paths: Still images in playback order
+            duration: Length of the video in seconds
+            output_path: Destination MP4 path
+            transition: "morph" (flow-guided) or "dissolve"
+            hold: Share of each keyframe interval spent on the still
+            zoom: Total push-in over the clip (0.06 = 6%)
+        
+        Returns:
+            output_path on success, None if nothing could be written
+        """
+        from utils.frame_pipeline import encode_frames
+        
+        keyframes = [self._load(path) for path in keyframe_paths]
+        keyframes = [frame for frame in keyframes if frame is not None]
+        if not keyframes:
+            return None
+        
+        total_frames = max(1, int(round(duration * self.fps)))
+        frames = (
+            self._push_in(frame, index / max(total_frames - 1, 1), zoom)
+            for index, frame in enumerate(self._frames(keyframes, total_frames, transition, hold))
+        )
+        written = encode_frames(output_path, self.fps, (self.width, self.height), frames)
+        
+        if written == 0 or not os.path.exists(output_path):
+            return None
+        return output_path
+    
+    def _load(self, path: str) -> Optional["np.ndarray"]:
+        import cv2
+        
+        image = cv2.imread(path)
+        if image is None:
+            print(f"⚠️  Could not read keyframe: {path}")
+            return None
+        return self._fit(image)
+    
+    def _frames(
+        self,
+        keyframes: List["np.ndarray"],
+        total_frames: int,
+        transition: str,
+        hold: float
+    ) -> Iterator["np.ndarray"]:
+        """Yield exactly total_frames frames for the keyframe sequence."""
+        if len(keyframes) == 1:
+            for _ in range(total_frames):
+                yield keyframes[0]
+            return
+        
+        for index, count in enumerate(self._plan(len(keyframes) - 1, total_frames)):
+            first, second = keyframes[index], keyframes[index + 1]
+            hold_frames = int(count * hold)
+            for _ in range(hold_frames):
+                yield first
+            
+            # Weights run from just after the first keyframe up to the second
+            # one, so the next interval's hold follows on smoothly
+            steps = count - hold_frames
+            weights = [(step + 1) / steps for step in range(steps)]
+            if transition == "dissolve":
+                yield from self._dissolve(first, second, weights)
+            else:
+                yield from self._morph(first, second, weights)
+    
+    @staticmethod
+    def _plan(intervals: int, total_frames: int) -> List[int]:
+        """Split the frames into near-equal frame counts per keyframe interval."""
+        base, remainder = divmod(total_frames, intervals)
+        return [base + 1 if index < remainder else base for index in range(intervals)]
+    
+    def _dissolve(self, first: "np.ndarray", second: "np.ndarray", weights: List[float]) -> Iterator["np.ndarray"]:
+        """Cross-dissolve, blending DISSOLVE_BATCH frames per array operation."""
+        import numpy as np
+        
+        base = first.astype(np.float32)
+        delta = second.astype(np.float32) - base
+        for start in range(0, len(weights), DISSOLVE_BATCH):
+            alphas = np.asarray(weights[start:start + DISSOLVE_BATCH], dtype=np.float32)[:, None, None, None]
+            batch = base + alphas * delta
+            np.clip(batch + 0.5, 0, 255, out=batch)
+            yield from batch.astype(np.uint8)
+    
+    def _morph(self, first: "np.ndarray", second: "np.ndarray", weights: List[float]) -> Iterator["np.ndarray"]:
+        """
+        Flow-guided morph.
+        
+        At weight t, the first keyframe is sampled t of the way back along
+        its flow to the second and the second (1 - t) of the way back along
+        the reverse flow; the two warped images are then blended by t.
+        """
+        import cv2
+        import numpy as np
+        
+        forward = self._flow(first, second)
+        backward = self._flow(second, first)
+        grid_x, grid_y = np.meshgrid(
+            np.arange(self.width, dtype=np.float32),
+            np.arange(self.height, dtype=np.float32)
+        )
+        
+        for t in weights:
+            warped_first = cv2.remap(
+                first, grid_x - t * forward[..., 0], grid_y - t * forward[..., 1],
+                cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT
+            )
+            warped_second = cv2.remap(
+                second, grid_x - (1 - t) * backward[..., 0], grid_y - (1 - t) * backward[..., 1],
+                cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT
+            )
+            yield cv2.addWeighted(warped_first, 1.0 - t, warped_second, t, 0.0)
+    
+    def _flow(self, source: "np.ndarray", target: "np.ndarray") -> "np.ndarray":
+        """Dense flow from source to target at output size, in output pixels."""
+        import cv2
+        
+        size = (max(16, int(self.width * FLOW_SCALE)), max(16, int(self.height * FLOW_SCALE)))
+        small = [
+            cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            for frame in (source, target)
+        ]
+        flow = cv2.calcOpticalFlowFarneback(small[0], small[1], None, 0.5, 4, 25, 3, 7, 1.5, 0)
+        flow = cv2.resize(flow, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+        flow[..., 0] *= self.width / size[0]
+        flow[..., 1] *= self.height / size[1]
+        return flow
+    
+    def _push_in(self, frame: "np.ndarray", progress: float, zoom: float) -> "np.ndarray":
+        """Scale the frame about its centre by up to 1 + zoom."""
+        import cv2
+        
+        if zoom <= 0:
+            return frame
+        scale = 1.0 + zoom * progress
+        matrix = cv2.getRotationMatrix2D((self.width / 2, self.height / 2), 0, scale)
+        return cv2.warpAffine(frame, matrix, (self.width, self.height), flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REFLECT)
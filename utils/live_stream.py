@@ -0,0 +1,342 @@
+"""
+Live fragmented-MP4 / HLS output for local renders.
+
+Frames are encoded in short segments as they are produced. Each finished
+segment (a regular MP4 from cv2.VideoWriter) is repackaged in pure Python
+into a movie fragment (moof + mdat), written out as an HLS media segment and
+appended to the playlist, so a player can start on the first segment while
+the rest is still rendering. The output directory holds:
+
+- init.mp4: initialization segment (codec configuration, no samples)
+- segment_00000.m4s, ...: one fragment per segment
+- playlist.m3u8: HLS playlist (EVENT while rendering, ENDLIST once done)
+- stream.mp4: init.mp4 followed by every fragment, a complete fragmented
+  MP4 that can be played or downloaded as one file
+
+Only one segment of encoded samples is held in memory at a time.
+"""
+
+import math
+import os
+import struct
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from config import Config
+from utils.file_io import atomic_write
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PLAYLIST_NAME = "playlist.m3u8"
+INIT_NAME = "init.mp4"
+STREAM_NAME = "stream.mp4"
+
+# trun sample flags: sync samples depend on nothing, others are non-sync
+_SYNC_FLAGS = 0x02000000
+_NON_SYNC_FLAGS = 0x01010000
+
+
+class HLSWriter:
+    """
+    Segmenting video writer with the cv2.VideoWriter write()/release() interface.
+    
+    Pass it to encode_frames as its writer to render straight to a live
+    stream.
+    """
+    
+    def __init__(
+        self,
+        output_dir: str,
+        fps: float,
+        size: Tuple[int, int],
+        segment_seconds: Optional[float] = None,
+        fourcc: str = "mp4v"
+    ):
+        """
+        Args:
+            output_dir: Directory for the playlist, segments and stream.mp4
+            fps: Frame rate
+            size: (width, height) of the frames
+            segment_seconds: Segment length (Config.LIVE_SEGMENT_SECONDS if omitted)
+            fourcc: Codec for cv2.VideoWriter
+        """
+        self.output_dir = output_dir
+        self.fps = fps
+        self.size = size
+        self.segment_seconds = segment_seconds or Config.LIVE_SEGMENT_SECONDS
+        self.fourcc = fourcc
+        self.frames_per_segment = max(1, int(round(self.segment_seconds * fps)))
+        os.makedirs(output_dir, exist_ok=True)
+        
+        self._segment_path = os.path.join(output_dir, ".segment.mp4")
+        self._writer = None
+        self._frames_in_segment = 0
+        self._segments: List[Tuple[str, float]] = []
+        self._decode_time = 0
+        self._initialized = False
+        self._released = False
+    
+    @property
+    def playlist_path(self) -> str:
+        return os.path.join(self.output_dir, PLAYLIST_NAME)
+    
+    @property
+    def stream_path(self) -> str:
+        return os.path.join(self.output_dir, STREAM_NAME)
+    
+    def isOpened(self) -> bool:
+        return not self._released
+    
+    def write(self, frame: "np.ndarray"):
+        """Encode a frame, publishing the segment once it is full."""
+        import cv2
+        
+        if self._writer is None:
+            self._writer = cv2.VideoWriter(
+                self._segment_path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, self.size
+            )
+        self._writer.write(frame)
+        self._frames_in_segment += 1
+        if self._frames_in_segment == self.frames_per_segment:
+            self._publish_segment()
+    
+    def release(self):
+        """Publish the last (possibly short) segment and close the playlist."""
+        if self._released:
+            return
+        self._released = True
+        if self._writer is not None:
+            self._publish_segment()
+        self._write_playlist(final=True)
+    
+    def _publish_segment(self):
+        """Repackage the finished segment as a fragment and list it."""
+        self._writer.release()
+        self._writer = None
+        self._frames_in_segment = 0
+        
+        with open(self._segment_path, "rb") as f:
+            source = f.read()
+        os.remove(self._segment_path)
+        
+        track = _read_track(source)
+        if not self._initialized:
+            init = _init_segment(source)
+            atomic_write(os.path.join(self.output_dir, INIT_NAME), init)
+            with open(self.stream_path, "wb") as stream:
+                stream.write(init)
+            self._initialized = True
+        
+        sequence = len(self._segments)
+        fragment = _fragment(source, track, sequence + 1, self._decode_time)
+        name = f"segment_{sequence:05d}.m4s"
+        atomic_write(os.path.join(self.output_dir, name), fragment)
+        with open(self.stream_path, "ab") as stream:
+            stream.write(fragment)
+        
+        duration = sum(track["durations"])
+        self._decode_time += duration
+        self._segments.append((name, duration / track["timescale"]))
+        self._write_playlist(final=False)
+    
+    def _write_playlist(self, final: bool):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:7",
+            f"#EXT-X-TARGETDURATION:{math.ceil(self.segment_seconds)}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            "#EXT-X-INDEPENDENT-SEGMENTS",
+            f'#EXT-X-MAP:URI="{INIT_NAME}"'
+        ]
+        for name, seconds in self._segments:
+            lines.append(f"#EXTINF:{seconds:.6f},")
+            lines.append(name)
+        if final:
+            lines.append("#EXT-X-ENDLIST")
+        atomic_write(self.playlist_path, ("\n".join(lines) + "\n").encode())
+
+
+def _box(kind: bytes, *payload: bytes) -> bytes:
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def _full_box(kind: bytes, version: int, flags: int, *payload: bytes) -> bytes:
+    return _box(kind, struct.pack(">I", (version << 24) | flags), *payload)
+
+
+def _children(data: bytes, start: int, end: int) -> List[Tuple[bytes, int, int, int]]:
+    """(type, box start, payload start, box end) of the boxes between start and end."""
+    boxes = []
+    position = start
+    while position + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, position)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, position + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ValueError(f"malformed {kind!r} box")
+        boxes.append((kind, position, position + header, position + size))
+        position += size
+    return boxes
+
+
+def _find(data: bytes, path: List[bytes]) -> Tuple[int, int, int]:
+    """(box start, payload start, end) of the first box along path (e.g. [b"moov", b"trak"])."""
+    box_start, start, end = 0, 0, len(data)
+    for kind in path:
+        for child, child_start, payload, box_end in _children(data, start, end):
+            if child == kind:
+                box_start, start, end = child_start, payload, box_end
+                break
+        else:
+            raise ValueError(f"no {kind!r} box")
+    return box_start, start, end
+
+
+def _read_track(data: bytes) -> dict:
+    """Sample sizes, positions, durations and sync flags of the first track."""
+    _, stbl_start, stbl_end = _find(data, [b"moov", b"trak", b"mdia", b"minf", b"stbl"])
+    tables = {kind: (payload, end) for kind, _, payload, end in _children(data, stbl_start, stbl_end)}
+    _, mdhd_start, _ = _find(data, [b"moov", b"trak", b"mdia", b"mdhd"])
+    version = data[mdhd_start]
+    timescale = struct.unpack_from(">I", data, mdhd_start + (20 if version == 1 else 12))[0]
+    
+    def entries(kind: bytes, fields: str):
+        start = tables[kind][0]
+        count = struct.unpack_from(">I", data, start + 4)[0]
+        width = struct.calcsize(">" + fields)
+        return [struct.unpack_from(">" + fields, data, start + 8 + index * width) for index in range(count)]
+    
+    # Sample sizes
+    start = tables[b"stsz"][0]
+    uniform, count = struct.unpack_from(">II", data, start + 4)
+    sizes = [uniform] * count if uniform else list(struct.unpack_from(f">{count}I", data, start + 12))
+    
+    # Chunk offsets, and how many samples each chunk holds
+    chunk_offsets = [offset for offset, in (entries(b"stco", "I") if b"stco" in tables else entries(b"co64", "Q"))]
+    runs = entries(b"stsc", "III")
+    positions = []
+    sample = 0
+    for index, (first_chunk, per_chunk, _) in enumerate(runs):
+        last_chunk = runs[index + 1][0] - 1 if index + 1 < len(runs) else len(chunk_offsets)
+        for chunk in range(first_chunk - 1, last_chunk):
+            offset = chunk_offsets[chunk]
+            for _ in range(per_chunk):
+                if sample == count:
+                    break
+                positions.append(offset)
+                offset += sizes[sample]
+                sample += 1
+    
+    durations = [delta for run, delta in entries(b"stts", "II") for _ in range(run)]
+    composition = None
+    if b"ctts" in tables:
+        composition = [offset for run, offset in entries(b"ctts", "Ii") for _ in range(run)]
+    sync = None
+    if b"stss" in tables:
+        sync = {number - 1 for number, in entries(b"stss", "I")}
+    
+    return {
+        "timescale": timescale,
+        "sizes": sizes,
+        "positions": positions,
+        "durations": durations[:count] + [durations[-1] if durations else 1] * (count - len(durations)),
+        "composition": composition,
+        "sync": sync
+    }
+
+
+def _zero_duration(box: bytes, v0_offset: int, v1_offset: int) -> bytes:
+    """Copy of an mvhd/tkhd/mdhd box with its duration field cleared."""
+    box = bytearray(box)
+    if box[8] == 1:
+        struct.pack_into(">Q", box, 8 + v1_offset, 0)
+    else:
+        struct.pack_into(">I", box, 8 + v0_offset, 0)
+    return bytes(box)
+
+
+def _init_segment(data: bytes) -> bytes:
+    """ftyp + moov with the source's codec setup, empty sample tables and mvex."""
+    def raw(path: List[bytes]) -> bytes:
+        start, _, end = _find(data, path)
+        return data[start:end]
+    
+    trak = [b"moov", b"trak"]
+    mvhd = _zero_duration(raw([b"moov", b"mvhd"]), 16, 24)
+    tkhd = _zero_duration(raw(trak + [b"tkhd"]), 20, 28)
+    track_id = struct.unpack_from(">I", tkhd, 8 + (20 if tkhd[8] == 1 else 12))[0]
+    mdhd = _zero_duration(raw(trak + [b"mdia", b"mdhd"]), 16, 24)
+    hdlr = raw(trak + [b"mdia", b"hdlr"])
+    minf = trak + [b"mdia", b"minf"]
+    media_header = b"".join(
+        raw(minf + [kind]) for kind in (b"vmhd", b"smhd", b"nmhd") if _has(data, minf + [kind])
+    )
+    dinf = raw(minf + [b"dinf"])
+    stsd = raw(minf + [b"stbl", b"stsd"])
+    
+    empty = struct.pack(">I", 0)
+    stbl = _box(
+        b"stbl",
+        stsd,
+        _full_box(b"stts", 0, 0, empty),
+        _full_box(b"stsc", 0, 0, empty),
+        _full_box(b"stsz", 0, 0, empty, empty),
+        _full_box(b"stco", 0, 0, empty)
+    )
+    moov = _box(
+        b"moov",
+        mvhd,
+        _box(b"trak", tkhd, _box(b"mdia", mdhd, hdlr, _box(b"minf", media_header, dinf, stbl))),
+        _box(b"mvex", _full_box(b"trex", 0, 0, struct.pack(">IIIII", track_id, 1, 0, 0, 0)))
+    )
+    ftyp = _box(b"ftyp", b"iso6", struct.pack(">I", 0), b"iso6isommp41")
+    return ftyp + moov
+
+
+def _has(data: bytes, path: List[bytes]) -> bool:
+    try:
+        _find(data, path)
+        return True
+    except ValueError:
+        return False
+
+
+def _fragment(data: bytes, track: dict, sequence: int, decode_time: int) -> bytes:
+    """moof + mdat holding every sample of the source track."""
+    _, tkhd_start, _ = _find(data, [b"moov", b"trak", b"tkhd"])
+    track_id = struct.unpack_from(">I", data, tkhd_start + (20 if data[tkhd_start] == 1 else 12))[0]
+    
+    count = len(track["sizes"])
+    sync, composition = track["sync"], track["composition"]
+    flags = 0x000001 | 0x000100 | 0x000200 | 0x000400 | (0x000800 if composition else 0)
+    samples = []
+    for index in range(count):
+        sample_flags = _SYNC_FLAGS if sync is None or index in sync else _NON_SYNC_FLAGS
+        fields = [track["durations"][index], track["sizes"][index], sample_flags]
+        if composition:
+            fields.append(composition[index])
+        samples.append(struct.pack(">III" + ("i" if composition else ""), *fields))
+    
+    def moof(data_offset: int) -> bytes:
+        trun = _full_box(b"trun", 1 if composition else 0, flags, struct.pack(">Ii", count, data_offset), *samples)
+        traf = _box(
+            b"traf",
+            _full_box(b"tfhd", 0, 0x020000, struct.pack(">I", track_id)),
+            _full_box(b"tfdt", 1, 0, struct.pack(">Q", decode_time)),
+            trun
+        )
+        return _box(b"moof", _full_box(b"mfhd", 0, 0, struct.pack(">I", sequence)), traf)
+    
+    # Sample data starts right after moof and the mdat header
+    header = moof(0)
+    header = moof(len(header) + 8)
+    payload = b"".join(
+        data[position:position + size] for position, size in zip(track["positions"], track["sizes"])
+    )
+    return header + _box(b"mdat", payload)
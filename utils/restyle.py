@@ -0,0 +1,368 @@
+"""
+Local restyling of generated images and videos.
+
+The style is normally baked into the prompt, so trying another one costs a
+new generation. Restyling instead grades media that already exists: a 3D
+colour LUT per style, then film grain and a vignette, all on the CPU with no
+API call.
+
+Each style's LUT is a 33x33x33 lattice, either computed from the grade
+recipe in STYLE_GRADES or loaded from ``<Config.RESTYLE_LUT_DIR>/<style>.cube``
+if that file exists. It is baked once into a dense 128-level table, so
+applying it is a single indexed lookup per pixel rather than a trilinear
+interpolation, done for a whole batch of video frames at once. The vignette
+mask is computed once per frame size and the grain comes from a few
+pre-generated plates, applied with saturating uint8 arithmetic.
+"""
+
+import os
+import threading
+from typing import Optional, Dict, Any, TYPE_CHECKING
+
+from config import Config, VideoProvider
+from utils.artifacts import MediaArtifact
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Lattice size of generated LUTs (the common .cube size)
+LATTICE_SIZE = 33
+
+# Levels per channel of the baked lookup table (128^3 entries, 6 MB)
+TABLE_BITS = 7
+
+# Video frames graded per batch
+FRAME_BATCH = 8
+
+# Grain plates generated per frame size, cycled with random offsets
+GRAIN_PLATES = 4
+GRAIN_MARGIN = 64
+
+# Grade recipe per style; colours are RGB offsets in [0, 1] units
+STYLE_GRADES: Dict[str, Dict[str, Any]] = {
+    "Realistic": {
+        "gamma": 1.0, "contrast": 0.1, "saturation": 1.05, "temperature": 0.0,
+        "shadows": (0.0, 0.0, 0.0), "highlights": (0.0, 0.0, 0.0),
+        "grain": 0.01, "vignette": 0.1
+    },
+    "Cinematic": {
+        "gamma": 1.05, "contrast": 0.35, "saturation": 0.9, "temperature": 0.02,
+        "shadows": (-0.02, 0.03, 0.06), "highlights": (0.06, 0.03, -0.03),
+        "grain": 0.03, "vignette": 0.35
+    },
+    "Animated": {
+        "gamma": 0.95, "contrast": 0.25, "saturation": 1.45, "temperature": 0.0,
+        "shadows": (0.0, 0.0, 0.02), "highlights": (0.02, 0.02, 0.0),
+        "grain": 0.0, "vignette": 0.0
+    },
+    "Documentary": {
+        "gamma": 1.0, "contrast": 0.05, "saturation": 0.8, "temperature": 0.01,
+        "shadows": (0.01, 0.01, 0.0), "highlights": (0.0, 0.0, 0.0),
+        "grain": 0.025, "vignette": 0.15
+    },
+    "Fantasy": {
+        "gamma": 0.9, "contrast": 0.15, "saturation": 1.2, "temperature": 0.03,
+        "shadows": (0.04, -0.01, 0.06), "highlights": (0.05, 0.04, 0.02),
+        "grain": 0.015, "vignette": 0.3
+    },
+    "Sci-Fi": {
+        "gamma": 1.05, "contrast": 0.3, "saturation": 0.95, "temperature": -0.04,
+        "shadows": (-0.02, 0.04, 0.06), "highlights": (0.0, 0.05, 0.06),
+        "grain": 0.02, "vignette": 0.25
+    }
+}
+
+
+def grade(rgb: "np.ndarray", recipe: Dict[str, Any]) -> "np.ndarray":
+    """
+    Apply a grade recipe to colours.
+    
+    Args:
+        rgb: Float array of shape (..., 3), RGB in [0, 1]
+        recipe: Entry of STYLE_GRADES
+    
+    Returns:
+        Graded colours, same shape, clipped to [0, 1]
+    """
+    import numpy as np
+    
+    rgb = np.clip(rgb, 0.0, 1.0) ** recipe["gamma"]
+    
+    # S-curve: blend towards smoothstep for contrast
+    curve = rgb * rgb * (3.0 - 2.0 * rgb)
+    rgb = rgb + recipe["contrast"] * (curve - rgb)
+    
+    luma = rgb @ np.array([0.2126, 0.7152, 0.0722], dtype=rgb.dtype)
+    rgb = luma[..., None] + recipe["saturation"] * (rgb - luma[..., None])
+    
+    # Split toning: tint shadows and highlights separately
+    rgb = rgb + np.asarray(recipe["shadows"], dtype=rgb.dtype) * ((1.0 - luma) ** 2)[..., None]
+    rgb = rgb + np.asarray(recipe["highlights"], dtype=rgb.dtype) * (luma ** 2)[..., None]
+    
+    temperature = recipe["temperature"]
+    rgb = rgb + np.array([temperature, 0.0, -temperature], dtype=rgb.dtype)
+    return np.clip(rgb, 0.0, 1.0)
+
+
+def load_cube(path: str) -> "np.ndarray":
+    """
+    Read a .cube 3D LUT.
+    
+    Returns:
+        Lattice of shape (N, N, N, 3) indexed [r, g, b], RGB in [0, 1]
+    """
+    import numpy as np
+    
+    size = None
+    values = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("LUT_3D_SIZE"):
+                size = int(line.split()[1])
+            elif line[0].isdigit() or line[0] in "-.":
+                values.append([float(v) for v in line.split()[:3]])
+    if size is None or len(values) != size ** 3:
+        raise ValueError(f"Not a 3D .cube LUT: {path}")
+    # Red varies fastest in .cube files
+    return np.asarray(values, dtype=np.float32).reshape(size, size, size, 3).transpose(2, 1, 0, 3)
+
+
+def _lattice(recipe: Dict[str, Any], size: int = LATTICE_SIZE) -> "np.ndarray":
+    """Sample a grade recipe on a size^3 lattice indexed [r, g, b]."""
+    import numpy as np
+    
+    axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+    r, g, b = np.meshgrid(axis, axis, axis, indexing="ij")
+    return grade(np.stack([r, g, b], axis=-1), recipe)
+
+
+def _bake(lattice: "np.ndarray", bits: int = TABLE_BITS) -> "np.ndarray":
+    """
+    Trilinearly resample a lattice into a dense lookup table.
+    
+    The table is indexed by (b << 2*bits) | (g << bits) | r of the top bits
+    of a BGR pixel and holds the graded pixel as little-endian BGR0 words.
+    """
+    import numpy as np
+    
+    size = lattice.shape[0]
+    levels = 1 << bits
+    # Sample at the centre of the 8-bit values each table entry stands for
+    centre = (np.arange(levels, dtype=np.float32) + 0.5) * (256 / levels) - 0.5
+    position = centre / 255.0 * (size - 1)
+    low = np.minimum(position.astype(np.int32), size - 2)
+    frac = position - low
+    
+    # Separable trilinear: interpolate along r, then g, then b
+    along_r = lattice[low] * (1 - frac)[:, None, None, None] + lattice[low + 1] * frac[:, None, None, None]
+    along_g = (along_r[:, low] * (1 - frac)[None, :, None, None]
+               + along_r[:, low + 1] * frac[None, :, None, None])
+    along_b = (along_g[:, :, low] * (1 - frac)[None, None, :, None]
+               + along_g[:, :, low + 1] * frac[None, None, :, None])
+    
+    # [r, g, b, rgb] -> [b, g, r, bgr] so a BGR pixel indexes it directly
+    table = along_b.transpose(2, 1, 0, 3)[..., ::-1].reshape(-1, 3)
+    packed = np.zeros((len(table), 4), dtype=np.uint8)
+    packed[:, :3] = np.clip(table * 255.0 + 0.5, 0, 255)
+    return packed.view("<u4").ravel()
+
+
+class Restyler:
+    """Grades BGR frames into one style (thread-safe once constructed)."""
+    
+    def __init__(self, style: str, lut_dir: Optional[str] = None):
+        """
+        Args:
+            style: One of Config.STYLES
+            lut_dir: Directory with <style>.cube overrides (Config.RESTYLE_LUT_DIR by default)
+        """
+        if style not in STYLE_GRADES:
+            raise ValueError(f"Style must be one of: {', '.join(STYLE_GRADES)}")
+        self.style = style
+        self.recipe = STYLE_GRADES[style]
+        
+        lut_dir = Config.RESTYLE_LUT_DIR if lut_dir is None else lut_dir
+        cube_path = os.path.join(lut_dir, f"{style}.cube") if lut_dir else ""
+        if cube_path and os.path.exists(cube_path):
+            self.table = _bake(load_cube(cube_path))
+            self.lut_source = cube_path
+        else:
+            self.table = _bake(_lattice(self.recipe))
+            self.lut_source = "builtin"
+        
+        self._lock = threading.Lock()
+        self._vignettes = {}
+        self._grain = {}
+        self._frame_index = 0
+    
+    def apply(self, frames: "np.ndarray") -> "np.ndarray":
+        """
+        Grade one BGR frame (H, W, 3) or a batch of frames (N, H, W, 3).
+        
+        Returns:
+            Graded uint8 frames of the same shape
+        """
+        import cv2
+        import numpy as np
+        
+        single = frames.ndim == 3
+        batch = frames[None] if single else frames
+        height, width = batch.shape[1:3]
+        
+        # One gather through the baked table grades every pixel of the batch;
+        # entries are packed BGR0 words, so each pixel is a single 4-byte load
+        shift = 8 - TABLE_BITS
+        top = (batch >> shift).astype(np.uint32)
+        index = (top[..., 0] << (2 * TABLE_BITS)) | (top[..., 1] << TABLE_BITS) | top[..., 2]
+        packed = np.take(self.table, index).view(np.uint8).reshape(*index.shape, 4)
+        
+        vignette = self._vignette(height, width) if self.recipe["vignette"] else None
+        graded = np.empty_like(batch)
+        for frame_index in range(len(batch)):
+            frame = cv2.cvtColor(packed[frame_index], cv2.COLOR_BGRA2BGR, dst=graded[frame_index])
+            if vignette is not None:
+                cv2.multiply(frame, vignette, dst=frame, scale=1 / 255)
+            if self.recipe["grain"]:
+                lighter, darker = self._grain_plate(height, width)
+                cv2.add(frame, lighter, dst=frame)
+                cv2.subtract(frame, darker, dst=frame)
+        
+        return graded[0] if single else graded
+    
+    def _vignette(self, height: int, width: int) -> "np.ndarray":
+        """Radial falloff mask (H, W, 3) in 1/255 units, cached per size."""
+        import numpy as np
+        
+        with self._lock:
+            mask = self._vignettes.get((height, width))
+            if mask is None:
+                y = np.linspace(-1.0, 1.0, height, dtype=np.float32)[:, None]
+                x = np.linspace(-1.0, 1.0, width, dtype=np.float32)[None, :]
+                falloff = 1.0 - self.recipe["vignette"] * (x * x + y * y) / 2.0
+                mask = np.repeat(np.round(falloff * 255.0).astype(np.uint8)[..., None], 3, axis=2)
+                self._vignettes[(height, width)] = mask
+            return mask
+    
+    def _grain_plate(self, height: int, width: int) -> tuple:
+        """
+        Luminance grain for one frame, as (lighter, darker) uint8 offsets.
+        
+        Plates are generated once per size with a margin; each frame takes
+        the next plate at a random offset (a view, nothing is copied).
+        """
+        import numpy as np
+        
+        with self._lock:
+            plates = self._grain.get((height, width))
+            if plates is None:
+                rng = np.random.default_rng()
+                noise = rng.standard_normal((GRAIN_PLATES, height + GRAIN_MARGIN, width + GRAIN_MARGIN, 1))
+                noise = np.repeat(np.round(noise * self.recipe["grain"] * 255.0), 3, axis=3)
+                plates = (
+                    np.clip(noise, 0, 255).astype(np.uint8),
+                    np.clip(-noise, 0, 255).astype(np.uint8),
+                    rng
+                )
+                self._grain[(height, width)] = plates
+            lighter, darker, rng = plates
+            plate = self._frame_index % GRAIN_PLATES
+            self._frame_index += 1
+            y, x = rng.integers(GRAIN_MARGIN + 1, size=2)
+        
+        return lighter[plate, y:y + height, x:x + width], darker[plate, y:y + height, x:x + width]
+    
+    def restyle_image(self, source_path: str, output_path: str) -> Optional[str]:
+        """Grade an image file; returns output_path, or None if it cannot be read."""
+        import cv2
+        
+        image = cv2.imread(source_path)
+        if image is None:
+            return None
+        if not cv2.imwrite(output_path, self.apply(image)):
+            return None
+        return output_path
+    
+    def restyle_video(self, source_path: str, output_path: str) -> Optional[str]:
+        """Grade every frame of a video, FRAME_BATCH frames at a time."""
+        import cv2
+        import numpy as np
+        from utils.frame_pipeline import encode_frames
+        
+        capture = cv2.VideoCapture(source_path)
+        if not capture.isOpened():
+            return None
+        fps = capture.get(cv2.CAP_PROP_FPS) or 24
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        
+        def graded_frames():
+            batch = []
+            while True:
+                ok, frame = capture.read()
+                if ok:
+                    batch.append(frame)
+                if batch and (not ok or len(batch) == FRAME_BATCH):
+                    yield from self.apply(np.stack(batch))
+                    batch = []
+                if not ok:
+                    break
+        
+        try:
+            written = encode_frames(output_path, fps, (width, height), graded_frames())
+        finally:
+            capture.release()
+        
+        if written == 0 or not os.path.exists(output_path):
+            return None
+        return output_path
+
+
+_restylers: Dict[tuple, Restyler] = {}
+_restylers_lock = threading.Lock()
+
+
+def get_restyler(style: str) -> Restyler:
+    """The Restyler for a style, built (and its LUT baked) on first use."""
+    key = (style, Config.RESTYLE_LUT_DIR)
+    with _restylers_lock:
+        restyler = _restylers.get(key)
+        if restyler is None:
+            restyler = _restylers[key] = Restyler(style)
+        return restyler
+
+
+def restyle_artifact(artifact: MediaArtifact, style: str, prompt: str = "") -> Optional[MediaArtifact]:
+    """
+    Grade a generated image or video into another style (blocking).
+    
+    Args:
+        artifact: Media to restyle; it is left untouched
+        style: Target style
+        prompt: Prompt of the original generation, for the file name
+    
+    Returns:
+        Artifact of the restyled copy, or None if it could not be produced
+    """
+    import uuid
+    from utils.file_handler import FileHandler
+    
+    restyler = get_restyler(style)
+    file_handler = FileHandler()
+    extension = os.path.splitext(artifact.path)[1] or (".png" if artifact.is_image else ".mp4")
+    output_path = os.path.join(file_handler.output_dir, f"restyled_{uuid.uuid4().hex}{extension}")
+    
+    if artifact.is_image:
+        restyled = restyler.restyle_image(artifact.path, output_path)
+    else:
+        restyled = restyler.restyle_video(artifact.path, output_path)
+    if not restyled:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return None
+    
+    return file_handler.store_rendered_file(
+        restyled, f"{style} {prompt}", VideoProvider.STABILITY_AI, artifact.mime_type
+    )
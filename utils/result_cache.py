@@ -0,0 +1,346 @@
+"""
+Result cache shared by every worker process on a node.
+
+Streamlit workers behind a load balancer do not share memory, so generation
+results are indexed in a SQLite database in WAL mode (many concurrent
+readers, one writer at a time, safe across processes). A result row is only
+published after its media file is atomically in place, so readers never see
+a half-written entry.
+
+Generation itself is single-flight across processes: the first worker to
+miss takes a lease row for the key and generates; the others poll until the
+result is published. Leases expire, so a worker that crashes mid-generation
+only delays the others until the lease runs out.
+
+With a remote storage backend (STORAGE_BACKEND=s3), every published result
+also gets a small JSON manifest in the bucket (results/<key>.json), so
+replicas on other nodes find it on a local miss, fetch the media and index
+it locally. Leases stay per node: two nodes that miss the same key at the
+same moment may each generate it once.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Callable, Awaitable, TYPE_CHECKING
+
+from config import Config
+from utils import cancellation
+from utils.artifacts import MediaArtifact, GenerationResult
+from utils.cancellation import CancellationToken
+from utils.file_io import run_io
+
+if TYPE_CHECKING:
+    from utils.file_handler import FileHandler
+
+# Storage-backend key prefix of the manifests that share results between nodes
+MANIFEST_PREFIX = "results/"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mime_type TEXT NOT NULL,
+    sha256 TEXT,
+    storage_key TEXT,
+    metadata TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_expires_at ON results(expires_at);
+"""
+
+
+class SharedResultCache:
+    """Cross-process result cache with single-flight generation."""
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        file_handler: Optional["FileHandler"] = None
+    ):
+        """
+        Args:
+            path: SQLite database file (Config.RESULT_CACHE_PATH by default)
+            ttl: Seconds a published result stays valid
+            lease_seconds: Seconds a worker may hold the generation lock
+            file_handler: Gives access to the storage backend (a default
+                FileHandler is created on first use if omitted)
+        """
+        self.path = os.path.abspath(path or Config.RESULT_CACHE_PATH)
+        self.ttl = ttl or Config.RESULT_CACHE_TTL
+        self.lease_seconds = lease_seconds or Config.RESULT_CACHE_LEASE_SECONDS
+        self._file_handler = file_handler
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection (safe to use from any thread or process)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    @property
+    def file_handler(self) -> "FileHandler":
+        if self._file_handler is None:
+            from utils.file_handler import FileHandler
+            self._file_handler = FileHandler()
+        return self._file_handler
+    
+    @staticmethod
+    def make_key(prompt: str, **params) -> str:
+        """
+        Build a cache key from a prompt and the parameters that affect the output.
+        
+        Whitespace in the prompt is normalized; everything else must match
+        exactly.
+        """
+        payload = {"prompt": " ".join(prompt.split()), **params}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[GenerationResult]:
+        """
+        Look up a published result.
+        
+        Entries whose media is gone (and cannot be fetched from the storage
+        backend) are dropped and reported as a miss. On a local miss, results
+        other nodes shared through remote storage are checked too.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path, size, mime_type, sha256, storage_key, metadata FROM results "
+                "WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        if not row:
+            return self._get_shared(key)
+        
+        path, size, mime_type, sha256, storage_key, metadata = row
+        artifact = MediaArtifact(path=path, size=size, mime_type=mime_type, _sha256=sha256, storage_key=storage_key)
+        
+        if not artifact.exists():
+            artifact = self._fetch_remote(storage_key, mime_type)
+            if artifact is None:
+                self.invalidate(key)
+                return None
+        
+        metadata = json.loads(metadata)
+        metadata['cache_hit'] = True
+        return GenerationResult(success=True, artifact=artifact, metadata=metadata)
+    
+    def _fetch_remote(self, storage_key: Optional[str], mime_type: str) -> Optional[MediaArtifact]:
+        """Get a local copy of a result another node saved to shared storage."""
+        if not storage_key or not self.file_handler.storage.is_remote:
+            return None
+        return self.file_handler.fetch_artifact(storage_key, mime_type)
+    
+    def _get_shared(self, key: str) -> Optional[GenerationResult]:
+        """Look up a result another node shared through remote storage, and index it here."""
+        storage = self.file_handler.storage
+        if not storage.is_remote:
+            return None
+        
+        manifest_key = f"{MANIFEST_PREFIX}{key}.json"
+        try:
+            if not storage.exists(manifest_key):
+                return None
+            manifest = json.loads(b"".join(storage.iter_chunks(manifest_key)))
+        except Exception as e:
+            print(f"⚠️  Failed to read shared result {key[:12]}: {str(e)}")
+            return None
+        if manifest["expires_at"] <= time.time():
+            return None
+        
+        artifact = self._fetch_remote(manifest["storage_key"], manifest["mime_type"])
+        if artifact is None:
+            return None
+        result = GenerationResult(success=True, artifact=artifact, metadata=manifest["metadata"])
+        self._index(key, result, manifest["expires_at"])
+        
+        result.metadata = {**result.metadata, 'cache_hit': True}
+        return result
+    
+    def publish(self, key: str, result: GenerationResult) -> bool:
+        """
+        Publish a successful result for other workers.
+        
+        The artifact must already be fully written; the row is inserted in a
+        single transaction, so readers see either nothing or the whole entry.
+        
+        Returns:
+            True if the result was cached
+        """
+        artifact = result.artifact
+        if not result.success or artifact is None or not artifact.exists():
+            return False
+        
+        expires_at = time.time() + self.ttl
+        self._index(key, result, expires_at)
+        self._share(key, result, expires_at)
+        return True
+    
+    def _index(self, key: str, result: GenerationResult, expires_at: float):
+        """Insert a result into this node's index."""
+        artifact = result.artifact
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(key, path, size, mime_type, sha256, storage_key, metadata, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    os.path.abspath(artifact.path),
+                    artifact.size,
+                    artifact.mime_type,
+                    artifact.sha256,
+                    artifact.storage_key,
+                    json.dumps(result.metadata, default=str),
+                    time.time(),
+                    expires_at
+                )
+            )
+    
+    def _share(self, key: str, result: GenerationResult, expires_at: float):
+        """Write a result manifest to remote storage for replicas on other nodes."""
+        artifact = result.artifact
+        storage = self.file_handler.storage
+        if not storage.is_remote or not artifact.storage_key:
+            return
+        
+        manifest = {
+            "storage_key": artifact.storage_key,
+            "mime_type": artifact.mime_type,
+            "metadata": result.metadata,
+            "expires_at": expires_at
+        }
+        try:
+            storage.put_stream(
+                f"{MANIFEST_PREFIX}{key}.json",
+                [json.dumps(manifest, default=str).encode()],
+                "application/json"
+            )
+        except Exception as e:
+            print(f"⚠️  Failed to share cached result {key[:12]}: {str(e)}")
+    
+    def invalidate(self, key: str):
+        """Forget a cached result (here and in shared storage)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        
+        storage = self.file_handler.storage
+        if storage.is_remote:
+            try:
+                storage.delete(f"{MANIFEST_PREFIX}{key}.json")
+            except Exception as e:
+                print(f"⚠️  Failed to remove shared result {key[:12]}: {str(e)}")
+    
+    def try_acquire(self, key: str, owner: str) -> bool:
+        """
+        Try to become the one worker that generates a key.
+        
+        Fails if the result is already published or another owner holds an
+        unexpired lease.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock up front so the check and the insert are atomic
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute(
+                "SELECT 1 FROM results WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone():
+                return False
+            
+            lease = conn.execute("SELECT owner, expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+            if lease and lease[0] != owner and lease[1] > now:
+                return False
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + self.lease_seconds)
+            )
+        return True
+    
+    def release(self, key: str, owner: str):
+        """Give up the generation lease (only if still held by owner)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+    
+    def purge_expired(self):
+        """Remove expired results and stale leases from the index."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+    
+    async def get_or_generate(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[GenerationResult]],
+        progress_callback: Optional[Callable] = None,
+        poll_interval: float = 0.5,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
+        """
+        Return the cached result for key, generating it at most once per node.
+        
+        Args:
+            key: Cache key from make_key
+            generate: Coroutine function producing the result on a miss
+            progress_callback: Optional callback for progress updates
+            poll_interval: Seconds between checks while another worker generates
+            cancel_token: Stops waiting for another worker when cancelled
+        
+        Returns:
+            Cached or freshly generated GenerationResult
+        """
+        owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        deadline = time.monotonic() + self.lease_seconds
+        waiting = False
+        
+        while True:
+            cached = await run_io(self.get, key)
+            if cached is not None:
+                if progress_callback:
+                    progress_callback(100, "Loaded cached result")
+                return cached
+            
+            if await run_io(self.try_acquire, key, owner):
+                break
+            
+            if time.monotonic() > deadline:
+                # The lease holder should have expired by now; don't wait forever
+                break
+            
+            if not waiting and progress_callback:
+                progress_callback(10, "Identical request in progress on another worker, waiting...")
+            waiting = True
+            await cancellation.sleep(poll_interval, cancel_token)
+        
+        try:
+            result = await generate()
+            # Offline fallbacks are not real results; let the next request retry
+            if result.success and not result.metadata.get('demo_mode'):
+                await run_io(self.publish, key, result)
+            return result
+        finally:
+            await run_io(self.release, key, owner)
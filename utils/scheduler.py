@@ -0,0 +1,199 @@
+"""
+Priority and fair-share ordering for queued generation jobs.
+
+Jobs are ordered by, in turn:
+
+1. Priority class (e.g. interactive before background final renders), with
+   aging so a waiting job is promoted one class per
+   Config.SCHEDULER_AGING_SECONDS and lower classes cannot starve.
+2. Fair share between sessions: each session accumulates the cost (video
+   seconds) of the jobs it has been granted, and the backlogged session with
+   the least usage goes next. A session that was idle re-enters at the
+   current minimum, so it neither starves others with banked credit nor
+   waits behind a heavy user's history (start-time fair queuing).
+3. Within a session, shortest job first by duration when
+   Config.SCHEDULER_SJF is set, otherwise arrival order.
+
+Wait times are recorded per priority class so fairness and latency goals can
+be checked under load.
+"""
+
+import itertools
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+from config import Config
+
+
+@dataclass
+class Job:
+    """A queued request for a generation slot."""
+    
+    priority: str
+    session_id: str
+    cost: float
+    enqueued_at: float = field(default_factory=time.monotonic)
+    seq: int = 0
+
+
+class FairShareScheduler:
+    """Orders waiting jobs; not thread-safe (callers hold their own lock)."""
+    
+    def __init__(
+        self,
+        priorities: Optional[Dict[str, int]] = None,
+        shortest_job_first: Optional[bool] = None,
+        aging_seconds: Optional[float] = None,
+        metrics_window: int = 1000,
+        session_window: int = 1000
+    ):
+        """
+        Args:
+            priorities: Class name -> rank (lower runs first)
+            shortest_job_first: Order a session's own jobs by cost
+            aging_seconds: Waiting time that promotes a job one class (0 disables)
+            metrics_window: Wait-time samples kept per class
+            session_window: Sessions whose grant counts are kept; the least
+                recently granted are forgotten first
+        """
+        self.priorities = priorities or Config.PRIORITY_CLASSES
+        self.shortest_job_first = Config.SCHEDULER_SJF if shortest_job_first is None else shortest_job_first
+        self.aging_seconds = Config.SCHEDULER_AGING_SECONDS if aging_seconds is None else aging_seconds
+        self._waiting: List[Job] = []
+        self._usage: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._wait_samples = {name: deque(maxlen=metrics_window) for name in self.priorities}
+        self.session_window = max(session_window, 1)
+        self._granted_by_session: "OrderedDict[str, int]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._waiting)
+    
+    def __contains__(self, job: Job) -> bool:
+        return job in self._waiting
+    
+    def submit(self, priority: str, session_id: str, cost: float) -> Job:
+        """
+        Queue a job.
+        
+        Raises:
+            ValueError: Unknown priority class
+        """
+        self._check_priority(priority)
+        
+        # With nothing queued there is no contention to be fair about
+        if not self._waiting:
+            self._usage.clear()
+        
+        # An idle session re-enters at the current minimum usage
+        backlogged = {job.session_id for job in self._waiting}
+        floor = min((self._usage.get(s, 0.0) for s in backlogged), default=None)
+        if session_id not in backlogged and floor is not None:
+            self._usage[session_id] = max(self._usage.get(session_id, 0.0), floor)
+        
+        job = Job(priority=priority, session_id=session_id, cost=max(cost, 0.0), seq=next(self._seq))
+        self._waiting.append(job)
+        return job
+    
+    def remove(self, job: Job):
+        """Drop a job that gave up waiting."""
+        if job in self._waiting:
+            self._waiting.remove(job)
+    
+    def _rank(self, job: Job, now: float) -> int:
+        rank = self.priorities[job.priority]
+        if self.aging_seconds > 0:
+            rank -= int((now - job.enqueued_at) // self.aging_seconds)
+        return max(rank, 0)
+    
+    def _pick(self, jobs: List[Job], usage: Dict[str, float], now: float) -> Job:
+        """The job that should run next among jobs, given session usage."""
+        best_rank = min(self._rank(job, now) for job in jobs)
+        candidates = [job for job in jobs if self._rank(job, now) == best_rank]
+        
+        least = min(usage.get(job.session_id, 0.0) for job in candidates)
+        candidates = [job for job in candidates if usage.get(job.session_id, 0.0) == least]
+        
+        if self.shortest_job_first:
+            return min(candidates, key=lambda job: (job.cost, job.seq))
+        return min(candidates, key=lambda job: job.seq)
+    
+    def peek(self) -> Optional[Job]:
+        """The job that would be granted next."""
+        if not self._waiting:
+            return None
+        return self._pick(self._waiting, self._usage, time.monotonic())
+    
+    def grant(self, job: Job):
+        """Remove a job from the queue and charge its session."""
+        self._waiting.remove(job)
+        self._usage[job.session_id] = self._usage.get(job.session_id, 0.0) + job.cost
+        self._count_grant(job.session_id)
+        self._wait_samples[job.priority].append(time.monotonic() - job.enqueued_at)
+        
+        # Idle sessions at or below the floor re-enter there anyway; forget them
+        backlogged = {waiting.session_id for waiting in self._waiting}
+        floor = min((self._usage.get(s, 0.0) for s in backlogged), default=0.0)
+        for session_id in list(self._usage):
+            if session_id not in backlogged and self._usage[session_id] <= floor:
+                del self._usage[session_id]
+    
+    def record_immediate(self, priority: str, session_id: str, cost: float):
+        """Account for a job granted without queueing."""
+        self._check_priority(priority)
+        # Usage only matters while jobs are queued; submit() resets it otherwise
+        if self._waiting:
+            self._usage[session_id] = self._usage.get(session_id, 0.0) + max(cost, 0.0)
+        self._count_grant(session_id)
+        self._wait_samples[priority].append(0.0)
+    
+    def _count_grant(self, session_id: str):
+        """Bump a session's grant count, keeping at most session_window sessions."""
+        self._granted_by_session[session_id] = self._granted_by_session.pop(session_id, 0) + 1
+        while len(self._granted_by_session) > self.session_window:
+            self._granted_by_session.popitem(last=False)
+    
+    def _check_priority(self, priority: str):
+        if priority not in self.priorities:
+            raise ValueError(f"Priority must be one of: {', '.join(self.priorities)}")
+    
+    def position(self, job: Job) -> int:
+        """1-based position of a job in the current schedule."""
+        now = time.monotonic()
+        remaining = list(self._waiting)
+        usage = dict(self._usage)
+        position = 1
+        while remaining:
+            picked = self._pick(remaining, usage, now)
+            if picked is job:
+                return position
+            remaining.remove(picked)
+            usage[picked.session_id] = usage.get(picked.session_id, 0.0) + picked.cost
+            position += 1
+        return position
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Wait-time percentiles per priority class and grants per recent session."""
+        per_class = {}
+        for name, samples in self._wait_samples.items():
+            ordered = sorted(samples)
+            per_class[name] = {
+                'count': len(ordered),
+                'waiting': sum(1 for job in self._waiting if job.priority == name),
+                'mean_wait': round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+                'p50_wait': round(_percentile(ordered, 50), 3),
+                'p95_wait': round(_percentile(ordered, 95), 3),
+                'max_wait': round(ordered[-1], 3) if ordered else 0.0
+            }
+        return {'classes': per_class, 'granted_by_session': dict(self._granted_by_session)}
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not ordered:
+        return 0.0
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
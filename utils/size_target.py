@@ -0,0 +1,274 @@
+"""
+Size-targeted re-encoding for videos over Config.MAX_FILE_SIZE.
+
+cv2's encoder has no bitrate or quality control; its output grows with the
+pixel rate (resolution x frame rate). Oversized videos are therefore
+re-encoded at the best rung of a resolution / frame-rate ladder whose
+estimated size fits the target:
+
+1. Estimate: one decode pass feeds a few short sample windows of the video
+   to an encoder per rung at once; each rung's sample size is scaled up to
+   the full frame count.
+2. Encode: the video is encoded once at the chosen rung (stepping down a
+   rung if the result still overshoots).
+
+The target is MAX_FILE_SIZE, or less when TARGET_BANDWIDTH names a
+bandwidth class (bits per second x duration).
+
+cv2 can only write mp4v video and drops every other track, so only videos
+that are a single mp4v track already (our own renders) are re-encoded.
+Provider videos - H.264 and friends, often with audio - are kept as
+delivered rather than turned into something browsers cannot play.
+"""
+
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from config import Config
+from utils.faststart import track_formats
+from utils.frame_interpolation import read_frames
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# MIME types of videos cv2 can decode and re-encode as MP4
+SIZE_TARGET_TYPES = {"video/mp4", "video/quicktime"}
+
+# Sample entry formats cv2 writes, and so can re-encode without changing codec
+REENCODABLE_FORMATS = {b"mp4v"}
+
+# Estimates are scaled by this before comparing with the target, leaving
+# room for estimation error
+SAFETY_MARGIN = 0.9
+
+
+@dataclass(frozen=True)
+class Rung:
+    """One step of the encoding ladder."""
+    
+    scale: float  # Fraction of the source width and height
+    frame_step: int  # Keep every frame_step-th frame
+    
+    def size(self, width: int, height: int):
+        # Even dimensions keep chroma subsampling happy
+        return max(2, int(width * self.scale) // 2 * 2), max(2, int(height * self.scale) // 2 * 2)
+
+
+# Best first; frame rate is halved only once resolution has been given up
+LADDER = [
+    Rung(1.0, 1),
+    Rung(0.75, 1),
+    Rung(0.5, 1),
+    Rung(0.75, 2),
+    Rung(0.5, 2),
+    Rung(0.375, 2),
+    Rung(0.25, 2),
+]
+
+
+def reencodable(path: str) -> bool:
+    """Whether re-encoding path with cv2 keeps its codec and every track."""
+    tracks = track_formats(path)
+    return bool(tracks) and all(
+        handler == b"vide" and entry_format in REENCODABLE_FORMATS for handler, entry_format in tracks
+    )
+
+
+def target_size(duration: float, bandwidth: Optional[str] = None) -> int:
+    """
+    Byte budget for a video of the given duration.
+    
+    Args:
+        duration: Length in seconds
+        bandwidth: Bandwidth class from Config.BANDWIDTH_CLASSES
+            (Config.TARGET_BANDWIDTH if omitted; empty for no class)
+    """
+    bandwidth = Config.TARGET_BANDWIDTH if bandwidth is None else bandwidth
+    bits_per_second = Config.BANDWIDTH_CLASSES.get(bandwidth)
+    if not bits_per_second:
+        return Config.MAX_FILE_SIZE
+    return min(Config.MAX_FILE_SIZE, int(bits_per_second * duration / 8))
+
+
+class SizeTargetedEncoder:
+    """Re-encodes a video to fit a byte budget."""
+    
+    def __init__(self, target_bytes: int, ladder: Optional[List[Rung]] = None):
+        """
+        Args:
+            target_bytes: Largest acceptable output size
+            ladder: Rungs to choose from, best first (LADDER if omitted)
+        """
+        self.target_bytes = target_bytes
+        self.ladder = ladder or LADDER
+    
+    def estimate(self, source_path: str) -> Dict[Rung, int]:
+        """
+        Estimated output size of every rung, from one pass over sampled frames.
+        
+        Config.SIZE_SAMPLES windows of Config.SIZE_SAMPLE_SECONDS each are
+        spread over the video; frames outside them are decoded and skipped.
+        """
+        import cv2
+        
+        capture = cv2.VideoCapture(source_path)
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS) or 24.0
+            total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            sampled = self._sample_indices(total, fps)
+            
+            with tempfile.TemporaryDirectory() as directory:
+                writers = {
+                    rung: cv2.VideoWriter(
+                        os.path.join(directory, f"{index}.mp4"),
+                        cv2.VideoWriter_fourcc(*'mp4v'),
+                        fps / rung.frame_step,
+                        rung.size(width, height)
+                    )
+                    for index, rung in enumerate(self.ladder)
+                }
+                fed = 0
+                try:
+                    for index, frame in enumerate(read_frames(capture)):
+                        if index not in sampled:
+                            continue
+                        fed += 1
+                        for rung, writer in writers.items():
+                            if index % rung.frame_step == 0:
+                                writer.write(self._resize(frame, rung.size(width, height)))
+                finally:
+                    for writer in writers.values():
+                        writer.release()
+                
+                if fed == 0:
+                    return {}
+                total = max(total, fed)
+                return {
+                    rung: int(os.path.getsize(os.path.join(directory, f"{index}.mp4")) * total / fed)
+                    for index, rung in enumerate(self.ladder)
+                }
+        finally:
+            capture.release()
+    
+    def choose(self, estimates: Dict[Rung, int]) -> Rung:
+        """Best rung whose estimate fits the budget (the last rung if none do)."""
+        for rung in self.ladder:
+            if estimates.get(rung, 0) <= self.target_bytes * SAFETY_MARGIN:
+                return rung
+        return self.ladder[-1]
+    
+    def encode(self, source_path: str, output_path: str) -> Optional[dict]:
+        """
+        Encode source_path into output_path within the budget.
+        
+        Returns:
+            {"rung", "estimate", "size", "width", "height", "fps"} of the
+            encode that was kept, or None if the source could not be read
+        """
+        estimates = self.estimate(source_path)
+        if not estimates:
+            return None
+        
+        start = self.ladder.index(self.choose(estimates))
+        result = None
+        for rung in self.ladder[start:]:
+            result = self._encode_rung(source_path, output_path, rung)
+            if result is None:
+                return None
+            result["estimate"] = estimates[rung]
+            if result["size"] <= self.target_bytes:
+                break
+        return result
+    
+    def _encode_rung(self, source_path: str, output_path: str, rung: Rung) -> Optional[dict]:
+        """Full encode at one rung through the frame pipeline."""
+        import cv2
+        from utils.frame_pipeline import encode_frames
+        
+        capture = cv2.VideoCapture(source_path)
+        try:
+            fps = (capture.get(cv2.CAP_PROP_FPS) or 24.0) / rung.frame_step
+            size = rung.size(int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            frames = (
+                self._resize(frame, size)
+                for index, frame in enumerate(read_frames(capture))
+                if index % rung.frame_step == 0
+            )
+            written = encode_frames(output_path, fps, size, frames)
+        finally:
+            capture.release()
+        
+        if written == 0 or not os.path.exists(output_path):
+            return None
+        return {
+            "rung": rung,
+            "size": os.path.getsize(output_path),
+            "width": size[0],
+            "height": size[1],
+            "fps": fps
+        }
+    
+    @staticmethod
+    def _sample_indices(total: int, fps: float) -> set:
+        """Frame indices of the sample windows, centred in equal parts of the video."""
+        window = max(1, int(round(Config.SIZE_SAMPLE_SECONDS * fps)))
+        samples = Config.SIZE_SAMPLES
+        if total <= window * samples:
+            return set(range(max(total, 1)))
+        indices = set()
+        for part in range(samples):
+            centre = int((part + 0.5) * total / samples)
+            start = max(0, min(total - window, centre - window // 2))
+            indices.update(range(start, start + window))
+        return indices
+    
+    @staticmethod
+    def _resize(frame: "np.ndarray", size) -> "np.ndarray":
+        import cv2
+        
+        if (frame.shape[1], frame.shape[0]) == size:
+            return frame
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def fit_to_size(path: str, bandwidth: Optional[str] = None) -> Optional[dict]:
+    """
+    Re-encode a video in place if it exceeds its byte budget (blocking).
+    
+    Args:
+        path: Video file
+        bandwidth: Bandwidth class (Config.TARGET_BANDWIDTH if omitted)
+    
+    Returns:
+        The encode result (see SizeTargetedEncoder.encode) if the file was
+        replaced, None if it already fit or could not be re-encoded (see
+        reencodable)
+    """
+    import cv2
+    
+    if not reencodable(path):
+        return None
+    
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 24.0
+    duration = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) / fps
+    capture.release()
+    
+    target = target_size(duration, bandwidth)
+    if duration <= 0 or os.path.getsize(path) <= target:
+        return None
+    
+    temp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f".sized_{os.path.basename(path)}")
+    try:
+        result = SizeTargetedEncoder(target).encode(path, temp_path)
+        if result is None or result["size"] >= os.path.getsize(path):
+            return None
+        os.replace(temp_path, path)
+        return result
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,204 @@
+"""
+Multiplexed status polling for outstanding provider jobs.
+
+Rather than every generation running its own poll loop, each provider (per
+API key and endpoint) gets one StatusPoller. Its thread wakes on a shared
+tick of Config.STATUS_POLL_INTERVAL seconds and checks every job that is due
+in one pass: through the provider's batch status endpoint when it has one
+(Config.STATUS_BATCH_SIZE IDs per request), otherwise with single-job checks
+on a small shared pool. Each status document is delivered to the job's
+PendingCallback, the same sink the webhook receiver writes to, so a waiting
+generation wakes on whichever arrives first. Jobs that have a webhook are
+only polled every Config.WEBHOOK_FALLBACK_POLL_SECONDS as a backstop.
+
+With a batch endpoint, N concurrent jobs cost about N / STATUS_BATCH_SIZE
+requests per tick instead of N.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Callable, Dict, Any, List, Iterable
+
+from config import Config
+from utils.cancellation import CancellationToken
+from utils.webhooks import PendingCallback
+
+
+@dataclass
+class _Job:
+    updates: PendingCallback
+    has_webhook: bool
+    next_due: float
+
+
+class StatusPoller:
+    """Polls all outstanding jobs of one provider on a shared schedule."""
+    
+    def __init__(
+        self,
+        name: str,
+        fetch_one: Callable[[str], Dict[str, Any]],
+        pending_statuses: Iterable[str],
+        fetch_batch: Optional[Callable[[List[str]], Dict[str, Dict[str, Any]]]] = None,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Provider name, for logs and thread names
+            fetch_one: Returns the status document of one job; raises on
+                transient errors (the job is retried on the next tick)
+            pending_statuses: Status values meaning the job is still running
+            fetch_batch: Returns status documents by job ID for many jobs at
+                once, if the provider has a batch endpoint
+            interval: Seconds between polling passes
+            batch_size: Job IDs per batch request
+        """
+        self.name = name
+        self.pending_statuses = set(pending_statuses)
+        self._fetch_one = fetch_one
+        self._fetch_batch = fetch_batch
+        self.interval = interval or Config.STATUS_POLL_INTERVAL
+        self.batch_size = max(1, batch_size or Config.STATUS_BATCH_SIZE)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs: Dict[str, _Job] = {}
+        self._thread = None
+        self._workers = None
+        self.requests = 0
+        self.checks = 0
+    
+    def track(self, generation_id: str, updates: PendingCallback):
+        """Start polling a job; status documents go to updates."""
+        has_webhook = updates.url is not None
+        # Webhook jobs are only polled as a backstop; others join the next pass
+        next_due = time.monotonic() + Config.WEBHOOK_FALLBACK_POLL_SECONDS if has_webhook else 0.0
+        with self._lock:
+            self._jobs[generation_id] = _Job(updates, has_webhook, next_due)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-status-poller", daemon=True)
+                self._thread.start()
+            self._changed.notify_all()
+    
+    def untrack(self, generation_id: str):
+        with self._lock:
+            self._jobs.pop(generation_id, None)
+    
+    async def wait(
+        self,
+        generation_id: str,
+        cancel_token: Optional[CancellationToken] = None,
+        callback: Optional[PendingCallback] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Wait until a job leaves the pending statuses.
+        
+        Args:
+            generation_id: Provider job ID
+            cancel_token: Stops waiting (and polling) when cancelled
+            callback: Webhook callback the job was submitted with, if any
+            timeout: Seconds to wait (Config.API_TIMEOUT if omitted)
+        
+        Returns:
+            The job's final status document, or None if it timed out
+        
+        Raises:
+            GenerationCancelled: The token was cancelled or its deadline passed
+        """
+        updates = callback if callback is not None else PendingCallback()
+        expires_at = time.monotonic() + (Config.API_TIMEOUT if timeout is None else timeout)
+        self.track(generation_id, updates)
+        try:
+            while True:
+                left = expires_at - time.monotonic()
+                if left <= 0:
+                    return None
+                data = await updates.wait(left, cancel_token)
+                if data is not None and data.get("status") not in self.pending_statuses:
+                    return data
+        finally:
+            self.untrack(generation_id)
+    
+    def _run(self):
+        next_pass = time.monotonic()
+        while True:
+            with self._lock:
+                while not self._jobs:
+                    self._changed.wait()
+                
+                now = time.monotonic()
+                if now < next_pass:
+                    # New jobs wait for the shared tick rather than polling alone
+                    self._changed.wait(next_pass - now)
+                    continue
+                
+                next_pass = now + self.interval
+                due = {}
+                for generation_id, job in self._jobs.items():
+                    if job.next_due <= now:
+                        job.next_due = now + (Config.WEBHOOK_FALLBACK_POLL_SECONDS if job.has_webhook else self.interval)
+                        due[generation_id] = job
+            
+            if due:
+                try:
+                    self._poll(due)
+                except Exception as e:
+                    print(f"⚠️  {self.name} status poll failed: {e}")
+    
+    def _poll(self, due: Dict[str, _Job]):
+        """Check every due job once and deliver the results."""
+        ids = list(due)
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        if self._fetch_batch is not None:
+            for start in range(0, len(ids), self.batch_size):
+                chunk = ids[start:start + self.batch_size]
+                self.requests += 1
+                try:
+                    results.update(self._fetch_batch(chunk))
+                except Exception as e:
+                    print(f"⚠️  {self.name} batch status check failed: {e}")
+        else:
+            if self._workers is None:
+                self._workers = ThreadPoolExecutor(
+                    max_workers=Config.STATUS_POLL_CONCURRENCY,
+                    thread_name_prefix=f"{self.name}-status"
+                )
+            
+            def check(generation_id):
+                try:
+                    return generation_id, self._fetch_one(generation_id)
+                except Exception as e:
+                    print(f"Error checking status: {str(e)}")
+                    return generation_id, None
+            
+            self.requests += len(ids)
+            results.update((gid, data) for gid, data in self._workers.map(check, ids) if data is not None)
+        
+        self.checks += len(ids)
+        for generation_id, data in results.items():
+            job = due.get(generation_id)
+            if job is not None:
+                job.updates.deliver(data)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Outstanding jobs and status requests made so far."""
+        with self._lock:
+            outstanding = len(self._jobs)
+        return {'outstanding': outstanding, 'requests': self.requests, 'job_checks': self.checks}
+
+
+_pollers: Dict[tuple, StatusPoller] = {}
+_pollers_lock = threading.Lock()
+
+
+def get_status_poller(key: tuple, factory: Callable[[], StatusPoller]) -> StatusPoller:
+    """The poller shared by every client with this key (e.g. provider, endpoint, API key)."""
+    with _pollers_lock:
+        poller = _pollers.get(key)
+        if poller is None:
+            poller = _pollers[key] = factory()
+        return poller
@@ -0,0 +1,265 @@
+"""
+Pluggable storage backends for generated media.
+
+FileHandler always renders and saves into its local working directory; a
+storage backend is the shared persistence tier behind it. The local backend
+keeps files where they are (single node), while the S3-compatible backend
+streams every artifact to a bucket with multipart uploads and hands out
+presigned read URLs, so any replica can serve any result.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional, Iterable, Iterator
+
+from config import Config
+from utils.file_io import atomic_write
+
+CHUNK_SIZE = 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+
+
+@dataclass
+class StoredObject:
+    """Metadata of an object held by a storage backend."""
+    
+    key: str
+    size: int
+    content_type: str
+    etag: Optional[str] = None
+
+
+class StorageBackend:
+    """Interface shared by all storage backends."""
+    
+    # Whether objects live outside this node's filesystem
+    is_remote = False
+    
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: str) -> StoredObject:
+        """Store streamed content under key."""
+        raise NotImplementedError
+    
+    def put_file(self, key: str, path: str, content_type: str) -> StoredObject:
+        """Store a local file under key without loading it whole."""
+        return self.put_stream(key, _iter_file(path), content_type)
+    
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream an object's content."""
+        raise NotImplementedError
+    
+    def download_to(self, key: str, path: str) -> int:
+        """Copy an object to a local file atomically; returns bytes written."""
+        size, _ = atomic_write(path, self.iter_chunks(key))
+        return size
+    
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+    
+    def delete(self, key: str):
+        raise NotImplementedError
+    
+    def read_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        """URL (or local path) that a browser or st.video can read the object from."""
+        raise NotImplementedError
+
+
+class LocalStorageBackend(StorageBackend):
+    """Objects are files under a root directory on this node."""
+    
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Key escapes storage root: {key}")
+        return path
+    
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: str) -> StoredObject:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size, sha256 = atomic_write(path, chunks)
+        return StoredObject(key=key, size=size, content_type=content_type, etag=sha256)
+    
+    def put_file(self, key: str, path: str, content_type: str) -> StoredObject:
+        # Files already saved under the root are stored in place
+        if os.path.abspath(path) == self._path(key):
+            return StoredObject(key=key, size=os.path.getsize(path), content_type=content_type)
+        return super().put_file(key, path, content_type)
+    
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        return _iter_file(self._path(key), chunk_size)
+    
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+    
+    def delete(self, key: str):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+    
+    def read_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        return self._path(key)
+
+
+class S3StorageBackend(StorageBackend):
+    """Objects live in an S3-compatible bucket (AWS S3, MinIO, R2, ...)."""
+    
+    is_remote = True
+    
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client=None,
+        part_size: Optional[int] = None,
+        url_ttl: Optional[int] = None
+    ):
+        """
+        Args:
+            bucket: Bucket name
+            prefix: Key prefix for every object
+            client: boto3-style S3 client (created from Config if omitted)
+            part_size: Multipart part size in bytes (at least 5 MiB)
+            url_ttl: Default lifetime of presigned URLs in seconds
+        """
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client if client is not None else self._create_client()
+        self.part_size = max(part_size or Config.S3_PART_SIZE, MIN_PART_SIZE)
+        self.url_ttl = url_ttl or Config.PRESIGNED_URL_TTL
+    
+    @staticmethod
+    def _create_client():
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        
+        return boto3.client(
+            "s3",
+            endpoint_url=Config.S3_ENDPOINT_URL or None,
+            region_name=Config.S3_REGION or None
+        )
+    
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+    
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: str) -> StoredObject:
+        """
+        Upload streamed content, switching to a multipart upload once it
+        exceeds one part. At most one part is buffered in memory.
+        """
+        object_key = self._key(key)
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        size = 0
+        
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                buffer += chunk
+                size += len(chunk)
+                
+                while len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        upload_id = self.client.create_multipart_upload(
+                            Bucket=self.bucket, Key=object_key, ContentType=content_type
+                        )["UploadId"]
+                    parts.append(self._upload_part(object_key, upload_id, len(parts) + 1,
+                                                   bytes(buffer[:self.part_size])))
+                    del buffer[:self.part_size]
+            
+            if upload_id is None:
+                # Small object: a single PUT is cheaper than a multipart upload
+                response = self.client.put_object(
+                    Bucket=self.bucket, Key=object_key, Body=bytes(buffer), ContentType=content_type
+                )
+                return StoredObject(key=key, size=size, content_type=content_type, etag=response.get("ETag"))
+            
+            if buffer:
+                parts.append(self._upload_part(object_key, upload_id, len(parts) + 1, bytes(buffer)))
+            
+            response = self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+            return StoredObject(key=key, size=size, content_type=content_type, etag=response.get("ETag"))
+        
+        except BaseException:
+            # Don't leave orphaned parts accruing storage charges
+            if upload_id is not None:
+                try:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+                except Exception as e:
+                    print(f"⚠️  Failed to abort multipart upload: {e}")
+            raise
+    
+    def _upload_part(self, object_key: str, upload_id: str, part_number: int, body: bytes) -> dict:
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=object_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+    
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        try:
+            while True:
+                chunk = body.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+    
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception:
+            return False
+    
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+    
+    def read_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=expires_in or self.url_ttl
+        )
+
+
+def get_storage_backend(local_root: str) -> StorageBackend:
+    """
+    Create the backend selected by Config.STORAGE_BACKEND.
+    
+    Args:
+        local_root: Root directory for the local backend
+    
+    Returns:
+        StorageBackend instance
+    """
+    if Config.STORAGE_BACKEND == "s3":
+        if not Config.S3_BUCKET:
+            raise ValueError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3StorageBackend(Config.S3_BUCKET, Config.S3_PREFIX)
+    return LocalStorageBackend(local_root)
+
+
+def _iter_file(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
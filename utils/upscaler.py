@@ -0,0 +1,182 @@
+"""
+Tiled CPU upscaler for images rendered below the output resolution.
+
+Rendering at a smaller native size is faster and uses fewer credits; the
+image is then brought up to the selected resolution locally. The source is
+cropped to the target aspect ratio, split into overlapping tiles, and every
+tile is resized (Lanczos) and edge-sharpened on a shared thread pool (cv2
+releases the GIL, so tiles run in parallel). Each tile only writes its core
+region, so the overlap gives the resampling and sharpening kernels context
+and no seams show.
+
+Sharpening is an unsharp mask weighted by local edge strength: edges get
+their crispness back, flat areas (sky, skin) are left alone so noise and
+compression artefacts are not amplified.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple, TYPE_CHECKING
+
+from config import Config, VideoProvider
+from utils.artifacts import MediaArtifact
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    """Thread pool shared by every upscale in this process."""
+    global _workers
+    with _workers_lock:
+        if _workers is None:
+            _workers = ThreadPoolExecutor(max_workers=Config.UPSCALE_WORKERS, thread_name_prefix="upscale")
+        return _workers
+
+
+class TiledUpscaler:
+    """Upscales BGR images to an exact output size, tile by tile."""
+    
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tile: Optional[int] = None,
+        overlap: int = 16,
+        sharpen: Optional[float] = None
+    ):
+        """
+        Args:
+            width: Output width in pixels
+            height: Output height in pixels
+            tile: Tile size in output pixels (Config.UPSCALE_TILE if omitted)
+            overlap: Context in output pixels around each tile
+            sharpen: Edge sharpening amount, 0 to disable (Config.UPSCALE_SHARPEN if omitted)
+        """
+        self.width = width
+        self.height = height
+        self.tile = tile or Config.UPSCALE_TILE
+        self.overlap = overlap
+        self.sharpen = Config.UPSCALE_SHARPEN if sharpen is None else sharpen
+    
+    def upscale(self, image: "np.ndarray") -> "np.ndarray":
+        """
+        Crop to the output aspect ratio and upscale to the output size.
+        
+        Returns:
+            uint8 BGR image of shape (height, width, 3)
+        """
+        import numpy as np
+        
+        source = self._crop_to_aspect(image)
+        scale_x = source.shape[1] / self.width
+        scale_y = source.shape[0] / self.height
+        output = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        
+        tiles = self._tiles()
+        futures = [_pool().submit(self._render_tile, source, output, box, scale_x, scale_y) for box in tiles]
+        for future in futures:
+            future.result()
+        return output
+    
+    def _crop_to_aspect(self, image: "np.ndarray") -> "np.ndarray":
+        height, width = image.shape[:2]
+        target_ratio = self.width / self.height
+        if abs(width / height - target_ratio) < 1e-3:
+            return image
+        if width / height > target_ratio:
+            crop_w = int(round(height * target_ratio))
+            x = (width - crop_w) // 2
+            return image[:, x:x + crop_w]
+        crop_h = int(round(width / target_ratio))
+        y = (height - crop_h) // 2
+        return image[y:y + crop_h]
+    
+    def _tiles(self) -> List[Tuple[int, int, int, int]]:
+        """Core (x0, y0, x1, y1) boxes covering the output."""
+        return [
+            (x, y, min(x + self.tile, self.width), min(y + self.tile, self.height))
+            for y in range(0, self.height, self.tile)
+            for x in range(0, self.width, self.tile)
+        ]
+    
+    def _render_tile(
+        self,
+        source: "np.ndarray",
+        output: "np.ndarray",
+        box: Tuple[int, int, int, int],
+        scale_x: float,
+        scale_y: float
+    ):
+        """Upscale one tile with its overlap and write its core into output."""
+        import cv2
+        import numpy as np
+        
+        x0, y0, x1, y1 = box
+        # Padded output box, clamped to the image
+        px0, py0 = max(0, x0 - self.overlap), max(0, y0 - self.overlap)
+        px1, py1 = min(self.width, x1 + self.overlap), min(self.height, y1 + self.overlap)
+        
+        # Output pixel x samples source x' = (x + 0.5) * scale - 0.5; warpAffine
+        # keeps that mapping exact for every tile, so neighbours line up
+        matrix = np.float32([
+            [scale_x, 0, (px0 + 0.5) * scale_x - 0.5],
+            [0, scale_y, (py0 + 0.5) * scale_y - 0.5]
+        ])
+        tile = cv2.warpAffine(
+            source, matrix, (px1 - px0, py1 - py0),
+            flags=cv2.INTER_LANCZOS4 | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_REFLECT
+        )
+        
+        if self.sharpen > 0:
+            tile = self._sharpen_edges(tile)
+        
+        output[y0:y1, x0:x1] = tile[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+    
+    def _sharpen_edges(self, tile: "np.ndarray") -> "np.ndarray":
+        """Unsharp mask applied in proportion to local edge strength."""
+        import cv2
+        import numpy as np
+        
+        blurred = cv2.GaussianBlur(tile, (0, 0), 1.2)
+        gray = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+        magnitude = cv2.magnitude(
+            cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3),
+            cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+        )
+        # 0 in flat areas, 1 on clear edges
+        edges = np.clip((cv2.GaussianBlur(magnitude, (0, 0), 1.0) - 20.0) / 80.0, 0.0, 1.0)
+        
+        detail = tile.astype(np.float32) - blurred
+        sharpened = tile + (self.sharpen * edges)[..., None] * detail
+        return np.clip(sharpened + 0.5, 0, 255).astype(np.uint8)
+
+
+def upscale_artifact(artifact: MediaArtifact, resolution: str, prompt: str = "") -> Optional[MediaArtifact]:
+    """
+    Upscale a generated image to a resolution such as "1024x576" (blocking).
+    
+    Returns:
+        Artifact of the upscaled PNG, or None if the image cannot be read
+    """
+    import uuid
+    import cv2
+    from utils.file_handler import FileHandler
+    
+    image = cv2.imread(artifact.path)
+    if image is None:
+        return None
+    
+    width, height = (int(value) for value in resolution.lower().split("x"))
+    upscaled = TiledUpscaler(width, height).upscale(image)
+    
+    file_handler = FileHandler()
+    output_path = os.path.join(file_handler.output_dir, f"upscaled_{uuid.uuid4().hex}.png")
+    if not cv2.imwrite(output_path, upscaled):
+        return None
+    return file_handler.store_rendered_file(output_path, prompt, VideoProvider.STABILITY_AI, "image/png")
@@ -0,0 +1,161 @@
+"""
+Stitch generated segments (videos or still images) into a single MP4.
+"""
+
+import os
+from typing import List, Iterator, Optional, TYPE_CHECKING
+
+from config import Config
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class VideoStitcher:
+    """Streams segments into one video, with optional crossfades between them."""
+    
+    def __init__(self, resolution: str = "1024x576", fps: int = 24):
+        width, height = resolution.lower().split("x")
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = fps
+    
+    def stitch(
+        self,
+        segment_paths: List[str],
+        durations: List[float],
+        output_path: str,
+        crossfade: float = 0.0
+    ) -> Optional[str]:
+        """
+        Stitch segments into one MP4.
+        
+        Video segments are read frame by frame; image segments become a slow
+        zoom. Only the frames of one crossfade window are buffered at a time.
+        
+        Args:
+            segment_paths: Segment files in playback order
+            durations: Seconds of each segment that should remain visible
+                once crossfades have been applied
+            output_path: Destination MP4 path
+            crossfade: Crossfade length in seconds (0 for hard cuts)
+        
+        Returns:
+            output_path on success, None if nothing could be written
+        """
+        from utils.frame_pipeline import encode_frames
+        
+        fade_frames = int(round(crossfade * self.fps)) if len(segment_paths) > 1 else 0
+        frames = self._stitched_frames(segment_paths, durations, fade_frames)
+        written = encode_frames(output_path, self.fps, (self.width, self.height), frames)
+        
+        if written == 0 or not os.path.exists(output_path):
+            return None
+        return output_path
+    
+    def _stitched_frames(
+        self,
+        segment_paths: List[str],
+        durations: List[float],
+        fade_frames: int
+    ) -> Iterator["np.ndarray"]:
+        """Yield the frames of every segment, crossfading fade_frames at each join."""
+        import cv2
+        
+        tail = []
+        last_index = len(segment_paths) - 1
+        
+        for index, (path, duration) in enumerate(zip(segment_paths, durations)):
+            # Every segment but the last also covers the overlap with the next one
+            frame_count = int(round(duration * self.fps)) + (fade_frames if index < last_index else 0)
+            frames = self._segment_frames(path, frame_count)
+            
+            # Blend the buffered tail of the previous segment into this head
+            for fade_index, previous in enumerate(tail):
+                current = next(frames, None)
+                if current is None:
+                    yield previous
+                    continue
+                alpha = (fade_index + 1) / (len(tail) + 1)
+                yield cv2.addWeighted(previous, 1.0 - alpha, current, alpha, 0.0)
+            
+            # Yield the body, holding back the last frames for the next fade
+            tail = []
+            for frame in frames:
+                if index < last_index and fade_frames:
+                    tail.append(frame)
+                    if len(tail) <= fade_frames:
+                        continue
+                    frame = tail.pop(0)
+                yield frame
+        
+        yield from tail
+    
+    def _segment_frames(self, path: str, frame_count: int) -> Iterator["np.ndarray"]:
+        """Yield exactly frame_count frames for a segment at the output size."""
+        import cv2
+        
+        image = cv2.imread(path) if not path.lower().endswith(".mp4") else None
+        if image is not None:
+            yield from self._still_frames(image, frame_count)
+            return
+        
+        cap = cv2.VideoCapture(path)
+        try:
+            available = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if Config.INTERPOLATE_SHORT_CLIPS and 1 < available < frame_count:
+                # Stretch short clips with synthesized in-between frames
+                from utils.frame_interpolation import FrameInterpolator, read_frames
+                
+                frames = (self._fit(frame) for frame in read_frames(cap))
+                yield from FrameInterpolator().interpolate(frames, available, frame_count)
+                return
+            
+            last = None
+            for _ in range(frame_count):
+                ok, frame = cap.read()
+                if ok:
+                    last = self._fit(frame)
+                elif last is None:
+                    return
+                # Short clips hold their last frame for the remaining time
+                yield last
+        finally:
+            cap.release()
+    
+    def _still_frames(self, image: "np.ndarray", frame_count: int, zoom: float = 0.08) -> Iterator["np.ndarray"]:
+        """Turn a still image into a slow zoom-in."""
+        import cv2
+        
+        base = self._fit(image, scale=1.0 + zoom)
+        base_h, base_w = base.shape[:2]
+        
+        for frame_num in range(frame_count):
+            progress = frame_num / max(frame_count - 1, 1)
+            scale = 1.0 + zoom * progress
+            crop_w = int(base_w / scale)
+            crop_h = int(base_h / scale)
+            x = (base_w - crop_w) // 2
+            y = (base_h - crop_h) // 2
+            yield cv2.resize(base[y:y + crop_h, x:x + crop_w], (self.width, self.height),
+                             interpolation=cv2.INTER_LINEAR)
+    
+    def _fit(self, frame: "np.ndarray", scale: float = 1.0) -> "np.ndarray":
+        """Center-crop to the output aspect ratio and resize (scaled by scale)."""
+        import cv2
+        
+        height, width = frame.shape[:2]
+        target_ratio = self.width / self.height
+        if width / height > target_ratio:
+            crop_w = int(height * target_ratio)
+            x = (width - crop_w) // 2
+            frame = frame[:, x:x + crop_w]
+        else:
+            crop_h = int(width / target_ratio)
+            y = (height - crop_h) // 2
+            frame = frame[y:y + crop_h]
+        
+        size = (int(self.width * scale), int(self.height * scale))
+        if frame.shape[1] == size[0] and frame.shape[0] == size[1]:
+            return frame
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,239 @@
+"""
+Local receiver for provider completion webhooks.
+
+Instead of discovering completion by polling, a client asks the receiver for
+a one-off callback URL, sends it with the generation request, and waits on
+it. When the provider POSTs its status update there, the waiting coroutine
+wakes immediately. The status poller still checks such jobs every
+Config.WEBHOOK_FALLBACK_POLL_SECONDS, so a callback that never arrives only
+costs latency, not the result.
+
+Each callback URL carries a random token, which is both the routing key and
+the proof that the caller is the provider we gave the URL to. Payloads are
+expected to be the same JSON document the provider's status endpoint
+returns.
+
+The receiver is optional: it only starts when Config.WEBHOOK_PUBLIC_URL is
+set, and if the port cannot be bound (e.g. another worker process on the
+same node already owns it) clients fall back to plain polling.
+"""
+
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any
+
+from config import Config
+from utils import cancellation, deadline
+from utils.cancellation import CancellationToken
+
+# Bigger bodies are not status updates
+MAX_PAYLOAD_BYTES = 1024 * 1024
+
+
+class PendingCallback:
+    """
+    Status updates for one job, delivered by the webhook receiver (through
+    the job's callback URL) or by the status poller.
+    """
+    
+    def __init__(
+        self,
+        receiver: Optional["WebhookReceiver"] = None,
+        token: Optional[str] = None,
+        url: Optional[str] = None
+    ):
+        self.url = url
+        self._receiver = receiver
+        self._token = token
+        self._lock = threading.Lock()
+        self._payloads = deque()
+        self._wake = None
+    
+    def deliver(self, payload: Dict[str, Any]):
+        """Queue a payload and wake the waiter (called from any thread)."""
+        with self._lock:
+            self._payloads.append(payload)
+            wake = self._wake
+        if wake is not None:
+            wake()
+    
+    async def wait(
+        self,
+        timeout: float,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next status update.
+        
+        Args:
+            timeout: Seconds to wait before giving up (and polling instead)
+            cancel_token: Stops waiting when cancelled or past its deadline
+        
+        Returns:
+            The payload, or None if nothing arrived in time
+        
+        Raises:
+            GenerationCancelled: The token was cancelled
+        """
+        cancellation.check(cancel_token)
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+        
+        def wake():
+            loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(None))
+        
+        with self._lock:
+            if self._payloads:
+                return self._payloads.popleft()
+            self._wake = wake
+        
+        unregister = cancel_token.on_cancel(wake) if cancel_token is not None else None
+        left = deadline.remaining(cancel_token)
+        try:
+            await asyncio.wait([woken], timeout=timeout if left is None else min(timeout, left))
+        finally:
+            if unregister is not None:
+                unregister()
+            with self._lock:
+                self._wake = None
+        
+        cancellation.check(cancel_token)
+        with self._lock:
+            return self._payloads.popleft() if self._payloads else None
+    
+    def close(self):
+        """Stop accepting callbacks on this URL."""
+        if self._receiver is not None:
+            self._receiver.discard(self._token)
+    
+    def __enter__(self) -> "PendingCallback":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class WebhookReceiver:
+    """Threaded HTTP server routing POST /webhooks/<token> to PendingCallbacks."""
+    
+    def __init__(self, public_url: str, host: Optional[str] = None, port: Optional[int] = None):
+        """
+        Args:
+            public_url: Base URL providers use to reach this server
+            host: Interface to listen on (Config.WEBHOOK_HOST if omitted)
+            port: Port to listen on (Config.WEBHOOK_PORT if omitted; 0 picks a free one)
+        """
+        self.public_url = public_url.rstrip("/")
+        self.host = host if host is not None else Config.WEBHOOK_HOST
+        self.port = Config.WEBHOOK_PORT if port is None else port
+        self._lock = threading.Lock()
+        self._pending: Dict[str, PendingCallback] = {}
+        self._server = None
+        self.delivered = 0
+    
+    def start(self):
+        """Bind the port and serve on a daemon thread."""
+        receiver = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.send_response(receiver._handle(self.path, self.headers, self.rfile))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                pass  # One line per provider callback is just noise
+        
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="webhook-receiver", daemon=True).start()
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def expect(self) -> PendingCallback:
+        """Create a callback URL to send with a generation request."""
+        token = secrets.token_urlsafe(24)
+        callback = PendingCallback(self, token, f"{self.public_url}/webhooks/{token}")
+        with self._lock:
+            self._pending[token] = callback
+        return callback
+    
+    def discard(self, token: str):
+        with self._lock:
+            self._pending.pop(token, None)
+    
+    def _handle(self, path: str, headers, body) -> int:
+        """Deliver one callback request; returns the HTTP status to answer with."""
+        prefix = "/webhooks/"
+        if not path.startswith(prefix):
+            return 404
+        with self._lock:
+            callback = self._pending.get(path[len(prefix):].split("?", 1)[0])
+        if callback is None:
+            return 404
+        
+        length = int(headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_PAYLOAD_BYTES:
+            return 413 if length > MAX_PAYLOAD_BYTES else 400
+        try:
+            payload = json.loads(body.read(length))
+        except ValueError:
+            return 400
+        if not isinstance(payload, dict):
+            return 400
+        
+        callback.deliver(payload)
+        with self._lock:
+            self.delivered += 1
+        return 204
+
+
+_receiver = None
+_receiver_started = False
+_receiver_lock = threading.Lock()
+
+
+def get_webhook_receiver() -> Optional[WebhookReceiver]:
+    """
+    The receiver shared by every client in this process, started on first use.
+    
+    Returns:
+        None when Config.WEBHOOK_PUBLIC_URL is unset or the port is taken
+    """
+    global _receiver, _receiver_started
+    with _receiver_lock:
+        if not _receiver_started:
+            _receiver_started = True
+            if Config.WEBHOOK_PUBLIC_URL:
+                receiver = WebhookReceiver(Config.WEBHOOK_PUBLIC_URL)
+                try:
+                    receiver.start()
+                    _receiver = receiver
+                except OSError as e:
+                    print(f"⚠️  Webhook receiver unavailable, polling instead: {e}")
+        return _receiver
+
+
+def expect_callback():
+    """
+    Context manager yielding a PendingCallback, or None without a receiver.
+    
+    Usage:
+        with expect_callback() as callback:
+            if callback is not None:
+                request["webhook_url"] = callback.url
+    """
+    receiver = get_webhook_receiver()
+    if receiver is None:
+        return nullcontext(None)
+    return receiver.expect()
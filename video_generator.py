@@ -3,34 +3,181 @@ Video generation orchestrator using Stability AI
 """
 
 import asyncio
-import tempfile
-import time
-import streamlit as st
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Dict, Any, Callable
-from pathlib import Path
 
 from config import Config, VideoProvider
-from api_clients.stability_ai_client import StabilityAIClient
+from utils.admission import QueueFullError, get_admission_controller
+from utils.artifacts import GenerationResult
+from utils.cancellation import CancellationToken, GenerationCancelled
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.file_io import run_io
+
+# Shared by all sessions; bounds how many full-quality renders run behind drafts
+_background_renders = ThreadPoolExecutor(
+    max_workers=Config.MAX_BACKGROUND_RENDERS,
+    thread_name_prefix="final-render"
+)
+
+
+class ProgressiveGeneration:
+    """Draft result that is available now, plus the final render in the background"""
+    
+    def __init__(self, draft: GenerationResult, final_future: Future, cancel_token: CancellationToken):
+        self.draft = draft
+        self._final_future = final_future
+        self._cancel_token = cancel_token
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_token.cancelled
+    
+    def final_ready(self) -> bool:
+        """Whether the final render has finished (or was cancelled)"""
+        return self._final_future.done()
+    
+    def final_result(self, timeout: Optional[float] = None) -> Optional[GenerationResult]:
+        """
+        Wait for the final render
+        
+        Args:
+            timeout: Seconds to wait, or None to wait until it finishes
+        
+        Returns:
+            The final GenerationResult, or None if the render was cancelled
+        """
+        if self.cancelled:
+            return None
+        try:
+            return self._final_future.result(timeout=timeout)
+        except Exception as e:
+            if self.cancelled:
+                return None
+            return GenerationResult.failure(f"Final render failed: {str(e)}")
+    
+    def cancel(self) -> bool:
+        """
+        Cancel the final render
+        
+        A render that has not reached the API yet is dropped without using
+        any quota; one that is already in flight has its connection closed
+        and any partially written file removed.
+        
+        Returns:
+            True if the final render had not completed yet
+        """
+        # Checked first: the render may wind down as soon as the token fires
+        pending = not self._final_future.done()
+        self._cancel_token.cancel("Final render cancelled")
+        self._final_future.cancel()
+        return pending
 
 
 class VideoGenerator:
     """Stability AI video generation orchestrator"""
     
-    def __init__(self):
+    def __init__(self, session_id: Optional[str] = None, priority: Optional[str] = None):
+        """
+        Args:
+            session_id: Caller's session, for fair sharing of generation slots
+            priority: Priority class of this caller's requests (see Config.PRIORITY_CLASSES)
+        """
         self.config = Config()
         self._client = None
-        
+        self._result_cache = None
+        self.session_id = session_id
+        self.priority = priority
+    
     async def initialize(self):
         """Initialize the Stability AI client"""
         try:
-            if not self.config.stability_api_key:
+            # Imported here so the HTTP stack is only loaded on first generation
+            from api_clients.stability_ai_client import StabilityAIClient
+            
+            if not Config.get_api_keys():
                 print("⚠️  No Stability AI API key found, using demo mode")
-                
-            self._client = StabilityAIClient(self.config.stability_api_key)
-                
+            
+            # Requests are spread across every configured key (STABILITY_API_KEYS)
+            self._client = StabilityAIClient()
+        
         except Exception as e:
             print(f"⚠️  Failed to initialize Stability AI client: {e}")
             print("🔄 Will use demo mode")
+        
+        if Config.RESULT_CACHE_ENABLED and self._result_cache is None:
+            try:
+                from utils.result_cache import SharedResultCache
+                self._result_cache = SharedResultCache()
+            except Exception as e:
+                print(f"⚠️  Shared result cache unavailable: {e}")
+    
+    def _cache_key(self, prompt: str, duration: int, style: str, resolution: str, **params) -> str:
+        """Cache key covering every setting that changes the generated output"""
+        from utils.result_cache import SharedResultCache
+        
+        return SharedResultCache.make_key(
+            prompt,
+            duration=duration,
+            style=style,
+            resolution=resolution,
+            model=Config.STABILITY_MODEL,
+            engine=Config.STABILITY_IMAGE_ENGINE,
+            steps=Config.FINAL_STEPS,
+            local_upscale=Config.LOCAL_UPSCALE,
+            **params
+        )
+    
+    async def _cached(
+        self,
+        key: str,
+        generate: Callable,
+        progress_callback: Optional[Callable] = None,
+        admit: bool = True,
+        priority: Optional[str] = None,
+        cost: float = 1.0,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
+        """Serve from the shared cache, or generate once across all workers"""
+        if admit:
+            # Cache hits and single-flight waiters never take a provider slot
+            produce = lambda: self._admitted(generate, progress_callback, priority, cost, cancel_token)
+        else:
+            produce = generate
+        
+        if self._result_cache is None:
+            return await produce()
+        return await self._result_cache.get_or_generate(key, produce, progress_callback, cancel_token=cancel_token)
+    
+    async def _admitted(
+        self,
+        generate: Callable,
+        progress_callback: Optional[Callable] = None,
+        priority: Optional[str] = None,
+        cost: float = 1.0,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
+        """Run a provider call once the process-wide admission controller lets it in"""
+        async with get_admission_controller().slot(
+            progress_callback,
+            priority=priority or self.priority,
+            session_id=self.session_id,
+            cost=cost,
+            cancel_token=cancel_token
+        ):
+            return await generate()
+    
+    @staticmethod
+    def _shed_response(error: QueueFullError) -> GenerationResult:
+        """Failure for a request rejected because the wait queue is full"""
+        return GenerationResult.failure(str(error), {'shed': True, 'retry_after': error.retry_after})
+    
+    @staticmethod
+    def _cancelled_response(error: GenerationCancelled) -> GenerationResult:
+        """Failure for a request that was cancelled or ran out of time"""
+        if isinstance(error, DeadlineExceeded):
+            return GenerationResult.failure(f"Generation timed out: {error}", {'timed_out': True})
+        return GenerationResult.failure(f"Generation cancelled: {error}", {'cancelled': True})
     
     async def generate_video(
         self,
@@ -38,8 +185,9 @@ class VideoGenerator:
         duration: int = 7,
         style: str = "Realistic",
         resolution: str = "1024x576",
-        progress_callback: Optional[Callable] = None
-    ) -> Dict[str, Any]:
+        progress_callback: Optional[Callable] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
         """
         Generate video using Stability AI
         
@@ -49,10 +197,14 @@ class VideoGenerator:
             style: Video style preference
             resolution: Video resolution
             progress_callback: Optional callback for progress updates
-            
+            cancel_token: Cancels the request, including in-flight HTTP calls;
+                a Deadline (Config.API_TIMEOUT if omitted) bounds the whole request
+        
         Returns:
-            Dict containing video data and metadata
+            GenerationResult referencing the generated media file
         """
+        cancel_token = cancel_token or Deadline()
+        
         if not self._client:
             await self.initialize()
         
@@ -63,32 +215,470 @@ class VideoGenerator:
             if progress_callback:
                 progress_callback(5, "Starting Stability AI video generation...")
             
-            # Generate video using Stability AI client
-            result = await self._client.generate_video(
-                prompt=prompt,
-                duration=duration,
-                style=style,
-                resolution=resolution,
-                progress_callback=progress_callback
+            # Generate video using Stability AI client (once per node for identical requests)
+            result = await self._cached(
+                self._cache_key(prompt, duration, style, resolution, quality="final"),
+                lambda: self._client.generate_video(
+                    prompt=prompt,
+                    duration=duration,
+                    style=style,
+                    resolution=resolution,
+                    progress_callback=progress_callback,
+                    cancel_token=cancel_token
+                ),
+                progress_callback,
+                cost=duration,
+                cancel_token=cancel_token
             )
             
             return result
+        
+        except GenerationCancelled as e:
+            return self._cancelled_response(e)
+        except QueueFullError as e:
+            return self._shed_response(e)
+        except Exception as e:
+            return GenerationResult.failure(f"Stability AI video generation failed: {str(e)}")
+    
+    async def generate_keyframe_video(
+        self,
+        prompt: str,
+        duration: int = 7,
+        style: str = "Realistic",
+        resolution: str = "1024x576",
+        progress_callback: Optional[Callable] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
+        """
+        Generate a video with real motion from concurrently requested SDXL keyframes
+        
+        Config.KEYFRAME_COUNT keyframes are generated at once and animated
+        locally with Config.KEYFRAME_TRANSITION transitions.
+        
+        Args:
+            prompt: Text description for video generation
+            duration: Video duration in seconds (5-10)
+            style: Video style preference
+            resolution: Video resolution
+            progress_callback: Optional callback for progress updates
+            cancel_token: Cancels every keyframe request still in flight; a
+                Deadline (Config.API_TIMEOUT if omitted) bounds the whole request
+        
+        Returns:
+            GenerationResult referencing the animated video
+        """
+        cancel_token = cancel_token or Deadline()
+        
+        if not self._client:
+            await self.initialize()
+        
+        try:
+            self._validate_inputs(prompt, duration, style, resolution)
+            
+            if progress_callback:
+                progress_callback(5, "Starting keyframe generation...")
+            
+            return await self._cached(
+                self._cache_key(
+                    prompt, duration, style, resolution,
+                    quality="keyframes", keyframes=Config.KEYFRAME_COUNT,
+                    transition=Config.KEYFRAME_TRANSITION, hold=Config.KEYFRAME_HOLD, fps=Config.KEYFRAME_FPS
+                ),
+                lambda: self._client.generate_keyframe_video(
+                    prompt=prompt,
+                    duration=duration,
+                    style=style,
+                    resolution=resolution,
+                    progress_callback=progress_callback,
+                    cancel_token=cancel_token
+                ),
+                progress_callback,
+                cost=duration,
+                cancel_token=cancel_token
+            )
+        
+        except GenerationCancelled as e:
+            return self._cancelled_response(e)
+        except QueueFullError as e:
+            return self._shed_response(e)
+        except Exception as e:
+            return GenerationResult.failure(f"Keyframe video generation failed: {str(e)}")
+    
+    async def restyle(self, result: GenerationResult, style: str) -> GenerationResult:
+        """
+        Re-grade an existing result into another style locally
+        
+        Applies the style's colour LUT, grain and vignette on the CPU; no API
+        call is made and no quota is used.
+        
+        Args:
+            result: Successful result to restyle (left untouched)
+            style: Target style
+        
+        Returns:
+            GenerationResult referencing the restyled copy
+        """
+        from utils.restyle import restyle_artifact
+        
+        if not result.success or result.artifact is None:
+            return GenerationResult.failure("Nothing to restyle")
+        
+        try:
+            # Grading every frame is CPU-bound; keep it off the event loop
+            loop = asyncio.get_event_loop()
+            artifact = await loop.run_in_executor(
+                None, restyle_artifact, result.artifact, style, result.metadata.get('prompt', '')
+            )
+        except Exception as e:
+            return GenerationResult.failure(f"Restyle failed: {str(e)}")
+        
+        if artifact is None:
+            return GenerationResult.failure("Restyle produced no output")
+        
+        return GenerationResult(
+            success=True,
+            artifact=artifact,
+            metadata={**result.metadata, 'style': style, 'restyled': True}
+        )
+    
+    async def generate_progressive(
+        self,
+        prompt: str,
+        duration: int = 7,
+        style: str = "Realistic",
+        resolution: str = "1024x576",
+        progress_callback: Optional[Callable] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> ProgressiveGeneration:
+        """
+        Generate a fast draft now and the full-quality render in the background
+        
+        Args:
+            prompt: Text description for video generation
+            duration: Video duration in seconds (5-10)
+            style: Video style preference
+            resolution: Video resolution
+            progress_callback: Optional callback for draft progress updates
+            cancel_token: Cancels the draft; a Deadline (Config.API_TIMEOUT if
+                omitted) bounds it. The final render gets a budget of its own.
+        
+        Returns:
+            ProgressiveGeneration holding the draft and the pending final render
+        """
+        cancel_token = cancel_token or Deadline()
+        # Cancelling the job cancels the final render; it gets its own budget
+        # once it starts, as it may wait behind interactive requests first
+        final_token = CancellationToken()
+        cancel_token.on_cancel(final_token.cancel)
+        
+        if not self._client:
+            await self.initialize()
+        
+        try:
+            self._validate_inputs(prompt, duration, style, resolution)
+            
+            # A final render another worker already produced beats any draft
+            final_key = self._cache_key(prompt, duration, style, resolution, quality="final")
+            if self._result_cache is not None:
+                cached = await run_io(self._result_cache.get, final_key)
+                if cached is not None:
+                    if progress_callback:
+                        progress_callback(100, "Loaded cached result")
+                    final_future = Future()
+                    final_future.set_result(cached)
+                    return ProgressiveGeneration(cached, final_future, final_token)
+            
+            if progress_callback:
+                progress_callback(5, "Starting draft render...")
+            
+            draft = await self._cached(
+                self._cache_key(
+                    prompt, duration, style, resolution,
+                    quality="draft", draft_engine=Config.DRAFT_ENGINE, draft_steps=Config.DRAFT_STEPS
+                ),
+                lambda: self._client.generate_video(
+                    prompt=prompt,
+                    duration=duration,
+                    style=style,
+                    resolution=resolution,
+                    progress_callback=progress_callback,
+                    quality="draft",
+                    cancel_token=cancel_token
+                ),
+                progress_callback,
+                cost=duration,
+                cancel_token=cancel_token
+            )
+        except GenerationCancelled as e:
+            draft = self._cancelled_response(e)
+        except QueueFullError as e:
+            draft = self._shed_response(e)
+        except Exception as e:
+            draft = GenerationResult.failure(f"Stability AI draft generation failed: {str(e)}")
+        
+        # No point paying for a final render when the draft already fell back
+        if not draft.success or draft.metadata.get('demo_mode'):
+            final_future = Future()
+            final_future.set_result(draft)
+            return ProgressiveGeneration(draft, final_future, final_token)
+        
+        final_future = _background_renders.submit(
+            self._run_final_render, prompt, duration, style, resolution, final_token
+        )
+        return ProgressiveGeneration(draft, final_future, final_token)
+    
+    def _run_final_render(
+        self,
+        prompt: str,
+        duration: int,
+        style: str,
+        resolution: str,
+        cancel_token: CancellationToken
+    ) -> Optional[GenerationResult]:
+        """Run the full-quality render on a background thread"""
+        # Cancelled while queued: never touch the API
+        if cancel_token.cancelled:
+            return None
+        
+        deadline = Deadline()
+        unregister = cancel_token.on_cancel(deadline.cancel)
+        try:
+            result = asyncio.run(self._cached(
+                self._cache_key(prompt, duration, style, resolution, quality="final"),
+                lambda: self._client.generate_video(
+                    prompt=prompt,
+                    duration=duration,
+                    style=style,
+                    resolution=resolution,
+                    quality="final",
+                    cancel_token=deadline
+                ),
+                priority="background",
+                cost=duration,
+                cancel_token=deadline
+            ))
+        except DeadlineExceeded as e:
+            return self._cancelled_response(e)
+        except GenerationCancelled:
+            return None
+        finally:
+            unregister()
+        
+        # Cancelled just as it finished: drop the file nobody will look at,
+        # unless it was published to the shared cache for other requests
+        if cancel_token.cancelled:
+            if result.artifact and not result.metadata.get('demo_mode') and self._result_cache is None:
+                from utils.file_handler import FileHandler
+                FileHandler().discard_artifact(result.artifact)
+            return None
+        
+        return result
+    
+    async def generate_long_video(
+        self,
+        prompt: str,
+        duration: int = 30,
+        style: str = "Realistic",
+        resolution: str = "1024x576",
+        progress_callback: Optional[Callable] = None,
+        crossfade: bool = True,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
+        """
+        Generate a long-form video from concurrently generated segments
+        
+        The duration is split into segments of about Config.SEGMENT_DURATION
+        seconds, all segments are requested at once (bounded by
+        Config.MAX_CONCURRENT_SEGMENTS) and the results are stitched into one
+        MP4, so wall-clock time stays close to a single segment's latency.
+        
+        Args:
+            prompt: Text description for video generation
+            duration: Total video duration in seconds
+            style: Video style preference
+            resolution: Video resolution
+            progress_callback: Optional callback for progress updates
+            crossfade: Crossfade between segments instead of hard cuts
+            cancel_token: Cancels every segment still in flight; a Deadline
+                (Config.API_TIMEOUT if omitted) bounds the whole video
+        
+        Returns:
+            GenerationResult referencing the stitched video
+        """
+        cancel_token = cancel_token or Deadline()
+        
+        if not self._client:
+            await self.initialize()
+        
+        try:
+            self._validate_inputs(prompt, duration, style, resolution, max_duration=Config.LONG_FORM_MAX_DURATION)
             
+            return await self._cached(
+                self._cache_key(
+                    prompt, duration, style, resolution,
+                    quality="long_form", segment_duration=Config.SEGMENT_DURATION, crossfade=crossfade
+                ),
+                lambda: self._render_long_video(
+                    prompt, duration, style, resolution, progress_callback, crossfade, cancel_token
+                ),
+                progress_callback,
+                admit=False,  # Each segment is admitted on its own
+                cancel_token=cancel_token
+            )
+        
+        except GenerationCancelled as e:
+            return self._cancelled_response(e)
+        except QueueFullError as e:
+            return self._shed_response(e)
         except Exception as e:
-            return {
-                'success': False,
-                'error': f"Stability AI video generation failed: {str(e)}",
-                'video_data': None
+            return GenerationResult.failure(f"Long-form video generation failed: {str(e)}")
+    
+    async def _render_long_video(
+        self,
+        prompt: str,
+        duration: int,
+        style: str,
+        resolution: str,
+        progress_callback: Optional[Callable],
+        crossfade: bool,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> GenerationResult:
+        """Generate all segments concurrently and stitch them (raises on failure)"""
+        durations = self._plan_segments(duration)
+        segment_progress = [0] * len(durations)
+        
+        if progress_callback:
+            progress_callback(5, f"Generating {len(durations)} segments in parallel...")
+        
+        semaphore = asyncio.Semaphore(Config.MAX_CONCURRENT_SEGMENTS)
+        
+        async def generate_segment(index: int, segment_duration: int) -> GenerationResult:
+            def segment_callback(percent, message):
+                # Overall progress is the mean of segment progress, mapped to 5-80%
+                segment_progress[index] = percent
+                if progress_callback:
+                    overall = 5 + int(75 * sum(segment_progress) / (100 * len(durations)))
+                    progress_callback(overall, f"Segment {index + 1}/{len(durations)}: {message}")
+            
+            async with semaphore:
+                return await self._admitted(
+                    lambda: self._client.generate_video(
+                        prompt=f"{prompt}, scene {index + 1} of {len(durations)}",
+                        duration=segment_duration,
+                        style=style,
+                        resolution=resolution,
+                        progress_callback=segment_callback,
+                        cancel_token=cancel_token
+                    ),
+                    segment_callback,
+                    priority="standard",
+                    cost=segment_duration,
+                    cancel_token=cancel_token
+                )
+        
+        outcomes = await asyncio.gather(
+            *(generate_segment(index, d) for index, d in enumerate(durations)),
+            return_exceptions=True
+        )
+        
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            # Don't leave finished segments behind when a sibling was cancelled or failed
+            await run_io(self._discard_segments, [o for o in outcomes if isinstance(o, GenerationResult)])
+            raise next((e for e in errors if isinstance(e, GenerationCancelled)), errors[0])
+        segments = outcomes
+        
+        failed = [index + 1 for index, segment in enumerate(segments) if not segment.success or not segment.artifact]
+        if failed:
+            await run_io(self._discard_segments, segments)
+            raise RuntimeError(f"Segments {', '.join(map(str, failed))} failed")
+        
+        if cancel_token is not None and cancel_token.cancelled:
+            await run_io(self._discard_segments, segments)
+            cancel_token.raise_if_cancelled()
+        
+        if progress_callback:
+            progress_callback(85, "Stitching segments...")
+        
+        # Stitching decodes and re-encodes every frame; keep it off the event loop
+        loop = asyncio.get_event_loop()
+        artifact = await loop.run_in_executor(
+            None,
+            self._stitch_segments,
+            segments,
+            durations,
+            resolution,
+            Config.CROSSFADE_SECONDS if crossfade else 0.0,
+            prompt
+        )
+        
+        if artifact is None:
+            raise RuntimeError("Stitching produced no video")
+        
+        if progress_callback:
+            progress_callback(100, "Long-form video ready!")
+        
+        return GenerationResult(
+            success=True,
+            artifact=artifact,
+            metadata={
+                'prompt': prompt,
+                'duration': duration,
+                'style': style,
+                'resolution': resolution,
+                'model': segments[0].metadata.get('model', Config.STABILITY_MODEL),
+                'segments': len(segments),
+                'crossfade': crossfade,
+                'demo_mode': any(segment.metadata.get('demo_mode') for segment in segments),
+                'long_form': True
             }
+        )
     
-    def _validate_inputs(self, prompt: str, duration: int, style: str, resolution: str):
+    def _plan_segments(self, duration: int) -> list:
+        """Split a duration into near-equal whole-second segments"""
+        count = max(1, -(-duration // Config.SEGMENT_DURATION))
+        base, remainder = divmod(duration, count)
+        return [base + 1 if index < remainder else base for index in range(count)]
+    
+    def _stitch_segments(self, segments: list, durations: list, resolution: str, crossfade: float, prompt: str = ""):
+        """Stitch segment artifacts into one MP4 and drop the intermediate files"""
+        import uuid
+        from utils.file_handler import FileHandler
+        from utils.video_stitcher import VideoStitcher
+        
+        file_handler = FileHandler()
+        output_path = os.path.join(file_handler.output_dir, f"longform_{uuid.uuid4().hex}.mp4")
+        stitched = VideoStitcher(resolution).stitch(
+            [segment.artifact.path for segment in segments],
+            durations,
+            output_path,
+            crossfade
+        )
+        
+        self._discard_segments(segments)
+        
+        if not stitched:
+            return None
+        return file_handler.store_rendered_file(stitched, f"longform {prompt}", VideoProvider.STABILITY_AI)
+    
+    def _discard_segments(self, segments: list):
+        """Delete per-request segment files (blocking)"""
+        from utils.file_handler import FileHandler
+        
+        file_handler = FileHandler()
+        # Fallback clips are shared cache entries; only per-request segments go
+        for segment in segments:
+            if segment.artifact and not segment.metadata.get('demo_mode'):
+                file_handler.discard_artifact(segment.artifact)
+    
+    def _validate_inputs(self, prompt: str, duration: int, style: str, resolution: str, max_duration: int = 10):
         """Validate input parameters for Stability AI"""
         
         if not prompt or len(prompt.strip()) < 10:
             raise ValueError("Prompt must be at least 10 characters long")
         
-        if duration < 5 or duration > 10:
-            raise ValueError("Duration must be between 5 and 10 seconds")
+        if duration < 5 or duration > max_duration:
+            raise ValueError(f"Duration must be between 5 and {max_duration} seconds")
         
         valid_styles = ["Realistic", "Cinematic", "Animated", "Documentary", "Fantasy", "Sci-Fi"]
         if style not in valid_styles:
@@ -118,13 +708,13 @@ class VideoGenerator:
         
         Args:
             job_id: The generation job ID
-            
+        
         Returns:
             Status information
         """
         if not self._client:
             await self.initialize()
-            
+        
         return await self._client.get_generation_status(job_id)
     
     def cleanup(self):
@@ -133,4 +723,5 @@ class VideoGenerator:
             # Clean up any temporary files if needed
             pass
         except Exception as e:
+            import streamlit as st
             st.warning(f"Cleanup warning: {str(e)}")